@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Graph Validation Benchmark
+Normalizes synthetic LLM-style process graphs (duplicate ids, dangling and aliased
+edge references, unlabeled decision branches, loops) at increasing sizes and reports
+the time per run. Time per node should stay flat if the pass is linear.
+
+Usage: python benchmarks/bench_graph_validation.py   (from backend/)
+"""
+
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph_validation import graph_validator
+
+SIZES = [100, 1_000, 10_000, 50_000]
+RUNS = 5
+SEED = 40
+
+
+def make_graph(size: int, rng: random.Random) -> dict:
+    nodes = []
+    edges = []
+    for i in range(size):
+        is_decision = rng.random() < 0.15 and i < size - 6
+        node_id = f"node-{i}"
+        if rng.random() < 0.01:
+            node_id = f"node-{rng.randrange(max(1, i))}"  # Duplicate id
+        nodes.append({
+            "id": node_id,
+            "type": "trigger" if i == 0 else "decision" if is_decision else "process",
+            "status": "trigger" if i == 0 else "current",
+            "title": f"Step {i}",
+            "description": "",
+        })
+        if i:
+            # Mix exact ids, sloppy aliases ("Node 12") and references to nodes that do not exist
+            target = f"node-{i}" if rng.random() > 0.05 else f"Node {i}"
+            source = f"node-{i - 1}" if rng.random() > 0.01 else f"node-missing-{i}"
+            edges.append({"source": source, "target": target})
+        if is_decision:
+            edges.append({"source": node_id, "target": f"node-{i + rng.randint(2, 5)}", "label": rng.choice(["no", "No", None])})
+        if rng.random() < 0.02 and i > 5:
+            edges.append({"source": f"node-{i}", "target": f"node-{i - rng.randint(2, 5)}"})  # Retry loop
+    return {"nodes": nodes, "edges": edges}
+
+
+def main():
+    rng = random.Random(SEED)
+    print("🔬 Graph validation benchmark")
+    print(f"{'nodes':>8}{'edges':>8}{'median':>12}{'per node':>12}{'renamed':>9}{'repaired':>10}{'dropped':>9}{'relabeled':>11}")
+    for size in SIZES:
+        graph = make_graph(size, rng)
+        timings = []
+        for _ in range(RUNS):
+            process = copy.deepcopy(graph)
+            started = time.perf_counter()
+            report = graph_validator.normalize(process)
+            timings.append(time.perf_counter() - started)
+        median = sorted(timings)[len(timings) // 2]
+        print(
+            f"{size:>8}{len(graph['edges']):>8}{median * 1000:>10.1f}ms{median / size * 1e6:>10.2f}µs"
+            f"{len(report.renamed_nodes):>9}{report.repaired_edges:>10}{report.dropped_edges:>9}{report.relabeled_branches:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Flowchart Layout Benchmark
+Lays out synthetic flowchart-like graphs (a main path with ~15% decisions whose NO
+branch skips a few steps ahead, and occasional retry loops back) at increasing sizes
+and reports the median time per layout with the resulting layers and crossings.
+
+Usage: python benchmarks/bench_layout.py   (from backend/)
+"""
+
+import os
+import platform
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from layout_engine import layout_engine
+
+SIZES = [50, 100, 250, 500, 1_000]
+RUNS = 7
+SEED = 39
+
+
+def make_graph(size: int, rng: random.Random) -> tuple:
+    nodes = []
+    edges = []
+    for i in range(size):
+        is_decision = 0 < i < size - 6 and rng.random() < 0.15
+        nodes.append({
+            "id": f"node-{i}",
+            "type": "trigger" if i == 0 else "decision" if is_decision else "process",
+            "title": f"Step {i}",
+        })
+        if i:
+            edges.append({"id": f"e-{i}", "source": f"node-{i - 1}", "target": f"node-{i}",
+                          "label": "Yes" if nodes[i - 1]["type"] == "decision" else None})
+        if is_decision:
+            edges.append({"id": f"no-{i}", "source": f"node-{i}", "target": f"node-{i + rng.randint(2, 5)}", "label": "No"})
+        if i > 5 and rng.random() < 0.03:
+            edges.append({"id": f"retry-{i}", "source": f"node-{i}", "target": f"node-{i - rng.randint(2, 5)}"})
+    return nodes, edges
+
+
+def main():
+    rng = random.Random(SEED)
+    print(f"🔬 Layout benchmark ({platform.python_implementation()} {platform.python_version()}, {platform.processor() or platform.machine()})")
+    print(f"{'nodes':>8}{'edges':>8}{'median':>12}{'layers':>8}{'crossings':>11}")
+    for size in SIZES:
+        nodes, edges = make_graph(size, rng)
+        timings = []
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            result = layout_engine.layout(nodes, edges)
+            timings.append(time.perf_counter() - started)
+        median = sorted(timings)[len(timings) // 2]
+        print(f"{size:>8}{len(edges):>8}{median * 1000:>10.1f}ms{result.layers:>8}{result.crossings:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Node Write Amplification Benchmark
+Compares the BSON size of the update each node endpoint sends to MongoDB before
+(read the process, $set the whole nodes array) and after (positional / arrayFilters
+update, $push, $pull, server-side reorder) on a 200-node process. The request
+payload is what crosses the wire and what the oplog and change streams carry.
+
+Usage: python benchmarks/bench_node_writes.py   (from backend/)
+"""
+
+import bson
+
+SIZE = 200
+NODE_ID = "node-100"
+
+
+def make_nodes(size: int) -> list:
+    return [
+        {
+            "id": f"node-{i}",
+            "type": "process",
+            "status": "current",
+            "title": f"Step {i}: review the submitted request",
+            "description": "Check the request against the policy and record the outcome in the tracker. " * 2,
+            "actors": ["Operations"],
+            "subSteps": ["Open the ticket", "Compare with policy", "Record outcome"],
+            "timeEstimate": "10 min",
+            "position": {"x": 0.0, "y": i * 150.0},
+        }
+        for i in range(size)
+    ]
+
+
+def command_bytes(filter_doc: dict, update, **options) -> int:
+    return len(bson.encode({"q": filter_doc, "u": update if isinstance(update, dict) else {"pipeline": update}, **options}))
+
+
+def main():
+    nodes = make_nodes(SIZE)
+    now = "2026-01-01T00:00:00+00:00"
+    ids = [node["id"] for node in nodes]
+    new_node = {"id": "node-200", "title": "New Step", "description": "Click to add details", "status": "current",
+                "actors": [], "subSteps": [], "position": {"x": 100.0, "y": 100.0}}
+    edit = {"title": "Review the escalated request"}
+
+    def full_set(updated_nodes):
+        return command_bytes({"id": "p"}, {"$set": {"nodes": updated_nodes, "updatedAt": now}})
+
+    guard = {"id": "p", "userId": "u", "revision": 7}
+    cases = [
+        (
+            "update_node",
+            full_set([{**node, **edit} if node["id"] == NODE_ID else node for node in nodes]),
+            command_bytes({**guard, "nodes.id": NODE_ID},
+                          {"$set": {"nodes.$[node].title": edit["title"], "updatedAt": now}, "$inc": {"revision": 1}},
+                          arrayFilters=[{"node.id": NODE_ID}]),
+        ),
+        (
+            "add_node",
+            full_set(nodes[:100] + [new_node] + nodes[100:]),
+            command_bytes(guard, {"$push": {"nodes": {"$each": [new_node], "$position": 100}},
+                                  "$set": {"updatedAt": now}, "$inc": {"revision": 1}}),
+        ),
+        (
+            "delete_node",
+            full_set([node for node in nodes if node["id"] != NODE_ID]),
+            command_bytes({**guard, "nodes.id": NODE_ID, "nodes.1": {"$exists": True}},
+                          {"$pull": {"nodes": {"id": NODE_ID}}, "$set": {"updatedAt": now}, "$inc": {"revision": 1}}),
+        ),
+        (
+            "reorder_nodes",
+            full_set(nodes[1:] + nodes[:1]),
+            command_bytes(
+                {**guard, "nodes": {"$size": SIZE}, "nodes.id": {"$all": ids[1:] + ids[:1]}},
+                [{"$set": {
+                    "nodes": {"$map": {
+                        "input": {"$literal": ids[1:] + ids[:1]},
+                        "as": "nodeId",
+                        "in": {"$arrayElemAt": [{"$filter": {"input": "$nodes", "cond": {"$eq": ["$$this.id", "$$nodeId"]}}}, 0]},
+                    }},
+                    "updatedAt": now,
+                    "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]},
+                }}],
+            ),
+        ),
+    ]
+
+    print(f"🔬 Node write amplification ({SIZE} nodes)")
+    print(f"{'operation':<16}{'before':>12}{'after':>12}{'ratio':>9}")
+    for name, before, after in cases:
+        print(f"{name:<16}{before / 1024:>10.1f}KB{after / 1024:>10.2f}KB{before / after:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
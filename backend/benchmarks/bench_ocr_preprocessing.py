@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+OCR Preprocessing Benchmark
+Compares raw Tesseract (full-resolution color, as /api/upload used to do) with the
+preprocessing pipeline on the bundled sample set. Reports latency and character
+accuracy (1 - character error rate) per sample.
+
+Usage: python benchmarks/bench_ocr_preprocessing.py   (from backend/, needs tesseract installed)
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytesseract
+
+from benchmarks.ocr_samples import load_samples
+from ocr_preprocessing import ocr_image, preprocess_for_ocr
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def character_accuracy(predicted: str, truth: str) -> float:
+    predicted, truth = normalize(predicted), normalize(truth)
+    return max(0.0, 1.0 - edit_distance(predicted, truth) / max(1, len(truth)))
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    print("🔬 OCR preprocessing benchmark")
+    print(f"{'sample':<24}{'variant':<14}{'latency':>10}{'accuracy':>10}")
+
+    totals = {}
+    for name, photo, truth in load_samples():
+        variants = {
+            "raw": lambda: pytesseract.image_to_string(photo),
+            "preprocessed": lambda: ocr_image(preprocess_for_ocr(photo), tile=False),
+            "pre+tiled": lambda: ocr_image(preprocess_for_ocr(photo), tile=True),
+        }
+        for variant, run in variants.items():
+            text, elapsed = timed(run)
+            accuracy = character_accuracy(text, truth)
+            latency_sum, accuracy_sum = totals.get(variant, (0.0, 0.0))
+            totals[variant] = (latency_sum + elapsed, accuracy_sum + accuracy)
+            print(f"{name:<24}{variant:<14}{elapsed:>9.2f}s{accuracy:>9.1%}")
+
+    count = len(load_samples())
+    print()
+    for variant, (latency_sum, accuracy_sum) in totals.items():
+        print(f"{'MEAN':<24}{variant:<14}{latency_sum / count:>9.2f}s{accuracy_sum / count:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Process Patch Benchmark
+Editing one node's description: request size and server-side CPU of a full
+PUT (parse + Process validation + model_dump of the whole document) against a
+JSON Patch (parse + normalize + value validation + translation to one update +
+the version history delta built from the node ids the update returns).
+
+Usage: python benchmarks/bench_process_patch.py   (from backend/)
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+
+from process_patch import history_delta, normalize_ops, translate
+
+SIZES = [20, 200, 1000]
+ROUNDS = 50
+
+
+def make_process(size: int) -> dict:
+    nodes = [
+        {
+            "id": f"node-{i}",
+            "type": "process",
+            "status": "current",
+            "title": f"Step {i}: review the submitted request",
+            "description": "Check the request against the policy and record the outcome in the tracker. " * 2,
+            "actors": ["Operations"],
+            "subSteps": ["Open the ticket", "Compare with policy", "Record outcome"],
+            "timeEstimate": "10 min",
+            "position": {"x": 0.0, "y": i * 150.0},
+        }
+        for i in range(size)
+    ]
+    edges = [{"id": f"edge-{i}", "source": f"node-{i}", "target": f"node-{i + 1}"} for i in range(size - 1)]
+    return {"id": "bench", "name": "Benchmark process", "version": 1, "nodes": nodes, "edges": edges}
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+
+def main():
+    from server import Process, ProcessNode  # Imported late: server logs its startup
+
+    description = TypeAdapter(ProcessNode.model_fields["description"].annotation)
+    print("🔬 PUT vs JSON Patch, one description edit")
+    print(f"{'nodes':>6}{'PUT body':>12}{'patch body':>12}{'PUT cpu':>11}{'patch cpu':>11}")
+    for size in SIZES:
+        process = make_process(size)
+        process["nodes"][size // 2]["description"] = "Escalate to the team lead when the policy is unclear."
+        put_body = json.dumps(process)
+        patch_body = json.dumps([{"op": "replace", "path": f"/nodes/{size // 2}/description",
+                                  "value": "Escalate to the team lead when the policy is unclear."}])
+
+        def put():
+            Process(**json.loads(put_body)).model_dump()
+
+        returned = {"id": "bench", "version": 1, "nodes": [{"id": node["id"]} for node in process["nodes"]]}
+
+        def patch():
+            ops = normalize_ops(json.loads(patch_body))
+            for op in ops:
+                op["value"] = description.dump_python(description.validate_python(op["value"]), mode="json")
+            translate(ops)
+            history_delta(ops, returned, {"version": 2})
+
+        print(
+            f"{size:>6}{len(put_body) / 1024:>10.1f}KB{len(patch_body):>11}B"
+            f"{timed(put):>9.2f}ms{timed(patch):>9.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
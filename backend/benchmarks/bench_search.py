@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Process Search Benchmark
+One user with 10k processes (12 nodes each, mixed vocabulary): latency of a ranked
+search through the inverted index (terms + prefix expansion, BM25, one page of 20
+with snippets) against the old unanchored case-insensitive regex test of every
+process's name, description and node titles/descriptions.
+
+Usage: python benchmarks/bench_search.py   (from backend/)
+"""
+
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import UserIndex, query_terms, snippets
+
+PROCESSES = 10_000
+NODES = 12
+PAGE = 20
+ROUNDS = 20
+QUERIES = ["invoice", "inv", "supplier approval", "sap onb", "re", "payroll exception escalation", "zzz"]
+
+COMMON = (
+    "review approve submit check record update send receive request invoice supplier customer "
+    "payment order ticket policy manager team report data form email system account contract"
+).split()
+SYSTEMS = ["SAP Ariba", "Salesforce", "Workday", "ServiceNow", "Xero", "Jira", "SharePoint"]
+
+
+def make_processes(count: int) -> list:
+    rng = random.Random(7)
+    rare = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 10))) for _ in range(20_000)]
+    rare += ["payroll", "exception", "escalation", "onboarding", "approval", "reconciliation"]
+
+    def words(n):
+        return " ".join(rng.choice(COMMON) if rng.random() < 0.6 else rng.choice(rare) for _ in range(n))
+
+    processes = []
+    for i in range(count):
+        nodes = [
+            {
+                "id": f"node-{j}",
+                "title": words(5).capitalize(),
+                "description": words(30).capitalize() + ".",
+                "actors": [rng.choice(["Finance", "HR", "Operations", "IT"])],
+                "operationalDetails": {
+                    "systems": [rng.choice(SYSTEMS)],
+                    "contactInfo": {"email": f"team{j}@example.com"},
+                },
+            }
+            for j in range(NODES)
+        ]
+        processes.append({
+            "id": f"process-{i}",
+            "name": words(4).capitalize(),
+            "description": words(20).capitalize() + ".",
+            "actors": ["Finance"],
+            "status": "published" if i % 3 else "draft",
+            "workspaceId": f"ws-{i % 5}",
+            "updatedAt": f"2026-01-01T00:00:00.{i:06d}+00:00",
+            "nodes": nodes,
+        })
+    return processes
+
+
+def regex_scan(processes: list, q: str) -> list:
+    pattern = re.compile(q, re.IGNORECASE)
+    return [
+        p for p in processes
+        if pattern.search(p["name"]) or pattern.search(p["description"])
+        or any(pattern.search(n["title"]) or pattern.search(n["description"]) for n in p["nodes"])
+    ]
+
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    return f"{statistics.median(samples):>8.2f}ms{samples[int(len(samples) * 0.95) - 1]:>9.2f}ms"
+
+
+def main():
+    processes = make_processes(PROCESSES)
+    by_id = {p["id"]: p for p in processes}
+
+    started = time.perf_counter()
+    index = UserIndex()
+    index.build(processes)
+    print(f"🔬 {PROCESSES} processes, {len(index.postings)} terms, index built in {time.perf_counter() - started:.2f}s")
+    print(f"{'query':<30}{'matches':>8}{'index p50':>11}{'p95':>11}{'regex p50':>11}{'p95':>11}")
+
+    for q in QUERIES:
+        indexed, scanned = [], []
+        for _ in range(ROUNDS):
+            started = time.perf_counter()
+            terms = query_terms(q)
+            scores = index.search(terms)
+            for process_id, _ in index.rank(scores, 0, PAGE):
+                snippets(by_id[process_id], terms)
+            indexed.append((time.perf_counter() - started) * 1000)
+        for _ in range(3):
+            started = time.perf_counter()
+            regex_scan(processes, q)
+            scanned.append((time.perf_counter() - started) * 1000)
+        print(f"{q!r:<30}{len(scores):>8}{percentiles(indexed)}{percentiles(scanned)}")
+
+    started = time.perf_counter()
+    for process in processes[:100]:
+        index.add({**process, "name": process["name"] + " renamed"})
+    print(f"♻️  Incremental re-index: {(time.perf_counter() - started) * 10:.2f}ms per process")
+
+
+if __name__ == "__main__":
+    main()
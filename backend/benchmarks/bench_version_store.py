@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Version Store Benchmark
+Replays a stream of typical edits (field changes, added/removed/reordered nodes,
+relabeled edges) against synthetic processes and compares the bytes a full copy
+per version would take with the snapshot + delta history, plus the worst-case
+time to rebuild a version from its nearest snapshot.
+
+Usage: python benchmarks/bench_version_store.py   (from backend/)
+"""
+
+import copy
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from version_store import apply_delta, version_store, versioned_content
+
+SIZES = [20, 100, 500]
+VERSIONS = 200
+SEED = 44
+
+
+def make_process(size: int) -> dict:
+    nodes = [
+        {
+            "id": f"node-{i}",
+            "type": "process",
+            "status": "current",
+            "title": f"Step {i}: review the submitted request",
+            "description": "Check the request against the policy and record the outcome in the tracker. " * 2,
+            "actors": ["Operations"],
+            "subSteps": ["Open the ticket", "Compare with policy", "Record outcome"],
+            "timeEstimate": "10 min",
+            "position": {"x": 0, "y": i * 150},
+        }
+        for i in range(size)
+    ]
+    edges = [{"id": f"edge-{i}", "source": f"node-{i}", "target": f"node-{i + 1}", "label": None, "condition": None} for i in range(size - 1)]
+    return {"id": "bench", "name": "Benchmark process", "version": 1, "nodes": nodes, "edges": edges}
+
+
+def edit(process: dict, rng: random.Random, counter: list):
+    nodes, edges = process["nodes"], process["edges"]
+    roll = rng.random()
+    if roll < 0.6:
+        node = rng.choice(nodes)
+        node[rng.choice(["title", "description", "timeEstimate"])] = f"Edited {counter[0]}"
+    elif roll < 0.75:
+        counter[0] += 1
+        nodes.insert(rng.randrange(len(nodes) + 1), {"id": f"new-{counter[0]}", "type": "process", "status": "current", "title": "New step", "description": ""})
+    elif roll < 0.85 and len(nodes) > 5:
+        removed = nodes.pop(rng.randrange(len(nodes)))
+        process["edges"] = [e for e in edges if removed["id"] not in (e["source"], e["target"])]
+    elif roll < 0.95:
+        i = rng.randrange(len(nodes) - 1)
+        nodes[i], nodes[i + 1] = nodes[i + 1], nodes[i]
+    elif edges:
+        rng.choice(edges)["label"] = rng.choice(["YES", "NO", None])
+    process["version"] += 1
+    counter[0] += 1
+
+
+def main():
+    rng = random.Random(SEED)
+    print("🔬 Version store benchmark")
+    print(f"{'nodes':>6}{'versions':>10}{'full copies':>14}{'history':>12}{'ratio':>8}{'snapshots':>11}{'rebuild max':>13}")
+    for size in SIZES:
+        process = make_process(size)
+        counter = [0]
+        entries = []
+        contents = []
+        full_bytes = 0
+        previous = None
+        for _ in range(VERSIONS):
+            content = versioned_content(process)
+            entry = version_store.plan(previous, content)
+            entries.append(entry)
+            contents.append(content)
+            full_bytes += len(json.dumps(content, separators=(',', ':')))
+            previous = (process["version"], content, entry["chain"])
+            edit(process, rng, counter)
+
+        # Rebuild every version from its snapshot and check it round-trips
+        worst = 0.0
+        gc.disable()  # Keep collector pauses out of the per-version timings
+        for index, entry in enumerate(entries):
+            started = time.perf_counter()
+            start = index - entry["chain"]
+            rebuilt = copy.deepcopy(entries[start]["snapshot"])
+            for step in entries[start + 1:index + 1]:
+                rebuilt = apply_delta(rebuilt, json.loads(step["delta"]))
+            worst = max(worst, time.perf_counter() - started)
+            assert rebuilt == contents[index], f"version {index + 1} did not round-trip"
+        gc.enable()
+
+        history_bytes = sum(entry["size"] for entry in entries)
+        snapshots = sum(entry["kind"] == "snapshot" for entry in entries)
+        print(
+            f"{size:>6}{VERSIONS:>10}{full_bytes / 1024:>12.0f}KB{history_bytes / 1024:>10.0f}KB"
+            f"{full_bytes / history_bytes:>7.1f}x{snapshots:>11}{worst * 1000:>11.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Bundled OCR sample set
+Ground-truth process texts rendered the way they reach us from phones:
+12MP, slightly rotated, unevenly lit, with sensor noise and JPEG artifacts.
+Generation is seeded, so every run benchmarks the same pixels.
+"""
+
+import io
+import random
+from typing import List, Tuple
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+SAMPLE_TEXTS = {
+    "whiteboard_incident": [
+        "INCIDENT ESCALATION PROCESS",
+        "1. Call handler receives alert from monitoring",
+        "2. Ask caller: are you harmed or injured?",
+        "3. If injured call emergency services on 000",
+        "4. Otherwise log ticket in MYIT within 15 minutes",
+        "5. Notify duty manager 0800 11 63 63",
+        "6. Check status every 30 minutes until resolved",
+    ],
+    "whiteboard_onboarding": [
+        "NEW STARTER ONBOARDING",
+        "HR sends offer letter and contract",
+        "Candidate signs via DocuSign within 5 days",
+        "IT creates account in Active Directory",
+        "Manager books induction with Service Hub",
+        "Payroll adds employee before first pay run",
+        "Email welcome pack to starter@company.com",
+    ],
+    "printed_sop_page": [
+        "Standard Operating Procedure: Vehicle Breakdown",
+        "Collect officer name, phone number and license plate.",
+        "Contact Custom Fleet on 0800 11 63 63 for towing.",
+        "If the vehicle is unsafe, arrange a replacement vehicle.",
+        "Record the job number in the Lighthouse timeline.",
+        "Escalate to the fleet coordinator after 2 hours.",
+        "Close the request once the vehicle is returned.",
+    ],
+}
+
+PHOTO_SIZE = (4000, 3000)  # 12MP
+
+
+def _render(lines: List[str], rng: random.Random) -> Image.Image:
+    image = Image.new("RGB", PHOTO_SIZE, (236, 236, 230))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=110)
+    y = 260
+    for line in lines:
+        draw.text((220 + rng.randint(-20, 20), y), line, fill=(30, 40, 90), font=font)
+        y += 330
+    return image
+
+
+def _photograph(image: Image.Image, rng: random.Random) -> Image.Image:
+    # Perspective-free approximation of a handheld shot: tilt, glare, blur, noise
+    image = image.rotate(rng.uniform(-4.0, 4.0), resample=Image.Resampling.BICUBIC, fillcolor=(236, 236, 230))
+
+    glare = Image.radial_gradient("L").resize(PHOTO_SIZE)
+    shade = Image.new("RGB", PHOTO_SIZE, (70, 70, 70))
+    image = Image.composite(image, shade, glare.point(lambda v: 255 - v // 3))
+
+    image = image.filter(ImageFilter.GaussianBlur(1.2))
+    noise = Image.effect_noise(PHOTO_SIZE, 18).convert("RGB")
+    image = Image.blend(image, noise, 0.08)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=80, dpi=(72, 72))
+    buffer.seek(0)
+    return Image.open(buffer)
+
+
+def load_samples(seed: int = 7) -> List[Tuple[str, Image.Image, str]]:
+    """(name, photo, ground truth) for every bundled sample"""
+    rng = random.Random(seed)
+    samples = []
+    for name, lines in SAMPLE_TEXTS.items():
+        photo = _photograph(_render(lines, rng), rng)
+        samples.append((name, photo, "\n".join(lines)))
+    return samples
@@ -0,0 +1,657 @@
+"""
+BPMN 2.0 Import / Export Engine
+Features:
+- Streaming importer (lxml iterparse): tasks, gateways, events, lanes and DI positions
+  map onto ProcessNode / ProcessEdge / actors without involving the LLM
+- Parallel and merge-only gateways are collapsed into direct edges (parallelWith kept)
+- Exclusive/inclusive gateways become decision nodes; yes/no flows become YES/NO edges
+- Exporter writes BPMN 2.0 XML with lanes and diagram interchange (opens in Camunda/Signavio)
+- Archive import for bulk migrations; all functions are module-level so they run in worker processes
+"""
+
+import io
+import logging
+import os
+import re
+import zipfile
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+BPMN_NS = "http://www.omg.org/spec/BPMN/20100524/MODEL"
+BPMNDI_NS = "http://www.omg.org/spec/BPMN/20100524/DI"
+DC_NS = "http://www.omg.org/spec/DD/20100524/DC"
+DI_NS = "http://www.omg.org/spec/DD/20100524/DI"
+XSI_NS = "http://www.w3.org/2001/XMLSchema-instance"
+EXPORT_NSMAP = {"bpmn": BPMN_NS, "bpmndi": BPMNDI_NS, "dc": DC_NS, "di": DI_NS, "xsi": XSI_NS}
+
+BPMN_FILE_EXTENSIONS = ('.bpmn', '.bpmn2', '.xml')
+MAX_ARCHIVE_MODELS = 1000
+MAX_ARCHIVE_ENTRIES = 5000
+MAX_MODEL_BYTES = 20 * 1024 * 1024  # Uncompressed, per model
+MAX_ARCHIVE_BYTES = 200 * 1024 * 1024  # Uncompressed, all models together
+
+TASK_TAGS = {
+    'task', 'userTask', 'manualTask', 'serviceTask', 'scriptTask', 'businessRuleTask',
+    'sendTask', 'receiveTask', 'callActivity',
+}
+DECISION_GATEWAY_TAGS = {'exclusiveGateway', 'inclusiveGateway', 'eventBasedGateway', 'complexGateway'}
+GATEWAY_TAGS = DECISION_GATEWAY_TAGS | {'parallelGateway'}
+EVENT_TAGS = {'startEvent', 'endEvent', 'intermediateCatchEvent', 'intermediateThrowEvent', 'boundaryEvent'}
+FLOW_NODE_TAGS = TASK_TAGS | GATEWAY_TAGS | EVENT_TAGS | {'subProcess', 'transaction', 'adHocSubProcess'}
+SUBPROCESS_TAGS = {'subProcess', 'transaction', 'adHocSubProcess'}
+
+YES_LABELS = {'yes', 'y', 'true', 'approved', 'ok', 'valid'}
+NO_LABELS = {'no', 'n', 'false', 'rejected', 'declined', 'invalid'}
+
+ISO_DURATION_RE = re.compile(r'^P(?:(\d+)Y)?(?:(\d+)M)?(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?)?$')
+NCNAME_RE = re.compile(r'^[A-Za-z_][\w.-]*$')
+INVALID_ID_CHARS_RE = re.compile(r'[^\w.-]')
+
+# Exported shape sizes and spacing (diagram interchange)
+TASK_SIZE = (100, 80)
+GATEWAY_SIZE = (50, 50)
+EVENT_SIZE = (36, 36)
+LAYER_SPACING = 180
+ROW_SPACING = 120
+LANE_HEIGHT = 160
+POOL_LABEL_WIDTH = 30
+
+
+class BpmnImportError(Exception):
+    """Raised when a file is not a usable BPMN 2.0 model"""
+
+
+def _local(tag) -> str:
+    return etree.QName(tag).localname if isinstance(tag, str) else ''
+
+
+def _clean(text: Optional[str]) -> str:
+    return ' '.join((text or '').split())
+
+
+def humanize_duration(value: str) -> str:
+    """ISO 8601 durations from timer definitions ("PT2H30M") as readable text"""
+    match = ISO_DURATION_RE.match(_clean(value).upper())
+    if not match or not any(match.groups()):
+        return _clean(value)
+    units = ('year', 'month', 'week', 'day', 'hour', 'minute', 'second')
+    parts = []
+    for amount, unit in zip(match.groups(), units):
+        if amount:
+            number = float(amount)
+            amount = str(int(number)) if number.is_integer() else amount
+            parts.append(f"{amount} {unit}{'' if amount == '1' else 's'}")
+    return ' '.join(parts)
+
+
+def _edge_condition(label: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """(label, condition) for a flow leaving a decision"""
+    key = _clean(label).lower().rstrip('.!?')
+    if key in YES_LABELS:
+        return "YES", "yes"
+    if key in NO_LABELS:
+        return "NO", "no"
+    return (_clean(label) or None), (key or None)
+
+
+# ============ Import ============
+
+class _ProcessState:
+    """Elements of one <process>, accumulated while streaming"""
+
+    def __init__(self, bpmn_id: str, name: str):
+        self.bpmn_id = bpmn_id
+        self.name = name
+        self.description = ''
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.kinds: Dict[str, str] = {}  # node id -> BPMN element name
+        self.flows: List[Dict[str, Any]] = []
+        self.lanes: List[str] = []
+        self.lane_of: Dict[str, str] = {}
+        self.data_inputs: Dict[str, List[str]] = defaultdict(list)  # node id -> data object ids
+        self.boundary_of: Dict[str, str] = {}  # boundary event id -> attached activity id
+
+
+def _new_node(node_id: str, node_type: str, title: str, description: str) -> Dict[str, Any]:
+    return {
+        "id": node_id,
+        "type": node_type,
+        "status": "trigger" if node_type == "trigger" else "current",
+        "title": title,
+        "description": description,
+        "actors": [],
+        "subSteps": [],
+        "dependencies": [],
+        "parallelWith": [],
+        "failures": [],
+        "blocking": None,
+        "currentState": None,
+        "idealState": None,
+        "gap": None,
+        "impact": None,
+        "timeEstimate": None,
+        "position": {"x": 0, "y": 0},
+        "operationalDetails": {
+            "requiredData": [],
+            "specificActions": [],
+            "contactInfo": {},
+            "timeline": None,
+            "systems": [],
+            "decisionCriteria": None,
+            "sourcePage": None,
+        },
+    }
+
+
+def _documentation(element) -> str:
+    return '\n'.join(
+        (child.text or '').strip() for child in element
+        if _local(child.tag) == 'documentation' and (child.text or '').strip()
+    )
+
+
+def _event_detail(element) -> Tuple[Optional[str], Optional[str]]:
+    """(event definition kind, timer duration) of an event element"""
+    for child in element:
+        kind = _local(child.tag)
+        if kind.endswith('EventDefinition'):
+            duration = None
+            for timer in child:
+                if _local(timer.tag) in ('timeDuration', 'timeCycle', 'timeDate') and timer.text:
+                    duration = humanize_duration(timer.text)
+            return kind[:-len('EventDefinition')], duration
+    return None, None
+
+
+def _flow_node(element, tag: str) -> Optional[Dict[str, Any]]:
+    node_id = element.get('id')
+    name = _clean(element.get('name'))
+    description = _documentation(element)
+    event_kind, duration = _event_detail(element) if tag in EVENT_TAGS else (None, None)
+
+    if tag == 'startEvent':
+        node = _new_node(node_id, "trigger", name or "Start", description)
+    elif tag == 'endEvent':
+        if not name:
+            return None  # Unnamed end events carry no information for the flowchart
+        node = _new_node(node_id, "process", name, description)
+    elif tag in DECISION_GATEWAY_TAGS:
+        title = name if not name or name.endswith('?') else f"{name}?"
+        node = _new_node(node_id, "decision", title or "Decision?", description)
+        node["operationalDetails"]["decisionCriteria"] = name or None
+    elif tag == 'parallelGateway':
+        node = _new_node(node_id, "process", name or "Parallel", description)
+    elif tag in EVENT_TAGS:
+        fallback = f"Wait {duration}" if event_kind == 'timer' and duration else (event_kind or 'Event').capitalize()
+        node = _new_node(node_id, "process", name or fallback, description)
+        if event_kind in ('error', 'escalation', 'compensate'):
+            node["failures"].append(name or fallback)
+    else:
+        node = _new_node(node_id, "process", name or tag, description)
+        if tag == 'callActivity' and element.get('calledElement'):
+            node["operationalDetails"]["specificActions"].append(f"Call process {element.get('calledElement')}")
+
+    if duration:
+        node["timeEstimate"] = duration
+        node["operationalDetails"]["timeline"] = duration
+    return node
+
+
+def _open_model(source: Union[str, bytes, bytearray]):
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+
+def import_bpmn(source: Union[str, bytes, bytearray], filename: str = '') -> List[Dict[str, Any]]:
+    """
+    Stream-parse a BPMN 2.0 file (path or bytes) into processes in the /process/parse
+    result format. One entry per <process> that contains flow nodes.
+    """
+    processes: Dict[str, _ProcessState] = {}
+    participants: Dict[str, str] = {}  # process id -> pool name
+    positions: Dict[str, Dict[str, float]] = {}
+    data_names: Dict[str, str] = {}
+    data_stores: set = set()
+    current: Optional[_ProcessState] = None
+    subprocess_stack: List[List[str]] = []  # Child step names of open sub-processes
+    saw_definitions = False
+
+    # Entities and DTDs are never resolved: uploaded XML must not read local files
+    events = etree.iterparse(
+        _open_model(source), events=('start', 'end'),
+        resolve_entities=False, no_network=True, load_dtd=False, huge_tree=False, remove_comments=True,
+    )
+    try:
+        for event, element in events:
+            tag = _local(element.tag)
+
+            if event == 'start':
+                if tag == 'definitions':
+                    saw_definitions = True
+                elif tag == 'process':
+                    current = processes.setdefault(
+                        element.get('id'), _ProcessState(element.get('id'), _clean(element.get('name')))
+                    )
+                elif tag in SUBPROCESS_TAGS and current is not None:
+                    subprocess_stack.append([])
+                continue
+
+            handled = True
+            if tag == 'participant' and element.get('processRef'):
+                participants[element.get('processRef')] = _clean(element.get('name'))
+            elif tag in ('dataObjectReference', 'dataObject', 'dataStoreReference'):
+                data_names[element.get('id')] = _clean(element.get('name'))
+                if tag == 'dataStoreReference':
+                    data_stores.add(element.get('id'))
+            elif tag == 'BPMNShape':
+                bounds = next((child for child in element if _local(child.tag) == 'Bounds'), None)
+                if bounds is not None and element.get('bpmnElement'):
+                    positions[element.get('bpmnElement')] = {
+                        "x": float(bounds.get('x', 0)), "y": float(bounds.get('y', 0)),
+                    }
+            elif current is None:
+                handled = tag in ('BPMNEdge', 'BPMNPlane', 'BPMNDiagram')
+            elif tag == 'process':
+                current = None
+            elif tag == 'documentation' and _local(element.getparent().tag) == 'process':
+                current.description = (element.text or '').strip()
+                handled = False
+            elif tag in SUBPROCESS_TAGS:
+                steps = subprocess_stack.pop()
+                if subprocess_stack:
+                    subprocess_stack[-1].append(_clean(element.get('name')) or 'Sub-process')
+                else:
+                    node = _flow_node(element, tag)
+                    node["subSteps"] = steps
+                    node["operationalDetails"]["specificActions"] = list(steps)
+                    current.nodes[node["id"]] = node
+                    current.kinds[node["id"]] = tag
+            elif subprocess_stack:
+                # Inside a sub-process: tasks become its sub-steps, internal flows are dropped
+                if tag in TASK_TAGS and element.get('name'):
+                    subprocess_stack[-1].append(_clean(element.get('name')))
+                handled = tag in FLOW_NODE_TAGS or tag == 'sequenceFlow'
+            elif tag in FLOW_NODE_TAGS:
+                node = _flow_node(element, tag)
+                if node is not None:
+                    current.nodes[node["id"]] = node
+                    current.kinds[node["id"]] = tag
+                    if tag == 'boundaryEvent' and element.get('attachedToRef'):
+                        current.boundary_of[node["id"]] = element.get('attachedToRef')
+                    for child in element:
+                        if _local(child.tag) == 'dataInputAssociation':
+                            current.data_inputs[node["id"]].extend(
+                                (ref.text or '').strip() for ref in child if _local(ref.tag) == 'sourceRef'
+                            )
+            elif tag == 'sequenceFlow':
+                condition = next(
+                    (_clean(child.text) for child in element if _local(child.tag) == 'conditionExpression'), None
+                )
+                current.flows.append({
+                    "id": element.get('id'),
+                    "source": element.get('sourceRef'),
+                    "target": element.get('targetRef'),
+                    "name": _clean(element.get('name')) or None,
+                    "expression": condition or None,
+                })
+            elif tag == 'lane':
+                lane = _clean(element.get('name'))
+                if lane:
+                    current.lanes.append(lane)
+                    for ref in element:
+                        if _local(ref.tag) == 'flowNodeRef' and ref.text:
+                            current.lane_of.setdefault(ref.text.strip(), lane)
+            else:
+                handled = False
+
+            if handled:
+                # Release what has been consumed so memory stays flat on large models. Inside a
+                # sub-process the siblings (its documentation) are still unread: the sub-process
+                # is released as a whole when it ends
+                element.clear()
+                parent = element.getparent()
+                while parent is not None and not subprocess_stack and element.getprevious() is not None:
+                    del parent[0]
+    except etree.XMLSyntaxError as e:
+        raise BpmnImportError(f"Invalid XML in {filename or 'BPMN file'}: {e}") from None
+
+    if not saw_definitions:
+        raise BpmnImportError(f"{filename or 'File'} is not a BPMN 2.0 model (no <definitions> element)")
+
+    fallback_name = os.path.splitext(os.path.basename(filename or ''))[0] or "Imported Process"
+    results = []
+    for state in processes.values():
+        if not state.nodes:
+            continue
+        name = state.name or participants.get(state.bpmn_id) or fallback_name
+        results.append(_assemble(state, name, participants.get(state.bpmn_id), positions, data_names, data_stores))
+    if not results:
+        raise BpmnImportError(f"{filename or 'BPMN file'} contains no process elements")
+    logger.info(f"📥 Imported {len(results)} BPMN process(es) from {filename or 'upload'}")
+    return results
+
+
+def _collapse_gateways(state: _ProcessState, flows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Replace parallel gateways and merge-only gateways (a single outgoing flow) with
+    direct edges from each predecessor to each successor.
+    """
+    outgoing = defaultdict(list)
+    for flow in flows:
+        outgoing[flow["source"]].append(flow)
+
+    collapsible = [
+        node_id for node_id, kind in state.kinds.items()
+        if kind == 'parallelGateway' or (kind in DECISION_GATEWAY_TAGS and len(outgoing[node_id]) <= 1)
+    ]
+    for gateway in collapsible:
+        incoming = [flow for flow in flows if flow["target"] == gateway]
+        leaving = [flow for flow in flows if flow["source"] == gateway]
+        flows = [flow for flow in flows if gateway not in (flow["source"], flow["target"])]
+        for before in incoming:
+            for after in leaving:
+                flows.append({
+                    "id": f"{before['id']}__{after['id']}",
+                    "source": before["source"],
+                    "target": after["target"],
+                    # A label on the incoming flow belongs to the decision before the merge
+                    "name": before["name"] or after["name"],
+                    "expression": before["expression"] or after["expression"],
+                })
+        if state.kinds[gateway] == 'parallelGateway' and len(leaving) > 1:
+            branches = [flow["target"] for flow in leaving]
+            for target in branches:
+                node = state.nodes.get(target)
+                if node is not None:
+                    node["parallelWith"] = [b for b in branches if b != target and b not in node["parallelWith"]] + node["parallelWith"]
+        state.nodes.pop(gateway, None)
+    return flows
+
+
+def _assemble(
+    state: _ProcessState,
+    name: str,
+    pool: Optional[str],
+    positions: Dict[str, Dict[str, float]],
+    data_names: Dict[str, str],
+    data_stores: set,
+) -> Dict[str, Any]:
+    flows = [flow for flow in state.flows if flow["source"] and flow["target"]]
+    # Boundary events hang off their activity: make that an explicit edge
+    for event_id, activity in state.boundary_of.items():
+        flows.append({"id": f"{event_id}__attached", "source": activity, "target": event_id, "name": None, "expression": None})
+        if activity in state.nodes:
+            state.nodes[activity]["failures"].extend(state.nodes[event_id]["failures"])
+    flows = _collapse_gateways(state, flows)
+
+    for node_id, node in state.nodes.items():
+        lane = state.lane_of.get(node_id) or (None if state.lanes else pool)
+        if lane:
+            node["actors"] = [lane]
+        if node_id in positions:
+            node["position"] = positions[node_id]
+        for ref in state.data_inputs.get(node_id, []):
+            label = data_names.get(ref)
+            if label:
+                bucket = "systems" if ref in data_stores else "requiredData"
+                node["operationalDetails"][bucket].append(label)
+
+    edges = []
+    seen = set()
+    for flow in flows:
+        source, target = flow["source"], flow["target"]
+        if source not in state.nodes or target not in state.nodes or (source, target) in seen:
+            continue  # Flows into dropped end events, duplicates after collapsing
+        seen.add((source, target))
+        label, condition = flow["name"], None
+        if state.nodes[source]["type"] == "decision":
+            label, condition = _edge_condition(flow["name"] or flow["expression"])
+        edges.append({"id": flow["id"], "source": source, "target": target, "label": label, "condition": condition})
+
+    actors = list(dict.fromkeys(state.lanes or ([pool] if pool else [])))
+    return {
+        "processName": name,
+        "description": state.description or f"Imported from BPMN model {state.bpmn_id}",
+        "actors": actors,
+        "nodes": list(state.nodes.values()),
+        "edges": edges,
+        "criticalGaps": [],
+        "improvementOpportunities": [],
+    }
+
+
+def import_bpmn_archive(source: Union[str, bytes, bytearray]) -> List[Dict[str, Any]]:
+    """
+    Import every BPMN model in a zip archive.
+    Returns one result per file: {"file", "processes"} or {"file", "error"}.
+    Entry count and uncompressed sizes are capped; declared sizes are not trusted,
+    every member is read with a bounded length.
+    """
+    results = []
+    with zipfile.ZipFile(_open_model(source)) as archive:
+        entries = archive.infolist()
+        if len(entries) > MAX_ARCHIVE_ENTRIES:
+            raise BpmnImportError(f"Archive contains {len(entries)} entries; the limit is {MAX_ARCHIVE_ENTRIES}")
+        members = [
+            info for info in entries
+            if not info.is_dir() and info.filename.lower().endswith(BPMN_FILE_EXTENSIONS)
+            and not os.path.basename(info.filename).startswith('.')
+        ]
+        if len(members) > MAX_ARCHIVE_MODELS:
+            raise BpmnImportError(f"Archive contains {len(members)} models; the limit is {MAX_ARCHIVE_MODELS}")
+        declared = sum(info.file_size for info in members)
+        if declared > MAX_ARCHIVE_BYTES:
+            raise BpmnImportError(
+                f"Archive expands to {declared // (1024 * 1024)} MB; the limit is {MAX_ARCHIVE_BYTES // (1024 * 1024)} MB"
+            )
+        remaining = MAX_ARCHIVE_BYTES
+        for info in members:
+            if info.file_size > MAX_MODEL_BYTES:
+                results.append({"file": info.filename, "error": _too_large(info.filename)})
+                continue
+            with archive.open(info) as stream:
+                data = stream.read(min(MAX_MODEL_BYTES, remaining) + 1)
+            if len(data) > MAX_MODEL_BYTES:
+                results.append({"file": info.filename, "error": _too_large(info.filename)})
+                continue
+            if len(data) > remaining:
+                raise BpmnImportError(
+                    f"Archive expands to more than {MAX_ARCHIVE_BYTES // (1024 * 1024)} MB"
+                )
+            remaining -= len(data)
+            results.append(_import_one(data, info.filename))
+    return results
+
+
+def _too_large(filename: str) -> str:
+    return f"{filename} is larger than {MAX_MODEL_BYTES // (1024 * 1024)} MB uncompressed"
+
+
+def import_bpmn_batch(sources: List[Tuple[Union[str, bytes], str]]) -> List[Dict[str, Any]]:
+    """Import several uploaded models in one worker job; per-file errors are reported, not raised"""
+    return [_import_one(source, filename) for source, filename in sources]
+
+
+def _import_one(source, filename: str) -> Dict[str, Any]:
+    try:
+        return {"file": filename, "processes": import_bpmn(source, filename)}
+    except BpmnImportError as e:
+        return {"file": filename, "error": str(e)}
+
+
+# ============ Export ============
+
+def _xml_id(value: str, used: Dict[str, str]) -> str:
+    """BPMN ids must be XML NCNames; UUID-style ids are prefixed"""
+    if value in used:
+        return used[value]
+    candidate = value if NCNAME_RE.match(value or '') else '_' + INVALID_ID_CHARS_RE.sub('_', value or 'id')
+    while candidate in used.values():
+        candidate += '_'
+    used[value] = candidate
+    return candidate
+
+
+def _layers(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Longest-path layer per node from the triggers (cycles broken by visit order)"""
+    outgoing = defaultdict(list)
+    for edge in edges:
+        outgoing[edge["source"]].append(edge["target"])
+    layer = {}
+    roots = [n["id"] for n in nodes if n.get("type") == "trigger"] or [nodes[0]["id"]]
+    order = [n["id"] for n in nodes]
+    for root in roots + order:
+        if root in layer:
+            continue
+        layer[root] = 0
+        stack = [root]
+        visited = set()
+        while stack:
+            node_id = stack.pop()
+            visited.add(node_id)
+            for target in outgoing[node_id]:
+                if target not in visited and layer.get(target, -1) < layer[node_id] + 1:
+                    layer[target] = layer[node_id] + 1
+                    stack.append(target)
+    return layer
+
+
+def _shape_size(element_tag: str) -> Tuple[int, int]:
+    if element_tag == 'startEvent':
+        return EVENT_SIZE
+    if element_tag == 'exclusiveGateway':
+        return GATEWAY_SIZE
+    return TASK_SIZE
+
+
+def export_bpmn(process: Dict[str, Any]) -> bytes:
+    """BPMN 2.0 XML (with lanes per actor and diagram interchange) for a stored process"""
+    nodes = [n for n in process.get('nodes', []) or [] if n.get('id')]
+    node_ids = {n["id"] for n in nodes}
+    edges = [e for e in process.get('edges', []) or [] if e.get('source') in node_ids and e.get('target') in node_ids]
+    ids: Dict[str, str] = {}
+    process_id = _xml_id(f"Process_{process.get('id', 'export')}", ids)
+
+    def bpmn(tag: str, parent=None, **attrs):
+        qname = f"{{{BPMN_NS}}}{tag}"
+        attrs = {k: str(v) for k, v in attrs.items() if v not in (None, '')}
+        return etree.SubElement(parent, qname, attrs) if parent is not None else etree.Element(qname, attrs, nsmap=EXPORT_NSMAP)
+
+    definitions = bpmn(
+        'definitions', id=_xml_id(f"Definitions_{process.get('id', 'export')}", ids),
+        targetNamespace="http://bpmn.io/schema/bpmn", exporter="SuperHumanly", exporterVersion="1.0",
+    )
+    lanes = list(dict.fromkeys(n["actors"][0] for n in nodes if n.get("actors")))
+    collaboration = None
+    if lanes:
+        collaboration = bpmn('collaboration', definitions, id=_xml_id("Collaboration_1", ids))
+        bpmn('participant', collaboration, id=_xml_id("Participant_1", ids), name=process.get('name'), processRef=process_id)
+    process_element = bpmn('process', definitions, id=process_id, name=process.get('name'), isExecutable="false")
+    if process.get('description'):
+        bpmn('documentation', process_element).text = process['description']
+
+    if lanes:
+        lane_set = bpmn('laneSet', process_element, id=_xml_id("LaneSet_1", ids))
+        lane_elements = {
+            lane: bpmn('lane', lane_set, id=_xml_id(f"Lane_{index + 1}", ids), name=lane)
+            for index, lane in enumerate(lanes)
+        }
+        for node in nodes:
+            if node.get("actors"):
+                bpmn('flowNodeRef', lane_elements[node["actors"][0]]).text = _xml_id(node["id"], ids)
+
+    incoming = defaultdict(list)
+    outgoing = defaultdict(list)
+    for edge in edges:
+        outgoing[edge["source"]].append(edge)
+        incoming[edge["target"]].append(edge)
+
+    element_tags = {}
+    for node in nodes:
+        details = node.get("operationalDetails") or {}
+        if node.get("type") == "trigger":
+            tag = 'startEvent'
+        elif node.get("type") == "decision":
+            tag = 'exclusiveGateway'
+        elif node.get("actors"):
+            tag = 'userTask'
+        elif details.get("systems"):
+            tag = 'serviceTask'
+        else:
+            tag = 'task'
+        element_tags[node["id"]] = tag
+        element = bpmn(tag, process_element, id=_xml_id(node["id"], ids), name=node.get("title"))
+        documentation = '\n'.join(filter(None, [node.get("description"), *[f"- {s}" for s in node.get("subSteps") or []]]))
+        if documentation:
+            bpmn('documentation', element).text = documentation
+        for edge in incoming[node["id"]]:
+            bpmn('incoming', element).text = _xml_id(edge["id"], ids)
+        for edge in outgoing[node["id"]]:
+            bpmn('outgoing', element).text = _xml_id(edge["id"], ids)
+
+    for edge in edges:
+        bpmn(
+            'sequenceFlow', process_element, id=_xml_id(edge["id"], ids), name=edge.get("label"),
+            sourceRef=_xml_id(edge["source"], ids), targetRef=_xml_id(edge["target"], ids),
+        )
+
+    _export_diagram(definitions, collaboration, process_element, nodes, edges, lanes, element_tags, ids)
+    return etree.tostring(definitions, xml_declaration=True, encoding='UTF-8', pretty_print=True)
+
+
+def _export_diagram(definitions, collaboration, process_element, nodes, edges, lanes, element_tags, ids):
+    """Diagram interchange: stored positions when present, otherwise a layered left-to-right layout"""
+    has_positions = any((n.get("position") or {}).get("x") or (n.get("position") or {}).get("y") for n in nodes)
+    layer = _layers(nodes, edges) if nodes else {}
+    bounds: Dict[str, Tuple[float, float, int, int]] = {}
+    rows: Dict[Tuple[int, int], int] = defaultdict(int)
+
+    for node in nodes:
+        width, height = _shape_size(element_tags[node["id"]])
+        lane_index = lanes.index(node["actors"][0]) if lanes and node.get("actors") else 0
+        if has_positions:
+            x = float((node.get("position") or {}).get("x", 0))
+            y = float((node.get("position") or {}).get("y", 0))
+        else:
+            x = 150 + layer.get(node["id"], 0) * LAYER_SPACING
+            row = rows[(lane_index, layer.get(node["id"], 0))]
+            rows[(lane_index, layer.get(node["id"], 0))] += 1
+            y = 80 + row * ROW_SPACING
+        if lanes and not has_positions:
+            y = lane_index * LANE_HEIGHT + (LANE_HEIGHT - height) / 2 + (y - 80)
+        bounds[node["id"]] = (x, y, width, height)
+
+    diagram = etree.SubElement(definitions, f"{{{BPMNDI_NS}}}BPMNDiagram", id=_xml_id("BPMNDiagram_1", ids))
+    plane_ref = collaboration.get('id') if collaboration is not None else process_element.get('id')
+    plane = etree.SubElement(diagram, f"{{{BPMNDI_NS}}}BPMNPlane", id=_xml_id("BPMNPlane_1", ids), bpmnElement=plane_ref)
+
+    def shape(element_id: str, x: float, y: float, width: float, height: float, **attrs):
+        element = etree.SubElement(plane, f"{{{BPMNDI_NS}}}BPMNShape", id=f"{element_id}_di", bpmnElement=element_id, **attrs)
+        etree.SubElement(element, f"{{{DC_NS}}}Bounds", x=f"{x:g}", y=f"{y:g}", width=f"{width:g}", height=f"{height:g}")
+
+    if lanes and nodes:
+        left = min(b[0] for b in bounds.values()) - 60
+        right = max(b[0] + b[2] for b in bounds.values()) + 60
+        top = min(b[1] for b in bounds.values()) - 40 if has_positions else 0
+        lane_height = (max(b[1] + b[3] for b in bounds.values()) + 40 - top) / len(lanes) if has_positions else LANE_HEIGHT
+        shape(_xml_id("Participant_1", ids), left - POOL_LABEL_WIDTH, top, right - left + POOL_LABEL_WIDTH, lane_height * len(lanes), isHorizontal="true")
+        for index in range(len(lanes)):
+            shape(_xml_id(f"Lane_{index + 1}", ids), left, top + index * lane_height, right - left, lane_height, isHorizontal="true")
+
+    for node in nodes:
+        x, y, width, height = bounds[node["id"]]
+        extra = {"isMarkerVisible": "true"} if element_tags[node["id"]] == 'exclusiveGateway' else {}
+        shape(_xml_id(node["id"], ids), x, y, width, height, **extra)
+
+    for edge in edges:
+        sx, sy, sw, sh = bounds[edge["source"]]
+        tx, ty, tw, th = bounds[edge["target"]]
+        element = etree.SubElement(plane, f"{{{BPMNDI_NS}}}BPMNEdge", id=f"{_xml_id(edge['id'], ids)}_di", bpmnElement=_xml_id(edge["id"], ids))
+        for px, py in ((sx + sw, sy + sh / 2), (tx, ty + th / 2)):
+            etree.SubElement(element, f"{{{DI_NS}}}waypoint", x=f"{px:g}", y=f"{py:g}")
+
@@ -9,11 +9,11 @@ Features:
 """
 
 import redis
-import hashlib
 import json
 import logging
 from typing import Optional, Dict, Any
 from datetime import datetime, timezone
+from fingerprint import fingerprint_bytes
 
 logger = logging.getLogger(__name__)
 
@@ -44,7 +44,7 @@ class IntelligentCacheService:
         normalized = text.lower().strip()
         normalized = ' '.join(normalized.split())  # Collapse whitespace
         
-        return hashlib.sha256(normalized.encode()).hexdigest()[:16]
+        return fingerprint_bytes(normalized.encode())
     
     def generate_pattern_key(self, text: str) -> str:
         """
@@ -171,6 +171,72 @@ class IntelligentCacheService:
         except Exception as e:
             logger.error(f"Parse cache storage error: {e}")
     
+    def get_coverage_cache(self, text: str, process_version: str) -> Optional[Dict[str, Any]]:
+        """Get cached coverage report for a (source document, process version) pair"""
+        if not self.redis_client:
+            return None
+        
+        try:
+            fingerprint = self.generate_document_fingerprint(text)
+            cache_key = f"coverage:{process_version}:{fingerprint}"
+            
+            cached = self.redis_client.get(cache_key)
+            if cached:
+                logger.info(f"🎯 Coverage Cache HIT: {fingerprint}")
+                self._track_cache_hit("coverage")
+                return json.loads(cached)
+            
+            return None
+            
+        except Exception as e:
+            logger.error(f"Coverage cache retrieval error: {e}")
+            return None
+    
+    def set_coverage_cache(self, text: str, process_version: str, report: Dict[str, Any], ttl: int = 86400):
+        """Store coverage report; a new process version or document changes the key"""
+        if not self.redis_client:
+            return
+        
+        try:
+            fingerprint = self.generate_document_fingerprint(text)
+            cache_key = f"coverage:{process_version}:{fingerprint}"
+            self.redis_client.setex(
+                cache_key,
+                ttl,
+                json.dumps(report)
+            )
+            logger.info(f"💾 Cached coverage report: {fingerprint}")
+            
+        except Exception as e:
+            logger.error(f"Coverage cache storage error: {e}")
+    
+    def get_layout_cache(self, process_version: str) -> Optional[Dict[str, Any]]:
+        """Get cached flowchart layout for a process version"""
+        if not self.redis_client:
+            return None
+        
+        try:
+            cached = self.redis_client.get(f"layout:{process_version}")
+            if cached:
+                self._track_cache_hit("layout")
+                return json.loads(cached)
+            
+            return None
+            
+        except Exception as e:
+            logger.error(f"Layout cache retrieval error: {e}")
+            return None
+    
+    def set_layout_cache(self, process_version: str, layout: Dict[str, Any], ttl: int = 86400):
+        """Store flowchart layout; any edit produces a new process version key"""
+        if not self.redis_client:
+            return
+        
+        try:
+            self.redis_client.setex(f"layout:{process_version}", ttl, json.dumps(layout))
+        except Exception as e:
+            logger.error(f"Layout cache storage error: {e}")
+    
     def _track_cache_hit(self, cache_type: str):
         """Track cache hits for monitoring"""
         if not self.redis_client:
@@ -219,7 +285,9 @@ class IntelligentCacheService:
                 "breakdown": {
                     "exact_matches": int(hits.get('exact', 0)),
                     "pattern_matches": int(hits.get('pattern', 0)),
-                    "parse_matches": int(hits.get('parse', 0))
+                    "parse_matches": int(hits.get('parse', 0)),
+                    "coverage_matches": int(hits.get('coverage', 0)),
+                    "layout_matches": int(hits.get('layout', 0))
                 }
             }
         except Exception as e:
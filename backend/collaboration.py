@@ -0,0 +1,197 @@
+"""
+Real-time Process Collaboration
+Features:
+- One channel per process; every editor/viewer socket joins its process's room
+- Accepted edits broadcast as small ops stamped with the process revision
+- Fan-out across uvicorn workers through Redis pub/sub (one publisher and one
+  subscriber per worker, both connected at startup; a worker with no sockets still publishes)
+- Local delivery when Redis is unavailable (single-worker deployments)
+- One bounded outbox and one writer task per socket: frames never interleave or get
+  cut off, and a socket that falls SEND_QUEUE_SIZE frames behind is dropped
+Writes are ordered by the revision-conditional update that accepted them, so each
+event carries a unique revision and clients can spot gaps and resync.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "collab:process:"
+SEND_QUEUE_SIZE = 256  # Frames queued per socket; one this far behind is dropped (it resyncs on reconnect)
+SLOW_CONSUMER_CLOSE_CODE = 1013  # "Try again later": the client reconnects and gets a fresh snapshot
+LEAVE_TIMEOUT_SECONDS = 5.0  # For a leaving socket's writer to flush (cancelled after, mid-frame or not)
+RECONNECT_INTERVAL_SECONDS = 5.0  # Between publisher reconnects while Redis is down
+
+
+class Connection:
+    """One socket's outbox, drained by a single writer task: the only code that sends on the socket"""
+
+    def __init__(self, socket):
+        self.socket = socket
+        self.outbox: asyncio.Queue = asyncio.Queue(SEND_QUEUE_SIZE)
+        self.closing = False
+        self.close_code: Optional[int] = None
+        self._flush = True
+        self.writer = asyncio.create_task(self._write())
+
+    def send(self, payload: str) -> bool:
+        """Queue a frame; False when the socket is closing or its outbox is full"""
+        if self.closing:
+            return False
+        try:
+            self.outbox.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self, code: Optional[int] = None):
+        """
+        Stop the writer, then close the socket with `code` (None leaves closing to the
+        handler). Frames already queued go first unless the outbox is full.
+        """
+        if self.closing:
+            return
+        self.closing = True
+        self.close_code = code
+        try:
+            self.outbox.put_nowait(None)
+        except asyncio.QueueFull:
+            self._flush = False  # Too far behind to be worth flushing
+
+    async def drain(self, code: Optional[int] = None):
+        """close(code) and wait for the writer, so the caller can finish with the socket without a concurrent send"""
+        self.close(code)
+        try:
+            await asyncio.wait_for(self.writer, LEAVE_TIMEOUT_SECONDS)
+        except Exception:
+            pass  # The socket is being closed either way
+
+    async def _write(self):
+        try:
+            while self._flush:
+                payload = await self.outbox.get()
+                if payload is None:
+                    break
+                await self.socket.send_text(payload)
+            if self.close_code is not None:
+                await self.socket.close(code=self.close_code)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.closing = True  # Socket gone: the handler's receive loop sees the disconnect
+            logger.info(f"🔌 Collaborator socket stopped taking events: {e!r}")
+
+
+class CollaborationHub:
+    def __init__(self, redis_url: str = "redis://localhost:6379/0"):
+        self.redis_url = redis_url
+        self.rooms: Dict[str, Dict[str, Connection]] = {}  # process id -> connection id -> outbox
+        self.redis: Optional[aioredis.Redis] = None  # Publisher: every worker writes, sockets or not
+        self.listener: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+        self._connect_lock = asyncio.Lock()
+
+    async def start(self):
+        """Connect the publisher and the subscriber (app startup)"""
+        await self._ensure_publisher()
+        await self._ensure_listener()
+
+    async def _connect(self) -> aioredis.Redis:
+        client = aioredis.from_url(self.redis_url, decode_responses=True, socket_connect_timeout=2)
+        await client.ping()
+        return client
+
+    async def _ensure_publisher(self):
+        """Connect the publisher, at most once per RECONNECT_INTERVAL_SECONDS while Redis is down"""
+        if self.redis is not None or time.monotonic() < self._retry_at:
+            return
+        async with self._connect_lock:
+            if self.redis is not None:
+                return
+            try:
+                self.redis = await self._connect()
+                logger.info("✅ Collaboration publisher connected")
+            except Exception as e:
+                self._retry_at = time.monotonic() + RECONNECT_INTERVAL_SECONDS
+                logger.warning(f"⚠️ Collaboration fan-out is local to this worker (Redis unavailable: {e})")
+
+    def _listening(self) -> bool:
+        return self.listener is not None and not self.listener.done()
+
+    async def _ensure_listener(self):
+        """Subscribe this worker to every process channel (on start, and again on join if it dropped)"""
+        async with self._connect_lock:
+            if self._listening():
+                return
+            try:
+                client = await self._connect()
+                pubsub = client.pubsub()
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+            except Exception as e:
+                logger.warning(f"⚠️ Collaboration events from other workers won't reach this one (Redis unavailable: {e})")
+                return
+            self.listener = asyncio.create_task(self._listen(client, pubsub))
+            logger.info("✅ Collaboration channel subscribed")
+
+    async def _listen(self, client, pubsub):
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "pmessage":
+                    self._deliver(message["channel"][len(CHANNEL_PREFIX):], message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Collaboration subscriber stopped: {e}")  # Local delivery until the next join resubscribes
+        finally:
+            await client.aclose()
+
+    async def join(self, process_id: str, connection_id: str, socket) -> Connection:
+        """Add an accepted socket to its process's room; send on it through the returned Connection only"""
+        await self._ensure_listener()
+        connection = Connection(socket)
+        self.rooms.setdefault(process_id, {})[connection_id] = connection
+        return connection
+
+    def leave(self, process_id: str, connection_id: str):
+        room = self.rooms.get(process_id)
+        if room is not None:
+            room.pop(connection_id, None)
+            if not room:
+                del self.rooms[process_id]
+
+    async def publish(self, process_id: str, event: Dict[str, Any]):
+        """Send an event to every socket on the process, on every worker; never raises"""
+        payload = json.dumps(event, default=str)
+        await self._ensure_publisher()
+        if self.redis is not None:
+            try:
+                await self.redis.publish(f"{CHANNEL_PREFIX}{process_id}", payload)
+                if self._listening():
+                    return  # Our own subscriber delivers it to this worker's sockets
+            except Exception as e:
+                logger.warning(f"⚠️ Collaboration publish failed, delivering locally: {e}")
+                self.redis = None
+        self._deliver(process_id, payload)
+
+    def _deliver(self, process_id: str, payload: str):
+        for connection_id, connection in list(self.rooms.get(process_id, {}).items()):
+            if not connection.send(payload):
+                logger.info(f"🔌 Dropping collaborator {connection_id} on {process_id}: {SEND_QUEUE_SIZE} events behind")
+                self.leave(process_id, connection_id)
+                connection.close(SLOW_CONSUMER_CLOSE_CODE)
+
+    async def close(self):
+        if self.listener:
+            self.listener.cancel()
+        if self.redis is not None:
+            await self.redis.aclose()
+
+
+# Global collaboration hub instance
+collaboration_hub = CollaborationHub()
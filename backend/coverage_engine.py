@@ -0,0 +1,214 @@
+"""
+Deterministic Coverage Engine
+Features:
+- Indexes every phone number, email, system name and numbered step in the full source
+- Matches them against the operational details of all nodes
+- Exact capturedElements counts and coverage ratio (no 5k-character window)
+- Residual text: source paragraphs no node represents, the only input the LLM still needs
+"""
+
+import logging
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from document_service import build_page_index, page_at
+from local_extraction import MIN_PHONE_DIGITS, extract_emails, extract_phone_numbers, extract_systems, normalize_term
+from text_compaction import PHONE_RE
+
+logger = logging.getLogger(__name__)
+
+STEP_MATCH_THRESHOLD = 0.5  # Share of a step's content words that must appear in one node
+RESIDUAL_MATCH_THRESHOLD = 0.35  # Paragraphs below this overlap with all nodes are residual
+RESIDUAL_MAX_CHARS = 5000
+PHONE_SUFFIX_DIGITS = 8  # "+61 8 9415 2888" and "08 9415 2888" are the same number
+
+NUMBERED_STEP_RE = re.compile(r'^\s*(?:step\s+)?(\d{1,3})\s*[.):\-]\s+(\S.{2,})$', re.IGNORECASE | re.MULTILINE)
+WORD_RE = re.compile(r"[a-z0-9][a-z0-9'&-]+")
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'that', 'this', 'from', 'into', 'then', 'than', 'are', 'was', 'were',
+    'will', 'shall', 'should', 'must', 'can', 'any', 'all', 'each', 'their', 'they', 'them', 'you',
+    'your', 'our', 'has', 'have', 'had', 'not', 'but', 'its', 'via', 'per', 'also', 'if', 'when', 'step',
+}
+
+
+def _stem(word: str) -> str:
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def content_words(text: str) -> Set[str]:
+    return {_stem(w) for w in WORD_RE.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS}
+
+
+def _phone_key(phone: str) -> str:
+    digits = ''.join(c for c in phone if c.isdigit())
+    return digits[-PHONE_SUFFIX_DIGITS:]
+
+
+def _flatten(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield str(key)
+            yield from _flatten(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten(item)
+
+
+@dataclass
+class SourceElement:
+    kind: str  # phone, email, system, step
+    value: str
+    page: Optional[int] = None
+    captured: bool = False
+
+
+class NodeIndex:
+    """Everything the nodes say, in the shapes needed for matching"""
+
+    def __init__(self, nodes: List[Dict[str, Any]]):
+        self.phones: Set[str] = set()
+        self.emails: Set[str] = set()
+        self.systems: Set[str] = set()
+        self.node_words: List[Set[str]] = []
+        self.all_words: Set[str] = set()
+        self.data_fields: Set[str] = set()
+        texts = []
+
+        for node in nodes:
+            details = node.get('operationalDetails') or {}
+            text = '\n'.join(_flatten([node.get('title'), node.get('description'), node.get('actors'), details]))
+            texts.append(text)
+            # Every digit run: a number the source calls a phone counts wherever a node keeps it
+            self.phones.update(
+                _phone_key(m.group()) for m in PHONE_RE.finditer(text)
+                if sum(c.isdigit() for c in m.group()) >= MIN_PHONE_DIGITS
+            )
+            self.emails.update(e.lower() for e in extract_emails(text))
+            self.systems.update(normalize_term(s) for s in details.get('systems', []) or [] if isinstance(s, str))
+            self.data_fields.update(normalize_term(f) for f in details.get('requiredData', []) or [] if isinstance(f, str))
+            words = content_words(text)
+            self.node_words.append(words)
+            self.all_words |= words
+
+        self.text = '\n'.join(texts).lower()
+
+    def has_system(self, name: str) -> bool:
+        key = normalize_term(name)
+        return key in self.systems or re.search(rf'(?<!\w){re.escape(key)}(?!\w)', self.text) is not None
+
+    def best_overlap(self, words: Set[str]) -> float:
+        if not words:
+            return 1.0
+        return max((len(words & node) / len(words) for node in self.node_words), default=0.0)
+
+
+def index_source(text: str, vocabulary: Iterable[str] = ()) -> List[SourceElement]:
+    """Every checkable element of the full source, with its page when markers exist"""
+    page_index = build_page_index(text)
+    lowered = text.lower()
+
+    def page_of(value: str) -> Optional[int]:
+        if not page_index:
+            return None
+        offset = lowered.find(value.lower())
+        return page_at(page_index, offset) if offset >= 0 else None
+
+    elements = [SourceElement('phone', p, page_of(p)) for p in extract_phone_numbers(text)]
+    elements += [SourceElement('email', e, page_of(e)) for e in extract_emails(text)]
+    elements += [SourceElement('system', s, page_of(s)) for s in extract_systems(text, vocabulary)]
+    for match in NUMBERED_STEP_RE.finditer(text):
+        step = match.group(2).strip()
+        elements.append(SourceElement('step', step, page_at(page_index, match.start()) if page_index else None))
+    return elements
+
+
+class CoverageEngine:
+    def check(self, text: str, process: Dict[str, Any], vocabulary: Iterable[str] = ()) -> Dict[str, Any]:
+        """Deterministic coverage of the whole source by the process's nodes"""
+        nodes = process.get('nodes', []) or []
+        index = NodeIndex(nodes)
+        elements = index_source(text, vocabulary)
+
+        for element in elements:
+            if element.kind == 'phone':
+                element.captured = _phone_key(element.value) in index.phones
+            elif element.kind == 'email':
+                element.captured = element.value.lower() in index.emails
+            elif element.kind == 'system':
+                element.captured = index.has_system(element.value)
+            else:
+                element.captured = index.best_overlap(content_words(element.value)) >= STEP_MATCH_THRESHOLD
+
+        def captured(*kinds: str) -> int:
+            return sum(1 for e in elements if e.kind in kinds and e.captured)
+
+        def total(*kinds: str) -> int:
+            return sum(1 for e in elements if e.kind in kinds)
+
+        captured_count = sum(1 for e in elements if e.captured)
+        ratio = captured_count / len(elements) if elements else 1.0
+
+        return {
+            "capturedElements": {
+                "steps": captured('step') if total('step') else len(nodes),
+                "data_fields": len(index.data_fields),
+                "contacts": captured('phone', 'email'),
+                "systems": captured('system'),
+            },
+            "sourceElements": {
+                "steps": total('step'),
+                "contacts": total('phone', 'email'),
+                "systems": total('system'),
+            },
+            "coverageRatio": round(ratio, 4),
+            "missing": [asdict(e) for e in elements if not e.captured],
+            "sourcePagesCovered": sorted({e.page for e in elements if e.captured and e.page is not None}),
+            "residualText": self.residual_text(text, index),
+        }
+
+    def residual_text(self, text: str, index: NodeIndex) -> str:
+        """
+        Source paragraphs that no node represents, in document order, capped for the prompt.
+        A paragraph that doesn't fit is skipped and later, shorter ones still go in; one
+        that alone exceeds the cap is truncated rather than lost.
+        """
+        residual = []
+        size = 0
+        for paragraph in re.split(r'\n\s*\n', text):
+            words = content_words(paragraph)
+            if len(words) < 3:
+                continue  # Markers, headings, stray lines
+            if len(words & index.all_words) / len(words) >= RESIDUAL_MATCH_THRESHOLD:
+                continue
+            paragraph = paragraph.strip()
+            cost = len(paragraph) + (2 if residual else 0)  # Joined with a blank line
+            if size + cost > RESIDUAL_MAX_CHARS:
+                if residual:
+                    continue
+                paragraph = paragraph[:RESIDUAL_MAX_CHARS].rsplit(' ', 1)[0]
+                cost = len(paragraph)
+            residual.append(paragraph)
+            size += cost
+        return '\n\n'.join(residual)
+
+
+def describe_missing(missing: List[Dict[str, Any]], limit: int = 15) -> List[str]:
+    """Human-readable gap lines for deterministic misses"""
+    labels = {'phone': 'Phone number', 'email': 'Email', 'system': 'System', 'step': 'Step'}
+    gaps = []
+    for element in missing[:limit]:
+        where = f" (page {element['page']})" if element.get('page') else ""
+        gaps.append(f"{labels[element['kind']]} not in flowchart{where}: {element['value']}")
+    if len(missing) > limit:
+        gaps.append(f"...and {len(missing) - limit} more source elements not in the flowchart")
+    return gaps
+
+
+# Global coverage engine instance
+coverage_engine = CoverageEngine()
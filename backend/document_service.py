@@ -0,0 +1,542 @@
+"""
+Document Ingestion Service
+Features:
+- Chunked streaming of uploads into spooled temporary files
+- Configurable size limits with early rejection
+- Text extraction from a file path or memory map (never a full in-memory copy)
+- Linear-time text assembly for multi-page documents
+- Page-parallel PDF pipeline with selective OCR of image-only pages
+- Per-page content fingerprints for the extraction cache
+- Spreadsheets (XLSX/XLS/CSV) normalized to CSV text for the structured parser
+"""
+
+import asyncio
+import bisect
+import codecs
+import io
+import logging
+import math
+import mmap
+import os
+import re
+import tempfile
+from collections import deque
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from fingerprint import finalize_fingerprint, fingerprint_bytes, new_fingerprint_hasher
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pypdf
+    import docx
+    from PIL import Image
+    from ocr_preprocessing import ocr_image, preprocess_for_ocr
+    DOCUMENT_SUPPORT = True
+except ImportError:
+    DOCUMENT_SUPPORT = False
+
+try:
+    import pymupdf
+    PDF_RENDER_SUPPORT = True
+except ImportError:
+    PDF_RENDER_SUPPORT = False
+
+try:
+    import pandas
+    SPREADSHEET_SUPPORT = True
+except ImportError:
+    SPREADSHEET_SUPPORT = False
+
+MB = 1024 * 1024
+
+# Size limits (override via environment)
+MAX_DOCUMENT_UPLOAD_BYTES = int(os.environ.get('MAX_DOCUMENT_UPLOAD_MB', '50')) * MB
+MAX_AUDIO_UPLOAD_BYTES = int(os.environ.get('MAX_AUDIO_UPLOAD_MB', '25')) * MB  # Whisper API limit
+MAX_BULK_UPLOAD_BYTES = int(os.environ.get('MAX_BULK_UPLOAD_MB', '200')) * MB  # All files of one bulk import together
+SPOOL_MEMORY_BYTES = int(os.environ.get('UPLOAD_SPOOL_MEMORY_MB', '2')) * MB  # Roll over to disk above this
+UPLOAD_CHUNK_BYTES = 1 * MB
+UPLOAD_TMP_DIR = os.environ.get('UPLOAD_TMP_DIR') or None  # None = system temp dir
+
+# PDF page pipeline
+MIN_TEXT_LAYER_CHARS = 25  # Fewer extractable characters than this = treat page as scanned
+OCR_DPI = int(os.environ.get('OCR_DPI', '300'))
+MIN_PAGES_PER_JOB = 4
+PAGE_MARKER = "==Page {}=="
+PAGE_MARKER_RE = re.compile(r'^==Page (\d+)==$', re.MULTILINE)
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds its configured size limit"""
+
+    def __init__(self, limit_bytes: int):
+        self.limit_bytes = limit_bytes
+        super().__init__(f"File exceeds maximum size of {limit_bytes // MB} MB")
+
+
+class SpooledUpload:
+    """
+    Upload body spooled to a temporary file.
+    Small files stay in memory; anything above SPOOL_MEMORY_BYTES is rolled over
+    to a named file on disk and read back through a memory map.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, memory_bytes: int = SPOOL_MEMORY_BYTES):
+        self.filename = filename or ""
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.size = 0
+        self.path: Optional[str] = None
+        self._file: BinaryIO = io.BytesIO()
+        self._mmap: Optional[mmap.mmap] = None
+        self._hasher = new_fingerprint_hasher()
+
+    def write(self, chunk: bytes):
+        """Append a chunk, rejecting as soon as the limit is crossed"""
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(self.max_bytes)
+        if not self.on_disk and self.size > self.memory_bytes:
+            self._rollover()
+        self._file.write(chunk)
+        self._hasher.update(chunk)
+
+    @property
+    def fingerprint(self) -> str:
+        """Content address of the bytes written so far"""
+        return finalize_fingerprint(self._hasher)
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.filename)[1].lower().lstrip('.') or 'txt'
+
+    @property
+    def on_disk(self) -> bool:
+        return self.path is not None
+
+    def _rollover(self):
+        """Move the in-memory buffer to a named temp file (worker processes open it by path)"""
+        suffix = os.path.splitext(self.filename)[1]
+        disk_file = tempfile.NamedTemporaryFile(dir=UPLOAD_TMP_DIR, suffix=suffix, delete=False)
+        disk_file.write(self._file.getbuffer())
+        self._file.close()
+        self._file = disk_file
+        self.path = disk_file.name
+
+    def materialize(self) -> str:
+        """Ensure the upload is on disk and return its path"""
+        if not self.on_disk:
+            self._rollover()
+        self._file.flush()
+        return self.path
+
+    def worker_source(self):
+        """
+        Cheapest picklable handle for another process:
+        the path for disk-backed uploads, the raw bytes for small in-memory ones.
+        """
+        if self.on_disk:
+            self._file.flush()
+            return self.path
+        return self._file.getvalue()
+
+    def open_stream(self) -> BinaryIO:
+        """
+        Return a seekable binary stream over the spooled content.
+        Disk-backed uploads are memory-mapped so pages are loaded lazily by the OS.
+        """
+        if self.on_disk and self.size > 0:
+            if self._mmap is None:
+                self._file.flush()
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mmap.seek(0)
+            return self._mmap
+        self._file.seek(0)
+        return self._file
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+async def spool_upload(file, max_bytes: int, chunk_size: int = UPLOAD_CHUNK_BYTES) -> SpooledUpload:
+    """
+    Stream an UploadFile into a SpooledUpload chunk by chunk.
+    Rejects early (before reading) when the declared size is already too large.
+    """
+    declared_size = getattr(file, 'size', None)
+    if declared_size is not None and declared_size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+
+    spooled = SpooledUpload(file.filename, max_bytes)
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            spooled.write(chunk)
+    except Exception:
+        spooled.close()
+        raise
+
+    logger.info(f"📥 Spooled upload {spooled.filename}: {spooled.size:,} bytes ({'disk' if spooled.on_disk else 'memory'})")
+    return spooled
+
+
+# ============ Text Extraction ============
+
+def _open_source(source):
+    """Accept a filesystem path, raw bytes or an already-open binary stream"""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb'), True
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source), True
+    return source, False
+
+
+def extract_pdf_text(stream: BinaryIO) -> str:
+    reader = pypdf.PdfReader(stream)
+    parts: List[str] = []
+    for page in reader.pages:
+        parts.append(page.extract_text() or "")
+        parts.append("\n")
+    return "".join(parts)
+
+
+def extract_docx_text(stream: BinaryIO) -> str:
+    doc = docx.Document(stream)
+    return "".join(f"{para.text}\n" for para in doc.paragraphs)
+
+
+def extract_image_text(stream: BinaryIO) -> str:
+    image = Image.open(stream)
+    return ocr_image(preprocess_for_ocr(image))
+
+
+def extract_spreadsheet_text(stream: BinaryIO) -> str:
+    """
+    Every non-empty sheet as CSV. Multiple sheets are separated by a blank line and
+    a '# <sheet name>' heading.
+    """
+    sheets = pandas.read_excel(stream, sheet_name=None, dtype=str)
+    blocks = []
+    for name, frame in sheets.items():
+        frame = frame.dropna(how='all').dropna(axis=1, how='all')
+        if frame.empty:
+            continue
+        csv_text = frame.to_csv(index=False, lineterminator='\n')
+        blocks.append(csv_text if len(sheets) == 1 else f"# {name}\n{csv_text}")
+    return "\n".join(blocks)
+
+
+def extract_plain_text(stream: BinaryIO, chunk_size: int = UPLOAD_CHUNK_BYTES) -> str:
+    """Decode UTF-8 incrementally so multi-byte characters split across chunks survive"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parts: List[str] = []
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+def extract_text(source, filename: str) -> str:
+    """
+    Extract text from a document given a file path, bytes or binary stream (e.g. a memory map).
+    Dispatches on file extension, matching the formats accepted by /api/upload.
+    Module-level so it can be shipped to extraction worker processes.
+    """
+    stream, owned = _open_source(source)
+    try:
+        name = (filename or "").lower()
+        if name.endswith('.pdf'):
+            return extract_pdf_text(stream)
+        if name.endswith('.docx'):
+            return extract_docx_text(stream)
+        if name.endswith(('.png', '.jpg', '.jpeg')):
+            return extract_image_text(stream)
+        if name.endswith(('.xlsx', '.xls')) and SPREADSHEET_SUPPORT:
+            return extract_spreadsheet_text(stream)
+        return extract_plain_text(stream)
+    finally:
+        if owned:
+            stream.close()
+
+
+# ============ PDF Page Pipeline ============
+# Worker-side functions operate on page ranges so a large PDF fans out into a
+# handful of jobs rather than one job per page.
+
+def _open_pdf(source):
+    if isinstance(source, (bytes, bytearray)):
+        return pymupdf.open(stream=source, filetype="pdf")
+    return pymupdf.open(source, filetype="pdf")
+
+
+def count_pdf_pages(source) -> int:
+    with _open_pdf(source) as pdf:
+        return pdf.page_count
+
+
+def extract_pdf_text_layer(source, page_indexes: List[int]) -> Dict[int, Optional[str]]:
+    """
+    Extract the text layer of the given pages (0-based).
+    Pages without a usable text layer but with images map to None (needs OCR).
+    """
+    results: Dict[int, Optional[str]] = {}
+    with _open_pdf(source) as pdf:
+        for index in page_indexes:
+            page = pdf[index]
+            text = page.get_text("text")
+            if len(text.strip()) < MIN_TEXT_LAYER_CHARS and page.get_images(full=False):
+                results[index] = None
+            else:
+                results[index] = text
+    return results
+
+
+def fingerprint_pdf_pages(source) -> List[str]:
+    """
+    Content fingerprint per page: the page's content stream plus the raw bytes of
+    the images and ToUnicode maps it uses. Identical pages in different files
+    (re-exports, appended revisions) get identical fingerprints.
+    """
+    resource_hashes: Dict[int, str] = {}
+
+    def resource_hash(pdf, xref: int) -> str:
+        if xref not in resource_hashes:
+            try:
+                data = pdf.xref_stream_raw(xref) or pdf.xref_object(xref).encode()
+            except Exception:
+                data = pdf.xref_object(xref).encode()
+            resource_hashes[xref] = fingerprint_bytes(data)
+        return resource_hashes[xref]
+
+    fingerprints: List[str] = []
+    with _open_pdf(source) as pdf:
+        for page in pdf:
+            hasher = new_fingerprint_hasher()
+            hasher.update(page.read_contents())
+            for image in page.get_images(full=True):
+                hasher.update(resource_hash(pdf, image[0]).encode())
+            for font in page.get_fonts(full=True):
+                hasher.update(font[3].encode())  # basefont
+                kind, value = pdf.xref_get_key(font[0], "ToUnicode")
+                if kind == 'xref':
+                    hasher.update(resource_hash(pdf, int(value.split()[0])).encode())
+            fingerprints.append(finalize_fingerprint(hasher))
+    return fingerprints
+
+
+def ocr_pdf_pages(source, page_indexes: List[int], dpi: int = OCR_DPI) -> Dict[int, str]:
+    """Render the given pages to grayscale bitmaps and OCR them with Tesseract"""
+    results: Dict[int, str] = {}
+    with _open_pdf(source) as pdf:
+        for index in page_indexes:
+            pixmap = pdf[index].get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY)
+            image = Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+            results[index] = ocr_image(preprocess_for_ocr(image, dpi=dpi))
+    return results
+
+
+STREAM_PAGES_PER_JOB = 2  # Small jobs so streamed pages arrive steadily
+
+
+def _chunk(items: List[int], size: int) -> List[List[int]]:
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def format_page(index: int, text: str) -> str:
+    """One page of assembled output with its 1-based ==Page N== marker"""
+    body = text.rstrip("\n")
+    return f"{PAGE_MARKER.format(index + 1)}\n{body}\n\n"
+
+
+def assemble_pages(page_texts: Dict[int, str]) -> str:
+    """Join pages in order with 1-based ==Page N== markers"""
+    return "".join(format_page(index, page_texts[index]) for index in sorted(page_texts))
+
+
+async def iter_pdf_pages(source, executor, page_count: int, pages_per_job: int,
+                         known_pages: Optional[Dict[int, str]] = None):
+    """
+    Yield {"index", "text", "ocr"} for every page as soon as it is available
+    (completion order, not page order). Pages in known_pages (e.g. cache hits)
+    are yielded first with "cached": True and never extracted.
+
+    Remaining pages are fanned out to the executor with at most max_workers jobs
+    outstanding; pages without a text layer are queued for OCR as their batch
+    completes, so text-layer pages stream while scanned pages are still OCRing.
+    OCR batches that fail yield empty pages flagged "failed": True.
+    """
+    known_pages = known_pages or {}
+    for index in sorted(known_pages):
+        yield {"index": index, "text": known_pages[index], "ocr": False, "cached": True}
+
+    window = executor.max_workers
+    missing = [index for index in range(page_count) if index not in known_pages]
+    work = deque(("text", chunk) for chunk in _chunk(missing, pages_per_job))
+    pending: Dict[asyncio.Future, tuple] = {}
+
+    def submit(kind: str, chunk: List[int]):
+        fn = extract_pdf_text_layer if kind == "text" else ocr_pdf_pages
+        pending[asyncio.ensure_future(executor.run(fn, source, chunk))] = (kind, chunk)
+
+    try:
+        while work or pending:
+            while work and len(pending) < window:
+                submit(*work.popleft())
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                kind, chunk = pending.pop(task)
+
+                if kind == "ocr":
+                    if task.exception() is not None:
+                        # Scanned pages in this batch come back empty; text-layer pages are kept
+                        logger.warning(f"OCR batch failed: {task.exception()}")
+                        for index in chunk:
+                            yield {"index": index, "text": "", "ocr": True, "failed": True}
+                    else:
+                        texts = task.result()
+                        for index in chunk:
+                            yield {"index": index, "text": texts.get(index, ""), "ocr": True}
+                    continue
+
+                needs_ocr = []
+                for index, text in task.result().items():
+                    if text is None:
+                        needs_ocr.append(index)
+                    else:
+                        yield {"index": index, "text": text, "ocr": False}
+
+                if needs_ocr and DOCUMENT_SUPPORT:
+                    ocr_size = min(pages_per_job, math.ceil(len(needs_ocr) / window))
+                    work.extend(("ocr", ocr_chunk) for ocr_chunk in _chunk(needs_ocr, ocr_size))
+                else:
+                    for index in needs_ocr:
+                        yield {"index": index, "text": "", "ocr": False}
+    finally:
+        # Consumer stopped early (e.g. client disconnected): drop outstanding jobs
+        for task in pending:
+            task.cancel()
+
+
+async def plan_pdf_extraction(source, executor, cache=None) -> Dict[str, Any]:
+    """
+    Count pages and, when a cache is supplied, fingerprint them and load the
+    pages already extracted from another upload.
+    """
+    if cache is None:
+        return {"pageCount": await executor.run(count_pdf_pages, source), "fingerprints": None, "known": {}}
+    fingerprints = await executor.run(fingerprint_pdf_pages, source)
+    return {"pageCount": len(fingerprints), "fingerprints": fingerprints, "known": cache.get_pages(fingerprints)}
+
+
+def fresh_page_entry(plan: Dict[str, Any], page: Dict[str, Any]) -> Optional[tuple]:
+    """(fingerprint, text) to store for a newly extracted page, None if it should not be cached"""
+    if plan["fingerprints"] is None or page.get("cached") or page.get("failed"):
+        return None
+    return plan["fingerprints"][page["index"]], page["text"]
+
+
+async def extract_pdf_pipeline(source, executor, cache=None) -> Dict[str, Any]:
+    """
+    Page-level PDF extraction:
+    1. Fingerprint pages and reuse cached text for pages seen before
+    2. Fan out text-layer extraction for the rest across worker processes
+    3. OCR only the pages that came back without a text layer
+    4. Reassemble in page order with ==Page N== markers
+    """
+    plan = await plan_pdf_extraction(source, executor, cache)
+    page_count = plan["pageCount"]
+    pages_per_job = max(MIN_PAGES_PER_JOB, math.ceil(page_count / executor.max_workers))
+
+    page_texts: Dict[int, str] = {}
+    ocr_pages: List[int] = []
+    failed_pages: List[int] = []
+    fresh: Dict[str, str] = {}
+    async for page in iter_pdf_pages(source, executor, page_count, pages_per_job, plan["known"]):
+        page_texts[page["index"]] = page["text"]
+        if page["ocr"]:
+            ocr_pages.append(page["index"] + 1)
+        if page.get("failed"):
+            failed_pages.append(page["index"] + 1)
+        entry = fresh_page_entry(plan, page)
+        if entry:
+            fresh[entry[0]] = entry[1]
+
+    if cache is not None:
+        cache.set_pages(fresh)
+
+    logger.info(f"📄 PDF pipeline: {page_count} pages, {len(plan['known'])} cached, {len(ocr_pages)} OCR'd")
+    return {
+        "text": assemble_pages(page_texts),
+        "pageCount": page_count,
+        "ocrPages": sorted(ocr_pages),
+        "cachedPages": len(plan["known"]),
+        "failedPages": sorted(failed_pages),
+    }
+
+
+# ============ Source Page Attribution ============
+
+def build_page_index(text: str) -> List[tuple]:
+    """Sorted (offset, page_number) pairs for every ==Page N== marker in text"""
+    return [(match.start(), int(match.group(1))) for match in PAGE_MARKER_RE.finditer(text)]
+
+
+def page_at(page_index: List[tuple], offset: int) -> Optional[int]:
+    """Page number containing a character offset (None if before the first marker)"""
+    position = bisect.bisect_right(page_index, (offset, float('inf'))) - 1
+    return page_index[position][1] if position >= 0 else None
+
+
+def assign_source_pages(process: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """
+    Fill operationalDetails.sourcePage on parsed nodes by locating their most
+    specific details (contacts, systems, title) in page-marked source text.
+    Existing values are kept; text without page markers is left untouched.
+    """
+    page_index = build_page_index(text)
+    if not page_index:
+        return process
+
+    haystack = text.lower()
+    for node in process.get('nodes', []) or []:
+        details = node.get('operationalDetails')
+        if not isinstance(details, dict) or details.get('sourcePage'):
+            continue
+
+        candidates = list((details.get('contactInfo') or {}).values())
+        candidates += details.get('systems') or []
+        candidates += details.get('specificActions') or []
+        candidates.append(node.get('title') or "")
+
+        for candidate in candidates:
+            needle = str(candidate).strip().lower()
+            if len(needle) < 4:
+                continue
+            offset = haystack.find(needle)
+            if offset != -1:
+                page = page_at(page_index, offset)
+                if page is not None:
+                    details['sourcePage'] = str(page)
+                break
+    return process
@@ -0,0 +1,156 @@
+"""
+Content-Addressed Extraction Cache
+Features:
+- Whole-upload cache keyed by the fingerprint of the raw bytes
+- Per-page cache keyed by PDF page content fingerprints, so documents that
+  share most pages with a known one only extract the new pages
+- Redis storage when available (eviction via the server's allkeys-lru policy),
+  otherwise a size-bounded LRU directory on disk
+"""
+
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction output changes so stale text is never served
+EXTRACTION_CACHE_VERSION = 2
+EXTRACTION_CACHE_TTL = int(os.environ.get('EXTRACTION_CACHE_TTL_DAYS', '30')) * 86400
+EXTRACTION_CACHE_DIR = os.environ.get('EXTRACTION_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'extraction-cache')
+EXTRACTION_CACHE_MAX_BYTES = int(os.environ.get('EXTRACTION_CACHE_MAX_MB', '512')) * 1024 * 1024
+
+
+class DiskLRUCache:
+    """Flat directory of small files with least-recently-used eviction by total size"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._total = 0
+        try:
+            os.makedirs(directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(directory):
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+            for _, name, size in sorted(entries):
+                self._index[name] = size
+                self._total += size
+        except OSError as e:
+            logger.error(f"Extraction disk cache unavailable: {e}")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[str]:
+        if key not in self._index:
+            return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                value = f.read()
+            os.utime(self._path(key))  # Persist recency across restarts
+        except OSError:
+            self._total -= self._index.pop(key, 0)
+            return None
+        self._index.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        data = value.encode('utf-8')
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.error(f"Extraction disk cache write failed: {e}")
+            return
+
+        self._total += len(data) - self._index.pop(key, 0)
+        self._index[key] = len(data)
+        while self._total > self.max_bytes and len(self._index) > 1:
+            oldest, size = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                os.unlink(self._path(oldest))
+            except OSError:
+                pass
+
+
+class ExtractionCache:
+    def __init__(self):
+        self.redis_client = cache_service.redis_client
+        self.disk = None if self.redis_client else DiskLRUCache(EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_BYTES)
+        self._counters = {"file_hits": 0, "file_misses": 0, "page_hits": 0, "page_misses": 0}
+
+    def _file_key(self, fingerprint: str, extension: str) -> str:
+        return f"extract:v{EXTRACTION_CACHE_VERSION}:file:{extension}:{fingerprint}"
+
+    def _page_key(self, fingerprint: str) -> str:
+        return f"extract:v{EXTRACTION_CACHE_VERSION}:page:{fingerprint}"
+
+    def _get_many(self, keys: List[str]) -> List[Optional[str]]:
+        try:
+            if self.redis_client:
+                return self.redis_client.mget(keys)
+            return [self.disk.get(key.replace(':', '_')) for key in keys]
+        except Exception as e:
+            logger.error(f"Extraction cache retrieval error: {e}")
+            return [None] * len(keys)
+
+    def _set_many(self, items: Dict[str, str]):
+        try:
+            if self.redis_client:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, value in items.items():
+                    pipe.setex(key, EXTRACTION_CACHE_TTL, value)
+                pipe.execute()
+            else:
+                for key, value in items.items():
+                    self.disk.set(key.replace(':', '_'), value)
+        except Exception as e:
+            logger.error(f"Extraction cache storage error: {e}")
+
+    def get_file(self, fingerprint: str, extension: str) -> Optional[Dict[str, Any]]:
+        """Cached extraction result for an identical upload"""
+        cached = self._get_many([self._file_key(fingerprint, extension)])[0]
+        if cached is None:
+            self._counters["file_misses"] += 1
+            return None
+        self._counters["file_hits"] += 1
+        logger.info(f"🎯 Extraction Cache HIT (file): {fingerprint}")
+        return json.loads(cached)
+
+    def set_file(self, fingerprint: str, extension: str, result: Dict[str, Any]):
+        self._set_many({self._file_key(fingerprint, extension): json.dumps(result)})
+
+    def get_pages(self, page_fingerprints: List[str]) -> Dict[int, str]:
+        """Known page texts as {page_index: text}"""
+        if not page_fingerprints:
+            return {}
+        cached = self._get_many([self._page_key(fp) for fp in page_fingerprints])
+        known = {index: text for index, text in enumerate(cached) if text is not None}
+        self._counters["page_hits"] += len(known)
+        self._counters["page_misses"] += len(page_fingerprints) - len(known)
+        if known:
+            logger.info(f"🎯 Extraction Cache HIT: {len(known)}/{len(page_fingerprints)} pages")
+        return known
+
+    def set_pages(self, page_texts: Dict[str, str]):
+        """Store page texts keyed by page fingerprint"""
+        if page_texts:
+            self._set_many({self._page_key(fp): text for fp, text in page_texts.items()})
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": "redis" if self.redis_client else "disk", **self._counters}
+
+
+# Global extraction cache instance
+extraction_cache = ExtractionCache()
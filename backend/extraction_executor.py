@@ -0,0 +1,195 @@
+"""
+Process-Pool Extraction Executor
+Features:
+- CPU-bound PDF/DOCX/OCR work runs in worker processes, off the event loop
+- Bounded queue with fast rejection when saturated
+- Per-job timeouts and cancellation (stuck workers are recycled)
+- Queue-wait and extraction-time metrics for monitoring
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_WORKERS = int(os.environ.get('EXTRACTION_WORKERS', str(min(4, os.cpu_count() or 1))))
+EXTRACTION_QUEUE_SIZE = int(os.environ.get('EXTRACTION_QUEUE_SIZE', '16'))
+EXTRACTION_TIMEOUT_SECONDS = float(os.environ.get('EXTRACTION_TIMEOUT_SECONDS', '120'))
+EXTRACTION_TASKS_PER_WORKER = 50  # Recycle workers periodically to release parser memory
+METRICS_WINDOW = 1000
+
+
+class ExtractionQueueFullError(Exception):
+    """Raised when the extraction queue is saturated"""
+
+
+class ExtractionTimeoutError(Exception):
+    """Raised when an extraction job exceeds its time budget"""
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict):
+    """Runs inside the worker: execute fn and report how long the work itself took"""
+    started = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        # Some library errors (e.g. TesseractNotFoundError) cannot be unpickled in the
+        # parent, which would surface as a BrokenProcessPool; send a plain error instead
+        try:
+            pickle.loads(pickle.dumps(e))
+        except Exception:
+            raise RuntimeError(f"{type(e).__name__}: {e}") from None
+        raise
+    return result, time.perf_counter() - started
+
+
+def _percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ExtractionExecutor:
+    def __init__(
+        self,
+        max_workers: int = EXTRACTION_WORKERS,
+        max_queue: int = EXTRACTION_QUEUE_SIZE,
+        timeout: float = EXTRACTION_TIMEOUT_SECONDS,
+    ):
+        """Pool is created lazily on first use so importing the module never forks"""
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+
+        self._counters: Dict[str, int] = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "pool_recycles": 0,
+        }
+        self._queue_wait: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self._run_time: Deque[float] = deque(maxlen=METRICS_WINDOW)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                max_tasks_per_child=EXTRACTION_TASKS_PER_WORKER,
+            )
+            logger.info(f"⚙️ Extraction pool started with {self.max_workers} workers")
+        return self._pool
+
+    def _recycle_pool(self):
+        """Terminate all workers (a running job cannot be cancelled any other way)"""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        self._counters["pool_recycles"] += 1
+        for process in list(getattr(pool, '_processes', {}).values()):
+            try:
+                process.terminate()
+            except Exception:
+                pass
+        # Queued jobs fail with BrokenProcessPool and are retried on the fresh pool
+        pool.shutdown(wait=False)
+        logger.warning("♻️ Extraction pool recycled after a stuck job")
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) in a worker process and await the result.
+        fn and its arguments must be picklable (module-level functions, paths, bytes).
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self._counters["rejected"] += 1
+            raise ExtractionQueueFullError("Document extraction is at capacity, please retry shortly")
+
+        self._in_flight += 1
+        self._counters["submitted"] += 1
+        enqueued_at = time.perf_counter()
+        try:
+            async with self._slots:
+                self._queue_wait.append(time.perf_counter() - enqueued_at)
+                return await self._run_in_pool(fn, args, kwargs, timeout or self.timeout)
+        except asyncio.CancelledError:
+            self._counters["cancelled"] += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+    async def _run_in_pool(self, fn: Callable, args: tuple, kwargs: dict, timeout: float) -> Any:
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            pool = self._get_pool()
+            future = pool.submit(_timed_call, fn, args, kwargs)
+            try:
+                result, elapsed = await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), timeout)
+            except asyncio.TimeoutError:
+                self._counters["timeouts"] += 1
+                if not future.cancel():
+                    self._recycle_pool()
+                raise ExtractionTimeoutError(f"Document extraction timed out after {timeout:g}s")
+            except asyncio.CancelledError:
+                # Client went away: drop the job if it has not started yet
+                future.cancel()
+                raise
+            except BrokenProcessPool:
+                # Another job's timeout recycled the pool underneath us; retry once
+                if pool is self._pool:
+                    self._pool = None
+                if attempt == 0:
+                    continue
+                self._counters["failed"] += 1
+                raise
+            except Exception:
+                self._counters["failed"] += 1
+                raise
+
+            self._counters["completed"] += 1
+            self._run_time.append(elapsed)
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Executor metrics for monitoring"""
+        return {
+            "workers": self.max_workers,
+            "queue_capacity": self.max_queue,
+            "in_flight": self._in_flight,
+            **self._counters,
+            "queue_wait_ms": {
+                "p50": round(_percentile(self._queue_wait, 50) * 1000, 1),
+                "p95": round(_percentile(self._queue_wait, 95) * 1000, 1),
+            },
+            "extraction_ms": {
+                "p50": round(_percentile(self._run_time, 50) * 1000, 1),
+                "p95": round(_percentile(self._run_time, 95) * 1000, 1),
+            },
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global executor instance
+extraction_executor = ExtractionExecutor()
@@ -0,0 +1,27 @@
+"""
+Content Fingerprinting
+Shared SHA-256 content addressing for every cache layer:
+- Normalized document text (analysis/parse cache)
+- Raw upload bytes and individual PDF pages (extraction cache)
+Kept dependency-free so extraction worker processes can import it.
+"""
+
+import hashlib
+
+FINGERPRINT_HEX_LENGTH = 16
+
+
+def new_fingerprint_hasher():
+    """Incremental hasher for content that arrives in chunks"""
+    return hashlib.sha256()
+
+
+def finalize_fingerprint(hasher) -> str:
+    return hasher.hexdigest()[:FINGERPRINT_HEX_LENGTH]
+
+
+def fingerprint_bytes(data: bytes) -> str:
+    """Fingerprint raw bytes in one shot"""
+    hasher = new_fingerprint_hasher()
+    hasher.update(data)
+    return finalize_fingerprint(hasher)
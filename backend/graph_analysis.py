@@ -0,0 +1,416 @@
+"""
+Process Graph Timing Analysis
+Features:
+- timeEstimate strings ("5-10 min", "2 business days", "1h30m", "half an hour") parsed to minutes
+- Critical path method over edges + dependencies: earliest/latest start and slack per node
+- Candidate parallel groups: serial runs of independent steps (different actors, no dependency)
+- Potential cycle-time reduction, recomputed on the graph with every group parallelized
+Decision branches are alternatives, so the critical path is the worst-case route.
+Retry loops (back edges) are ignored. Everything is O(V + E) and LLM-free.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9, 'ten': 10, 'twelve': 12, 'fifteen': 15, 'twenty': 20, 'thirty': 30,
+    'forty five': 45, 'fortyfive': 45, 'sixty': 60, 'ninety': 90, 'half a': 0.5, 'half an': 0.5,
+    'few': 3, 'a few': 3, 'couple': 2, 'couple of': 2, 'a couple of': 2,
+}
+UNIT_MINUTES = {'s': 1 / 60, 'm': 1, 'h': 60, 'd': 1440, 'w': 10080, 'mo': 43200, 'y': 525600}
+
+_NUMBER = r'(?:\d+(?:\.\d+)?|\b(?:half an?|a few|few|(?:a )?couple(?: of)?|an?|one|two|three|four|five|six|seven|eight|nine|ten|twelve|fifteen|twenty|thirty|forty[- ]?five|sixty|ninety))'
+_UNIT = r'(?:seconds?|secs?|s|minutes?|mins?|m|hours?|hrs?|hr|h|days?|d|weeks?|wks?|w|months?|mos?|years?|yrs?|y)'
+DURATION_RE = re.compile(
+    rf'(?<![\d.])({_NUMBER})(?:\s*(?:-|–|to)\s*({_NUMBER}))?\s*(?:business\s+|working\s+|calendar\s+)?({_UNIT})(?![a-z])',
+    re.IGNORECASE,
+)
+INSTANT_RE = re.compile(r'\b(?:immediate(?:ly)?|instant(?:ly|aneous)?|real[- ]time|automatic(?:ally)?)\b', re.IGNORECASE)
+REFERENCE_STRIP_RE = re.compile(r'[^a-z0-9]+')
+SLACK_EPSILON = 1e-6
+
+
+def _number(value: str) -> float:
+    value = ' '.join(value.lower().replace('-', ' ').split())
+    if value in NUMBER_WORDS:
+        return NUMBER_WORDS[value]
+    return float(value)
+
+
+def _unit(value: str) -> str:
+    value = value.lower()
+    if value.startswith('mo'):
+        return 'mo'
+    if value.startswith('mi') or value == 'm':
+        return 'm'
+    return value[0]
+
+
+def parse_duration_range(text: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(low, high) minutes for a timeEstimate string, None if no duration is stated"""
+    if not text or not isinstance(text, str):
+        return None
+    components = []
+    for match in DURATION_RE.finditer(text):
+        low = _number(match.group(1))
+        high = _number(match.group(2)) if match.group(2) else low
+        unit = UNIT_MINUTES[_unit(match.group(3))]
+        components.append((min(low, high) * unit, max(low, high) * unit, unit))
+    if not components:
+        return (0.0, 0.0) if INSTANT_RE.search(text) else None
+    units = [unit for _, _, unit in components]
+    if all(a > b for a, b in zip(units, units[1:])):
+        # "2 hours 30 minutes", "1h30m": one compound duration
+        return sum(low for low, _, _ in components), sum(high for _, high, _ in components)
+    # "5 minutes, up to 1 hour": alternatives, take the longest
+    low, high, _ = max(components, key=lambda component: component[0] + component[1])
+    return low, high
+
+
+def parse_duration(text: Optional[str]) -> Optional[float]:
+    """Minutes for a timeEstimate string; ranges use the midpoint, None if no duration is stated"""
+    bounds = parse_duration_range(text)
+    return None if bounds is None else (bounds[0] + bounds[1]) / 2
+
+
+def format_minutes(minutes: Optional[float]) -> Optional[str]:
+    if minutes is None:
+        return None
+    if minutes < 1:
+        return f"{round(minutes * 60)} s"
+    if minutes < 60:
+        return f"{minutes:g} min" if minutes == int(minutes) else f"{minutes:.1f} min"
+    if minutes < 1440:
+        hours, rest = divmod(round(minutes), 60)
+        return f"{hours} h {rest} min" if rest else f"{hours} h"
+    days, rest = divmod(round(minutes / 60), 24)
+    return f"{days} d {rest} h" if rest else f"{days} d"
+
+
+def _reference(value: Any) -> str:
+    return REFERENCE_STRIP_RE.sub('', str(value).lower())
+
+
+def _actors(node: Dict[str, Any]) -> Set[str]:
+    return {_reference(actor) for actor in node.get("actors") or [] if isinstance(actor, str) and actor.strip()}
+
+
+@dataclass
+class ParallelGroup:
+    nodes: List[str]
+    titles: List[str]
+    actors: List[str]
+    serial_duration: float
+    parallel_duration: float
+    on_critical_path: bool
+    declared: bool  # Every member was marked parallelWith by the author
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "nodes": self.nodes,
+            "titles": self.titles,
+            "actors": self.actors,
+            "serialDuration": self.serial_duration,
+            "parallelDuration": self.parallel_duration,
+            "savings": self.serial_duration - self.parallel_duration,
+            "savingsLabel": format_minutes(self.serial_duration - self.parallel_duration),
+            "onCriticalPath": self.on_critical_path,
+            "declared": self.declared,
+        }
+
+
+@dataclass
+class AnalysisResult:
+    total_duration: float = 0.0
+    optimized_duration: float = 0.0
+    critical_path: List[str] = field(default_factory=list)
+    schedule: List[Dict[str, Any]] = field(default_factory=list)
+    parallel_groups: List[ParallelGroup] = field(default_factory=list)
+    unestimated_nodes: List[str] = field(default_factory=list)
+    ignored_edges: int = 0  # Retry loops left out of the schedule
+
+    @property
+    def potential_reduction(self) -> float:
+        return max(0.0, self.total_duration - self.optimized_duration)
+
+    def to_dict(self) -> Dict[str, Any]:
+        reduction = self.potential_reduction
+        return {
+            "unit": "minutes",
+            "totalDuration": self.total_duration,
+            "totalDurationLabel": format_minutes(self.total_duration),
+            "criticalPath": self.critical_path,
+            "nodes": self.schedule,
+            "parallelGroups": [group.to_dict() for group in self.parallel_groups],
+            "optimizedDuration": self.optimized_duration,
+            "optimizedDurationLabel": format_minutes(self.optimized_duration),
+            "potentialReduction": reduction,
+            "potentialReductionLabel": format_minutes(reduction),
+            "potentialReductionPercent": round(100 * reduction / self.total_duration, 1) if self.total_duration else 0.0,
+            "estimatedNodes": len(self.schedule) - len(self.unestimated_nodes),
+            "unestimatedNodes": self.unestimated_nodes,
+            "ignoredEdges": self.ignored_edges,
+        }
+
+
+def _schedule(count: int, durations: List[float], edges: List[Tuple[int, int]]):
+    """Forward and backward pass of the critical path method over a DAG"""
+    outgoing: List[List[int]] = [[] for _ in range(count)]
+    incoming: List[List[int]] = [[] for _ in range(count)]
+    for source, target in edges:
+        outgoing[source].append(target)
+        incoming[target].append(source)
+
+    indegree = [len(preds) for preds in incoming]
+    order = [i for i in range(count) if indegree[i] == 0]
+    for node in order:
+        for child in outgoing[node]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                order.append(child)
+
+    earliest = [0.0] * count
+    for node in order:
+        finish = earliest[node] + durations[node]
+        for child in outgoing[node]:
+            earliest[child] = max(earliest[child], finish)
+    total = max((earliest[i] + durations[i] for i in range(count)), default=0.0)
+
+    latest = [0.0] * count  # Latest finish
+    for node in reversed(order):
+        latest[node] = min((latest[child] - durations[child] for child in outgoing[node]), default=total)
+    return earliest, latest, total, incoming
+
+
+class GraphAnalyzer:
+    def analyze(self, process: Dict[str, Any]) -> AnalysisResult:
+        nodes = [n for n in process.get("nodes") or [] if isinstance(n, dict) and n.get("id") not in (None, "")]
+        result = AnalysisResult()
+        if not nodes:
+            return result
+
+        ids = [str(node["id"]) for node in nodes]
+        parsed = [parse_duration(node.get("timeEstimate")) for node in nodes]
+        durations = [minutes or 0.0 for minutes in parsed]
+        result.unestimated_nodes = [ids[i] for i, minutes in enumerate(parsed) if minutes is None]
+
+        dag, result.ignored_edges = self._dag(nodes, ids, process.get("edges") or [])
+        earliest, latest, total, incoming = _schedule(len(nodes), durations, dag)
+        slack = [latest[i] - durations[i] - earliest[i] for i in range(len(nodes))]
+        critical = [abs(value) < SLACK_EPSILON for value in slack]
+
+        result.total_duration = total
+        result.schedule = [
+            {
+                "id": ids[i],
+                "title": nodes[i].get("title", ""),
+                "duration": parsed[i],
+                "earliestStart": earliest[i],
+                "earliestFinish": earliest[i] + durations[i],
+                "latestStart": latest[i] - durations[i],
+                "latestFinish": latest[i],
+                "slack": max(0.0, slack[i]),
+                "critical": critical[i],
+            }
+            for i in range(len(nodes))
+        ]
+        result.critical_path = [ids[i] for i in self._critical_path(earliest, durations, incoming, critical, total)]
+
+        groups = self._parallel_groups(nodes, ids, dag)
+        for members in groups:
+            member_durations = [durations[i] for i in members]
+            result.parallel_groups.append(ParallelGroup(
+                nodes=[ids[i] for i in members],
+                titles=[nodes[i].get("title", "") for i in members],
+                actors=[", ".join(nodes[i].get("actors") or []) for i in members],
+                serial_duration=sum(member_durations),
+                parallel_duration=max(member_durations),
+                on_critical_path=any(critical[i] for i in members),
+                declared=self._declared(nodes, ids, members),
+            ))
+
+        # Every member of a group inherits the run's predecessors and successors
+        group_of = {i: members for members in groups for i in members}
+        optimized = set()
+        for u, v in dag:
+            sources, targets = group_of.get(u, [u]), group_of.get(v, [v])
+            if sources is not targets:
+                optimized.update((source, target) for source in sources for target in targets)
+        result.optimized_duration = _schedule(len(nodes), durations, list(optimized))[2] if groups else total
+
+        logger.info(
+            f"⏱️ Timing analysis: {format_minutes(total)} critical path over {len(result.critical_path)} steps, "
+            f"{len(groups)} parallel groups, {format_minutes(result.potential_reduction)} potential reduction"
+        )
+        return result
+
+    def _dag(self, nodes, ids, edges) -> Tuple[List[Tuple[int, int]], int]:
+        """Edges plus declared dependencies, with retry loops (DFS back edges) removed"""
+        index = {node_id: i for i, node_id in enumerate(ids)}
+        aliases: Dict[str, int] = {}
+        for i, node in enumerate(nodes):
+            for alias in (_reference(ids[i]), _reference(node.get("title", ""))):
+                if alias:
+                    aliases.setdefault(alias, i)
+
+        pairs: List[Tuple[int, int]] = []
+        for edge in edges:
+            if not isinstance(edge, dict):
+                continue
+            source, target = index.get(str(edge.get("source"))), index.get(str(edge.get("target")))
+            if source is not None and target is not None:
+                pairs.append((source, target))
+        if not pairs:
+            # No explicit edges: steps run in list order
+            pairs = [(i, i + 1) for i in range(len(nodes) - 1)]
+        for target, node in enumerate(nodes):
+            for dependency in node.get("dependencies") or []:
+                source = index.get(str(dependency), aliases.get(_reference(dependency)))
+                if source is not None:
+                    pairs.append((source, target))
+
+        outgoing: List[List[int]] = [[] for _ in nodes]
+        seen = set()
+        for source, target in pairs:
+            if source != target and (source, target) not in seen:
+                seen.add((source, target))
+                outgoing[source].append(target)
+
+        state = [0] * len(nodes)  # 0 new, 1 on stack, 2 done
+        dag = []
+        ignored = 0
+        for root in range(len(nodes)):
+            if state[root]:
+                continue
+            state[root] = 1
+            stack = [(root, iter(outgoing[root]))]
+            while stack:
+                node, children = stack[-1]
+                for child in children:
+                    if state[child] == 1:
+                        ignored += 1
+                        continue
+                    dag.append((node, child))
+                    if state[child] == 0:
+                        state[child] = 1
+                        stack.append((child, iter(outgoing[child])))
+                        break
+                else:
+                    state[node] = 2
+                    stack.pop()
+        return dag, ignored
+
+    def _critical_path(self, earliest, durations, incoming, critical, total) -> List[int]:
+        ends = [i for i in range(len(earliest)) if critical[i] and abs(earliest[i] + durations[i] - total) < SLACK_EPSILON]
+        if not ends:
+            return []
+        path = [ends[0]]
+        while True:
+            node = path[-1]
+            previous = [p for p in incoming[node] if critical[p] and abs(earliest[p] + durations[p] - earliest[node]) < SLACK_EPSILON]
+            if not previous:
+                break
+            path.append(previous[0])
+        return path[::-1]
+
+    def _gateway(self, node: Dict[str, Any]) -> bool:
+        """Triggers start the run and decisions route it; neither can overlap other steps"""
+        return node.get("type") in ("decision", "trigger") or node.get("status") == "trigger"
+
+    def _independent(self, nodes, ids, group: List[int], candidate: int) -> bool:
+        node = nodes[candidate]
+        if any(self._gateway(nodes[i]) for i in group):
+            return False
+        declared = {_reference(value) for value in node.get("parallelWith") or []}
+        if all(_reference(ids[i]) in declared or _reference(nodes[i].get("title", "")) in declared for i in group):
+            return True
+        if self._gateway(node):
+            return False
+        actors = _actors(node)
+        if not actors:
+            return False  # Unknown owner: can't tell whether the work overlaps
+        dependencies = {_reference(value) for value in node.get("dependencies") or []}
+        for i in group:
+            if actors & _actors(nodes[i]) or not _actors(nodes[i]):
+                return False
+            if _reference(ids[i]) in dependencies or _reference(nodes[i].get("title", "")) in dependencies:
+                return False
+        return True
+
+    def _declared(self, nodes, ids, members: List[int]) -> bool:
+        for position, i in enumerate(members):
+            declared = {_reference(value) for value in nodes[i].get("parallelWith") or []}
+            for j in members[:position]:
+                if _reference(ids[j]) not in declared and _reference(nodes[j].get("title", "")) not in declared:
+                    return False
+        return True
+
+    def _parallel_groups(self, nodes, ids, dag) -> List[List[int]]:
+        """Greedy runs along serial chains (single successor -> single predecessor)"""
+        successors: List[List[int]] = [[] for _ in nodes]
+        predecessors: List[List[int]] = [[] for _ in nodes]
+        for source, target in dag:
+            successors[source].append(target)
+            predecessors[target].append(source)
+
+        def serial_next(i: int) -> Optional[int]:
+            if len(successors[i]) == 1 and len(predecessors[successors[i][0]]) == 1:
+                return successors[i][0]
+            return None
+
+        groups = []
+        visited = set()
+        for start in range(len(nodes)):
+            if start in visited or (len(predecessors[start]) == 1 and serial_next(predecessors[start][0]) == start):
+                continue  # Only walk each chain from its head
+            chain = [start]
+            while serial_next(chain[-1]) is not None and serial_next(chain[-1]) not in visited:
+                chain.append(serial_next(chain[-1]))
+            visited.update(chain)
+
+            group = [chain[0]]
+            for candidate in chain[1:] + [None]:
+                if candidate is not None and self._independent(nodes, ids, group, candidate):
+                    group.append(candidate)
+                    continue
+                if len(group) > 1:
+                    groups.append(group)
+                group = [candidate]
+        return groups
+
+    def describe(self, result: AnalysisResult, nodes: List[Dict[str, Any]]) -> str:
+        """Computed figures for the intelligence prompt"""
+        if not result.schedule:
+            return ""
+        position = {str(node.get("id")): index + 1 for index, node in enumerate(nodes)}
+        lines = [
+            f"Critical path duration: {format_minutes(result.total_duration)} "
+            f"(steps {', '.join(str(position.get(node_id, node_id)) for node_id in result.critical_path)})",
+            f"Steps with a time estimate: {len(result.schedule) - len(result.unestimated_nodes)} of {len(result.schedule)}",
+        ]
+        slack = [item for item in result.schedule if not item["critical"] and item["slack"] > 0]
+        if slack:
+            lines.append("Slack: " + "; ".join(
+                f"step {position.get(item['id'])} {format_minutes(item['slack'])}" for item in slack
+            ))
+        for group in result.parallel_groups:
+            lines.append(
+                f"Parallel candidate: steps {', '.join(str(position.get(node_id, node_id)) for node_id in group.nodes)} "
+                f"({' | '.join(group.actors)}) {format_minutes(group.serial_duration)} serial -> "
+                f"{format_minutes(group.parallel_duration)} parallel"
+                f"{', on critical path' if group.on_critical_path else ''}"
+            )
+        lines.append(
+            f"Cycle time with all candidates parallelized: {format_minutes(result.optimized_duration)} "
+            f"(saves {format_minutes(result.potential_reduction)})"
+        )
+        return "\n".join(lines)
+
+
+# Global graph analyzer instance
+graph_analyzer = GraphAnalyzer()
@@ -0,0 +1,252 @@
+"""
+Process Graph Validation & Repair
+Features:
+- Collision-free node and edge ids (duplicates and missing ids are reassigned)
+- Dangling edges repaired through an id/title alias index, otherwise dropped
+- YES/NO labels normalized; two-way decisions missing a label get the other one
+- Unreachable nodes, cycles and one-armed decisions reported
+Every pass is a single walk over nodes or edges: O(V + E) overall.
+"""
+
+import logging
+import re
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+NODE_DEFAULTS = {"type": "process", "status": "current", "title": "Untitled step", "description": ""}
+YES_LABELS = {'yes', 'y', 'true', 'approved', 'pass'}
+NO_LABELS = {'no', 'n', 'false', 'rejected', 'fail'}
+ALIAS_STRIP_RE = re.compile(r'[^a-z0-9]+')
+
+
+def _alias(value: Any) -> str:
+    return ALIAS_STRIP_RE.sub('', str(value).lower())
+
+
+class IdAllocator:
+    """
+    Mints ids that are unique within one process ("node-3f9c2a1b7e4d"). Random rather
+    than counted: a deleted node's id must never come back on an unrelated step, or
+    stale ops, version deltas and diffs keyed by it would land on the new one.
+    """
+
+    def __init__(self, prefix: str, existing: Iterable[str] = ()):
+        self.prefix = prefix
+        self.used: Set[str] = set(existing)
+
+    def claim(self, value: str) -> bool:
+        """Reserve an existing id; False if it is already taken"""
+        if value in self.used:
+            return False
+        self.used.add(value)
+        return True
+
+    def mint(self) -> str:
+        candidate = f"{self.prefix}-{uuid.uuid4().hex[:12]}"
+        while candidate in self.used:
+            candidate = f"{self.prefix}-{uuid.uuid4().hex[:12]}"
+        self.used.add(candidate)
+        return candidate
+
+
+def new_node_id(nodes: List[Dict[str, Any]]) -> str:
+    """Fresh node id for a process (replaces millisecond-timestamp ids)"""
+    return IdAllocator("node", (n.get("id") for n in nodes if isinstance(n, dict) and n.get("id"))).mint()
+
+
+@dataclass
+class ValidationReport:
+    nodes: int = 0
+    edges: int = 0
+    renamed_nodes: Dict[str, str] = field(default_factory=dict)
+    repaired_edges: int = 0
+    dropped_edges: int = 0
+    relabeled_branches: int = 0
+    unreachable_nodes: List[str] = field(default_factory=list)
+    cycle_edges: List[str] = field(default_factory=list)  # Back edges (loops are legal: retries)
+    incomplete_decisions: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.renamed_nodes or self.repaired_edges or self.dropped_edges or self.relabeled_branches)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        return {
+            "nodes": data["nodes"],
+            "edges": data["edges"],
+            "renamedNodes": data["renamed_nodes"],
+            "repairedEdges": data["repaired_edges"],
+            "droppedEdges": data["dropped_edges"],
+            "relabeledBranches": data["relabeled_branches"],
+            "unreachableNodes": data["unreachable_nodes"],
+            "cycleEdges": data["cycle_edges"],
+            "incompleteDecisions": data["incomplete_decisions"],
+        }
+
+
+class GraphValidator:
+    def normalize(self, process: Dict[str, Any]) -> ValidationReport:
+        """Repair process['nodes'] / process['edges'] in place and report what was found"""
+        report = ValidationReport()
+        nodes = self._normalize_nodes(process, report)
+        edges = self._normalize_edges(process, nodes, report)
+        outgoing = self._label_decisions(nodes, edges, report)
+        self._check_reachability(nodes, outgoing, report)
+        self._find_cycles(nodes, outgoing, report)
+
+        process["nodes"] = nodes
+        process["edges"] = edges
+        report.nodes = len(nodes)
+        report.edges = len(edges)
+        if report.changed or report.unreachable_nodes or report.incomplete_decisions:
+            logger.info(
+                f"🧹 Graph normalized: {len(report.renamed_nodes)} ids reassigned, "
+                f"{report.repaired_edges} edges repaired, {report.dropped_edges} dropped, "
+                f"{len(report.unreachable_nodes)} unreachable, {len(report.incomplete_decisions)} incomplete decisions"
+            )
+        return report
+
+    def _normalize_nodes(self, process: Dict[str, Any], report: ValidationReport) -> List[Dict[str, Any]]:
+        nodes = [n for n in process.get("nodes") or [] if isinstance(n, dict)]
+        ids = IdAllocator("node")
+        # Claim every first occurrence before minting, so a minted id never steals a later node's id
+        keep = []
+        for node in nodes:
+            node_id = node.get("id")
+            keep.append(node_id not in (None, "") and ids.claim(str(node_id)))
+        for node, kept in zip(nodes, keep):
+            if kept:
+                node["id"] = str(node["id"])
+            else:
+                fresh = ids.mint()
+                if node.get("id") not in (None, ""):
+                    # Edges keep pointing at the first node that used the id
+                    report.renamed_nodes.setdefault(str(node["id"]), fresh)
+                node["id"] = fresh
+            for key, default in NODE_DEFAULTS.items():
+                if node.get(key) is None or (key != "description" and node.get(key) == ""):
+                    node[key] = default
+        return nodes
+
+    def _normalize_edges(self, process, nodes, report: ValidationReport) -> List[Dict[str, Any]]:
+        ids = {node["id"] for node in nodes}
+        # Alias index: "node1", "Node 1", "1" (1-based position) and unique titles
+        aliases: Dict[str, Optional[str]] = {}
+        for position, node in enumerate(nodes, 1):
+            for alias in (_alias(node["id"]), str(position), _alias(node.get("title", ""))):
+                if alias:
+                    aliases[alias] = None if aliases.get(alias, node["id"]) != node["id"] else node["id"]
+
+        def resolve(reference) -> Optional[str]:
+            if reference is None:
+                return None
+            reference = str(reference)
+            if reference in ids:
+                return reference
+            return aliases.get(_alias(reference))
+
+        edge_ids = IdAllocator("edge")
+        edges = []
+        seen = set()
+        for edge in process.get("edges") or []:
+            if not isinstance(edge, dict):
+                report.dropped_edges += 1
+                continue
+            source, target = resolve(edge.get("source")), resolve(edge.get("target"))
+            if source is None or target is None:
+                report.dropped_edges += 1
+                continue
+            if (source, target) != (edge.get("source"), edge.get("target")):
+                report.repaired_edges += 1
+            edge["source"], edge["target"] = source, target
+
+            label, condition = self._branch(edge.get("label"), edge.get("condition"))
+            key = (source, target, condition)
+            if key in seen:
+                report.dropped_edges += 1
+                continue
+            seen.add(key)
+            edge["label"], edge["condition"] = label, condition
+            edges.append(edge)
+
+        keep = [edge.get("id") not in (None, "") and edge_ids.claim(str(edge["id"])) for edge in edges]
+        for edge, kept in zip(edges, keep):
+            edge["id"] = str(edge["id"]) if kept else edge_ids.mint()
+        return edges
+
+    def _branch(self, label, condition):
+        key = _alias(condition or label or '')
+        if key in YES_LABELS:
+            return "YES", "yes"
+        if key in NO_LABELS:
+            return "NO", "no"
+        return label, condition
+
+    def _label_decisions(self, nodes, edges, report: ValidationReport) -> Dict[str, List[Dict[str, Any]]]:
+        outgoing: Dict[str, List[Dict[str, Any]]] = {node["id"]: [] for node in nodes}
+        for edge in edges:
+            outgoing[edge["source"]].append(edge)
+
+        for node in nodes:
+            if node.get("type") != "decision":
+                continue
+            branches = outgoing[node["id"]]
+            conditions = [edge.get("condition") for edge in branches]
+            if len(branches) == 2 and conditions.count("yes") + conditions.count("no") < 2:
+                unlabeled = [edge for edge in branches if edge.get("condition") not in ("yes", "no")]
+                labels = [c for c in conditions if c in ("yes", "no")]
+                # Fill the missing side; with no labels at all the first branch is YES
+                for edge, condition in zip(unlabeled, [c for c in ("yes", "no") if c not in labels]):
+                    if edge.get("label") and edge["label"].upper() not in ("YES", "NO"):
+                        continue  # A meaningful custom label ("Over $500") stays
+                    edge["label"], edge["condition"] = condition.upper(), condition
+                    report.relabeled_branches += 1
+            if len(branches) < 2 and edges:
+                report.incomplete_decisions.append(node["id"])
+        return outgoing
+
+    def _roots(self, nodes) -> List[str]:
+        roots = [n["id"] for n in nodes if n.get("type") == "trigger" or n.get("status") == "trigger"]
+        return roots or [nodes[0]["id"]]
+
+    def _check_reachability(self, nodes, outgoing, report: ValidationReport):
+        if not nodes or not any(outgoing.values()):
+            return  # No explicit edges: nodes are connected in list order
+        reached = set(self._roots(nodes))
+        queue = list(reached)
+        for node_id in queue:
+            for edge in outgoing[node_id]:
+                if edge["target"] not in reached:
+                    reached.add(edge["target"])
+                    queue.append(edge["target"])
+        report.unreachable_nodes = [node["id"] for node in nodes if node["id"] not in reached]
+
+    def _find_cycles(self, nodes, outgoing, report: ValidationReport):
+        """Iterative three-colour DFS; every back edge closes a cycle"""
+        state: Dict[str, int] = {}
+        for root in self._roots(nodes) + [node["id"] for node in nodes] if nodes else []:
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, iter(outgoing[root]))]
+            while stack:
+                node_id, branches = stack[-1]
+                for edge in branches:
+                    target = edge["target"]
+                    if state.get(target) == 1:
+                        report.cycle_edges.append(edge["id"])
+                    elif target not in state:
+                        state[target] = 1
+                        stack.append((target, iter(outgoing[target])))
+                        break
+                else:
+                    state[node_id] = 2
+                    stack.pop()
+
+
+# Global graph validator instance
+graph_validator = GraphValidator()
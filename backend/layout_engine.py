@@ -0,0 +1,379 @@
+"""
+Layered Flowchart Layout Engine (Sugiyama)
+Features:
+- Cycle breaking (DFS back edges reversed), longest-path layer assignment
+- Long edges split with virtual nodes so every edge spans one layer
+- Crossing minimization: barycenter sweeps, best ordering kept
+- Coordinate assignment: order-preserving least-squares alignment to neighbor medians (pool adjacent violators)
+- Node sizes and spacing match the React Flow renderer (top-to-bottom, top-left positions)
+Pure Python and linear-ish per sweep: a 500-node flowchart takes tens of milliseconds
+(40-120 ms depending on machine and graph shape, see benchmarks/bench_layout.py).
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Keep in sync with frontend/src/utils/flowchartLayoutUtils.js
+NODE_WIDTH = 280
+NODE_HEIGHT = 110
+DECISION_SIZE = 280
+NODE_SEPARATION = 60
+RANK_SEPARATION = 120
+MARGIN = 40
+VIRTUAL_WIDTH = 20
+VIRTUAL_SEPARATION = 20
+
+ORDERING_SWEEPS = 12
+ORDERING_PATIENCE = 3  # Sweeps without fewer crossings before stopping
+COORDINATE_PASSES = 6
+VIRTUAL_WEIGHT = 2.0  # Pull long edges straight harder than node alignment
+
+BRANCH_RANK = {"yes": 0, None: 1, "no": 2}  # YES branches to the left of NO branches
+
+
+@dataclass
+class LayoutResult:
+    positions: Dict[str, Dict[str, float]]
+    edge_points: Dict[str, List[Dict[str, float]]] = field(default_factory=dict)
+    width: float = 0.0
+    height: float = 0.0
+    layers: int = 0
+    crossings: int = 0
+    reversed_edges: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "positions": self.positions,
+            "edgePoints": self.edge_points,
+            "width": self.width,
+            "height": self.height,
+            "layers": self.layers,
+            "crossings": self.crossings,
+            "reversedEdges": self.reversed_edges,
+        }
+
+
+def _node_size(node: Dict[str, Any]) -> Tuple[float, float]:
+    if node.get("type") == "decision":
+        return DECISION_SIZE, DECISION_SIZE
+    return NODE_WIDTH, NODE_HEIGHT
+
+
+def _graph_edges(ids: List[str], edges: List[Dict[str, Any]]) -> List[Tuple[int, int, Optional[str], Optional[str]]]:
+    """(source, target, branch, edge id) with dangling edges, self-loops and duplicates dropped"""
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    result = []
+    seen = set()
+    for edge in edges or []:
+        source, target = index.get(edge.get("source")), index.get(edge.get("target"))
+        if source is None or target is None or source == target or (source, target) in seen:
+            continue
+        seen.add((source, target))
+        branch = edge.get("condition") if edge.get("condition") in ("yes", "no") else None
+        result.append((source, target, branch, edge.get("id")))
+    if not result and not edges:
+        # No explicit edges: the renderer connects nodes in list order
+        result = [(i, i + 1, None, None) for i in range(len(ids) - 1)]
+    return result
+
+
+def _break_cycles(count: int, edges: List[Tuple[int, int, Optional[str], Optional[str]]]) -> Tuple[List[Tuple[int, int]], int]:
+    """Reverse DFS back edges; roots are taken in node order so the trigger leads"""
+    outgoing: List[List[Tuple[int, int]]] = [[] for _ in range(count)]
+    indegree = [0] * count
+    for position, (source, target, _, _) in enumerate(edges):
+        outgoing[source].append((target, position))
+        indegree[target] += 1
+
+    state = [0] * count  # 0 new, 1 on stack, 2 done
+    oriented = [(source, target) for source, target, _, _ in edges]
+    reversed_count = 0
+    roots = [i for i in range(count) if indegree[i] == 0] + list(range(count))
+    for root in roots:
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(outgoing[root]))]
+        while stack:
+            node, children = stack[-1]
+            for child, position in children:
+                if state[child] == 1:
+                    oriented[position] = (child, node)
+                    reversed_count += 1
+                elif state[child] == 0:
+                    state[child] = 1
+                    stack.append((child, iter(outgoing[child])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return oriented, reversed_count
+
+
+def _assign_layers(count: int, dag: List[Tuple[int, int]]) -> List[int]:
+    """Longest path from the sources (Kahn order)"""
+    outgoing: List[List[int]] = [[] for _ in range(count)]
+    indegree = [0] * count
+    for source, target in dag:
+        outgoing[source].append(target)
+        indegree[target] += 1
+    layer = [0] * count
+    queue = [i for i in range(count) if indegree[i] == 0]
+    for node in queue:  # The list grows while iterating
+        for target in outgoing[node]:
+            layer[target] = max(layer[target], layer[node] + 1)
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                queue.append(target)
+    return layer
+
+
+def _count_crossings(upper: List[int], lower_pos: Dict[int, int], down: List[List[int]]) -> int:
+    """Crossings between two adjacent layers (inversions of target positions, Fenwick tree)"""
+    targets = []
+    for node in upper:
+        targets.extend(sorted(lower_pos[t] for t in down[node]))
+    size = len(lower_pos) + 1
+    tree = [0] * (size + 1)
+    crossings = 0
+    seen = 0
+    for position in targets:
+        # Count already-placed targets strictly to the right of this one
+        i = position + 1
+        below = 0
+        while i > 0:
+            below += tree[i]
+            i -= i & -i
+        crossings += seen - below
+        i = position + 1
+        while i <= size:
+            tree[i] += 1
+            i += i & -i
+        seen += 1
+    return crossings
+
+
+def _median(values: List[float]) -> float:
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def _isotonic(values: List[float], weights: List[float]) -> List[float]:
+    """Weighted least-squares non-decreasing fit (pool adjacent violators)"""
+    blocks: List[List[float]] = []  # [mean, weight, length]
+    for value, weight in zip(values, weights):
+        blocks.append([value, weight, 1])
+        while len(blocks) > 1 and blocks[-2][0] > blocks[-1][0]:
+            mean, w, n = blocks.pop()
+            previous = blocks[-1]
+            total = previous[1] + w
+            previous[0] = (previous[0] * previous[1] + mean * w) / total
+            previous[1] = total
+            previous[2] += n
+    fitted = []
+    for mean, _, length in blocks:
+        fitted.extend([mean] * length)
+    return fitted
+
+
+class LayoutEngine:
+    def layout(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> LayoutResult:
+        """Top-left positions for every node (keyed by node id)"""
+        nodes = [n for n in nodes or [] if n.get("id")]
+        ids = list(dict.fromkeys(n["id"] for n in nodes))
+        if not ids:
+            return LayoutResult(positions={})
+        sizes = [_node_size(n) for n in {n["id"]: n for n in nodes}.values()]
+        count = len(ids)
+
+        graph_edges = _graph_edges(ids, edges)
+        dag, reversed_count = _break_cycles(count, graph_edges)
+        layer = _assign_layers(count, dag)
+
+        # Proper layered graph: virtual nodes for edges spanning several layers
+        down: List[List[int]] = [[] for _ in range(count)]
+        up: List[List[int]] = [[] for _ in range(count)]
+        branch = [1] * count
+        chains: Dict[int, List[int]] = {}  # edge position -> virtual nodes along it
+        for position, ((source, target), (_, _, condition, _)) in enumerate(zip(dag, graph_edges)):
+            rank = BRANCH_RANK[condition]
+            previous = source
+            chain = []
+            for virtual_layer in range(layer[source] + 1, layer[target]):
+                virtual = len(layer)
+                layer.append(virtual_layer)
+                down.append([])
+                up.append([])
+                branch.append(rank)
+                sizes.append((VIRTUAL_WIDTH, 0))
+                down[previous].append(virtual)
+                up[virtual].append(previous)
+                chain.append(virtual)
+                previous = virtual
+            down[previous].append(target)
+            up[target].append(previous)
+            if condition is not None and not chain:
+                branch[target] = min(branch[target], rank)
+            if chain:
+                chains[position] = chain
+        total = len(layer)
+
+        layers = self._initial_order(count, total, layer, down, branch)
+        layers, crossings = self._minimize_crossings(layers, up, down, branch)
+        x = self._assign_x(layers, up, down, sizes, count)
+
+        # Vertical placement: each layer as tall as its tallest node
+        layer_top = []
+        top = MARGIN
+        for members in layers:
+            layer_top.append(top)
+            top += max(sizes[node][1] for node in members) + RANK_SEPARATION
+        layer_height = [max(sizes[node][1] for node in members) for members in layers]
+
+        left = min(x[node] - sizes[node][0] / 2 for node in range(total))
+        shift = MARGIN - left
+        positions = {}
+        for node in range(count):
+            width, height = sizes[node]
+            positions[ids[node]] = {
+                "x": round(x[node] + shift - width / 2, 1),
+                "y": round(layer_top[layer[node]] + (layer_height[layer[node]] - height) / 2, 1),
+            }
+
+        edge_points = {}
+        for position, chain in chains.items():
+            edge_id = graph_edges[position][3]
+            if edge_id:
+                edge_points[edge_id] = [
+                    {"x": round(x[v] + shift, 1), "y": round(layer_top[layer[v]] + layer_height[layer[v]] / 2, 1)}
+                    for v in chain
+                ]
+
+        return LayoutResult(
+            positions=positions,
+            edge_points=edge_points,
+            width=round(max(x[node] + shift + sizes[node][0] / 2 for node in range(total)) + MARGIN, 1),
+            height=round(top - RANK_SEPARATION + MARGIN, 1),
+            layers=len(layers),
+            crossings=crossings,
+            reversed_edges=reversed_count,
+        )
+
+    def _initial_order(self, count, total, layer, down, branch) -> List[List[int]]:
+        """DFS discovery order from the roots keeps each branch contiguous"""
+        has_parent = [False] * total
+        for node in range(total):
+            for child in down[node]:
+                has_parent[child] = True
+        visited = [False] * total
+        order = []
+        for root in [i for i in range(count) if not has_parent[i]] + list(range(total)):
+            if visited[root]:
+                continue
+            visited[root] = True
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                order.append(node)
+                # Reverse so the YES branch is discovered (and placed) first
+                for child in sorted(down[node], key=lambda c: branch[c], reverse=True):
+                    if not visited[child]:
+                        visited[child] = True
+                        stack.append(child)
+
+        layers: List[List[int]] = [[] for _ in range(max(layer) + 1)]
+        for node in order:
+            layers[layer[node]].append(node)
+        return layers
+
+    def _total_crossings(self, layers, down) -> int:
+        total = 0
+        for upper, lower in zip(layers, layers[1:]):
+            lower_pos = {node: i for i, node in enumerate(lower)}
+            total += _count_crossings(upper, lower_pos, down)
+        return total
+
+    def _minimize_crossings(self, layers, up, down, branch) -> Tuple[List[List[int]], int]:
+        best = [list(members) for members in layers]
+        best_crossings = self._total_crossings(layers, down)
+        stale = 0
+        for sweep in range(ORDERING_SWEEPS):
+            if best_crossings == 0:
+                break
+            downward = sweep % 2 == 0
+            sequence = range(1, len(layers)) if downward else range(len(layers) - 2, -1, -1)
+            for index in sequence:
+                fixed = layers[index - 1] if downward else layers[index + 1]
+                neighbors = up if downward else down
+                fixed_pos = {node: i for i, node in enumerate(fixed)}
+                members = layers[index]
+
+                def barycenter(item):
+                    position, node = item
+                    linked = [fixed_pos[n] for n in neighbors[node] if n in fixed_pos]
+                    center = sum(linked) / len(linked) if linked else position * len(fixed) / max(1, len(members))
+                    return center, branch[node], position
+
+                layers[index] = [node for _, node in sorted(enumerate(members), key=barycenter)]
+
+            crossings = self._total_crossings(layers, down)
+            if crossings < best_crossings:
+                best = [list(members) for members in layers]
+                best_crossings = crossings
+                stale = 0
+            else:
+                stale += 1
+                if stale >= ORDERING_PATIENCE:
+                    break
+        return best, best_crossings
+
+    def _assign_x(self, layers, up, down, sizes, real_count) -> List[float]:
+        total = len(sizes)
+        x = [0.0] * total
+
+        def gaps(members):
+            offsets = [0.0]
+            for a, b in zip(members, members[1:]):
+                both_virtual = a >= real_count and b >= real_count
+                separation = VIRTUAL_SEPARATION if both_virtual else NODE_SEPARATION
+                offsets.append(offsets[-1] + sizes[a][0] / 2 + sizes[b][0] / 2 + separation)
+            return offsets
+
+        layer_offsets = [gaps(members) for members in layers]
+        for members, offsets in zip(layers, layer_offsets):
+            for node, offset in zip(members, offsets):
+                x[node] = offset
+
+        for sweep in range(COORDINATE_PASSES):
+            final = sweep == COORDINATE_PASSES - 1
+            downward = sweep % 2 == 0
+            sequence = range(len(layers)) if downward else range(len(layers) - 1, -1, -1)
+            for index in sequence:
+                members = layers[index]
+                offsets = layer_offsets[index]
+                desired = []
+                weights = []
+                for node in members:
+                    linked = (up[node] + down[node]) if final else (up[node] if downward else down[node])
+                    desired.append(_median([x[n] for n in linked]) if linked else x[node])
+                    weights.append(VIRTUAL_WEIGHT if node >= real_count else 1.0)
+                fitted = _isotonic([d - o for d, o in zip(desired, offsets)], weights)
+                for node, value, offset in zip(members, fitted, offsets):
+                    x[node] = value + offset
+        return x
+
+    def apply(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> LayoutResult:
+        """Lay out and write the positions onto the node dicts"""
+        result = self.layout(nodes, edges)
+        for node in nodes:
+            if node.get("id") in result.positions:
+                node["position"] = result.positions[node["id"]]
+        return result
+
+
+# Global layout engine instance
+layout_engine = LayoutEngine()
@@ -0,0 +1,234 @@
+"""
+Local Extraction Engine
+Features:
+- Phone numbers and email addresses (same patterns the compaction stage protects)
+- Duration / SLA / frequency expressions
+- IF/ELSE and yes/no decision cues
+- System names from a learned per-workspace vocabulary plus naming heuristics
+Deterministic and LLM-free: produces a provisional extraction summary in milliseconds.
+"""
+
+import logging
+import re
+from typing import Any, Dict, Iterable, List
+
+from text_compaction import EMAIL_RE, PHONE_RE
+
+logger = logging.getLogger(__name__)
+
+MIN_PHONE_DIGITS = 7
+MAX_PHONE_DIGITS = 20  # E.164 allows 15, plus an extension
+
+MAX_PHONE_GROUP_DIGITS = 5  # "1300 555 123", "0412 345 678"; longer unbroken runs are IDs
+PHONE_CONTEXT_CHARS = 40
+
+DATE_LIKE_RE = re.compile(r'^\d{4}[-/.]\d{1,2}[-/.]\d{1,2}$|^\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}$')
+# "Phone: 0894152888", "call the helpdesk on 9415 2888"
+PHONE_CUE_RE = re.compile(
+    r'\b(?:tel(?:ephone)?|phone|ph|mobile|mob|cell|call|dial|fax|hotline|sms|text)\b[^\w\n]*(?:[^\W\d]+[^\w\n]+){0,3}$',
+    re.IGNORECASE,
+)
+# "#10042311", "INV-2024-0042", "PO 4500012345", "order no. 55512345"
+ID_PREFIX_RE = re.compile(
+    r'(?:#|(?<![a-z])(?:inv(?:oice)?|po|order|ref|case|ticket)s?\.?(?:\s*(?:no|num|number|id)\.?)?)\s*[:#-]?\s*$',
+    re.IGNORECASE,
+)
+EXTENSION_RE = re.compile(r'\s*(?:ext\.?|x)\s*\d+$', re.IGNORECASE)
+
+_NUMBER_WORDS = r'(?:\d+(?:\.\d+)?|an?|one|two|three|four|five|six|seven|eight|nine|ten|twelve|fifteen|twenty|thirty|forty[- ]?five|sixty|ninety|half an?)'
+_TIME_UNITS = r'(?:seconds?|secs?|minutes?|mins?|hours?|hrs?|h|days?|weeks?|wks?|months?|years?)'
+_RANGE = rf'{_NUMBER_WORDS}(?:\s*(?:-|–|to)\s*{_NUMBER_WORDS})?'
+TIMELINE_PATTERNS = [
+    # "every 30 minutes", "within 2 business days", "no later than 4 hours"
+    re.compile(
+        rf'\b(?:every|each|within|after|before|at least|at most|no later than|no more than|up to|under|over|in|for|takes?|allow)\s+'
+        rf'{_RANGE}\s*(?:business\s+|working\s+|calendar\s+)?{_TIME_UNITS}\b',
+        re.IGNORECASE,
+    ),
+    # "2 business days", "48h turnaround", "24/7"
+    re.compile(rf'\b\d+(?:\.\d+)?\s*(?:business\s+|working\s+|calendar\s+){_TIME_UNITS}\b', re.IGNORECASE),
+    re.compile(r'\b\d+\s*(?:h|hr|hrs|hour)\s+(?:sla|turnaround|response|resolution)\b', re.IGNORECASE),
+    re.compile(r'\bSLA\s*(?:of|:|is)?\s*\d+(?:\.\d+)?\s*' + _TIME_UNITS + r'\b', re.IGNORECASE),
+    re.compile(r'\b24/7\b'),
+    # Calendar phrases
+    re.compile(
+        r'\b(?:daily|weekly|fortnightly|monthly|quarterly|annually|hourly|same day|next business day|'
+        r'end of (?:the )?(?:day|week|month)|EOD|COB|close of business)\b',
+        re.IGNORECASE,
+    ),
+    re.compile(r'\bby\s+\d{1,2}(?::\d{2})?\s*(?:am|pm)\b', re.IGNORECASE),
+]
+
+# A sentence that opens a branch; the matching else/otherwise belongs to the same decision
+DECISION_CUE_RE = re.compile(
+    r'\b(?:if|whether|unless|in case|in the event|depending on|yes/no|y/n)\b|\b(?:approved|rejected)\s+or\s+(?:rejected|approved)\b',
+    re.IGNORECASE,
+)
+# Closed (yes/no) questions, including ones introduced inline: "Ask caller: are you injured?"
+QUESTION_RE = re.compile(
+    r'(?:^|[:"“]\s*)(?:is|are|was|were|does|do|did|has|have|can|could|will|would|should)\b[^?]{3,}\?',
+    re.IGNORECASE,
+)
+ELSE_ONLY_RE = re.compile(r'^\W*(?:else|otherwise|if not|if no|if yes)\b', re.IGNORECASE)
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+LIST_ITEM_RE = re.compile(r'^\s*(?:\d{1,3}[.)]|[a-z][.)]|[-*•▪◦]|step\s+\d+\b)\s*\S', re.IGNORECASE | re.MULTILINE)
+
+SYSTEM_SUFFIX_RE = re.compile(
+    r'\b([A-Z][\w&+.-]*(?:[ \t]+[A-Z][\w&+.-]*){0,2})[ \t]+'
+    r'(?:ticketing[ \t]+)?(?:system|platform|portal|tool|app|application|software|database|timeline|dashboard|queue|crm|erp)\b'
+)
+# "log a ticket in MYIT", "submit via SAP"
+ACRONYM_SYSTEM_RE = re.compile(r'\b(?:in|into|via|using|through|on|from|to)\s+(?:the\s+)?([A-Z][A-Z0-9]{2,})\b')
+NOT_SYSTEM_ACRONYMS = {'PDF', 'SMS', 'ASAP', 'CEO', 'CFO', 'COO', 'CTO', 'FAQ', 'SOP', 'SLA', 'EOD', 'COB', 'URL', 'USA', 'AND', 'THE'}
+CAMEL_CASE_RE = re.compile(r'\b[A-Z][a-z]+(?:[A-Z][a-z0-9]+)+\b')  # DocuSign, ServiceNow, SharePoint
+NOT_SYSTEM_WORDS = {
+    'the', 'this', 'that', 'our', 'your', 'a', 'an', 'any', 'each', 'new', 'same', 'internal', 'external',
+    'if', 'when', 'then', 'log', 'use', 'open', 'check', 'update', 'enter', 'record',
+}
+
+
+def normalize_term(term: str) -> str:
+    return ' '.join(term.lower().split())
+
+
+def _unique(items: Iterable[str]) -> List[str]:
+    seen = set()
+    ordered = []
+    for item in items:
+        key = normalize_term(item)
+        if key and key not in seen:
+            seen.add(key)
+            ordered.append(item.strip())
+    return ordered
+
+
+def _phone_shaped(number: str) -> bool:
+    """International / area-code prefix, or digit groups the way phone numbers are written"""
+    if number.startswith(('+', '(')):
+        return True
+    number = EXTENSION_RE.sub('', number)
+    groups = re.findall(r'\d+', number)
+    if not 2 <= len(groups) <= 6 or max(len(g) for g in groups) > MAX_PHONE_GROUP_DIGITS or len(groups[-1]) < 3:
+        return False
+    # 1.250.000 is an amount, not a number to call
+    separators = set(re.sub(r'[\d\s]', '', number))
+    return not (separators and separators <= {'.', ','} and all(len(g) == 3 for g in groups[1:]))
+
+
+def extract_phone_numbers(text: str) -> List[str]:
+    """
+    Phone numbers: 7-20 digits written like a phone (see _phone_shaped) or introduced by
+    a phone cue; runs introduced as an invoice, PO, order or # reference are IDs
+    """
+    phones = []
+    for line in text.splitlines():  # Per line: a number must not run into a list index on the next line
+        for match in PHONE_RE.finditer(line):
+            raw = match.group().strip(' .-')
+            if raw.count('(') != raw.count(')'):
+                raw = raw.strip('()')
+            candidate = raw
+            digits = sum(c.isdigit() for c in candidate)
+            if not MIN_PHONE_DIGITS <= digits <= MAX_PHONE_DIGITS or DATE_LIKE_RE.match(candidate):
+                continue
+            before = line[max(0, match.start() - PHONE_CONTEXT_CHARS):match.start()]
+            if ID_PREFIX_RE.search(before):
+                continue
+            if not (_phone_shaped(candidate) or PHONE_CUE_RE.search(before)):
+                continue
+            phones.append(' '.join(candidate.split()))
+    return _unique(phones)
+
+
+def extract_emails(text: str) -> List[str]:
+    return _unique(match.group().rstrip('.') for match in EMAIL_RE.finditer(text))
+
+
+def extract_timelines(text: str) -> List[str]:
+    """Timeline expressions in document order, overlapping matches merged to the longest"""
+    spans = []
+    for pattern in TIMELINE_PATTERNS:
+        spans.extend(match.span() for match in pattern.finditer(text))
+    spans.sort(key=lambda span: (span[0], -span[1]))
+
+    merged = []
+    for start, end in spans:
+        if merged and start < merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return _unique(' '.join(text[start:end].split()) for start, end in merged)
+
+
+def count_decision_points(text: str) -> int:
+    count = 0
+    for sentence in SENTENCE_SPLIT_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence or ELSE_ONLY_RE.match(sentence):
+            continue
+        if DECISION_CUE_RE.search(sentence) or QUESTION_RE.search(sentence):
+            count += 1
+    return count
+
+
+def count_process_steps(text: str) -> int:
+    """Numbered/bulleted items; a rough provisional step count"""
+    return len(LIST_ITEM_RE.findall(text))
+
+
+def extract_systems(text: str, vocabulary: Iterable[str] = ()) -> List[str]:
+    """Known workspace systems first (as written in the text), then heuristic candidates"""
+    found = []
+    for term in sorted(set(vocabulary), key=len, reverse=True):
+        match = re.search(rf'(?<!\w){re.escape(term)}(?!\w)', text, re.IGNORECASE)
+        if match:
+            found.append(match.group())
+
+    for match in SYSTEM_SUFFIX_RE.finditer(text):
+        words = match.group(1).split()
+        while words and words[0].lower() in NOT_SYSTEM_WORDS:
+            words = words[1:]
+        if words:
+            found.append(' '.join(words))
+    found.extend(a for a in ACRONYM_SYSTEM_RE.findall(text) if a not in NOT_SYSTEM_ACRONYMS)
+    found.extend(CAMEL_CASE_RE.findall(text))
+
+    # Drop candidates contained in a longer one ("Service" vs "Service Hub")
+    unique = _unique(found)
+    keys = [normalize_term(s) for s in unique]
+    return [
+        system for system, key in zip(unique, keys)
+        if not any(key != other and re.search(rf'\b{re.escape(key)}\b', other) for other in keys)
+    ]
+
+
+class LocalExtractor:
+    def summarize(self, text: str, vocabulary: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Provisional ExtractionSummary fields. Semantic fields (data fields, actors,
+        complexity) are left empty for the LLM to fill.
+        """
+        steps = count_process_steps(text)
+        decisions = count_decision_points(text)
+        return {
+            "processSteps": steps,
+            "dataFields": [],
+            "phoneNumbers": extract_phone_numbers(text),
+            "emails": extract_emails(text),
+            "systems": extract_systems(text, vocabulary),
+            "decisionPoints": decisions,
+            "actors": [],
+            "timelines": extract_timelines(text),
+            "complexity": "high" if steps > 10 or decisions > 3 else "medium" if steps >= 5 else "low",
+        }
+
+    def systems_from_process(self, process: Dict[str, Any]) -> List[str]:
+        """System names recorded on a process's nodes (vocabulary learning input)"""
+        systems = []
+        for node in process.get('nodes', []) or []:
+            details = node.get('operationalDetails') or {}
+            systems.extend(s for s in details.get('systems', []) or [] if isinstance(s, str))
+        return _unique(s for s in systems if 1 < len(s.strip()) <= 60)
+
+
+# Global local extractor instance
+local_extractor = LocalExtractor()
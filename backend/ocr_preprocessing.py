@@ -0,0 +1,163 @@
+"""
+OCR Image Preprocessing
+Features:
+- EXIF-aware orientation and DPI-normalizing downscale (phone photos are 12MP+)
+- Grayscale conversion with background flattening for unevenly lit whiteboards
+- Otsu binarization
+- Projection-profile deskew
+- Tiling on blank rows with parallel OCR of the tiles
+Runs inside extraction worker processes.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+import pytesseract
+
+logger = logging.getLogger(__name__)
+
+OCR_TARGET_DPI = 300
+OCR_MAX_LONG_SIDE = int(os.environ.get('OCR_MAX_LONG_SIDE', '2800'))  # Used when DPI metadata is missing/unreliable
+OCR_TILE_MIN_HEIGHT = 1200  # Images shorter than this are OCR'd in one piece
+OCR_TILE_WORKERS = int(os.environ.get('OCR_TILE_WORKERS', '4'))
+DESKEW_MAX_ANGLE = 10.0
+DESKEW_SAMPLE_WIDTH = 800  # Skew is estimated on a downsampled copy
+
+# Each tile already runs in its own tesseract process; keep them single-threaded
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+
+def normalize_resolution(image: Image.Image, dpi: Optional[float] = None) -> Image.Image:
+    """
+    Downscale to OCR_TARGET_DPI when the source resolution is known, otherwise
+    cap the long side. Never upscales.
+    """
+    if dpi is None:
+        dpi_info = image.info.get('dpi')
+        # Cameras write 72/96 dpi regardless of content, so only trust print-like values
+        if dpi_info and dpi_info[0] >= 150:
+            dpi = float(dpi_info[0])
+
+    if dpi:
+        scale = OCR_TARGET_DPI / dpi
+    else:
+        scale = OCR_MAX_LONG_SIDE / max(image.size)
+
+    if scale >= 1.0:
+        return image
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+
+def to_grayscale(image: Image.Image) -> Image.Image:
+    return image if image.mode == 'L' else image.convert('L')
+
+
+def flatten_background(gray: Image.Image) -> np.ndarray:
+    """Divide out low-frequency illumination (glare, shadows) so one threshold fits the whole image"""
+    radius = max(8, max(gray.size) // 40)
+    background = np.asarray(gray.filter(ImageFilter.GaussianBlur(radius)), dtype=np.float32)
+    pixels = np.asarray(gray, dtype=np.float32)
+    return np.clip(pixels / np.maximum(background, 1.0) * 255.0, 0, 255)
+
+
+def otsu_threshold(pixels: np.ndarray) -> float:
+    histogram, _ = np.histogram(pixels, bins=256, range=(0, 256))
+    histogram = histogram.astype(np.float64)
+    total = histogram.sum()
+    if total == 0:
+        return 128.0
+    levels = np.arange(256)
+    weight_bg = np.cumsum(histogram)
+    weight_fg = total - weight_bg
+    cumulative_mean = np.cumsum(histogram * levels)
+    mean_bg = cumulative_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cumulative_mean[-1] - cumulative_mean) / np.maximum(weight_fg, 1)
+    between_variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return float(np.argmax(between_variance))
+
+
+def binarize(gray: Image.Image) -> Image.Image:
+    pixels = flatten_background(gray)
+    threshold = otsu_threshold(pixels)
+    return Image.fromarray(np.where(pixels > threshold, 255, 0).astype(np.uint8), mode='L')
+
+
+def estimate_skew(binary: Image.Image) -> float:
+    """
+    Angle (degrees) that maximizes the variance of horizontal ink projections:
+    text lines are sharpest when they are level. Coarse 1° sweep, then 0.1° refinement.
+    """
+    sample = binary
+    if binary.width > DESKEW_SAMPLE_WIDTH:
+        ratio = DESKEW_SAMPLE_WIDTH / binary.width
+        sample = binary.resize((DESKEW_SAMPLE_WIDTH, max(1, round(binary.height * ratio))), Image.Resampling.NEAREST)
+    ink = ImageOps.invert(sample)  # Text becomes bright so rotation fill (0) adds no ink
+
+    def score(angle: float) -> float:
+        rotated = np.asarray(ink.rotate(angle, resample=Image.Resampling.NEAREST, fillcolor=0), dtype=np.float32)
+        return float(np.var(rotated.sum(axis=1)))
+
+    coarse = max(np.arange(-DESKEW_MAX_ANGLE, DESKEW_MAX_ANGLE + 0.5, 1.0), key=score)
+    fine = max(np.arange(coarse - 1.0, coarse + 1.05, 0.1), key=score)
+    return float(round(fine, 2))
+
+
+def deskew(image: Image.Image, angle: Optional[float] = None) -> Image.Image:
+    angle = estimate_skew(image) if angle is None else angle
+    if abs(angle) < 0.1:
+        return image
+    return image.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=255)
+
+
+def preprocess_for_ocr(image: Image.Image, dpi: Optional[float] = None,
+                       binarize_image: bool = True, deskew_image: bool = True) -> Image.Image:
+    """Full preprocessing chain applied before Tesseract"""
+    image = ImageOps.exif_transpose(image)
+    image = normalize_resolution(image, dpi)
+    image = to_grayscale(image)
+    if binarize_image:
+        image = binarize(image)
+        if deskew_image:
+            image = deskew(image)
+    return image
+
+
+def split_into_tiles(image: Image.Image, target_height: int = OCR_TILE_MIN_HEIGHT) -> List[Image.Image]:
+    """
+    Cut the image into horizontal bands at blank rows near every target_height,
+    so no text line is split between tiles.
+    """
+    if image.height < target_height * 1.5:
+        return [image]
+
+    ink_rows = (np.asarray(image, dtype=np.uint8) < 128).sum(axis=1)
+    blank = ink_rows <= max(1, image.width // 500)
+    search = target_height // 4
+
+    cuts = [0]
+    while image.height - cuts[-1] > target_height * 1.5:
+        target = cuts[-1] + target_height
+        window = np.nonzero(blank[target - search:target + search])[0]
+        if len(window) == 0:
+            cut = target  # No clean gap: accept a hard cut
+        else:
+            cut = target - search + int(window[np.argmin(np.abs(window - search))])
+        cuts.append(cut)
+    cuts.append(image.height)
+
+    return [image.crop((0, top, image.width, bottom)) for top, bottom in zip(cuts, cuts[1:])]
+
+
+def ocr_image(image: Image.Image, tile: bool = True) -> str:
+    """OCR an already preprocessed image, tiles in parallel tesseract processes"""
+    tiles = split_into_tiles(image) if tile else [image]
+    if len(tiles) == 1:
+        return pytesseract.image_to_string(tiles[0])
+    with ThreadPoolExecutor(max_workers=min(OCR_TILE_WORKERS, len(tiles))) as pool:
+        texts = list(pool.map(pytesseract.image_to_string, tiles))
+    return "".join(text if text.endswith("\n") else text + "\n" for text in texts)
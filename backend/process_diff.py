@@ -0,0 +1,262 @@
+"""
+Structural Process Diff
+Features:
+- Nodes matched by id, then by title similarity (ids regenerated by the LLM or a re-import)
+- Added, removed, modified and moved node sets with field-level before/after changes
+- Edge diff on (source, target) after mapping matched node ids
+- Impact flags telling which derived data (intelligence, layout, coverage) is stale
+Matching is a hash join plus a bounded similarity pass over the leftovers;
+moves come from a longest increasing subsequence, so reorders cost O(n log n).
+"""
+
+import bisect
+import logging
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TITLE_MATCH_THRESHOLD = 0.8
+MAX_SIMILARITY_PAIRS = 10_000  # Beyond this many unmatched pairs only exact titles are paired
+IGNORED_NODE_FIELDS = {"id", "position"}  # Canvas coordinates are a view concern, not process content
+LAYOUT_NODE_FIELDS = {"type"}  # Node size depends on type only
+COVERAGE_NODE_FIELDS = {"title", "description", "actors", "subSteps", "operationalDetails"}
+EDGE_FIELDS = ("label", "condition")
+EMPTY_VALUES = (None, "", [], {})
+
+
+def _same(before: Any, after: Any) -> bool:
+    """Equal, counting a missing optional field and its empty default as the same"""
+    return before == after or (before in EMPTY_VALUES and after in EMPTY_VALUES)
+
+
+def _title_key(node: Dict[str, Any]) -> str:
+    return ' '.join(str(node.get("title") or "").lower().split())
+
+
+@dataclass
+class ProcessDiff:
+    added_nodes: List[Dict[str, Any]] = field(default_factory=list)
+    removed_nodes: List[Dict[str, Any]] = field(default_factory=list)
+    modified_nodes: List[Dict[str, Any]] = field(default_factory=list)
+    moved_nodes: List[Dict[str, Any]] = field(default_factory=list)
+    added_edges: List[Dict[str, Any]] = field(default_factory=list)
+    removed_edges: List[Dict[str, Any]] = field(default_factory=list)
+    modified_edges: List[Dict[str, Any]] = field(default_factory=list)
+    process_changes: List[Dict[str, Any]] = field(default_factory=list)  # name, description, actors...
+
+    @property
+    def changed_fields(self) -> List[str]:
+        return sorted({change["field"] for node in self.modified_nodes for change in node["changes"]})
+
+    @property
+    def node_set_changed(self) -> bool:
+        return bool(self.added_nodes or self.removed_nodes)
+
+    @property
+    def edges_changed(self) -> bool:
+        return bool(self.added_edges or self.removed_edges or self.modified_edges)
+
+    @property
+    def structural(self) -> bool:
+        """Anything beyond canvas positions changed"""
+        return bool(self.node_set_changed or self.edges_changed or self.modified_nodes
+                    or self.moved_nodes or self.process_changes)
+
+    def impacts(self) -> Dict[str, bool]:
+        fields = set(self.changed_fields)
+        renamed = any(node.get("matchedBy") == "title" for node in self.modified_nodes)
+        return {
+            "intelligence": self.structural,
+            "layout": bool(self.node_set_changed or self.edges_changed or self.moved_nodes
+                           or renamed or fields & LAYOUT_NODE_FIELDS),
+            "coverage": bool(self.node_set_changed or fields & COVERAGE_NODE_FIELDS),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "nodes": {
+                "added": self.added_nodes,
+                "removed": self.removed_nodes,
+                "modified": self.modified_nodes,
+                "moved": self.moved_nodes,
+            },
+            "edges": {
+                "added": self.added_edges,
+                "removed": self.removed_edges,
+                "modified": self.modified_edges,
+            },
+            "process": self.process_changes,
+            "summary": {
+                "addedNodes": len(self.added_nodes),
+                "removedNodes": len(self.removed_nodes),
+                "modifiedNodes": len(self.modified_nodes),
+                "movedNodes": len(self.moved_nodes),
+                "addedEdges": len(self.added_edges),
+                "removedEdges": len(self.removed_edges),
+                "modifiedEdges": len(self.modified_edges),
+                "changedFields": self.changed_fields,
+                "structural": self.structural,
+            },
+            "impacts": self.impacts(),
+        }
+
+
+def _moved(pairs: List[Tuple[int, int]]) -> Tuple[List[int], List[Tuple[int, int]]]:
+    """Sorted (old index, new index) pairs and the positions outside the longest kept order"""
+    pairs = sorted(pairs)
+    tails: List[int] = []  # tails[k]: smallest new index ending an increasing run of length k + 1
+    tail_at: List[int] = []
+    parent = [-1] * len(pairs)
+    for position, (_, new_index) in enumerate(pairs):
+        k = bisect.bisect_left(tails, new_index)
+        if k == len(tails):
+            tails.append(new_index)
+            tail_at.append(position)
+        else:
+            tails[k] = new_index
+            tail_at[k] = position
+        parent[position] = tail_at[k - 1] if k else -1
+    kept = set()
+    position = tail_at[-1] if tail_at else -1
+    while position >= 0:
+        kept.add(position)
+        position = parent[position]
+    return [position for position in range(len(pairs)) if position not in kept], pairs
+
+
+class ProcessDiffer:
+    def diff(self, old: Dict[str, Any], new: Dict[str, Any]) -> ProcessDiff:
+        result = ProcessDiff()
+        old_nodes = [n for n in old.get("nodes") or [] if isinstance(n, dict)]
+        new_nodes = [n for n in new.get("nodes") or [] if isinstance(n, dict)]
+        matches, matched_by = self._match(old_nodes, new_nodes)
+
+        matched_new = set(matches.values())
+        result.removed_nodes = [self._brief(node) for i, node in enumerate(old_nodes) if i not in matches]
+        result.added_nodes = [self._brief(node) for j, node in enumerate(new_nodes) if j not in matched_new]
+
+        for i, j in matches.items():
+            changes = self._field_changes(old_nodes[i], new_nodes[j])
+            renamed = str(old_nodes[i].get("id")) != str(new_nodes[j].get("id"))
+            if changes or renamed:
+                entry = {**self._brief(new_nodes[j]), "matchedBy": matched_by[i], "changes": changes}
+                if renamed:
+                    entry["previousId"] = old_nodes[i].get("id")
+                result.modified_nodes.append(entry)
+
+        positions, pairs = _moved(list(matches.items()))
+        for position in positions:
+            i, j = pairs[position]
+            result.moved_nodes.append({**self._brief(new_nodes[j]), "fromIndex": i, "toIndex": j})
+
+        id_map = {str(old_nodes[i].get("id")): str(new_nodes[j].get("id")) for i, j in matches.items()}
+        self._diff_edges(old.get("edges") or [], new.get("edges") or [], id_map, result)
+        for key in ("name", "description", "actors"):
+            if key in new and not _same(old.get(key), new.get(key)):
+                result.process_changes.append({"field": key, "before": old.get(key), "after": new.get(key)})
+
+        if result.structural:
+            summary = result.to_dict()["summary"]
+            logger.info(
+                f"🔀 Process diff: +{summary['addedNodes']} -{summary['removedNodes']} ~{summary['modifiedNodes']} "
+                f"nodes, {summary['movedNodes']} moved, +{summary['addedEdges']} -{summary['removedEdges']} edges"
+            )
+        return result
+
+    def _brief(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        return {"id": node.get("id"), "title": node.get("title", "")}
+
+    def _match(self, old_nodes, new_nodes) -> Tuple[Dict[int, int], Dict[int, str]]:
+        """old index -> new index, by id first and title similarity second"""
+        new_by_id: Dict[str, int] = {}
+        for j, node in enumerate(new_nodes):
+            if node.get("id") not in (None, ""):
+                new_by_id.setdefault(str(node["id"]), j)
+        matches: Dict[int, int] = {}
+        matched_by: Dict[int, str] = {}
+        taken = set()
+        for i, node in enumerate(old_nodes):
+            j = new_by_id.get(str(node.get("id")))
+            if j is not None and j not in taken:
+                matches[i] = j
+                matched_by[i] = "id"
+                taken.add(j)
+
+        old_rest = [i for i in range(len(old_nodes)) if i not in matches]
+        new_rest = [j for j in range(len(new_nodes)) if j not in taken]
+        if not old_rest or not new_rest:
+            return matches, matched_by
+
+        candidates = []
+        if len(old_rest) * len(new_rest) <= MAX_SIMILARITY_PAIRS:
+            for i in old_rest:
+                matcher = SequenceMatcher(None)
+                matcher.set_seq2(_title_key(old_nodes[i]))  # seq2 is the side SequenceMatcher indexes
+                for j in new_rest:
+                    matcher.set_seq1(_title_key(new_nodes[j]))
+                    if matcher.real_quick_ratio() < TITLE_MATCH_THRESHOLD or matcher.quick_ratio() < TITLE_MATCH_THRESHOLD:
+                        continue
+                    score = matcher.ratio()
+                    if score >= TITLE_MATCH_THRESHOLD:
+                        candidates.append((-score, i, j))
+        else:
+            by_title: Dict[str, List[int]] = {}
+            for j in new_rest:
+                by_title.setdefault(_title_key(new_nodes[j]), []).append(j)
+            for i in old_rest:
+                candidates.extend((-1.0, i, j) for j in by_title.get(_title_key(old_nodes[i]), []))
+
+        # Greedy best-first pairing; ties keep document order
+        for _, i, j in sorted(candidates):
+            if i in matches or j in taken or not _title_key(old_nodes[i]):
+                continue
+            matches[i] = j
+            matched_by[i] = "title"
+            taken.add(j)
+        return matches, matched_by
+
+    def _field_changes(self, before: Dict[str, Any], after: Dict[str, Any]) -> List[Dict[str, Any]]:
+        changes = []
+        for key in sorted(set(before) | set(after)):
+            if key in IGNORED_NODE_FIELDS:
+                continue
+            old_value, new_value = before.get(key), after.get(key)
+            if not _same(old_value, new_value):
+                changes.append({"field": key, "before": old_value, "after": new_value})
+        return changes
+
+    def _diff_edges(self, old_edges, new_edges, id_map: Dict[str, str], result: ProcessDiff):
+        def keyed(edges, mapping: Optional[Dict[str, str]] = None) -> Dict[Tuple[str, str], Dict[str, Any]]:
+            index = {}
+            for edge in edges:
+                if not isinstance(edge, dict):
+                    continue
+                source, target = str(edge.get("source")), str(edge.get("target"))
+                if mapping is not None:
+                    source, target = mapping.get(source, f"removed:{source}"), mapping.get(target, f"removed:{target}")
+                index.setdefault((source, target), edge)
+            return index
+
+        before, after = keyed(old_edges, id_map), keyed(new_edges)
+        for key, edge in after.items():
+            previous = before.get(key)
+            if previous is None:
+                result.added_edges.append({"id": edge.get("id"), "source": key[0], "target": key[1], "label": edge.get("label")})
+                continue
+            changes = [
+                {"field": name, "before": previous.get(name), "after": edge.get(name)}
+                for name in EDGE_FIELDS if not _same(previous.get(name), edge.get(name))
+            ]
+            if changes:
+                result.modified_edges.append({"id": edge.get("id"), "source": key[0], "target": key[1], "changes": changes})
+        for key, edge in before.items():
+            if key not in after:
+                result.removed_edges.append({
+                    "id": edge.get("id"), "source": edge.get("source"), "target": edge.get("target"), "label": edge.get("label"),
+                })
+
+
+# Global process differ instance
+process_differ = ProcessDiffer()
@@ -0,0 +1,401 @@
+"""
+Process JSON Patch
+Features:
+- RFC 6902 JSON Patch (add, remove, replace, move, copy, test) on process documents
+- RFC 7396 merge patch, converted to the equivalent JSON Patch ops
+- Translation to targeted Mongo operators ($set / $unset / $push on dotted paths) with
+  the patch's own preconditions (test values, paths that must exist) in the filter
+- In-memory application with path copying when a patch can't be expressed as one update
+- Impact flags (intelligence, layout) from the touched paths, without diffing documents
+- Version history deltas for targeted updates, built from the ops and the ids of the
+  list items they index, so the document is never read whole
+Only the containers on a patched path are copied, so applying k ops costs O(k * depth)
+plus the size of the lists they index into.
+"""
+
+import copy
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from process_diff import LAYOUT_NODE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+PATCHABLE_FIELDS = {
+    "name", "description", "nodes", "edges", "actors",
+    "criticalGaps", "improvementOpportunities", "theme", "healthScore",
+}
+CONTENT_FIELDS = {"name", "description", "nodes", "edges", "actors"}  # What intelligence is generated from
+VIEW_NODE_FIELDS = {"position"}  # Canvas-only, don't invalidate intelligence
+OPS = {"add", "remove", "replace", "move", "copy", "test"}
+KEYED_LISTS = {"nodes", "edges"}  # Version history keys their items by id
+
+
+class PatchError(ValueError):
+    """Patch rejected: 400 malformed, 409 failed test, 422 can't be applied to this document"""
+
+    def __init__(self, message: str, index: Optional[int] = None, status: int = 422):
+        super().__init__(message if index is None else f"Operation {index}: {message}")
+        self.message = message
+        self.index = index
+        self.status = status
+
+
+def parse_pointer(pointer: Any) -> List[str]:
+    """JSON Pointer -> reference tokens ("/nodes/3/title" -> ["nodes", "3", "title"])"""
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise ValueError(f"invalid JSON pointer {pointer!r}")
+    tokens = [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+    if tokens[0] not in PATCHABLE_FIELDS:
+        raise ValueError(f"field {tokens[0]!r} can't be patched")
+    return tokens
+
+
+def _index(token: str, size: int, allow_end: bool = False) -> int:
+    if token == "-" and allow_end:
+        return size
+    if not token.isdigit() or (len(token) > 1 and token[0] == "0"):
+        raise PatchError(f"{token!r} is not an array index")
+    index = int(token)
+    if index > size or (index == size and not allow_end):
+        raise PatchError(f"index {index} is out of range")
+    return index
+
+
+def _overlaps(a: Tuple[str, ...], b: Tuple[str, ...]) -> bool:
+    return a[:len(b)] == b or b[:len(a)] == a
+
+
+def normalize_ops(ops: Any) -> List[Dict[str, Any]]:
+    """Check the patch's shape; returns ops with parsed "tokens" / "fromTokens" """
+    if not isinstance(ops, list) or not ops:
+        raise PatchError("a JSON Patch must be a non-empty array of operations", status=400)
+    normalized = []
+    for index, op in enumerate(ops):
+        if not isinstance(op, dict) or op.get("op") not in OPS:
+            raise PatchError(f"unknown op {op.get('op') if isinstance(op, dict) else op!r}", index, 400)
+        try:
+            entry = {**op, "tokens": parse_pointer(op.get("path"))}
+            if op["op"] in ("move", "copy"):
+                entry["fromTokens"] = parse_pointer(op.get("from"))
+        except ValueError as e:
+            raise PatchError(str(e), index, 400)
+        if op["op"] in ("add", "replace", "test") and "value" not in op:
+            raise PatchError("value is required", index, 400)
+        if op["op"] == "move" and entry["tokens"][:len(entry["fromTokens"])] == entry["fromTokens"] \
+                and entry["tokens"] != entry["fromTokens"]:
+            raise PatchError("can't move a value into one of its own children", index, 400)
+        normalized.append(entry)
+    return normalized
+
+
+def merge_patch_ops(patch: Any, prefix: str = "") -> List[Dict[str, Any]]:
+    """RFC 7396 merge patch as JSON Patch ops: objects merge, null removes, anything else replaces"""
+    if not isinstance(patch, dict) or (not prefix and not patch):
+        raise PatchError("a merge patch must be a non-empty object", status=400)
+    ops = []
+    for key, value in patch.items():
+        path = f"{prefix}/{str(key).replace('~', '~0').replace('/', '~1')}"
+        if value is None:
+            ops.append({"op": "remove", "path": path, "optional": True})
+        elif isinstance(value, dict) and value:
+            # Nested objects merge into the stored object (created if missing)
+            ops.append({"op": "add", "path": path, "value": {}, "ifMissing": True})
+            ops.extend(merge_patch_ops(value, path))
+        else:
+            ops.append({"op": "add", "path": path, "value": value})
+    return ops
+
+
+class PatchApplier:
+    """Applies normalized ops to a copy of `doc`, copying only the containers on each path"""
+
+    def __init__(self, doc: Dict[str, Any]):
+        self.doc = dict(doc)
+        self.owned = {id(self.doc)}  # Containers already copied by this patch
+
+    def _own(self, container):
+        if id(container) in self.owned:
+            return container
+        container = list(container) if isinstance(container, list) else dict(container)
+        self.owned.add(id(container))
+        return container
+
+    def _parent(self, tokens: List[str]):
+        """Copy-on-write walk to the container holding tokens[-1]"""
+        parent = self.doc
+        for token in tokens[:-1]:
+            if isinstance(parent, dict):
+                if token not in parent:
+                    raise PatchError(f"path /{'/'.join(tokens)} does not exist")
+                key = token
+            elif isinstance(parent, list):
+                key = _index(token, len(parent))
+            else:
+                raise PatchError(f"path /{'/'.join(tokens)} does not exist")
+            child = parent[key]
+            if not isinstance(child, (dict, list)):
+                raise PatchError(f"path /{'/'.join(tokens)} does not exist")
+            child = self._own(child)
+            parent[key] = child
+            parent = child
+        return parent
+
+    def get(self, tokens: List[str]) -> Any:
+        value = self.doc
+        for token in tokens:
+            if isinstance(value, dict) and token in value:
+                value = value[token]
+            elif isinstance(value, list):
+                value = value[_index(token, len(value))]
+            else:
+                raise PatchError(f"path /{'/'.join(tokens)} does not exist")
+        return value
+
+    def add(self, tokens: List[str], value: Any, if_missing: bool = False):
+        parent = self._parent(tokens)
+        if isinstance(parent, list):
+            parent.insert(_index(tokens[-1], len(parent), allow_end=True), value)
+        elif not (if_missing and isinstance(parent.get(tokens[-1]), dict)):
+            parent[tokens[-1]] = value
+
+    def replace(self, tokens: List[str], value: Any):
+        parent = self._parent(tokens)
+        if isinstance(parent, list):
+            parent[_index(tokens[-1], len(parent))] = value
+        elif tokens[-1] in parent:
+            parent[tokens[-1]] = value
+        else:
+            raise PatchError(f"path /{'/'.join(tokens)} does not exist")
+
+    def remove(self, tokens: List[str], optional: bool = False) -> Any:
+        try:
+            parent = self._parent(tokens)
+        except PatchError:
+            if optional:
+                return None
+            raise
+        if isinstance(parent, list):
+            return parent.pop(_index(tokens[-1], len(parent)))
+        if tokens[-1] not in parent:
+            if optional:
+                return None
+            raise PatchError(f"path /{'/'.join(tokens)} does not exist")
+        return parent.pop(tokens[-1])
+
+    def apply(self, ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+        for index, op in enumerate(ops):
+            try:
+                kind, tokens = op["op"], op["tokens"]
+                if kind == "test":
+                    if self.get(tokens) != op["value"]:
+                        raise PatchError(f"test failed at {op['path']}", status=409)
+                elif kind == "add":
+                    self.add(tokens, copy.deepcopy(op["value"]), op.get("ifMissing", False))
+                elif kind == "remove":
+                    self.remove(tokens, op.get("optional", False))
+                elif kind == "replace":
+                    self.replace(tokens, copy.deepcopy(op["value"]))
+                elif kind == "move":
+                    self.add(tokens, self.remove(op["fromTokens"]))
+                else:
+                    self.add(tokens, copy.deepcopy(self.get(op["fromTokens"])))
+            except PatchError as e:
+                raise PatchError(e.message, index, e.status)
+        return self.doc
+
+
+def apply_patch(doc: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Patched copy of `doc`; `doc` itself is never modified"""
+    return PatchApplier(doc).apply(ops)
+
+
+def translate(ops: List[Dict[str, Any]]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    (filter, update) performing the patch as one Mongo update, or None when it needs
+    the document (array inserts/removals by index, move/copy, overlapping paths)
+    """
+    query: Dict[str, Any] = {}
+    sets: Dict[str, Any] = {}
+    unsets: Dict[str, str] = {}
+    pushes: Dict[str, List[Any]] = {}
+    writes: List[Tuple[Tuple[str, ...], str]] = []
+
+    def claim(path: Tuple[str, ...], kind: str) -> bool:
+        for written, written_kind in writes:
+            if _overlaps(written, path) and not (kind == written_kind == "push" and written == path):
+                return False
+        writes.append((path, kind))
+        return True
+
+    for op in ops:
+        tokens = op["tokens"]
+        if any(not token or token.startswith("$") or "." in token for token in tokens):
+            return None
+        kind, path, last = op["op"], tuple(tokens), tokens[-1]
+        dotted = ".".join(tokens)
+        if kind == "test":
+            value = op["value"]
+            if isinstance(value, (dict, list)) or any(_overlaps(written, path) for written, _ in writes):
+                return None
+            # Mongo equality also matches array members and missing fields; rule both out
+            query[dotted] = {"$exists": True, "$eq": value, "$not": {"$type": "array"}}
+        elif kind == "replace":
+            if not claim(path, "set"):
+                return None
+            query[dotted] = {"$exists": True}
+            sets[dotted] = op["value"]
+        elif kind == "add" and last == "-":
+            parent = ".".join(tokens[:-1])
+            if not claim(path[:-1], "push"):
+                return None
+            query[parent] = {"$type": "array"}
+            pushes.setdefault(parent, []).append(op["value"])
+        elif kind == "add" and not last.isdigit() and not op.get("ifMissing"):
+            if not claim(path, "set"):
+                return None
+            if len(tokens) > 1:
+                # $type also matches arrays holding an object: the parent itself must not be an array
+                query[".".join(tokens[:-1])] = {"$type": "object", "$not": {"$type": "array"}}
+            sets[dotted] = op["value"]
+        elif kind == "remove" and not last.isdigit():
+            if not claim(path, "unset"):
+                return None
+            if not op.get("optional"):
+                query[dotted] = {"$exists": True}
+            unsets[dotted] = ""
+        else:
+            return None
+
+    update: Dict[str, Any] = {}
+    if sets:
+        update["$set"] = sets
+    if unsets:
+        update["$unset"] = unsets
+    if pushes:
+        update["$push"] = {path: {"$each": values} for path, values in pushes.items()}
+    return query, update
+
+
+def touched_projection(ops: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    What a targeted update has to return for history_delta: the item ids of node/edge
+    lists written below the top level, and the whole value of other fields written there
+    """
+    projection = {}
+    for op in ops:
+        if op["op"] != "test" and len(op["tokens"]) > 1:
+            field = op["tokens"][0]
+            projection[f"{field}.id" if field in KEYED_LISTS else field] = 1
+    return projection
+
+
+def _keyed_list_delta(ids: List[Any], ops: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Id-keyed list delta of ops below /nodes or /edges, given the stored item ids"""
+    if not all(isinstance(item_id, str) for item_id in ids) or len(set(ids)) != len(ids):
+        return None
+    new_ids = list(ids)
+    added: Dict[str, Any] = {}
+    children: Dict[str, Dict[str, Any]] = {}
+    for op in ops:
+        tokens = op["tokens"]
+        if tokens[1] == "-":
+            new_ids.append(op["value"].get("id") if isinstance(op["value"], dict) else None)
+            added[new_ids[-1]] = op["value"]
+            continue
+        position = int(tokens[1])
+        if position >= len(ids):
+            return None  # Optional removal under an item that doesn't exist
+        if len(tokens) == 2:
+            new_id = op["value"].get("id") if isinstance(op["value"], dict) else None
+            if new_id == ids[position]:
+                children[new_id] = {"v": op["value"]}
+            else:
+                new_ids[position] = new_id
+                added[new_id] = op["value"]
+            continue
+        patch = children.setdefault(ids[position], {"d": {}})["d"]
+        if op["op"] == "remove":
+            patch.setdefault("u", []).append(tokens[2])
+        else:
+            patch.setdefault("s", {})[tokens[2]] = op["value"]
+    if not all(isinstance(item_id, str) for item_id in new_ids) or len(set(new_ids)) != len(new_ids):
+        return None  # The list stops being keyed by id: history stores it whole
+
+    kept = set(new_ids)
+    patch: Dict[str, Any] = {}
+    removed = [item_id for item_id in ids if item_id not in kept]
+    placements = [[item_id, new_ids[i - 1] if i else None] for i, item_id in enumerate(new_ids) if item_id in added]
+    if removed:
+        patch["r"] = removed
+    if placements:
+        patch["p"] = placements
+    if added:
+        patch["s"] = added
+    if children:
+        patch["c"] = children
+    return {"l": patch}
+
+
+def history_delta(ops: List[Dict[str, Any]], before: Dict[str, Any], stamp: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Version history delta (version_store format) of a patch written by translate(),
+    from the fields touched_projection() returned and the server-set fields in `stamp`.
+    None when a node/edge list isn't keyed by unique ids.
+    """
+    writes = [op for op in ops if op["op"] != "test"]
+    sets: Dict[str, Any] = {}
+    unsets: List[str] = []
+    children: Dict[str, Any] = {}
+    for op in writes:
+        if len(op["tokens"]) == 1:
+            if op["op"] == "remove":
+                unsets.append(op["tokens"][0])
+            else:
+                sets[op["tokens"][0]] = op["value"]
+
+    deep = {op["tokens"][0] for op in writes if len(op["tokens"]) > 1}
+    for field in deep & KEYED_LISTS:
+        ids = [item.get("id") if isinstance(item, dict) else None for item in before.get(field) or []]
+        delta = _keyed_list_delta(ids, [op for op in writes if op["tokens"][0] == field and len(op["tokens"]) > 1])
+        if delta is None:
+            return None
+        children[field] = delta
+    plain = deep - KEYED_LISTS
+    if plain:
+        # Other lists and objects are small: apply the ops to their stored values
+        after = apply_patch({field: before[field] for field in plain if field in before},
+                            [op for op in writes if op["tokens"][0] in plain])
+        sets.update({field: after[field] for field in plain if field in after})
+
+    patch: Dict[str, Any] = {"s": {**sets, **stamp}}
+    if unsets:
+        patch["u"] = unsets
+    if children:
+        patch["c"] = children
+    return {"d": patch}
+
+
+def written_paths(ops: List[Dict[str, Any]]) -> List[List[str]]:
+    """Every path a patch changes (both ends of a move)"""
+    paths = []
+    for op in ops:
+        if op["op"] == "test":
+            continue
+        paths.append(op["tokens"])
+        if op["op"] == "move":
+            paths.append(op["fromTokens"])
+    return paths
+
+
+def patch_impacts(ops: List[Dict[str, Any]]) -> Dict[str, bool]:
+    """Which derived data a patch makes stale, judged from its paths alone"""
+    intelligence = layout = False
+    for tokens in written_paths(ops):
+        field = tokens[0]
+        view_only = field == "nodes" and len(tokens) > 2 and tokens[2] in VIEW_NODE_FIELDS
+        intelligence |= field in CONTENT_FIELDS and not view_only
+        layout |= field == "edges" or (field == "nodes" and (
+            len(tokens) <= 2 or tokens[2] in LAYOUT_NODE_FIELDS or tokens[2] == "id"
+        ))
+    return {"intelligence": intelligence, "layout": layout}
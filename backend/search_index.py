@@ -0,0 +1,397 @@
+"""
+Process Search
+Features:
+- Per-user inverted index over process names, descriptions and actors, node titles,
+  descriptions and actors, and operationalDetails systems and contacts
+- Field-weighted BM25 ranking; a term matched exactly outranks its prefix completions
+- Prefix matching on every query term (search-as-you-type) through a sorted vocabulary
+- Status / workspace filters and offset pagination over the ranked matches
+- Highlighted snippets, built only for the page being returned
+An index is built on its user's first search and then kept current from updatedAt,
+so a query reads the postings of its own terms instead of scanning documents.
+"""
+
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import re
+import time
+from array import array
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+MIN_PREFIX_LENGTH = 2  # Shorter terms only match whole words
+MAX_PREFIX_EXPANSIONS = 32  # Completions per query term, closest (shortest) first
+PREFIX_BOOST = 0.6  # A completion scores this share of an exact match
+BM25_K1 = 1.2
+BM25_B = 0.75
+INDEX_TTL_SECONDS = 1800  # Full rebuild: drops processes deleted through another worker
+MIN_REBUILD_TOMBSTONES = 1000  # Rebuild early once superseded entries outnumber live ones
+MAX_FREQUENCY = 0xFFFF  # Weighted frequencies are stored as unsigned shorts
+REFRESH_OVERLAP_SECONDS = 5  # Re-read recent writes whose timestamps raced the last refresh (unchanged ones are skipped)
+MAX_INDEXED_DOCUMENTS = 100_000  # Across users; least recently searched indexes go first
+SNIPPETS_PER_RESULT = 2
+SNIPPET_CHARS = 160
+SNIPPET_LEAD_CHARS = 40  # Context kept before the first highlighted word
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'do', 'does', 'for', 'from', 'how', 'i',
+    'in', 'is', 'it', 'my', 'of', 'on', 'or', 'our', 'that', 'the', 'this', 'to', 'we',
+    'what', 'when', 'where', 'who', 'with',
+}
+
+# Field label -> weight; labels are reported on snippets
+FIELD_WEIGHTS = {
+    "name": 5,
+    "nodes.title": 3,
+    "actors": 2,
+    "description": 2,
+    "nodes.actors": 2,
+    "nodes.systems": 2,
+    "nodes.description": 1,
+    "nodes.contacts": 1,
+}
+
+SEARCH_PROJECTION = {
+    "_id": 0, "id": 1, "status": 1, "workspaceId": 1, "updatedAt": 1,
+    "name": 1, "description": 1, "actors": 1,
+    "nodes.id": 1, "nodes.title": 1, "nodes.description": 1, "nodes.actors": 1,
+    "nodes.operationalDetails.systems": 1, "nodes.operationalDetails.contactInfo": 1,
+}
+
+
+def timestamp(value: Any) -> str:
+    """updatedAt as stored in the index (ISO string)"""
+    return value.isoformat() if isinstance(value, datetime) else str(value or "")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def query_terms(q: str) -> List[str]:
+    """Distinct query terms in order; stop words are dropped unless that leaves nothing"""
+    terms = list(dict.fromkeys(tokenize(q or "")))
+    return [term for term in terms if term not in STOPWORDS] or terms
+
+
+def matches_term(token: str, terms: List[str]) -> bool:
+    """Whether a lowercased word matches a query term, as a whole word or a prefix"""
+    return any(token == term or (len(term) >= MIN_PREFIX_LENGTH and token.startswith(term)) for term in terms)
+
+
+def iter_fields(process: Dict[str, Any]) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """(field label, text, node id) for every searchable string of a process"""
+    def strings(value):
+        if isinstance(value, str):
+            return [value] if value else []
+        if isinstance(value, list):
+            return [item for item in value if isinstance(item, str) and item]
+        return []
+
+    for field in ("name", "description"):
+        for text in strings(process.get(field)):
+            yield field, text, None
+    for text in strings(process.get("actors")):
+        yield "actors", text, None
+    for node in process.get("nodes") or []:
+        if not isinstance(node, dict):
+            continue
+        node_id = node.get("id")
+        for field in ("title", "description", "actors"):
+            for text in strings(node.get(field)):
+                yield f"nodes.{field}", text, node_id
+        details = node.get("operationalDetails")
+        if isinstance(details, dict):
+            for text in strings(details.get("systems")):
+                yield "nodes.systems", text, node_id
+            contacts = details.get("contactInfo")
+            if isinstance(contacts, dict):
+                for label, value in contacts.items():
+                    if isinstance(value, str) and value:
+                        yield "nodes.contacts", f"{label}: {value}", node_id
+
+
+def snippets(process: Dict[str, Any], terms: List[str], limit: int = SNIPPETS_PER_RESULT) -> List[Dict[str, Any]]:
+    """
+    Up to `limit` excerpts of the best-weighted fields containing a query term, each
+    with [start, end) highlight offsets into its text
+    """
+    if not terms:
+        return []
+    fields = sorted(iter_fields(process), key=lambda field: -FIELD_WEIGHTS[field[0]])
+    found = []
+    for label, text, node_id in fields:
+        spans = [
+            match.span() for match in TOKEN_RE.finditer(text)
+            if matches_term(match.group().lower(), terms)
+        ]
+        if not spans:
+            continue
+        start = 0
+        if len(text) > SNIPPET_CHARS and spans[0][0] > SNIPPET_LEAD_CHARS:
+            cut = spans[0][0] - SNIPPET_LEAD_CHARS
+            space = text.rfind(" ", max(0, cut - 20), cut)  # Start on a word boundary when one is near
+            start = min(space + 1 if space >= 0 else cut, len(text) - SNIPPET_CHARS)
+        end = min(len(text), start + SNIPPET_CHARS)
+        lead = "…" if start > 0 else ""
+        excerpt = lead + text[start:end] + ("…" if end < len(text) else "")
+        shift = len(lead) - start
+        entry = {
+            "field": label,
+            "text": excerpt,
+            "highlights": [[a + shift, min(b, end) + shift] for a, b in spans if start <= a < end],
+        }
+        if node_id:
+            entry["nodeId"] = node_id
+        found.append(entry)
+        if len(found) == limit:
+            break
+    return found
+
+
+class UserIndex:
+    """
+    Inverted index over one user's processes. Postings are compact arrays of process
+    ordinals and weighted frequencies; re-indexing a process gives it a new ordinal and
+    leaves the old entries as tombstones until the next rebuild.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Tuple[array, array]] = {}  # term -> (ordinals, weighted frequencies)
+        self.vocabulary: List[str] = []  # Sorted postings keys, for prefix lookups
+        self.ids: List[Optional[str]] = []  # ordinal -> process id, None once superseded
+        self.meta: List[Optional[Tuple[Optional[str], Optional[str], str, int]]] = []  # status, workspace, updatedAt, length
+        self.ordinals: Dict[str, int] = {}  # live process id -> ordinal
+        self.total_length = 0
+        self.high_water = ""  # Newest updatedAt indexed
+        self.built_at = time.monotonic()
+        self.changes = 0
+        self._norms: Tuple[int, List[float]] = (-1, [])
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def expired(self) -> bool:
+        tombstones = len(self.ids) - len(self.ordinals)
+        return time.monotonic() - self.built_at > INDEX_TTL_SECONDS or tombstones > max(len(self.ordinals), MIN_REBUILD_TOMBSTONES)
+
+    def refresh_since(self) -> str:
+        """updatedAt from which writes may not be indexed yet"""
+        try:
+            cutoff = datetime.fromisoformat(self.high_water) - timedelta(seconds=REFRESH_OVERLAP_SECONDS)
+        except ValueError:
+            return self.high_water
+        return cutoff.isoformat()
+
+    def is_current(self, process: Dict[str, Any]) -> bool:
+        """Whether the process is indexed at this updatedAt already (re-read by the refresh overlap)"""
+        ordinal = self.ordinals.get(process.get("id"))
+        return ordinal is not None and self.meta[ordinal][2] == timestamp(process.get("updatedAt"))
+
+    def build(self, processes: List[Dict[str, Any]]):
+        for process in processes:
+            self.add(process, sort=False)
+        self.vocabulary = sorted(self.postings)
+
+    def add(self, process: Dict[str, Any], sort: bool = True):
+        process_id = process.get("id")
+        if not process_id:
+            return
+        self.remove(process_id)
+        texts: Dict[int, List[str]] = {}
+        for label, text, _ in iter_fields(process):
+            texts.setdefault(FIELD_WEIGHTS[label], []).append(text)
+        # Each word counted `weight` times, so the whole tally runs in Counter's C loop
+        tokens: List[str] = []
+        for weight, group in texts.items():
+            tokens.extend(tokenize("\n".join(group)) * weight)
+        frequencies = Counter(tokens)
+        for stopword in STOPWORDS.intersection(frequencies):
+            del frequencies[stopword]
+
+        ordinal = len(self.ids)
+        for term, frequency in frequencies.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array("I"), array("H"))
+                if sort:
+                    bisect.insort(self.vocabulary, term)
+            entry[0].append(ordinal)
+            entry[1].append(min(frequency, MAX_FREQUENCY))
+        length = sum(frequencies.values())
+        updated_at = timestamp(process.get("updatedAt"))
+        self.ids.append(process_id)
+        self.meta.append((process.get("status"), process.get("workspaceId"), updated_at, length))
+        self.ordinals[process_id] = ordinal
+        self.total_length += length
+        self.high_water = max(self.high_water, updated_at)
+        self.changes += 1
+
+    def remove(self, process_id: str):
+        ordinal = self.ordinals.pop(process_id, None)
+        if ordinal is None:
+            return
+        self.total_length -= self.meta[ordinal][3]
+        self.ids[ordinal] = None
+        self.meta[ordinal] = None
+        self.changes += 1
+
+    def norms(self) -> List[float]:
+        """BM25 length normalization per ordinal, recomputed after index changes"""
+        if self._norms[0] != self.changes:
+            average = self.total_length / len(self.ordinals) if self.ordinals else 1.0
+            self._norms = (self.changes, [
+                BM25_K1 * (1 - BM25_B + BM25_B * meta[3] / average) if meta else 0.0
+                for meta in self.meta
+            ])
+        return self._norms[1]
+
+    def expand(self, term: str) -> List[Tuple[str, float]]:
+        """Indexed terms matching a query term: itself, then its shortest completions"""
+        matches = [(term, 1.0)] if term in self.postings else []
+        if len(term) < MIN_PREFIX_LENGTH:
+            return matches
+        completions = []
+        position = bisect.bisect_right(self.vocabulary, term)
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(term):
+            completions.append(self.vocabulary[position])
+            position += 1
+        if len(completions) > MAX_PREFIX_EXPANSIONS:
+            completions = heapq.nsmallest(MAX_PREFIX_EXPANSIONS, completions, key=len)
+        return matches + [(completion, PREFIX_BOOST) for completion in completions]
+
+    def search(
+        self,
+        terms: List[str],
+        status: Optional[str] = None,
+        workspace_id: Optional[str] = None,
+    ) -> Dict[int, float]:
+        """ordinal -> score for processes matching every term (all processes without terms)"""
+        meta = self.meta
+
+        def allowed(ordinal: int) -> bool:
+            process_status, workspace, _, _ = meta[ordinal]
+            return (status is None or process_status == status) and (workspace_id is None or workspace == workspace_id)
+
+        if not terms:
+            return {ordinal: 0.0 for ordinal in self.ordinals.values() if allowed(ordinal)}
+
+        expansions = [self.expand(term) for term in terms]
+        # Rarest term first: later terms only score the survivors
+        expansions.sort(key=lambda matches: sum(len(self.postings[t][0]) for t, _ in matches))
+        count = len(self.ordinals)
+        ids, norms = self.ids, self.norms()
+        scores: Optional[Dict[int, float]] = None
+        for matches in expansions:
+            # A process scores a query term through its first match: the exact word, then the
+            # shortest completion it contains
+            term_scores: Dict[int, float] = {}
+            for term, boost in matches:
+                ordinals, frequencies = self.postings[term]
+                frequency_of_docs = len(ordinals)  # Tombstones included until the next rebuild
+                weight = boost * (BM25_K1 + 1) * math.log(1 + (count - frequency_of_docs + 0.5) / (frequency_of_docs + 0.5))
+                if scores is None:
+                    part = {
+                        o: weight * f / (f + norms[o]) for o, f in zip(ordinals, frequencies)
+                        if ids[o] is not None and o not in term_scores
+                    }
+                else:
+                    part = {
+                        o: weight * f / (f + norms[o]) for o, f in zip(ordinals, frequencies)
+                        if o in scores and o not in term_scores
+                    }
+                term_scores.update(part)
+            if scores is None:
+                if status is not None or workspace_id is not None:
+                    term_scores = {o: score for o, score in term_scores.items() if allowed(o)}
+                scores = term_scores
+            else:
+                scores = {o: scores[o] + score for o, score in term_scores.items()}
+            if not scores:
+                return {}
+        return scores
+
+    def rank(self, scores: Dict[int, float], offset: int, limit: int) -> List[Tuple[str, float]]:
+        """One page of (process id, score), best first; ties go to the most recently updated"""
+        meta = self.meta
+        page = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], meta[item[0]][2]))
+        return [(self.ids[ordinal], score) for ordinal, score in page[offset:]]
+
+
+class ProcessSearch:
+    """Per-user indexes, built lazily and evicted least recently searched first"""
+
+    def __init__(self, max_documents: int = MAX_INDEXED_DOCUMENTS):
+        self.max_documents = max_documents
+        self.indexes: "OrderedDict[str, UserIndex]" = OrderedDict()
+        self.locks: Dict[str, asyncio.Lock] = {}
+
+    async def index_for(self, collection, user_id: str) -> UserIndex:
+        lock = self.locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            index = self.indexes.get(user_id)
+            if index is None or index.expired():
+                started = time.perf_counter()
+                processes = await collection.find({"userId": user_id}, SEARCH_PROJECTION).to_list(None)
+                index = UserIndex()
+                await asyncio.to_thread(index.build, processes)  # Seconds for the largest users; keep the loop free
+                self.indexes[user_id] = index
+                logger.info(
+                    f"🔎 Search index built for {user_id}: {len(index)} processes, "
+                    f"{len(index.postings)} terms in {(time.perf_counter() - started) * 1000:.0f}ms"
+                )
+            else:
+                changed = await collection.find(
+                    {"userId": user_id, "updatedAt": {"$gte": index.refresh_since()}}, SEARCH_PROJECTION
+                ).to_list(None)
+                for process in changed:
+                    # Re-adding an unchanged process would leave a tombstone and recompute norms on every search
+                    if not index.is_current(process):
+                        index.add(process)
+            self.indexes.move_to_end(user_id)
+            self._evict(keep=user_id)
+            return index
+
+    def _evict(self, keep: str):
+        total = sum(len(index) for index in self.indexes.values())
+        while total > self.max_documents and len(self.indexes) > 1:
+            user_id = next(iter(self.indexes))
+            if user_id == keep:
+                break
+            total -= len(self.indexes.pop(user_id))
+            self.locks.pop(user_id, None)
+
+    def discard(self, user_id: str, process_id: str):
+        """Drop a deleted process from its owner's index on this worker"""
+        index = self.indexes.get(user_id)
+        if index is not None:
+            index.remove(process_id)
+
+    async def search(
+        self,
+        collection,
+        user_id: str,
+        q: str,
+        status: Optional[str] = None,
+        workspace_id: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Dict[str, Any]:
+        """{"terms", "total", "page": [(process id, score)]} for one page of results"""
+        terms = query_terms(q)
+        if q.strip() and not terms:
+            return {"terms": [], "total": 0, "page": []}  # Nothing searchable, e.g. only punctuation
+        index = await self.index_for(collection, user_id)
+        scores = index.search(terms, status=status, workspace_id=workspace_id)
+        return {"terms": terms, "total": len(scores), "page": index.rank(scores, offset, limit)}
+
+
+# Global process search instance
+process_search = ProcessSearch()
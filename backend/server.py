@@ -1,39 +1,69 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Request, Response, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Request, Response, Depends, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, JSONResponse
 from sse_starlette.sse import EventSourceResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import OperationFailure
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, ValidationError
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, get_args
 import re
 import uuid
+import base64
+from functools import lru_cache
 from datetime import datetime, timezone, timedelta
 import json
-import io
 import asyncio
+import zipfile
+from contextlib import ExitStack
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 import secrets
 from cache_service import cache_service
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-
-try:
-    import pypdf
-    import docx
-    from PIL import Image
-    import pytesseract
-    DOCUMENT_SUPPORT = True
-except ImportError:
-    DOCUMENT_SUPPORT = False
+
+from document_service import (
+    DOCUMENT_SUPPORT,
+    PDF_RENDER_SUPPORT,
+    MAX_AUDIO_UPLOAD_BYTES,
+    MAX_BULK_UPLOAD_BYTES,
+    MAX_DOCUMENT_UPLOAD_BYTES,
+    STREAM_PAGES_PER_JOB,
+    UploadTooLargeError,
+    assemble_pages,
+    assign_source_pages,
+    extract_pdf_pipeline,
+    extract_text,
+    format_page,
+    fresh_page_entry,
+    iter_pdf_pages,
+    plan_pdf_extraction,
+    spool_upload,
+)
+from extraction_executor import extraction_executor, ExtractionQueueFullError, ExtractionTimeoutError
+from extraction_cache import extraction_cache
+from transcription_service import transcription_service, LiveTranscriptionSession, SAMPLE_RATE
+from text_compaction import load_token_encoding, text_compactor
+from local_extraction import local_extractor, normalize_term
+from coverage_engine import coverage_engine, describe_missing
+from structured_parser import structured_parser
+from layout_engine import layout_engine
+from graph_validation import IdAllocator, graph_validator, new_node_id
+from graph_analysis import graph_analyzer
+from process_diff import process_differ
+from version_store import VERSION_COLLECTION, VersionConflictError, version_store
+from simulation_engine import DEFAULT_TRIALS, MAX_TRIALS, SimulationError, simulate_process
+from process_ops import MAX_OPS, OperationError, apply_operations
+from collaboration import SLOW_CONSUMER_CLOSE_CODE, collaboration_hub
+from process_patch import (
+    PatchError, apply_patch, history_delta, merge_patch_ops, normalize_ops, patch_impacts, touched_projection, translate
+)
+from search_index import SEARCH_PROJECTION, process_search, snippets as search_snippets
+from bpmn_engine import BpmnImportError, export_bpmn, import_bpmn, import_bpmn_archive, import_bpmn_batch
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -202,6 +232,7 @@ class Process(BaseModel):
     updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     publishedAt: Optional[datetime] = None  # Added for publish feature
     version: int = 1
+    revision: int = 0  # Bumped by every write; sent back as the ETag for conditional (If-Match) edits
     status: str = "draft"  # draft, published, archived
     nodes: List[ProcessNode] = []
     edges: List[ProcessEdge] = []  # NEW: Explicit edge definitions for branching
@@ -220,6 +251,7 @@ class ProcessInput(BaseModel):
     inputType: str  # voice_transcript, document, chat
     additionalContext: Optional[str] = None  # Optional context added via voice/chat
     contextAnswers: Optional[Dict[str, str]] = None  # Smart question answers
+    workspaceId: Optional[str] = None  # Enables the workspace's learned system vocabulary
 
 class SmartQuestion(BaseModel):
     id: str
@@ -245,6 +277,8 @@ class ExtractionSummary(BaseModel):
     actors: List[str]  # Responsible parties
     timelines: List[str]  # Time-based requirements (e.g., "check every 30 min")
     complexity: str  # "low", "medium", "high"
+    compaction: Optional[Dict[str, int]] = None  # Prompt tokens saved by input compaction
+    provisional: bool = False  # True when only the local extractor ran (no LLM fields yet)
     
 class CoverageReport(BaseModel):
     """AI-generated report on how well the flowchart covers the source document"""
@@ -259,6 +293,7 @@ class CoverageReport(BaseModel):
     summary: str
     is_multi_process: bool = False  # NEW: Flag for multi-process documents
     process_count: int = 1  # NEW: Number of processes detected
+    compaction: Optional[Dict[str, int]] = None  # Prompt tokens saved by input compaction
 
 class Comment(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -299,6 +334,16 @@ class CreateShareRequest(BaseModel):
     accessLevel: str
     expiresInDays: Optional[int] = None  # 7, 30, 90, or None for never
 
+class SimulationRequest(BaseModel):
+    trials: int = Field(default=DEFAULT_TRIALS, ge=1, le=MAX_TRIALS)
+    seed: Optional[int] = None  # Same seed, same result
+    overrides: Dict[str, Dict[str, float]] = {}  # nodeId -> {"min", "mode", "max"} in minutes
+    branchProbabilities: Dict[str, float] = {}  # edgeId -> probability of taking that decision branch
+
+class OperationsRequest(BaseModel):
+    """Ordered editor ops, e.g. {"op": "update", "nodeId": "node-3", "fields": {"title": "..."}}"""
+    ops: List[Dict[str, Any]] = Field(min_length=1, max_length=MAX_OPS)
+
 # Constants for validation
 ALLOWED_ACCESS_LEVELS = ["view", "comment", "edit"]
 ALLOWED_EXPIRATION_DAYS = [7, 30, 90, None]
@@ -405,6 +450,15 @@ class AIService:
                                     seen_normalized.add(normalized)
                                     logger.debug(f"Found compound process title: {combined}")
         
+        result = self._finalize_process_titles(process_titles)
+        
+        print(f"[DEBUG] Preprocessing found {result['process_count']} processes: {result['process_titles']}", flush=True)
+        logger.info(f"Preprocessing found {result['process_count']} unique process titles: {result['process_titles']}")
+        
+        return result
+    
+    def _finalize_process_titles(self, process_titles: List[str]) -> Dict[str, Any]:
+        """Drop titles contained in a longer title and score multi-process confidence"""
         # Final cleanup: Remove any title that's a substring of another (keep the longer one)
         filtered_titles = []
         for title in process_titles:
@@ -419,9 +473,6 @@ class AIService:
         process_count = len(filtered_titles)
         high_confidence = process_count >= 2 and any('process' in t.lower() or 'requisition' in t.lower() for t in filtered_titles)
         
-        print(f"[DEBUG] Preprocessing found {process_count} processes: {filtered_titles}", flush=True)
-        logger.info(f"Preprocessing found {process_count} unique process titles: {filtered_titles}")
-        
         return {
             'process_count': process_count,
             'process_titles': filtered_titles,
@@ -1294,6 +1345,8 @@ Keep responses concise (2-3 sentences max)."""
             step_count = len(nodes)
             decision_points = sum(1 for node in nodes if node.get('type') == 'decision' or '?' in node.get('title', ''))
             handoffs = sum(1 for node in nodes if 'actor' in node and len(set(n.get('actor') for n in nodes if 'actor' in n)) > 1)
+            timing = graph_analyzer.analyze(process_data)
+            timing_summary = graph_analyzer.describe(timing, nodes)
             
             # Build analysis prompt
             process_description = f"""
@@ -1304,6 +1357,11 @@ Detected Handoffs: {handoffs}
 
 Steps:
 {chr(10).join([f"{i+1}. {node.get('title', 'Step')} - {node.get('description', '')}" for i, node in enumerate(nodes)])}
+"""
+            if timing_summary:
+                process_description += f"""
+Computed Timing (critical path method over the stored graph - exact, use these figures instead of estimating):
+{timing_summary}
 """
             
             chat = LlmChat(
@@ -1383,6 +1441,7 @@ TIME SAVINGS CALCULATION:
 - Example: Step A (5 min) + Step B (3 min) in sequence = 8 min total
 - If parallel: max(5, 3) = 5 min total → Save 3 min per occurrence
 - Monthly savings = 3 min × occurrences/month × hourly rate
+- If "Computed Timing" is given above, report its parallel candidates and savings as stated
 
 ═══════════════════════════════════════════════════════
 3. UNCLEAR OWNERSHIP / "WHO DOES THIS?"
@@ -1653,6 +1712,7 @@ Return ONLY valid JSON (no markdown, no code blocks):
                     response_text = response_text[start:end+1]
             
             result = json.loads(response_text)
+            result["timing"] = timing.to_dict()
             
             logger.info(f"Intelligence analysis complete: Health score {result.get('health_score', 'N/A')}")
             
@@ -1682,11 +1742,92 @@ Return ONLY valid JSON (no markdown, no code blocks):
                     "expected_duration_days": 1,
                     "current_estimated_duration_days": 2,
                     "industry_comparison": "average"
-                }
+                },
+                "timing": graph_analyzer.analyze(process_data).to_dict()
             }
 
 ai_service = AIService()
 
+class IncrementalBoundaryDetector:
+    """
+    Runs process boundary detection over text that arrives in pieces (pages, transcript windows).
+    Only the new text plus a few lines of overlap is scanned on each feed, so the
+    total cost stays linear in document length.
+    """
+    CONTEXT_LINES = 5  # Boundary detection looks this many lines ahead for content
+    
+    def __init__(self):
+        self._titles: List[str] = []
+        self._normalized = set()
+        self._tail_lines: List[str] = []
+        self.result = ai_service._finalize_process_titles([])
+    
+    def feed(self, text: str) -> bool:
+        """Scan newly contiguous text; returns True when the detected titles changed"""
+        lines = text.split('\n')
+        block = '\n'.join(self._tail_lines + lines)
+        self._tail_lines = lines[-self.CONTEXT_LINES:]
+        
+        changed = False
+        for title in ai_service._preprocess_and_detect_boundaries(block)['process_titles']:
+            normalized = ' '.join(title.lower().split()).replace('–', '-')
+            if normalized not in self._normalized:
+                self._normalized.add(normalized)
+                self._titles.append(title)
+                changed = True
+        
+        if changed:
+            self.result = ai_service._finalize_process_titles(self._titles)
+        return changed
+
+# ============ Workspace Vocabulary ============
+
+VOCABULARY_COLLECTION = "workspace_vocabulary"
+VOCABULARY_LIMIT = 500  # Most frequently seen terms per workspace
+
+async def vocabulary_workspace_id(user: Optional[Dict], workspace_id: Optional[str]) -> Optional[str]:
+    """
+    The workspace whose vocabulary a request may read and teach: `workspace_id` when the
+    caller owns it, else None (anonymous callers never read or write vocabulary)
+    """
+    if not user or not workspace_id:
+        return None
+    workspace = await db.workspaces.find_one({"id": workspace_id, "userId": user.get("id")}, {"_id": 0, "id": 1})
+    return workspace_id if workspace else None
+
+async def load_workspace_vocabulary(workspace_id: Optional[str]) -> List[str]:
+    """System names learned from the workspace's processes, most common first"""
+    if not workspace_id:
+        return []
+    try:
+        cursor = db[VOCABULARY_COLLECTION].find(
+            {"workspaceId": workspace_id, "kind": "system"},
+            {"_id": 0, "term": 1}
+        ).sort("count", -1).limit(VOCABULARY_LIMIT)
+        return [doc["term"] async for doc in cursor]
+    except Exception as e:
+        logger.error(f"Failed to load vocabulary for workspace {workspace_id}: {e}")
+        return []
+
+async def learn_workspace_vocabulary(workspace_id: Optional[str], systems: List[str]):
+    """Record system names so the local extractor recognizes them in future documents"""
+    if not workspace_id or not systems:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    operations = [
+        UpdateOne(
+            {"workspaceId": workspace_id, "kind": "system", "key": normalize_term(term)},
+            {"$set": {"term": term.strip(), "updatedAt": now}, "$inc": {"count": 1}},
+            upsert=True
+        )
+        for term in systems
+    ]
+    try:
+        await db[VOCABULARY_COLLECTION].bulk_write(operations, ordered=False)
+        logger.info(f"📚 Learned {len(operations)} system names for workspace {workspace_id}")
+    except Exception as e:
+        logger.error(f"Failed to update vocabulary for workspace {workspace_id}: {e}")
+
 # ============ Authentication Helper ============
 
 async def get_current_user(request: Request) -> Optional[Dict]:
@@ -2135,6 +2276,16 @@ async def get_cache_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/admin/extraction-stats")
+async def get_extraction_stats():
+    """Get document extraction pool and cache metrics (admin only in production)"""
+    return {**extraction_executor.get_stats(), "cache": extraction_cache.get_stats()}
+
+@api_router.get("/admin/compaction-stats")
+async def get_compaction_stats():
+    """Get prompt input compaction token savings (admin only in production)"""
+    return text_compactor.get_stats()
+
 @api_router.post("/process/analyze", response_model=DocumentAnalysis)
 async def analyze_document(input_data: ProcessInput):
     """
@@ -2143,18 +2294,31 @@ async def analyze_document(input_data: ProcessInput):
     """
     try:
         logger.info(f"Analyzing document for smart questions: {input_data.inputType}")
-        result = await ai_service.analyze_document(input_data.text)
+        compaction = text_compactor.compact(input_data.text)
+        result = await ai_service.analyze_document(compaction.text)
         return result
     except Exception as e:
         logger.error(f"Document analysis failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/process/parse", response_model=Dict[str, Any])
-async def parse_process(input_data: ProcessInput):
+async def parse_process(input_data: ProcessInput, request: Request):
     """Parse input and extract process structure with optional smart context"""
     try:
+        workspace_id = await vocabulary_workspace_id(await get_current_user(request), input_data.workspaceId)
+        
+        # Strip repeated headers/footers, OCR markers and boilerplate before prompting
+        compaction = text_compactor.compact(input_data.text)
+        
+        # Numbered SOPs, markdown outlines and CSV exports map straight to a graph;
+        # user-supplied context still needs the LLM to be taken into account
+        result = None
+        if not input_data.contextAnswers and not input_data.additionalContext:
+            vocabulary = await load_workspace_vocabulary(workspace_id)
+            result = structured_parser.parse(compaction.text, vocabulary)
+        
         # Build enhanced context from smart questions if provided
-        text_to_parse = input_data.text
+        text_to_parse = compaction.text
         
         # Add context answers if provided (smart questions)
         if input_data.contextAnswers:
@@ -2164,25 +2328,56 @@ async def parse_process(input_data: ProcessInput):
             
             if context_parts:
                 smart_context = "\n".join(context_parts)
-                text_to_parse = f"{input_data.text}\n\n---SMART CONTEXT FROM USER---\n{smart_context}"
+                text_to_parse = f"{text_to_parse}\n\n---SMART CONTEXT FROM USER---\n{smart_context}"
         
         # Add additional freeform context if provided
         if input_data.additionalContext:
             text_to_parse = f"{text_to_parse}\n\n---ADDITIONAL CONTEXT FROM USER---\n{input_data.additionalContext}"
         
-        result = await ai_service.parse_process(text_to_parse, input_data.inputType)
+        if result is None:
+            result = await ai_service.parse_process(text_to_parse, input_data.inputType)
+        
+        # Attribute nodes to ==Page N== markers from page-level extraction
+        for parsed_process in result.get('processes', []):
+            parsed_process['validation'] = graph_validator.normalize(parsed_process).to_dict()
+            assign_source_pages(parsed_process, input_data.text)
+            await learn_workspace_vocabulary(workspace_id, local_extractor.systems_from_process(parsed_process))
+        
+        result['compaction'] = compaction.to_dict()
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/process/extract-summary/provisional", response_model=ExtractionSummary)
+async def extract_summary_provisional(input_data: ProcessInput, request: Request):
+    """
+    Instant summary from the local extractor only (phones, emails, systems, timelines,
+    decision points). Semantic fields are empty until /process/extract-summary completes.
+    """
+    try:
+        workspace_id = await vocabulary_workspace_id(await get_current_user(request), input_data.workspaceId)
+        vocabulary = await load_workspace_vocabulary(workspace_id)
+        compaction = text_compactor.compact(input_data.text)
+        summary = local_extractor.summarize(compaction.text, vocabulary)
+        return ExtractionSummary(**summary, compaction=compaction.to_dict(), provisional=True)
+    except Exception as e:
+        logger.error(f"Error extracting provisional summary: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.post("/process/extract-summary", response_model=ExtractionSummary)
-async def extract_summary(input_data: ProcessInput):
+async def extract_summary(input_data: ProcessInput, request: Request):
     """
     Extract summary of key elements from document BEFORE generating flowchart.
     Shows customer what was found to build confidence.
+    Contacts, systems, timelines and decision points come from the local extractor;
+    the LLM only fills the semantic fields (steps, data fields, actors, complexity).
     """
     try:
         logger.info(f"Extracting summary from {input_data.inputType}")
+        compaction = text_compactor.compact(input_data.text)
+        workspace_id = await vocabulary_workspace_id(await get_current_user(request), input_data.workspaceId)
+        vocabulary = await load_workspace_vocabulary(workspace_id)
+        summary = local_extractor.summarize(compaction.text, vocabulary)
         
         chat = LlmChat(
             api_key=os.environ.get("EMERGENT_LLM_KEY"),
@@ -2190,21 +2385,23 @@ async def extract_summary(input_data: ProcessInput):
             system_message="You are an expert at extracting key operational elements from process documents."
         ).with_model("anthropic", "claude-4-sonnet-20250514")
         
-        prompt = f"""Analyze this {input_data.inputType} and extract a summary of ALL key operational elements.
+        prompt = f"""Analyze this {input_data.inputType} and extract the semantic elements below.
 
 INPUT TEXT:
-{input_data.text}
+{compaction.text}
+
+ALREADY EXTRACTED (do not repeat these):
+- Phone numbers: {', '.join(summary['phoneNumbers']) or 'none'}
+- Emails: {', '.join(summary['emails']) or 'none'}
+- Systems: {', '.join(summary['systems']) or 'none'}
+- Timelines: {', '.join(summary['timelines']) or 'none'}
+- Decision points: {summary['decisionPoints']}
 
 Extract and count:
 1. **Process Steps**: How many distinct process steps/actions are described?
 2. **Data Fields**: List ALL specific data fields that must be collected (e.g., "Officer Name", "Phone Number")
-3. **Phone Numbers**: Extract ALL phone numbers mentioned
-4. **Emails**: Extract ALL email addresses mentioned
-5. **Systems/Tools**: List ALL systems, software, or tools mentioned (e.g., "MYIT", "Service Hub")
-6. **Decision Points**: Count how many decision/branching points exist (IF/ELSE)
-7. **Actors**: List ALL responsible parties/roles mentioned
-8. **Timelines**: List ANY time-based requirements (e.g., "check every 30 min")
-9. **Complexity**: Assess overall complexity as "low" (simple, <5 steps), "medium" (5-10 steps), or "high" (>10 steps or complex branching)
+3. **Actors**: List ALL responsible parties/roles mentioned
+4. **Complexity**: Assess overall complexity as "low" (simple, <5 steps), "medium" (5-10 steps), or "high" (>10 steps or complex branching)
 
 CRITICAL: Be thorough. List EVERY specific element found.
 
@@ -2212,107 +2409,143 @@ Return ONLY this JSON (no markdown):
 {{
   "processSteps": number,
   "dataFields": ["Field 1", "Field 2", ...],
-  "phoneNumbers": ["0800 11 63 63", ...],
-  "emails": ["email@example.com", ...],
-  "systems": ["System1", "System2", ...],
-  "decisionPoints": number,
   "actors": ["Actor1", "Actor2", ...],
-  "timelines": ["Timeline1", ...],
   "complexity": "low|medium|high"
 }}"""
         
-        message = UserMessage(text=prompt)
-        response = await chat.send_message(message)
-        
-        # Parse JSON
-        response_text = response.strip()
-        if response_text.startswith('```'):
-            start = response_text.find('{')
-            end = response_text.rfind('}')
-            if start != -1 and end != -1:
-                response_text = response_text[start:end+1]
+        try:
+            message = UserMessage(text=prompt)
+            response = await chat.send_message(message)
+            
+            # Parse JSON
+            response_text = response.strip()
+            if response_text.startswith('```'):
+                start = response_text.find('{')
+                end = response_text.rfind('}')
+                if start != -1 and end != -1:
+                    response_text = response_text[start:end+1]
+            
+            semantic = json.loads(response_text)
+        except Exception as e:
+            # The local fields are still useful on their own
+            logger.warning(f"⚠️ Semantic summary failed, returning provisional summary: {e}")
+            return ExtractionSummary(**summary, compaction=compaction.to_dict(), provisional=True)
         
-        summary = json.loads(response_text)
-        return ExtractionSummary(**summary)
+        for field in ("processSteps", "dataFields", "actors", "complexity"):
+            if semantic.get(field) is not None:
+                summary[field] = semantic[field]
+        return ExtractionSummary(**summary, compaction=compaction.to_dict())
         
     except Exception as e:
         logger.error(f"Error extracting summary: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/process/{process_id}/coverage-report", response_model=CoverageReport)
-async def generate_coverage_report(process_id: str, input_data: ProcessInput):
+async def generate_coverage_report(process_id: str, input_data: ProcessInput, request: Request):
     """
-    Generate AI-powered coverage report AFTER flowchart generation.
-    Compares source document with generated flowchart to identify gaps.
+    Generate coverage report AFTER flowchart generation.
+    Contacts, systems and numbered steps across the FULL source are matched against the
+    nodes deterministically; the LLM only reviews source paragraphs no node represents.
+    Cached per (document, process version).
     """
     try:
         logger.info(f"Generating coverage report for process {process_id}")
         
         # Get the generated process
-        process = await db.processes.find_one({"id": process_id})
+        process = await db.processes.find_one({"id": process_id}, {"_id": 0})
         if not process:
             raise HTTPException(status_code=404, detail="Process not found")
         
-        chat = LlmChat(
-            api_key=os.environ.get("EMERGENT_LLM_KEY"),
-            session_id=f"coverage_{uuid.uuid4()}",
-            system_message="You are an expert at verifying process documentation completeness."
-        ).with_model("anthropic", "claude-4-sonnet-20250514")
+        # Node-level edits bump updatedAt without bumping version, so key on both
+        process_version = f"{process_id}:{process.get('version', 1)}:{process.get('updatedAt')}"
+        cached = cache_service.get_coverage_cache(input_data.text, process_version)
+        if cached:
+            return CoverageReport(**cached)
         
-        # Extract node titles and operational details for comparison
-        node_info = []
-        for node in process.get('nodes', []):
-            node_summary = {
-                "title": node.get('title'),
-                "description": node.get('description'),
-                "operationalDetails": node.get('operationalDetails', {})
-            }
-            node_info.append(node_summary)
+        compaction = text_compactor.compact(input_data.text)
+        workspace_id = await vocabulary_workspace_id(
+            await get_current_user(request), input_data.workspaceId or process.get('workspaceId')
+        )
+        vocabulary = await load_workspace_vocabulary(workspace_id)
+        check = coverage_engine.check(compaction.text, process, vocabulary)
+        score = round(check["coverageRatio"] * 100, 1)
+        gaps = describe_missing(check["missing"])
+        recommendations = [f"Verify the {m['kind']} '{m['value']}' is handled" for m in check["missing"][:5]]
+        summary = (
+            f"{score:g}% of contacts, systems and numbered steps in the source appear in the flowchart "
+            f"({check['sourceElements']['contacts']} contacts, {check['sourceElements']['systems']} systems, "
+            f"{check['sourceElements']['steps']} numbered steps checked)."
+        )
         
-        prompt = f"""Compare the SOURCE DOCUMENT with the GENERATED FLOWCHART to verify completeness.
+        # Only paragraphs the nodes don't represent need semantic review
+        if check["residualText"]:
+            node_info = [
+                {"title": node.get('title'), "description": node.get('description')}
+                for node in process.get('nodes', [])
+            ]
+            
+            chat = LlmChat(
+                api_key=os.environ.get("EMERGENT_LLM_KEY"),
+                session_id=f"coverage_{uuid.uuid4()}",
+                system_message="You are an expert at verifying process documentation completeness."
+            ).with_model("anthropic", "claude-4-sonnet-20250514")
+            
+            prompt = f"""These SOURCE PARAGRAPHS were not matched to any step of the GENERATED FLOWCHART.
+Decide which contain process content the flowchart is missing (ignore boilerplate, introductions, legal text).
 
-SOURCE DOCUMENT:
-{input_data.text[:5000]}
+SOURCE PARAGRAPHS:
+{check["residualText"]}
 
 GENERATED FLOWCHART NODES:
 {json.dumps(node_info, indent=2)}
 
-Analyze and return:
-1. **Confidence Score** (0-100): How confident are you that the flowchart captures everything important?
-2. **Confidence Level**: "high" (90-100%), "medium" (70-89%), "low" (<70%)
-3. **Captured Elements**: Count of steps, data fields, contacts, systems captured
-4. **Potential Gaps**: List anything important in the source that's NOT in the flowchart
-5. **Recommendations**: What should the customer manually verify?
-
 Return ONLY this JSON (no markdown):
 {{
-  "confidenceScore": number (0-100),
-  "confidenceLevel": "high|medium|low",
-  "capturedElements": {{
-    "steps": number,
-    "data_fields": number,
-    "contacts": number,
-    "systems": number
-  }},
-  "potentialGaps": ["Gap 1", "Gap 2", ...],
-  "recommendations": ["Verify X", "Check Y", ...],
-  "sourcePagesCovered": [1, 2, 3]
+  "semanticGaps": ["Missing step or rule, one line each", ...],
+  "recommendations": ["Verify X", ...],
+  "summary": "one sentence"
 }}"""
+            
+            try:
+                message = UserMessage(text=prompt)
+                response = await chat.send_message(message)
+                
+                # Parse JSON
+                response_text = response.strip()
+                if response_text.startswith('```'):
+                    start = response_text.find('{')
+                    end = response_text.rfind('}')
+                    if start != -1 and end != -1:
+                        response_text = response_text[start:end+1]
+                
+                semantic = json.loads(response_text)
+                semantic_gaps = [str(g) for g in semantic.get("semanticGaps", [])]
+                gaps = semantic_gaps + gaps
+                recommendations = [str(r) for r in semantic.get("recommendations", [])] + recommendations
+                if semantic.get("summary"):
+                    summary = f"{summary} {semantic['summary']}"
+                # Each confirmed semantic gap costs confidence the exact check cannot see
+                score = max(0.0, score - 5 * len(semantic_gaps))
+            except Exception as e:
+                logger.warning(f"⚠️ Semantic coverage review failed, using deterministic report: {e}")
+        
+        report = CoverageReport(
+            confidenceScore=score,
+            confidenceLevel="high" if score >= 90 else "medium" if score >= 70 else "low",
+            capturedElements=check["capturedElements"],
+            potentialGaps=gaps,
+            recommendations=recommendations,
+            sourcePagesCovered=check["sourcePagesCovered"],
+            detected_actors=len(process.get('actors', []) or []),
+            suggested_questions=[],
+            summary=summary,
+            compaction=compaction.to_dict()
+        )
+        cache_service.set_coverage_cache(input_data.text, process_version, report.model_dump())
+        return report
         
-        message = UserMessage(text=prompt)
-        response = await chat.send_message(message)
-        
-        # Parse JSON
-        response_text = response.strip()
-        if response_text.startswith('```'):
-            start = response_text.find('{')
-            end = response_text.rfind('}')
-            if start != -1 and end != -1:
-                response_text = response_text[start:end+1]
-        
-        report = json.loads(response_text)
-        return CoverageReport(**report)
-        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating coverage report: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2324,34 +2557,41 @@ async def publish_process(process_id: str):
     This creates a version snapshot for audit trail.
     """
     try:
-        # Get the current process
-        process = await db.processes.find_one({"id": process_id})
-        if not process:
-            raise HTTPException(status_code=404, detail="Process not found")
-        
-        # Check if guest trying to publish
-        if process.get('isGuest', False):
-            raise HTTPException(
-                status_code=403,
-                detail="Guest users cannot publish. Sign up to share your flowchart!"
+        for _ in range(NODE_WRITE_RETRIES):
+            process = await db.processes.find_one({"id": process_id}, {"_id": 0})
+            if not process:
+                raise HTTPException(status_code=404, detail="Process not found")
+            
+            # Check if guest trying to publish
+            if process.get('isGuest', False):
+                raise HTTPException(
+                    status_code=403,
+                    detail="Guest users cannot publish. Sign up to share your flowchart!"
+                )
+            
+            # Update status to published
+            now = datetime.now(timezone.utc).isoformat()
+            update_data = {
+                "status": "published",
+                "updatedAt": now,
+                "publishedAt": now,
+                "version": process.get('version', 1) + 1  # Increment version
+            }
+            
+            # The version was read at this revision, so the write is conditional on it
+            updated = await db.processes.find_one_and_update(
+                {"id": process_id, **revision_filter(process.get("revision", 0))},
+                {"$set": update_data, "$inc": {"revision": 1}},
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER
             )
+            if updated is not None:
+                break
+        else:
+            raise HTTPException(status_code=409, detail="Process is being edited concurrently, please retry")
         
-        # Update status to published
-        update_data = {
-            "status": "published",
-            "updatedAt": datetime.now(timezone.utc).isoformat(),
-            "publishedAt": datetime.now(timezone.utc).isoformat(),
-            "version": process.get('version', 1) + 1  # Increment version
-        }
-        
-        await db.processes.update_one(
-            {"id": process_id},
-            {"$set": update_data}
-        )
-        
-        # Fetch updated process
-        updated = await db.processes.find_one({"id": process_id})
-        updated['_id'] = str(updated['_id'])
+        await publish_change(process_id, None, "reload", updated["revision"], version=updated["version"])
+        await record_process_version(updated, updated.get('userId'), {"event": "publish"})
         return Process(**updated)
         
     except HTTPException:
@@ -2599,7 +2839,7 @@ async def delete_workspace(workspace_id: str, request: Request):
         if default_workspace and default_workspace['id'] != workspace_id:
             await db.processes.update_many(
                 {"workspaceId": workspace_id, "userId": user_id},
-                {"$set": {"workspaceId": default_workspace['id']}}
+                {"$set": {"workspaceId": default_workspace['id'], "updatedAt": datetime.now(timezone.utc).isoformat()}}
             )
         
         await db.workspaces.delete_one({"id": workspace_id, "userId": user_id})
@@ -2614,6 +2854,27 @@ async def delete_workspace(workspace_id: str, request: Request):
         logger.error(f"Error unpublishing process: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to unpublish process: {str(e)}")
 
+async def get_default_workspace_id(user_id: str) -> str:
+    """The user's default workspace, created on first use"""
+    default_workspace = await db.workspaces.find_one({"userId": user_id, "isDefault": True})
+    if default_workspace:
+        logger.info(f"✅ Assigned process to default workspace: {default_workspace['id']}")
+        return default_workspace['id']
+    
+    # Create default workspace if it doesn't exist
+    default_workspace = Workspace(
+        name="My Workspace",
+        description="Your default workspace",
+        userId=user_id,
+        isDefault=True
+    )
+    workspace_dict = default_workspace.model_dump()
+    workspace_dict['createdAt'] = workspace_dict['createdAt'].isoformat()
+    workspace_dict['updatedAt'] = workspace_dict['updatedAt'].isoformat()
+    await db.workspaces.insert_one(workspace_dict)
+    logger.info(f"✅ Created default workspace and assigned process to it")
+    return default_workspace.id
+
 @api_router.post("/process", response_model=Process)
 async def create_process(process_data: dict, request: Request, response: Response):
     """Create a new process with security validation"""
@@ -2660,24 +2921,7 @@ async def create_process(process_data: dict, request: Request, response: Respons
             
             # If no workspaceId provided, assign to user's default workspace
             if 'workspaceId' not in process_data or not process_data.get('workspaceId'):
-                default_workspace = await db.workspaces.find_one({"userId": user_id, "isDefault": True})
-                if default_workspace:
-                    process_data['workspaceId'] = default_workspace['id']
-                    logger.info(f"✅ Assigned process to default workspace: {default_workspace['id']}")
-                else:
-                    # Create default workspace if it doesn't exist
-                    default_workspace = Workspace(
-                        name="My Workspace",
-                        description="Your default workspace",
-                        userId=user_id,
-                        isDefault=True
-                    )
-                    workspace_dict = default_workspace.model_dump()
-                    workspace_dict['createdAt'] = workspace_dict['createdAt'].isoformat()
-                    workspace_dict['updatedAt'] = workspace_dict['updatedAt'].isoformat()
-                    await db.workspaces.insert_one(workspace_dict)
-                    process_data['workspaceId'] = default_workspace.id
-                    logger.info(f"✅ Created default workspace and assigned process to it")
+                process_data['workspaceId'] = await get_default_workspace_id(user_id)
         
         
         # SECURITY: Sanitize text fields to prevent XSS
@@ -2730,6 +2974,9 @@ async def create_process(process_data: dict, request: Request, response: Respons
                 detail=f"Missing required fields: {', '.join(missing_fields)}"
             )
             
+        # Repair ids and dangling edges before the model sees them
+        graph_validator.normalize(process_data)
+        
         # Create and validate Process object
         process = Process(**process_data)
         
@@ -2741,6 +2988,10 @@ async def create_process(process_data: dict, request: Request, response: Respons
             doc['publishedAt'] = doc['publishedAt'].isoformat() if isinstance(doc['publishedAt'], datetime) else doc['publishedAt']
         
         await db.processes.insert_one(doc)
+        await record_process_version(doc, user.get('id') if user else None, {"event": "create"})
+        if not process.isGuest:
+            workspace_id = await vocabulary_workspace_id(user, process.workspaceId)
+            await learn_workspace_vocabulary(workspace_id, local_extractor.systems_from_process(doc))
         return process
     except HTTPException:
         raise
@@ -2751,33 +3002,41 @@ async def create_process(process_data: dict, request: Request, response: Respons
             raise HTTPException(status_code=422, detail=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+async def process_list_query(request: Request) -> Optional[Dict[str, Any]]:
+    """Mongo filter for the caller's own processes (user or guest session); None if neither"""
+    # Try to get current user (optional for guest mode)
+    user = await get_current_user(request)
+    
+    if user:
+        # AUTHENTICATED USER - Get their processes (exclude guest processes)
+        user_id = user.get('id')
+        # Use $or to include processes without isGuest field (existing processes) or where isGuest is False
+        # This is more index-friendly than $ne
+        return {
+            "userId": user_id,
+            "$or": [
+                {"isGuest": False},
+                {"isGuest": {"$exists": False}}
+            ]
+        }
+    
+    # GUEST MODE - Get guest processes
+    guest_id = request.cookies.get("guest_session")
+    if not guest_id:
+        return None
+    return {"userId": guest_id, "isGuest": True}
+
 @api_router.get("/process", response_model=List[Process])
 async def get_processes(request: Request, workspace_id: Optional[str] = None):
-    """Get all processes for the authenticated user or guest, optionally filtered by workspace"""
+    """
+    Get all processes for the authenticated user or guest, optionally filtered by
+    workspace. Full documents; dashboards should use /process/summary instead.
+    """
     try:
-        # Try to get current user (optional for guest mode)
-        user = await get_current_user(request)
-        
-        if user:
-            # AUTHENTICATED USER - Get their processes (exclude guest processes)
-            user_id = user.get('id')
-            # Use $or to include processes without isGuest field (existing processes) or where isGuest is False
-            # This is more index-friendly than $ne
-            query = {
-                "userId": user_id,
-                "$or": [
-                    {"isGuest": False},
-                    {"isGuest": {"$exists": False}}
-                ]
-            }
-        else:
-            # GUEST MODE - Get guest processes
-            guest_id = request.cookies.get("guest_session")
-            if not guest_id:
-                # No user and no guest session - return empty list
-                return []
-            
-            query = {"userId": guest_id, "isGuest": True}
+        query = await process_list_query(request)
+        if query is None:
+            # No user and no guest session - return empty list
+            return []
         
         if workspace_id:
             query['workspaceId'] = workspace_id
@@ -2798,73 +3057,142 @@ async def get_processes(request: Request, workspace_id: Optional[str] = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/process/search", response_model=List[Process])
-async def search_processes(
-    request: Request, 
-    q: Optional[str] = None,
+SUMMARY_PAGE_SIZE = 50
+MAX_SUMMARY_PAGE_SIZE = 200
+PROCESS_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "status": 1, "workspaceId": 1, "version": 1,
+    "views": 1, "healthScore": 1, "updatedAt": 1,
+    # Counted by Mongo: the arrays themselves never leave the database
+    "nodeCount": {"$size": {"$ifNull": ["$nodes", []]}},
+    "edgeCount": {"$size": {"$ifNull": ["$edges", []]}},
+    "criticalGapCount": {"$size": {"$ifNull": ["$criticalGaps", []]}},
+}
+SUMMARY_EXTRA_FIELDS = (set(Process.model_fields) | {"lastChange", "intelligence", "intelligenceGeneratedAt"}) - set(PROCESS_SUMMARY_PROJECTION)
+
+def encode_cursor(process: Dict[str, Any]) -> str:
+    raw = json.dumps([process.get("updatedAt"), process.get("id")], default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Keyset filter for the page after `cursor` in (updatedAt desc, id desc) order"""
+    try:
+        updated_at, process_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"updatedAt": {"$lt": updated_at}},
+        {"updatedAt": updated_at, "id": {"$lt": process_id}}
+    ]}
+
+def summary_projection(fields: Optional[str]) -> Dict[str, Any]:
+    """PROCESS_SUMMARY_PROJECTION plus the comma-separated extra `fields`; unknown ones are a 400"""
+    projection = dict(PROCESS_SUMMARY_PROJECTION)
+    if fields:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - SUMMARY_EXTRA_FIELDS - set(PROCESS_SUMMARY_PROJECTION)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        projection.update({field: 1 for field in requested - set(PROCESS_SUMMARY_PROJECTION)})
+    return projection
+
+@api_router.get("/process/summary")
+async def list_process_summaries(
+    request: Request,
     workspace_id: Optional[str] = None,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    limit: int = SUMMARY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ):
-    """Search processes for the authenticated user"""
+    """
+    Dashboard listing: name, status, counts, health score and updatedAt per process,
+    most recently updated first. Pages with `cursor` (the previous page's nextCursor);
+    `fields=description,views` adds more process fields.
+    """
     try:
-        # Get current user
-        user = await require_auth(request)
-        user_id = user.get('id')
-        
-        # Base query - filter by userId
-        query = {"userId": user_id}
+        query = await process_list_query(request)
+        if query is None:
+            return {"items": [], "nextCursor": None}
         
-        # Add workspace filter if specified
         if workspace_id:
             query['workspaceId'] = workspace_id
-            
-        # Add status filter if specified
-        if status and status in ['draft', 'published']:
+        if status:
             query['status'] = status
+        if cursor:
+            query = {"$and": [query, decode_cursor(cursor)]}
         
-        # Add text search if query provided
-        if q and q.strip():
-            # Create text search conditions
-            search_conditions = []
-            search_term = {"$regex": q.strip(), "$options": "i"}  # Case-insensitive
-            
-            # Search in name, description, and node content
-            search_conditions.append({"name": search_term})
-            search_conditions.append({"description": search_term})
-            
-            # Search in node titles and descriptions
-            search_conditions.append({
-                "nodes": {
-                    "$elemMatch": {
-                        "$or": [
-                            {"title": search_term},
-                            {"description": search_term}
-                        ]
-                    }
-                }
-            })
-            
-            # Combine with OR condition
-            query["$or"] = search_conditions
+        projection = summary_projection(fields)
+        limit = max(1, min(limit, MAX_SUMMARY_PAGE_SIZE))
+        items = await db.processes.find(query, projection).sort(
+            [("updatedAt", -1), ("id", -1)]
+        ).limit(limit + 1).to_list(limit + 1)
         
-        # Execute search
-        processes = await db.processes.find(query, {"_id": 0}).to_list(1000)
+        next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+        return {"items": items[:limit], "nextCursor": next_cursor}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing process summaries: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_TEXT_FIELDS = [path for path in SEARCH_PROJECTION if path not in PROCESS_SUMMARY_PROJECTION]  # Read for snippets
+
+@api_router.get("/process/search")
+async def search_processes(
+    request: Request, 
+    q: Optional[str] = None,
+    workspace_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = SEARCH_PAGE_SIZE,
+    offset: int = 0,
+    fields: Optional[str] = None
+):
+    """
+    Ranked search over the authenticated user's processes: names, descriptions, actors,
+    node titles and descriptions, systems and contacts. Every query word also matches
+    as a prefix. Items are process summaries (`fields` as on /process/summary) with a
+    score and highlighted snippets; page with `offset` (the previous nextOffset).
+    """
+    try:
+        user = await require_auth(request)
+        user_id = user.get('id')
         
-        # Convert datetime strings if needed
-        for process in processes:
-            if isinstance(process.get('createdAt'), str):
-                process['createdAt'] = datetime.fromisoformat(process['createdAt'])
-            if isinstance(process.get('updatedAt'), str):
-                process['updatedAt'] = datetime.fromisoformat(process['updatedAt'])
-            if isinstance(process.get('publishedAt'), str):
-                process['publishedAt'] = datetime.fromisoformat(process['publishedAt'])
+        projection = summary_projection(fields)
+        if status not in ('draft', 'published'):
+            status = None
+        limit = max(1, min(limit, MAX_SUMMARY_PAGE_SIZE))
+        offset = max(0, offset)
         
-        # Sort by relevance (updated date desc)
-        processes.sort(key=lambda x: x.get('updatedAt', datetime.min), reverse=True)
+        results = await process_search.search(
+            db.processes, user_id, q or "",
+            status=status, workspace_id=workspace_id, offset=offset, limit=limit
+        )
         
-        logger.info(f"✅ Search completed: query='{q}' results={len(processes)} user={user['email']}")
+        # Only the page is read back: its summaries plus the text the snippets come from
+        page_ids = [process_id for process_id, _ in results["page"]]
+        read = dict(projection)
+        read.update({path: 1 for path in SEARCH_TEXT_FIELDS if path.split(".")[0] not in projection})
+        docs = {}
+        if page_ids:
+            cursor = db.processes.find({"id": {"$in": page_ids}, "userId": user_id}, read)
+            docs = {doc["id"]: doc for doc in await cursor.to_list(len(page_ids))}
+        
+        items = []
+        for process_id, score in results["page"]:
+            doc = docs.get(process_id)
+            if doc is None:
+                process_search.discard(user_id, process_id)  # Deleted since the index saw it
+                continue
+            item = {key: value for key, value in doc.items() if key in projection}
+            item["score"] = round(score, 4)
+            item["snippets"] = search_snippets(doc, results["terms"])
+            items.append(item)
         
-        return processes
+        next_offset = offset + limit if offset + limit < results["total"] else None
+        logger.info(f"✅ Search completed: query='{q}' results={results['total']} user={user['email']}")
+        
+        return {"items": items, "total": results["total"], "nextOffset": next_offset}
         
     except HTTPException:
         raise
@@ -2907,23 +3235,267 @@ async def get_process(process_id: str, request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/process/{process_id}", response_model=Process)
-async def update_process(process_id: str, process: Process):
-    """Update a process"""
+async def update_process(process_id: str, process: Process, request: Request):
+    """Update a process; derived data is invalidated only where the diff says it changed"""
     try:
-        process.updatedAt = datetime.now(timezone.utc)
-        process.version += 1
-        
-        doc = process.model_dump()
-        doc['createdAt'] = doc['createdAt'].isoformat()
-        doc['updatedAt'] = doc['updatedAt'].isoformat()
-        
-        await db.processes.update_one(
-            {"id": process_id},
-            {"$set": doc}
-        )
+        expected = parse_if_match(request)
+        for _ in range(NODE_WRITE_RETRIES):
+            stored = await db.processes.find_one(
+                {"id": process_id},
+                {"_id": 0, "id": 1, "name": 1, "description": 1, "actors": 1, "nodes": 1, "edges": 1, "version": 1, "revision": 1, "updatedAt": 1}
+            )
+            if not stored:
+                raise HTTPException(status_code=404, detail="Process not found")
+            revision = stored.get("revision", 0)
+            if expected is not None and revision != expected:
+                raise revision_conflict(stored)
+            # Version is server-owned: the next one follows the stored document, not the request body
+            process.updatedAt = datetime.now(timezone.utc)
+            process.version = stored.get("version", 1) + 1
+            
+            doc = process.model_dump()
+            doc['createdAt'] = doc['createdAt'].isoformat()
+            doc['updatedAt'] = doc['updatedAt'].isoformat()
+            doc.pop('revision')  # Server-owned, only ever incremented
+            
+            diff = process_differ.diff(stored, doc)
+            impacts = diff.impacts()
+            doc["lastChange"] = {"version": process.version, "summary": diff.to_dict()["summary"], "impacts": impacts}
+            change = {"event": "update", **doc["lastChange"]["summary"]}
+            update = {"$set": doc, "$inc": {"revision": 1}}
+            if impacts["intelligence"]:
+                update["$unset"] = {"intelligence": "", "intelligenceGeneratedAt": ""}
+            
+            # The diff and version were computed from this revision, so the write is conditional on it
+            updated = await db.processes.find_one_and_update(
+                {"id": process_id, **revision_filter(revision)},
+                update,
+                projection={"_id": 0, "revision": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if updated is not None:
+                break
+            if expected is not None:
+                current = await db.processes.find_one({"id": process_id}, NODE_EDIT_PROJECTION)
+                if current:
+                    raise revision_conflict(current)
+                raise HTTPException(status_code=404, detail="Process not found")
+        else:
+            raise HTTPException(status_code=409, detail="Process is being edited concurrently, please retry")
+        
+        if not impacts["layout"]:
+            # Same graph shape: carry the cached layout over to the new version
+            layout = cache_service.get_layout_cache(layout_version(stored))
+            if layout:
+                cache_service.set_layout_cache(layout_version(doc), layout)
+        process.revision = updated["revision"]
+        await publish_change(process_id, request_client_id(request), "reload", process.revision, version=process.version)
+        user = await get_current_user(request)
+        await record_process_version(doc, user.get('id') if user else None, change)
         
         return process
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============ JSON Patch ============
+
+PATCH_ITEM_MODELS = {"nodes": ProcessNode, "edges": ProcessEdge}
+JSON_PATCH_TYPE = "application/json-patch+json"
+MONGO_RETRYABLE_CODES = {112}  # WriteConflict
+MERGE_PATCH_TYPE = "application/merge-patch+json"
+
+@lru_cache(maxsize=None)
+def patch_adapter(field: str, depth: int, item_field: Optional[str] = None) -> Optional[TypeAdapter]:
+    """Validator for a value written at depth 1 (field), 2 (list item) or 3 (node/edge field)"""
+    annotation = Process.model_fields[field].annotation
+    if depth == 1:
+        return TypeAdapter(annotation)
+    if depth == 2:
+        item = PATCH_ITEM_MODELS.get(field) or next(iter(get_args(annotation)), None)
+        return TypeAdapter(item) if item is not None else None
+    model = PATCH_ITEM_MODELS.get(field)
+    if depth == 3 and model is not None and item_field in model.model_fields:
+        return TypeAdapter(model.model_fields[item_field].annotation)
+    return None
+
+def prepare_patch(ops: List[Dict[str, Any]]) -> bool:
+    """
+    Validate and normalize written values in place (400 on bad ones). Returns False
+    when some value sits deeper than a node/edge field and the patched document has
+    to be validated instead.
+    """
+    shallow = True
+    for index, op in enumerate(ops):
+        tokens = op["tokens"]
+        model = PATCH_ITEM_MODELS.get(tokens[0])
+        if op["op"] == "remove":
+            required = Process.model_fields[tokens[0]].is_required() if len(tokens) == 1 else (
+                len(tokens) == 3 and model is not None and tokens[2] in model.model_fields
+                and model.model_fields[tokens[2]].is_required()
+            )
+            if required:
+                raise PatchError(f"{op['path']} is required and can't be removed", index, 400)
+        if op["op"] not in ("add", "replace"):
+            continue
+        if len(tokens) == 3 and model is not None and tokens[2] not in model.model_fields:
+            raise PatchError(f"unknown field {tokens[2]!r}", index, 400)
+        adapter = patch_adapter(tokens[0], len(tokens), tokens[2] if len(tokens) == 3 else None)
+        if adapter is None:
+            shallow = False
+            continue
+        try:
+            op["value"] = adapter.dump_python(adapter.validate_python(op["value"]), mode="json")
+        except ValidationError as e:
+            raise PatchError(f"invalid value for {op['path']}: {e.errors()[0]['msg']}", index, 400)
+    return shallow
+
+def validate_patched_fields(doc: Dict[str, Any], fields) -> None:
+    for field in fields:
+        try:
+            patch_adapter(field, 1).validate_python(doc.get(field))
+        except ValidationError as e:
+            error = e.errors()[0]
+            location = "/".join(str(part) for part in error["loc"])
+            raise PatchError(f"invalid value at /{field}/{location}: {error['msg']}", status=400)
+
+async def record_patch_version(process_id: str, before: Dict[str, Any], ops: List[Dict[str, Any]], updated_at: str,
+                               author_id: Optional[str], summary: Dict[str, Any]):
+    """
+    History entry of a targeted patch: a delta from the fields the update returned,
+    or the written document when the delta can't be stored; never fails the request
+    """
+    version = before.get("version", 1) + 1
+    try:
+        delta = history_delta(ops, before, {"updatedAt": updated_at, "version": version})
+        if delta is not None and await version_store.record_delta(db[VERSION_COLLECTION], process_id, version, delta, author_id, summary):
+            return
+    except VersionConflictError as e:
+        logger.error(f"❌ {e}")
+        return
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record version {version} of process {process_id}: {e}")
+        return
+    process = await db.processes.find_one({"id": process_id, "version": version}, {"_id": 0})
+    if process:
+        await record_process_version(process, author_id, summary)
+
+@api_router.patch("/process/{process_id}")
+async def patch_process(process_id: str, request: Request, response: Response):
+    """
+    Partial update (owner only). Send a JSON Patch (RFC 6902, array body or
+    application/json-patch+json) or a merge patch (RFC 7396, object body or
+    application/merge-patch+json); If-Match with the revision guards against
+    concurrent edits. Patches that map onto dotted paths are written as one
+    targeted update that returns only the touched fields (ids for node/edge
+    lists), and history gets a delta built from them; the rest are applied to
+    the touched fields only.
+    """
+    try:
+        user = await require_auth(request)
+        expected = parse_if_match(request)
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Patch body must be JSON")
+        merge = content_type == MERGE_PATCH_TYPE or (content_type != JSON_PATCH_TYPE and isinstance(body, dict))
+        ops = normalize_ops(merge_patch_ops(body) if merge else body)
+        shallow = prepare_patch(ops)
+        impacts = patch_impacts(ops)
+        
+        updated_at = datetime.now(timezone.utc).isoformat()
+        derived = {"$set": {"updatedAt": updated_at}, "$inc": {"version": 1, "revision": 1}}
+        if impacts["intelligence"]:
+            derived["$unset"] = {"intelligence": "", "intelligenceGeneratedAt": ""}
+        translated = translate(ops) if shallow else None
+        
+        if translated is not None:
+            # One update; the patch's preconditions ride along in the filter
+            query, update = translated
+            for operator, values in derived.items():
+                update[operator] = {**update.get(operator, {}), **values}
+            before = await db.processes.find_one_and_update(
+                {"id": process_id, "userId": user["id"], **revision_filter(expected), **query},
+                update,
+                projection={"_id": 0, "id": 1, "userId": 1, "version": 1, "revision": 1, "updatedAt": 1, **touched_projection(ops)},
+                return_document=ReturnDocument.BEFORE
+            )
+            if before is None:
+                current = await db.processes.find_one({"id": process_id}, {"_id": 0, "intelligence": 0})
+                if not current:
+                    raise HTTPException(status_code=404, detail="Process not found")
+                if current.get("userId") != user["id"]:
+                    raise HTTPException(status_code=403, detail="Only process owner can edit")
+                if expected is not None and current.get("revision", 0) != expected:
+                    raise revision_conflict(current)
+                apply_patch(current, ops)  # Raises the failing op's error
+                raise revision_conflict(current)  # It applies now: someone else changed it in between
+            after = {"id": process_id}
+        else:
+            before = await db.processes.find_one({"id": process_id}, {"_id": 0, "intelligence": 0})
+            if not before:
+                raise HTTPException(status_code=404, detail="Process not found")
+            if before.get("userId") != user["id"]:
+                raise HTTPException(status_code=403, detail="Only process owner can edit")
+            revision = before.get("revision", 0)
+            if expected is not None and revision != expected:
+                raise revision_conflict(before)
+            after = apply_patch(before, ops)
+            fields = {tokens[0] for op in ops for tokens in (op["tokens"], op.get("fromTokens")) if tokens and op["op"] != "test"}
+            validate_patched_fields(after, fields)
+            derived["$set"].update({field: after[field] for field in fields if field in after})
+            removed = {field: "" for field in fields if field not in after}
+            if removed:
+                derived["$unset"] = {**derived.get("$unset", {}), **removed}
+            result = await db.processes.update_one({"id": process_id, **revision_filter(revision)}, derived)
+            if not result.matched_count:
+                current = await db.processes.find_one({"id": process_id}, NODE_EDIT_PROJECTION)
+                if not current:
+                    raise HTTPException(status_code=404, detail="Process not found")
+                raise revision_conflict(current)
+        
+        after.update({
+            "version": before.get("version", 1) + 1,
+            "revision": before.get("revision", 0) + 1,
+            "updatedAt": updated_at,
+        })
+        await publish_change(process_id, request_client_id(request), "patch", after["revision"], version=after["version"],
+                             ops=[{key: value for key, value in op.items() if key not in ("tokens", "fromTokens")} for op in ops])
+        summary = {"event": "patch", "ops": len(ops), **impacts}
+        if translated is not None:
+            await record_patch_version(process_id, before, ops, updated_at, user["id"], summary)
+        else:
+            await record_process_version(after, user["id"], summary)
+        if not impacts["layout"]:
+            layout = cache_service.get_layout_cache(layout_version(before))
+            if layout:
+                cache_service.set_layout_cache(layout_version(after), layout)
+        response.headers["ETag"] = f'"{after["revision"]}"'
+        
+        logger.info(f"🩹 Patched process {process_id} ({len(ops)} ops, {'targeted' if translated is not None else 'fields'} update)")
+        return {
+            "success": True,
+            "version": after["version"],
+            "revision": after["revision"],
+            "updatedAt": updated_at,
+            "impacts": impacts
+        }
+    except PatchError as e:
+        detail = {"message": e.message, "index": e.index} if e.index is not None else e.message
+        raise HTTPException(status_code=e.status, detail=detail)
+    except OperationFailure as e:
+        # The filter matched but Mongo can't apply the update to this document
+        if e.code in MONGO_RETRYABLE_CODES:
+            raise HTTPException(status_code=409, detail="Process changed during the edit, please retry")
+        message = (e.details or {}).get("errmsg") or str(e)
+        logger.warning(f"⚠️ Patch on process {process_id} rejected by the database: {message}")
+        raise HTTPException(status_code=422, detail=f"Patch can't be applied to this process: {message}")
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.error(f"Error patching process: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/process/{process_id}/intelligence")
@@ -3007,62 +3579,173 @@ async def regenerate_intelligence(process_id: str, request: Request):
 async def delete_process(process_id: str):
     """Delete a process"""
     try:
-        result = await db.processes.delete_one({"id": process_id})
-        if result.deleted_count == 0:
+        deleted = await db.processes.find_one_and_delete({"id": process_id}, projection={"_id": 0, "userId": 1})
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Process not found")
+        process_search.discard(deleted.get("userId"), process_id)
         return {"message": "Process deleted"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.patch("/process/{process_id}/node/{node_id}")
-async def update_node(process_id: str, node_id: str, node_data: dict, request: Request):
-    """Update a specific node in a process (owner only)"""
+# ============ Node-level Edits ============
+
+NODE_WRITE_RETRIES = 3  # Attempts when a read-then-write races another writer and no If-Match was sent
+NODE_FIELD_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')  # Keeps client keys out of update paths
+NODE_EDIT_PROJECTION = {"_id": 0, "id": 1, "userId": 1, "version": 1, "revision": 1, "updatedAt": 1, "nodes": 1, "edges": 1}
+
+def parse_if_match(request: Request) -> Optional[int]:
+    """Expected process revision from If-Match ("12", W/"12"); None when absent or "*" """
+    value = (request.headers.get("if-match") or "").strip()
+    if not value or value == "*":
+        return None
+    if value.startswith("W/"):
+        value = value[2:]
     try:
-        # Authenticate user
-        user = await require_auth(request)
-        
-        # Get process and verify ownership
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a process revision")
+
+def revision_filter(revision: Optional[int]) -> Dict[str, Any]:
+    if revision is None:
+        return {}
+    if revision == 0:
+        return {"revision": {"$in": [0, None]}}  # Also matches processes written before revisions existed
+    return {"revision": revision}
+
+def request_client_id(request: Request) -> Optional[str]:
+    """Tab id sent by the editor, echoed in broadcasts so a tab can skip its own edits"""
+    return request.headers.get("x-client-id")
+
+async def publish_change(process_id: str, origin: Optional[str], kind: str, revision: Optional[int], **payload):
+    """Broadcast an accepted write to everyone on the process's collaboration channel"""
+    await collaboration_hub.publish(process_id, {
+        "type": kind, "processId": process_id, "revision": revision, "clientId": origin, **payload
+    })
+
+def revision_conflict(process: Dict[str, Any]) -> HTTPException:
+    """409 carrying the current graph so the client can rebase its edit"""
+    revision = process.get("revision", 0)
+    return HTTPException(
+        status_code=409,
+        detail={
+            "message": "Process was changed by someone else. Review the latest version and retry.",
+            "revision": revision,
+            "updatedAt": process.get("updatedAt"),
+            "nodes": process.get("nodes", []),
+            "edges": process.get("edges", []),
+        },
+        headers={"ETag": f'"{revision}"'}
+    )
+
+async def node_write_failure(process_id: str, user: Dict, action: str, expected: Optional[int],
+                             node_id: Optional[str] = None) -> Optional[HTTPException]:
+    """Why a guarded node write matched nothing; None if the caller's own check applies"""
+    process = await db.processes.find_one({"id": process_id}, NODE_EDIT_PROJECTION)
+    if not process:
+        return HTTPException(status_code=404, detail="Process not found")
+    if process.get("userId") != user["id"]:
+        return HTTPException(status_code=403, detail=f"Only process owner can {action}")
+    if expected is not None and process.get("revision", 0) != expected:
+        return revision_conflict(process)
+    if node_id is not None and not any(n.get("id") == node_id for n in process.get("nodes", [])):
+        return HTTPException(status_code=404, detail="Node not found")
+    return None
+
+NodeEdit = Tuple[Dict[str, Any], Union[Dict[str, Any], List[Dict[str, Any]]], Optional[List[Dict[str, Any]]]]
+
+async def write_node_edit(process_id: str, user: Dict, expected: Optional[int], action: str, event: str,
+                          edit: Callable[[Dict[str, Any]], NodeEdit]) -> Dict[str, Any]:
+    """
+    Read-then-write for the node endpoints. `edit` gets the stored process and returns
+    (its changed nodes/edges, the targeted update, array filters). The write is conditional
+    on the revision read, bumps the version and sets lastChange like /ops, and the new
+    version is recorded; without If-Match a lost race is retried. Returns the written process.
+    """
+    for _ in range(NODE_WRITE_RETRIES):
         process = await db.processes.find_one({"id": process_id}, {"_id": 0})
         if not process:
             raise HTTPException(status_code=404, detail="Process not found")
-        
         if process.get("userId") != user["id"]:
-            raise HTTPException(status_code=403, detail="Only process owner can edit nodes")
+            raise HTTPException(status_code=403, detail=f"Only process owner can {action}")
+        revision = process.get("revision", 0)
+        if expected is not None and revision != expected:
+            raise revision_conflict(process)
+        
+        changed, update, array_filters = edit(process)
+        doc = {**process, **changed, "updatedAt": datetime.now(timezone.utc).isoformat(), "version": process.get("version", 1) + 1}
+        diff = process_differ.diff(process, doc)
+        impacts = diff.impacts()
+        summary = diff.to_dict()["summary"]
+        derived = {
+            "updatedAt": doc["updatedAt"],
+            "version": doc["version"],
+            "lastChange": {"version": doc["version"], "summary": summary, "impacts": impacts}
+        }
+        stale = ["intelligence", "intelligenceGeneratedAt"] if impacts["intelligence"] else []
+        if isinstance(update, list):  # Aggregation pipeline
+            update = update + [{"$set": {**derived, "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]}}}]
+            if stale:
+                update.append({"$unset": stale})
+        else:
+            update = {**update, "$set": {**update.get("$set", {}), **derived}, "$inc": {"revision": 1}}
+            if stale:
+                update["$unset"] = {key: "" for key in stale}
+        
+        options = {"array_filters": array_filters} if array_filters else {}
+        result = await db.processes.update_one({"id": process_id, **revision_filter(revision)}, update, **options)
+        if result.matched_count:
+            break
+        if expected is not None:
+            raise await node_write_failure(process_id, user, action, expected) or HTTPException(status_code=409, detail="Process changed during the edit")
+    else:
+        raise HTTPException(status_code=409, detail="Process is being edited concurrently, please retry")
+    
+    doc.update(derived, revision=revision + 1)
+    for key in stale:
+        doc.pop(key, None)
+    await record_process_version(doc, user["id"], {"event": event, **summary})
+    return doc
+
+def find_node(process: Dict[str, Any], node_id: str) -> Dict[str, Any]:
+    node = next((n for n in process.get("nodes", []) if n.get("id") == node_id), None)
+    if node is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return node
+
+@api_router.patch("/process/{process_id}/node/{node_id}")
+async def update_node(process_id: str, node_id: str, node_data: dict, request: Request, response: Response):
+    """
+    Update a specific node in a process (owner only). Only the sent fields of that
+    node are written; send If-Match with the process revision to reject stale edits.
+    """
+    try:
+        # Authenticate user
+        user = await require_auth(request)
+        expected = parse_if_match(request)
         
-        # Find and update the specific node
-        nodes = process.get("nodes", [])
-        node_found = False
-        
-        for i, node in enumerate(nodes):
-            if node.get("id") == node_id:
-                # Update only the fields provided in node_data
-                for key, value in node_data.items():
-                    if key != "id":  # Don't allow changing node ID
-                        nodes[i][key] = value
-                node_found = True
-                break
+        # Update only the fields provided in node_data; the node ID can't change
+        fields = {key: value for key, value in node_data.items() if key != "id"}
+        invalid = [key for key in fields if not NODE_FIELD_RE.match(key)]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid node fields: {', '.join(invalid)}")
         
-        if not node_found:
-            raise HTTPException(status_code=404, detail="Node not found")
+        def edit(process):
+            find_node(process, node_id)
+            nodes = [{**n, **fields} if n.get("id") == node_id else n for n in process.get("nodes", [])]
+            update = {"$set": {f"nodes.$[node].{key}": value for key, value in fields.items()}}
+            return {"nodes": nodes}, update, [{"node.id": node_id}]
         
-        # Update the process with modified nodes
-        await db.processes.update_one(
-            {"id": process_id},
-            {
-                "$set": {
-                    "nodes": nodes,
-                    "updatedAt": datetime.now(timezone.utc).isoformat()
-                }
-            }
-        )
+        process = await write_node_edit(process_id, user, expected, "edit nodes", "updateNode", edit)
         
+        response.headers["ETag"] = f'"{process["revision"]}"'
+        await publish_change(process_id, request_client_id(request), "ops", process["revision"], version=process["version"],
+                             ops=[{"op": "update", "nodeId": node_id, "fields": fields}])
         logger.info(f"✅ Node {node_id} updated in process {process_id} by {user['email']}")
         
         # Return the updated node
-        updated_node = next((n for n in nodes if n.get("id") == node_id), None)
-        return updated_node
+        return find_node(process, node_id)
         
     except HTTPException:
         raise
@@ -3070,58 +3753,288 @@ async def update_node(process_id: str, node_id: str, node_data: dict, request: R
         logger.error(f"Error updating node: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to update node: {str(e)}")
 
-@api_router.patch("/process/{process_id}/reorder")
-async def reorder_nodes(process_id: str, node_order: dict, request: Request):
-    """Reorder nodes in a process (owner only)"""
+def layout_version(process: Dict[str, Any], updated_at: Optional[str] = None) -> str:
+    """Layout cache key: node/edge edits change updatedAt even when version does not"""
+    return f"{process.get('id')}:{process.get('version', 1)}:{updated_at or process.get('updatedAt')}"
+
+@api_router.get("/process/{process_id}/layout")
+async def get_process_layout(process_id: str, request: Request):
+    """
+    Layered (Sugiyama) layout of the process graph: top-left node positions, bend
+    points for long edges and canvas size. Cached per process version.
+    """
     try:
-        # Authenticate user
-        user = await require_auth(request)
-        
-        # Get process and verify ownership
         process = await db.processes.find_one({"id": process_id}, {"_id": 0})
         if not process:
             raise HTTPException(status_code=404, detail="Process not found")
         
-        if process.get("userId") != user["id"]:
-            raise HTTPException(status_code=403, detail="Only process owner can reorder nodes")
+        # Check access: allow if owned by user OR if published
+        user = await get_current_user(request)
+        is_owner = user and user.get('id') == process.get('userId')
+        is_published = process.get('status') == 'published'
+        if not is_owner and not is_published:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        version = layout_version(process)
+        cached = cache_service.get_layout_cache(version)
+        if cached:
+            return {**cached, "cached": True}
+        
+        layout = layout_engine.layout(process.get("nodes", []), process.get("edges", [])).to_dict()
+        cache_service.set_layout_cache(version, layout)
+        return {**layout, "cached": False}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing layout: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/process/{process_id}/analysis")
+async def get_process_analysis(process_id: str, request: Request):
+    """
+    Critical path, slack per step and candidate parallel groups computed from
+    timeEstimate, edges, dependencies and parallelWith (no LLM call)
+    """
+    try:
+        process = await db.processes.find_one(
+            {"id": process_id},
+            {"_id": 0, "nodes": 1, "edges": 1, "userId": 1, "status": 1}
+        )
+        if not process:
+            raise HTTPException(status_code=404, detail="Process not found")
+        
+        # Check access: allow if owned by user OR if published
+        user = await get_current_user(request)
+        is_owner = user and user.get('id') == process.get('userId')
+        is_published = process.get('status') == 'published'
+        if not is_owner and not is_published:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        return graph_analyzer.analyze(process).to_dict()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error analyzing process graph: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/process/{process_id}/simulate")
+async def simulate_process_cycle_time(process_id: str, request: Request, body: Optional[SimulationRequest] = None):
+    """
+    Monte Carlo cycle-time simulation: percentile cycle times, join wait times and
+    each step's contribution to the critical path
+    """
+    try:
+        body = body or SimulationRequest()
+        process = await db.processes.find_one(
+            {"id": process_id},
+            {"_id": 0, "nodes": 1, "edges": 1, "userId": 1, "status": 1}
+        )
+        if not process:
+            raise HTTPException(status_code=404, detail="Process not found")
+        
+        # Check access: allow if owned by user OR if published
+        user = await get_current_user(request)
+        is_owner = user and user.get('id') == process.get('userId')
+        is_published = process.get('status') == 'published'
+        if not is_owner and not is_published:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        return await extraction_executor.run(
+            simulate_process, process, body.trials, body.seed, body.overrides, body.branchProbabilities
+        )
+    except HTTPException:
+        raise
+    except SimulationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ExtractionQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ExtractionTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error simulating process: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/process/{process_id}/diff")
+async def diff_process(process_id: str, other: Dict[str, Any], request: Request):
+    """
+    Node- and edge-level diff from the stored process to the posted version
+    (nodes matched by id, then by title similarity)
+    """
+    try:
+        process = await db.processes.find_one(
+            {"id": process_id},
+            {"_id": 0, "name": 1, "description": 1, "actors": 1, "nodes": 1, "edges": 1, "userId": 1, "status": 1}
+        )
+        if not process:
+            raise HTTPException(status_code=404, detail="Process not found")
+        
+        # Check access: allow if owned by user OR if published
+        user = await get_current_user(request)
+        is_owner = user and user.get('id') == process.get('userId')
+        is_published = process.get('status') == 'published'
+        if not is_owner and not is_published:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        return process_differ.diff(process, other).to_dict()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error diffing process: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============ Version History ============
+
+RESTORE_KEPT_FIELDS = {"id", "userId", "workspaceId", "createdAt", "status", "publishedAt", "isGuest", "guestCreatedAt", "guestEditCount", "views"}
+
+async def record_process_version(process: Dict[str, Any], author_id: Optional[str] = None, summary: Optional[Dict[str, Any]] = None):
+    """Append the process's current version to its history; never fails the request"""
+    try:
+        await version_store.record(db[VERSION_COLLECTION], process, author_id, summary)
+    except VersionConflictError as e:
+        logger.error(f"❌ {e}")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record version {process.get('version')} of process {process.get('id')}: {e}")
+
+async def get_owned_process(process_id: str, request: Request, projection: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    process = await db.processes.find_one({"id": process_id}, projection or {"_id": 0})
+    if not process:
+        raise HTTPException(status_code=404, detail="Process not found")
+    user = await get_current_user(request)
+    if not user or user.get('id') != process.get('userId'):
+        raise HTTPException(status_code=403, detail="Access denied")
+    return process
+
+@api_router.get("/process/{process_id}/versions")
+async def list_process_versions(process_id: str, request: Request, limit: int = 100):
+    """Version history, newest first (owner only)"""
+    try:
+        await get_owned_process(process_id, request, {"_id": 0, "userId": 1})
+        versions = await version_store.list(db[VERSION_COLLECTION], process_id, max(1, min(limit, 500)))
+        return {"processId": process_id, "versions": versions}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing versions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/process/{process_id}/versions/{version}")
+async def get_process_version(process_id: str, version: int, request: Request):
+    """One version of the process, rebuilt from its nearest snapshot (owner only)"""
+    try:
+        await get_owned_process(process_id, request, {"_id": 0, "userId": 1})
+        content = await version_store.load(db[VERSION_COLLECTION], process_id, version)
+        if content is None:
+            raise HTTPException(status_code=404, detail=f"Version {version} not found")
+        return content
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error loading version: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/process/{process_id}/versions/{version}/restore", response_model=Process)
+async def restore_process_version(process_id: str, version: int, request: Request):
+    """Restore an old version's content as a new version (owner only)"""
+    try:
+        user = await require_auth(request)
+        expected = parse_if_match(request)
+        await get_owned_process(process_id, request, {"_id": 0, "userId": 1})
+        content = await version_store.load(db[VERSION_COLLECTION], process_id, version)
+        if content is None:
+            raise HTTPException(status_code=404, detail=f"Version {version} not found")
+        
+        for _ in range(NODE_WRITE_RETRIES):
+            current = await get_owned_process(process_id, request)
+            revision = current.get("revision", 0)
+            if expected is not None and revision != expected:
+                raise revision_conflict(current)
+            doc = {key: value for key, value in content.items() if key not in RESTORE_KEPT_FIELDS}
+            doc.update({key: current[key] for key in RESTORE_KEPT_FIELDS if key in current})
+            doc["version"] = current.get("version", 1) + 1
+            doc["updatedAt"] = datetime.now(timezone.utc).isoformat()
+            
+            diff = process_differ.diff(current, doc)
+            doc.pop("revision", None)
+            update = {"$set": doc, "$inc": {"revision": 1}}
+            if diff.impacts()["intelligence"]:
+                update["$unset"] = {"intelligence": "", "intelligenceGeneratedAt": ""}
+            # The version and diff were computed from this revision, so the write is conditional on it
+            updated = await db.processes.find_one_and_update(
+                {"id": process_id, **revision_filter(revision)},
+                update,
+                projection={"_id": 0, "revision": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if updated is not None:
+                break
+            if expected is not None:
+                latest = await db.processes.find_one({"id": process_id}, NODE_EDIT_PROJECTION)
+                if latest:
+                    raise revision_conflict(latest)
+                raise HTTPException(status_code=404, detail="Process not found")
+        else:
+            raise HTTPException(status_code=409, detail="Process is being edited concurrently, please retry")
+        
+        doc["revision"] = updated["revision"]
+        await publish_change(process_id, request_client_id(request), "reload", doc["revision"], version=doc["version"])
+        await record_process_version(doc, user.get('id'), {"event": "restore", "restoredFrom": version, **diff.to_dict()["summary"]})
+        
+        logger.info(f"⏪ Restored process {process_id} to version {version} as version {doc['version']}")
+        return Process(**doc)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error restoring version: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.patch("/process/{process_id}/reorder")
+async def reorder_nodes(process_id: str, node_order: dict, request: Request, response: Response):
+    """Reorder nodes in a process (owner only); only the id order is sent to the database"""
+    try:
+        # Authenticate user
+        user = await require_auth(request)
+        expected = parse_if_match(request)
         
         # Get the new order of node IDs
         new_order = node_order.get("nodeIds", [])
         if not new_order:
             raise HTTPException(status_code=400, detail="nodeIds array required")
-        
-        # Get current nodes
-        nodes = process.get("nodes", [])
-        
-        # Validate that all node IDs exist
-        node_ids_set = {n.get("id") for n in nodes}
-        if set(new_order) != node_ids_set:
+        if len(set(new_order)) != len(new_order):
             raise HTTPException(status_code=400, detail="Node IDs don't match existing nodes")
         
-        # Create a mapping of node ID to node
-        node_map = {n.get("id"): n for n in nodes}
+        def edit(process):
+            nodes = process.get("nodes", [])
+            by_id = {n.get("id"): n for n in nodes}
+            if len(new_order) != len(nodes) or set(new_order) != set(by_id):
+                raise HTTPException(status_code=400, detail="Node IDs don't match existing nodes")
+            # Server-side permutation: only the id order is sent, each node is picked by id
+            update = [{
+                "$set": {
+                    "nodes": {
+                        "$map": {
+                            "input": {"$literal": new_order},
+                            "as": "nodeId",
+                            "in": {"$arrayElemAt": [{"$filter": {"input": "$nodes", "cond": {"$eq": ["$$this.id", "$$nodeId"]}}}, 0]}
+                        }
+                    }
+                }
+            }]
+            return {"nodes": [by_id[node_id] for node_id in new_order]}, update, None
         
-        # Reorder nodes based on new_order
-        reordered_nodes = [node_map[node_id] for node_id in new_order]
+        process = await write_node_edit(process_id, user, expected, "reorder nodes", "reorderNodes", edit)
         
-        # Update positions for visual consistency
-        for i, node in enumerate(reordered_nodes):
-            node["position"] = {"x": 100.0, "y": 100.0 + (i * 150)}
+        await publish_change(process_id, request_client_id(request), "ops", process["revision"], version=process["version"],
+                             ops=[{"op": "reorder", "nodeIds": new_order}])
         
-        # Update the process with reordered nodes
-        await db.processes.update_one(
-            {"id": process_id},
-            {
-                "$set": {
-                    "nodes": reordered_nodes,
-                    "updatedAt": datetime.now(timezone.utc).isoformat()
-                }
-            }
-        )
+        # Re-run the layered layout (order breaks ties between sibling branches)
+        reordered_nodes = process.get("nodes", [])
+        layout = layout_engine.apply(reordered_nodes, process.get("edges", []))
+        cache_service.set_layout_cache(layout_version(process), layout.to_dict())
+        response.headers["ETag"] = f'"{process["revision"]}"'
         
         logger.info(f"✅ Nodes reordered in process {process_id} by {user['email']}")
         
-        return {"success": True, "nodes": reordered_nodes}
+        return {"success": True, "nodes": reordered_nodes, "revision": process["revision"]}
         
     except HTTPException:
         raise
@@ -3130,60 +4043,54 @@ async def reorder_nodes(process_id: str, node_order: dict, request: Request):
         raise HTTPException(status_code=500, detail=f"Failed to reorder nodes: {str(e)}")
 
 @api_router.post("/process/{process_id}/node")
-async def add_node(process_id: str, node_data: dict, request: Request):
-    """Add a new node to a process (owner only)"""
+async def add_node(process_id: str, node_data: dict, request: Request, response: Response):
+    """Add a new node to a process (owner only); only the new node is written"""
     try:
         # Authenticate user
         user = await require_auth(request)
+        expected = parse_if_match(request)
         
-        # Get process and verify ownership
-        process = await db.processes.find_one({"id": process_id}, {"_id": 0})
-        if not process:
-            raise HTTPException(status_code=404, detail="Process not found")
-        
-        if process.get("userId") != user["id"]:
-            raise HTTPException(status_code=403, detail="Only process owner can add nodes")
-        
-        # Get current nodes
-        nodes = process.get("nodes", [])
+        added = {}
         
-        # Create new node with default values
-        new_node = {
-            "id": f"node-{int(datetime.now(timezone.utc).timestamp() * 1000)}",
-            "title": node_data.get("title", "New Step"),
-            "description": node_data.get("description", "Click to add details"),
-            "status": node_data.get("status", "current"),
-            "actors": node_data.get("actors", []),
-            "subSteps": node_data.get("subSteps", []),
-            "position": {"x": 100.0, "y": 100.0 + (len(nodes) * 150)}
-        }
+        def edit(process):
+            nodes = process.get("nodes", [])
+            
+            # Create new node with default values
+            new_node = {
+                "id": new_node_id(nodes),
+                "title": node_data.get("title", "New Step"),
+                "description": node_data.get("description", "Click to add details"),
+                "status": node_data.get("status", "current"),
+                "actors": node_data.get("actors", []),
+                "subSteps": node_data.get("subSteps", []),
+                "position": {"x": 100.0, "y": 100.0}
+            }
+            
+            # Determine where to insert (default: at the end)
+            insert_index = node_data.get("insertIndex", len(nodes))
+            if insert_index < 0 or insert_index > len(nodes):
+                insert_index = len(nodes)
+            added.update(node=new_node, index=insert_index)
+            
+            # The id and index were computed from this revision, which the write is conditional on
+            update = {"$push": {"nodes": {"$each": [new_node], "$position": insert_index}}}
+            return {"nodes": nodes[:insert_index] + [new_node] + nodes[insert_index:]}, update, None
         
-        # Determine where to insert (default: at the end)
-        insert_index = node_data.get("insertIndex", len(nodes))
-        if insert_index < 0 or insert_index > len(nodes):
-            insert_index = len(nodes)
+        process = await write_node_edit(process_id, user, expected, "add nodes", "addNode", edit)
+        new_node, insert_index = added["node"], added["index"]
         
-        # Insert the new node
-        nodes.insert(insert_index, new_node)
+        await publish_change(process_id, request_client_id(request), "ops", process["revision"], version=process["version"],
+                             ops=[{"op": "add", "node": dict(new_node), "index": insert_index}])
         
-        # Update positions for all nodes
-        for i, node in enumerate(nodes):
-            node["position"] = {"x": 100.0, "y": 100.0 + (i * 150)}
-        
-        # Update the process with new nodes
-        await db.processes.update_one(
-            {"id": process_id},
-            {
-                "$set": {
-                    "nodes": nodes,
-                    "updatedAt": datetime.now(timezone.utc).isoformat()
-                }
-            }
-        )
+        # Positions for the response and the layout cache; stored nodes keep theirs
+        nodes = [dict(n) for n in process["nodes"]]
+        layout = layout_engine.apply(nodes, process.get("edges", []))
+        cache_service.set_layout_cache(layout_version(process), layout.to_dict())
+        response.headers["ETag"] = f'"{process["revision"]}"'
         
         logger.info(f"✅ Node added to process {process_id} by {user['email']}")
         
-        return {"success": True, "node": new_node, "nodes": nodes}
+        return {"success": True, "node": new_node, "nodes": nodes, "revision": process["revision"]}
         
     except HTTPException:
         raise
@@ -3192,58 +4099,138 @@ async def add_node(process_id: str, node_data: dict, request: Request):
         raise HTTPException(status_code=500, detail=f"Failed to add node: {str(e)}")
 
 @api_router.delete("/process/{process_id}/node/{node_id}")
-async def delete_node(process_id: str, node_id: str, request: Request):
-    """Delete a node from a process (owner only)"""
+async def delete_node(process_id: str, node_id: str, request: Request, response: Response):
+    """Delete a node and its edges from a process (owner only); one $pull, no array rewrite"""
     try:
         # Authenticate user
         user = await require_auth(request)
+        expected = parse_if_match(request)
         
-        # Get process and verify ownership
-        process = await db.processes.find_one({"id": process_id}, {"_id": 0})
-        if not process:
-            raise HTTPException(status_code=404, detail="Process not found")
+        def edit(process):
+            find_node(process, node_id)
+            nodes = [n for n in process.get("nodes", []) if n.get("id") != node_id]
+            if not nodes:
+                raise HTTPException(status_code=400, detail="Cannot delete the last node. Process must have at least one step.")
+            edges = [e for e in process.get("edges", []) if node_id not in (e.get("source"), e.get("target"))]
+            # Edges into and out of the node go in the same update: no dangling references
+            update = {"$pull": {"nodes": {"id": node_id}, "edges": {"$or": [{"source": node_id}, {"target": node_id}]}}}
+            return {"nodes": nodes, "edges": edges}, update, None
         
-        if process.get("userId") != user["id"]:
-            raise HTTPException(status_code=403, detail="Only process owner can delete nodes")
+        process = await write_node_edit(process_id, user, expected, "delete nodes", "deleteNode", edit)
+        
+        await publish_change(process_id, request_client_id(request), "ops", process["revision"], version=process["version"],
+                             ops=[{"op": "delete", "nodeId": node_id}])
         
-        # Get current nodes
+        # Update positions for remaining nodes
         nodes = process.get("nodes", [])
+        layout = layout_engine.apply(nodes, process.get("edges", []))
+        cache_service.set_layout_cache(layout_version(process), layout.to_dict())
+        response.headers["ETag"] = f'"{process["revision"]}"'
         
-        # Check if process has only one node
-        if len(nodes) <= 1:
-            raise HTTPException(status_code=400, detail="Cannot delete the last node. Process must have at least one step.")
+        logger.info(f"✅ Node {node_id} deleted from process {process_id} by {user['email']}")
         
-        # Find and remove the node
-        original_length = len(nodes)
-        nodes = [n for n in nodes if n.get("id") != node_id]
+        return {"success": True, "nodes": nodes, "revision": process["revision"]}
         
-        if len(nodes) == original_length:
-            raise HTTPException(status_code=404, detail="Node not found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting node: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to delete node: {str(e)}")
+
+async def commit_process_operations(process: Dict[str, Any], ops: List[Dict[str, Any]], expected: Optional[int],
+                                    author_id: Optional[str], client_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Apply an ops batch to a loaded process and write it conditionally on the revision
+    it was applied to, then broadcast it. Callers check access first.
+    """
+    process_id = process["id"]
+    revision = process.get("revision", 0)
+    if expected is not None and revision != expected:
+        raise revision_conflict(process)
+    
+    try:
+        batch = apply_operations(process.get("nodes", []), process.get("edges", []), ops)
+    except OperationError as e:
+        raise HTTPException(status_code=422, detail={"message": e.message, "index": e.index})
+    
+    updated_at = datetime.now(timezone.utc).isoformat()
+    doc = {**process, "nodes": batch.nodes, "edges": batch.edges, "updatedAt": updated_at, "version": process.get("version", 1) + 1}
+    diff = process_differ.diff(process, doc)
+    impacts = diff.impacts()
+    summary = diff.to_dict()["summary"]
+    changes = {
+        "nodes": batch.nodes,
+        "edges": batch.edges,
+        "updatedAt": updated_at,
+        "version": doc["version"],
+        "lastChange": {"version": doc["version"], "summary": summary, "impacts": impacts}
+    }
+    update = {"$set": changes, "$inc": {"revision": 1}}
+    if impacts["intelligence"]:
+        update["$unset"] = {"intelligence": "", "intelligenceGeneratedAt": ""}
+    
+    # Conditional on the revision the ops were applied to: a concurrent edit makes this a 409
+    result = await db.processes.update_one({"id": process_id, **revision_filter(revision)}, update)
+    if not result.matched_count:
+        current = await db.processes.find_one({"id": process_id}, NODE_EDIT_PROJECTION)
+        if not current:
+            raise HTTPException(status_code=404, detail="Process not found")
+        raise revision_conflict(current)
+    
+    doc.update(changes)
+    await publish_change(process_id, client_id, "ops", revision + 1, version=doc["version"], ops=batch.applied)
+    await record_process_version(doc, author_id, {"event": "ops", "ops": len(ops), **summary})
+    
+    if impacts["layout"]:
+        layout = layout_engine.apply(batch.nodes, batch.edges)
+        cache_service.set_layout_cache(layout_version(doc), layout.to_dict())
+    else:
+        layout = cache_service.get_layout_cache(layout_version(process))
+        if layout:
+            cache_service.set_layout_cache(layout_version(doc), layout)
+    
+    return {
+        "success": True,
+        "version": doc["version"],
+        "revision": revision + 1,
+        "nodes": batch.nodes,
+        "edges": batch.edges,
+        "addedNodeIds": batch.added_nodes,
+        "addedEdgeIds": batch.added_edges,
+        "summary": summary
+    }
+
+@api_router.post("/process/{process_id}/ops")
+async def apply_process_operations(process_id: str, body: OperationsRequest, request: Request, response: Response):
+    """
+    Apply a batch of editor operations (owner only) in one read-modify-write:
+    update/add/delete/reorder nodes and addEdge/updateEdge/deleteEdge. The batch
+    is all-or-nothing and bumps the version once.
+    """
+    try:
+        # Authenticate user
+        user = await require_auth(request)
+        expected = parse_if_match(request)
         
-        # Update positions for remaining nodes
-        for i, node in enumerate(nodes):
-            node["position"] = {"x": 100.0, "y": 100.0 + (i * 150)}
+        process = await db.processes.find_one({"id": process_id}, {"_id": 0})
+        if not process:
+            raise HTTPException(status_code=404, detail="Process not found")
         
-        # Update the process
-        await db.processes.update_one(
-            {"id": process_id},
-            {
-                "$set": {
-                    "nodes": nodes,
-                    "updatedAt": datetime.now(timezone.utc).isoformat()
-                }
-            }
-        )
+        if process.get("userId") != user["id"]:
+            raise HTTPException(status_code=403, detail="Only process owner can edit nodes")
         
-        logger.info(f"✅ Node {node_id} deleted from process {process_id} by {user['email']}")
+        result = await commit_process_operations(process, body.ops, expected, user["id"], request_client_id(request))
+        response.headers["ETag"] = f'"{result["revision"]}"'
         
-        return {"success": True, "nodes": nodes}
+        logger.info(f"✅ {len(body.ops)} ops applied to process {process_id} by {user['email']}")
+        
+        return result
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error deleting node: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to delete node: {str(e)}")
+        logger.error(f"Error applying operations: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to apply operations: {str(e)}")
 
 @api_router.patch("/process/{process_id}/workspace")
 async def move_process_to_workspace(process_id: str, data: dict, request: Request):
@@ -3397,9 +4384,11 @@ Return ONLY valid JSON, no markdown or explanations."""
             if not isinstance(refined_data['nodes'], list):
                 raise ValueError("'nodes' must be an array")
             
-            # Post-process nodes: Replace placeholder IDs with proper timestamps
+            # Post-process nodes: Replace placeholder IDs with collision-free ones
             processed_nodes = []
-            timestamp_counter = int(datetime.now(timezone.utc).timestamp() * 1000)
+            node_ids = IdAllocator("node", (
+                n.get("id") for n in refined_data.get("nodes", []) if isinstance(n, dict) and n.get("id")
+            ))
             
             for idx, node in enumerate(refined_data.get("nodes", [])):
                 # Ensure node has required fields
@@ -3409,8 +4398,7 @@ Return ONLY valid JSON, no markdown or explanations."""
                 # If node has a placeholder ID (starts with "new-"), generate a real one
                 node_id = node.get("id", f"new-{idx}")
                 if node_id.startswith("new-"):
-                    node["id"] = f"node-{timestamp_counter}"
-                    timestamp_counter += 1
+                    node["id"] = node_ids.mint()
                 
                 # Ensure type field exists
                 if "type" not in node:
@@ -3424,12 +4412,17 @@ Return ONLY valid JSON, no markdown or explanations."""
             
             logger.info(f"✅ Processed {len(processed_nodes)} nodes")
             
+            # Existing edges may point at nodes the refinement removed or renamed
+            graph = {"nodes": processed_nodes, "edges": process.get("edges", [])}
+            graph_validator.normalize(graph)
+            
             # Check if process was published
             was_published = process.get("status") == "published"
             
             # Update process in database
             update_data = {
-                "nodes": processed_nodes,
+                "nodes": graph["nodes"],
+                "edges": graph["edges"],
                 "updatedAt": datetime.now(timezone.utc).isoformat()
             }
             
@@ -3446,11 +4439,12 @@ Return ONLY valid JSON, no markdown or explanations."""
             
             result = await db.processes.update_one(
                 {"id": process_id},
-                {"$set": update_data}
+                {"$set": update_data, "$inc": {"revision": 1}}
             )
             
             if result.modified_count == 0:
                 logger.warning(f"Process {process_id} not modified (maybe no changes?)")
+            await publish_change(process_id, request_client_id(request), "reload", None)
             
             logger.info(f"✅ Process {process_id} refined successfully by {user['email']}")
             
@@ -3461,7 +4455,8 @@ Return ONLY valid JSON, no markdown or explanations."""
                     "id": process_id,
                     "name": refined_data.get("name", process_context["name"]),
                     "description": refined_data.get("description", process_context["description"]),
-                    "nodes": processed_nodes,
+                    "nodes": graph["nodes"],
+                    "edges": graph["edges"],
                     "status": update_data.get("status", process.get("status"))
                 },
                 "changes": refined_data.get("changes", ["Process updated based on your request"])
@@ -3544,63 +4539,453 @@ async def upload_document(file: UploadFile = File(...)):
         raise HTTPException(status_code=501, detail="Document processing not available")
     
     try:
-        content = await file.read()
-        text = ""
-        
-        if file.filename.endswith('.pdf'):
-            pdf_reader = pypdf.PdfReader(io.BytesIO(content))
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        
-        elif file.filename.endswith('.docx'):
-            doc = docx.Document(io.BytesIO(content))
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-        
-        elif file.filename.endswith(('.png', '.jpg', '.jpeg')):
-            image = Image.open(io.BytesIO(content))
-            text = pytesseract.image_to_string(image)
+        with await spool_upload(file, MAX_DOCUMENT_UPLOAD_BYTES) as upload:
+            # Identical bytes seen before: serve the stored extraction
+            cached = extraction_cache.get_file(upload.fingerprint, upload.extension)
+            if cached:
+                return cached
+            
+            # Parsing/OCR runs in the extraction process pool; the handler only awaits
+            if PDF_RENDER_SUPPORT and upload.extension == 'pdf':
+                # Page-parallel text extraction, cached pages reused, OCR only for scanned pages
+                result = await extract_pdf_pipeline(upload.worker_source(), extraction_executor, extraction_cache)
+            else:
+                text = await extraction_executor.run(extract_text, upload.worker_source(), file.filename)
+                result = {"text": text}
+            
+            if not result.get("failedPages"):
+                extraction_cache.set_file(upload.fingerprint, upload.extension, result)
         
+        return result
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ExtractionQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ExtractionTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to extract text: {str(e)}")
+
+@api_router.post("/upload/stream")
+async def upload_document_stream(file: UploadFile = File(...)):
+    """
+    STREAMING upload endpoint - emits page text as each page finishes (SSE)
+    Process titles are detected incrementally from the pages received so far
+    """
+    if not DOCUMENT_SUPPORT:
+        raise HTTPException(status_code=501, detail="Document processing not available")
+    
+    try:
+        upload = await spool_upload(file, MAX_DOCUMENT_UPLOAD_BYTES)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    filename = file.filename or ""
+    
+    async def single_page():
+        text = await extraction_executor.run(extract_text, upload.worker_source(), filename)
+        yield {"index": 0, "text": text, "ocr": False}
+    
+    async def event_generator():
+        try:
+            cached = extraction_cache.get_file(upload.fingerprint, upload.extension)
+            if cached:
+                detector = IncrementalBoundaryDetector()
+                detector.feed(cached["text"])
+                yield {
+                    "event": "complete",
+                    "data": json.dumps({**cached, "cached": True, **detector.result})
+                }
+                return
+            
+            is_paged = PDF_RENDER_SUPPORT and upload.extension == 'pdf'
+            plan = {"fingerprints": None, "known": {}}
+            if is_paged:
+                source = upload.worker_source()
+                plan = await plan_pdf_extraction(source, extraction_executor, extraction_cache)
+                page_count = plan["pageCount"]
+                pages = iter_pdf_pages(source, extraction_executor, page_count, STREAM_PAGES_PER_JOB, plan["known"])
+            else:
+                page_count = 1
+                pages = single_page()
+            
+            yield {
+                "event": "progress",
+                "data": json.dumps({
+                    "step": "start",
+                    "message": f"📄 Extracting {page_count} page(s)...",
+                    "pageCount": page_count
+                })
+            }
+            
+            detector = IncrementalBoundaryDetector()
+            received: Dict[int, str] = {}
+            ocr_pages: List[int] = []
+            failed_pages: List[int] = []
+            fresh: Dict[str, str] = {}
+            next_index = 0
+            char_count = 0
+            
+            async for page in pages:
+                index = page["index"]
+                received[index] = page["text"]
+                char_count += len(page["text"])
+                if page["ocr"]:
+                    ocr_pages.append(index + 1)
+                if page.get("failed"):
+                    failed_pages.append(index + 1)
+                entry = fresh_page_entry(plan, page)
+                if entry:
+                    fresh[entry[0]] = entry[1]
+                
+                yield {
+                    "event": "page",
+                    "data": json.dumps({
+                        "page": index + 1,
+                        "text": page["text"],
+                        "ocr": page["ocr"],
+                        "pagesDone": len(received),
+                        "pageCount": page_count,
+                        "charCount": char_count
+                    })
+                }
+                
+                # Boundary detection runs over the in-order prefix received so far
+                while next_index in received:
+                    if detector.feed(format_page(next_index, received[next_index])):
+                        yield {
+                            "event": "processes",
+                            "data": json.dumps(detector.result)
+                        }
+                    next_index += 1
+            
+            result = {"text": assemble_pages(received) if is_paged else received.get(0, "")}
+            if is_paged:
+                result.update({
+                    "pageCount": page_count,
+                    "ocrPages": sorted(ocr_pages),
+                    "cachedPages": len(plan["known"]),
+                    "failedPages": sorted(failed_pages)
+                })
+            extraction_cache.set_pages(fresh)
+            if not failed_pages:
+                extraction_cache.set_file(upload.fingerprint, upload.extension, result)
+            
+            yield {
+                "event": "complete",
+                "data": json.dumps({**result, **detector.result})
+            }
+        except Exception as e:
+            logger.error(f"Streaming extraction failed: {e}")
+            yield {
+                "event": "error",
+                "data": json.dumps({"error": str(e)})
+            }
+        finally:
+            upload.close()
+    
+    return EventSourceResponse(event_generator())
+
+# ============ BPMN Import / Export ============
+
+BPMN_IMPORT_BATCH_SIZE = 25  # Plain .bpmn files parsed per worker job in bulk imports
+BPMN_IMPORT_CONCURRENCY = 4  # Worker jobs in flight per bulk import (stays below the queue limit)
+
+@api_router.post("/process/import/bpmn", response_model=Dict[str, Any])
+async def import_bpmn_model(file: UploadFile = File(...)):
+    """
+    Import a BPMN 2.0 model (Camunda, Signavio, bpmn.io) deterministically, without the LLM.
+    Returns the /process/parse result format; nothing is saved until POST /process.
+    """
+    try:
+        with await spool_upload(file, MAX_DOCUMENT_UPLOAD_BYTES) as upload:
+            processes = await extraction_executor.run(import_bpmn, upload.worker_source(), file.filename)
+        return {
+            "multipleProcesses": len(processes) > 1,
+            "processes": processes,
+            "structured": {"format": "bpmn", "confidence": 1.0},
+        }
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except BpmnImportError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ExtractionQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ExtractionTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to import BPMN model: {str(e)}")
+
+@api_router.post("/process/import/bpmn/bulk")
+async def import_bpmn_bulk(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    workspaceId: Optional[str] = Form(None)
+):
+    """
+    Bulk migration: import many BPMN models (individual files and/or .zip archives)
+    and save each process as a draft in the workspace. Per-file failures are reported
+    without aborting the rest.
+    """
+    user = await require_auth(request)
+    user_id = user.get('id')
+    
+    try:
+        if workspaceId:
+            workspace = await db.workspaces.find_one({"id": workspaceId, "userId": user_id})
+            if not workspace:
+                raise HTTPException(status_code=404, detail="Workspace not found")
         else:
-            text = content.decode('utf-8')
+            workspaceId = await get_default_workspace_id(user_id)
+        
+        with ExitStack() as uploads:
+            archives = []
+            models = []
+            spooled_bytes = 0
+            for file in files:
+                upload = uploads.enter_context(await spool_upload(file, MAX_DOCUMENT_UPLOAD_BYTES))
+                spooled_bytes += upload.size
+                if spooled_bytes > MAX_BULK_UPLOAD_BYTES:  # Chunked bodies carry no Content-Length for the middleware
+                    raise UploadTooLargeError(MAX_BULK_UPLOAD_BYTES)
+                if upload.extension == 'zip':
+                    archives.append(upload.worker_source())
+                else:
+                    models.append((upload.worker_source(), file.filename))
+            
+            jobs = [(import_bpmn_archive, archive) for archive in archives]
+            jobs += [
+                (import_bpmn_batch, models[i:i + BPMN_IMPORT_BATCH_SIZE])
+                for i in range(0, len(models), BPMN_IMPORT_BATCH_SIZE)
+            ]
+            semaphore = asyncio.Semaphore(BPMN_IMPORT_CONCURRENCY)
+            
+            async def run_job(fn, argument):
+                async with semaphore:
+                    return await extraction_executor.run(fn, argument)
+            
+            batches = await asyncio.gather(*(run_job(fn, argument) for fn, argument in jobs))
+        
+        now = datetime.now(timezone.utc).isoformat()
+        docs = []
+        imported = []
+        failed = []
+        systems = []
+        for file_result in (result for batch in batches for result in batch):
+            if file_result.get("error"):
+                failed.append({"file": file_result["file"], "error": file_result["error"]})
+                continue
+            for parsed in file_result["processes"]:
+                process = Process(
+                    name=parsed["processName"],
+                    description=parsed["description"],
+                    userId=user_id,
+                    workspaceId=workspaceId,
+                    nodes=parsed["nodes"],
+                    edges=parsed["edges"],
+                    actors=parsed["actors"],
+                )
+                doc = process.model_dump()
+                doc['createdAt'] = now
+                doc['updatedAt'] = now
+                docs.append(doc)
+                systems.extend(local_extractor.systems_from_process(doc))
+                imported.append({"file": file_result["file"], "id": process.id, "name": process.name, "nodes": len(process.nodes)})
+        
+        if docs:
+            await db.processes.insert_many(docs, ordered=False)
+            await learn_workspace_vocabulary(workspaceId, systems)
+        
+        logger.info(f"📥 Bulk BPMN import: {len(imported)} processes saved, {len(failed)} files failed")
+        return {"workspaceId": workspaceId, "imported": imported, "failed": failed}
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (BpmnImportError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ExtractionQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ExtractionTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Bulk BPMN import failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/process/{process_id}/export/bpmn")
+async def export_process_bpmn(process_id: str, request: Request):
+    """Download a process as BPMN 2.0 XML - accessible if owned by user or if published"""
+    try:
+        process = await db.processes.find_one({"id": process_id}, {"_id": 0})
+        if not process:
+            raise HTTPException(status_code=404, detail="Process not found")
         
-        return {"text": text}
+        user = await get_current_user(request)
+        is_owner = user and user.get('id') == process.get('userId')
+        is_published = process.get('status') == 'published'
+        if not is_owner and not is_published:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        filename = re.sub(r'[^A-Za-z0-9_-]+', '-', process.get('name') or 'process').strip('-') or 'process'
+        return Response(
+            content=export_bpmn(process),
+            media_type="application/xml",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.bpmn"'}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to extract text: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/transcribe")
 async def transcribe_audio(file: UploadFile = File(...)):
     """Transcribe audio using OpenAI Whisper via Emergent LLM key"""
-    if not OPENAI_AVAILABLE:
+    if not transcription_service.available:
         raise HTTPException(status_code=501, detail="OpenAI transcription not available")
     
     try:
-        # Get Emergent LLM key
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not api_key:
-            raise HTTPException(status_code=500, detail="EMERGENT_LLM_KEY not configured")
-        
-        # Initialize OpenAI client
-        client = OpenAI(api_key=api_key)
-        
-        # Read audio file
-        audio_content = await file.read()
-        
-        # Create a temporary file-like object
-        audio_file = io.BytesIO(audio_content)
-        audio_file.name = file.filename or "audio.webm"
-        
-        # Transcribe using Whisper
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file
-        )
-        
-        return {"text": transcript.text}
+        # Stream audio into a size-bounded spool instead of reading it all into memory
+        with await spool_upload(file, MAX_AUDIO_UPLOAD_BYTES) as upload:
+            # Long recordings are split on silence and transcribed concurrently
+            return await transcription_service.transcribe(upload, file.filename or "audio.webm")
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Transcription error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to transcribe audio: {str(e)}")
 
+@api_router.post("/transcribe/stream")
+async def transcribe_audio_stream(file: UploadFile = File(...)):
+    """
+    Transcribe audio with Server-Sent Events progress:
+    - segments: how many segments the recording was split into
+    - segment: text of each segment as it finishes (may arrive out of order)
+    - complete: stitched transcript
+    """
+    if not transcription_service.available:
+        raise HTTPException(status_code=501, detail="OpenAI transcription not available")
+    
+    try:
+        upload = await spool_upload(file, MAX_AUDIO_UPLOAD_BYTES)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    filename = file.filename or "audio.webm"
+    
+    async def event_generator():
+        try:
+            async for event in transcription_service.iter_transcription(upload, filename):
+                name = event.pop("event")
+                yield {
+                    "event": name,
+                    "data": json.dumps(event)
+                }
+        except Exception as e:
+            logger.error(f"Streaming transcription failed: {e}")
+            yield {
+                "event": "error",
+                "data": json.dumps({"error": str(e)})
+            }
+        finally:
+            upload.close()
+    
+    return EventSourceResponse(event_generator())
+
+def get_transcriber():
+    """Transcriber used by the live endpoint (overridable, e.g. with a local stand-in in tests)"""
+    return transcription_service
+
+@api_router.websocket("/transcribe/ws")
+async def transcribe_live(websocket: WebSocket, transcriber=Depends(get_transcriber)):
+    """
+    Live transcription while the user is still recording.
+    
+    Client -> server:
+    - {"type": "start", "format": "pcm16" | "webm" | ..., "sampleRate": 16000}
+    - binary audio chunks
+    - {"type": "stop"}
+    
+    Server -> client:
+    - {"type": "ready"}
+    - {"type": "partial", "window", "text", "transcript"} for every transcribed window
+    - {"type": "processes", "process_count", "process_titles", "high_confidence"} when boundaries change
+    - {"type": "final", "text", "durationSeconds", ...boundaries}
+    - {"type": "error", "error"}
+    """
+    await websocket.accept()
+    worker = None
+    try:
+        start = await websocket.receive_json()
+        if start.get("type") != "start":
+            raise ValueError("First message must be {\"type\": \"start\"}")
+        session = LiveTranscriptionSession(
+            transcriber,
+            audio_format=start.get("format", "pcm16"),
+            sample_rate=int(start.get("sampleRate", SAMPLE_RATE)),
+            max_container_bytes=MAX_AUDIO_UPLOAD_BYTES,
+        )
+        detector = IncrementalBoundaryDetector()
+        windows: asyncio.Queue = asyncio.Queue()
+        
+        async def transcribe_windows():
+            # Windows are transcribed in order so each one can use the transcript so far as context
+            while True:
+                window = await windows.get()
+                if window is None:
+                    return
+                text = await session.transcribe_window(window)
+                await websocket.send_json({
+                    "type": "partial",
+                    "window": len(session.texts) - 1,
+                    "text": text,
+                    "transcript": session.transcript
+                })
+                if text and detector.feed(text):
+                    await websocket.send_json({"type": "processes", **detector.result})
+        
+        worker = asyncio.create_task(transcribe_windows())
+        await websocket.send_json({"type": "ready"})
+        logger.info(f"🎙️ Live transcription started ({session.audio_format}, {session.sample_rate}Hz)")
+        
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                for window in await session.add_audio(message["bytes"]):
+                    windows.put_nowait(window)
+            elif message.get("text") and json.loads(message["text"]).get("type") == "stop":
+                break
+            if worker.done():
+                break  # Surface transcription errors without waiting for stop
+        
+        for window in session.finish():
+            windows.put_nowait(window)
+        windows.put_nowait(None)
+        await worker
+        
+        await websocket.send_json({
+            "type": "final",
+            "text": session.transcript,
+            "durationSeconds": session.duration_seconds,
+            **detector.result
+        })
+        logger.info(f"✅ Live transcription finished: {session.duration_seconds}s, {session.windows_cut} windows")
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("🔌 Live transcription client disconnected")
+    except Exception as e:
+        logger.error(f"Live transcription error: {e}")
+        try:
+            await websocket.send_json({"type": "error", "error": str(e)})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        if worker and not worker.done():
+            worker.cancel()
+
 # ============ Share Endpoints ============
 
 @api_router.post("/process/{process_id}/share", response_model=Share)
@@ -3750,35 +5135,40 @@ async def revoke_share(token: str, request: Request):
         logger.error(f"Error revoking share: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to revoke share: {str(e)}")
 
+async def load_active_share(token: str) -> Dict[str, Any]:
+    """Share for a token; 404 if unknown, 403 if revoked or expired"""
+    # Get share by token
+    share = await db.shares.find_one({"token": token}, {"_id": 0})
+    if not share:
+        raise HTTPException(status_code=404, detail="Share not found or invalid token")
+    
+    # Convert datetime strings if needed and ensure timezone awareness
+    for date_field in ['createdAt', 'updatedAt', 'expiresAt', 'lastAccessedAt', 'revokedAt']:
+        if isinstance(share.get(date_field), str):
+            dt = datetime.fromisoformat(share[date_field])
+            # Make timezone-aware if naive
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            share[date_field] = dt
+        elif isinstance(share.get(date_field), datetime) and share[date_field].tzinfo is None:
+            # If already datetime but naive, make it aware
+            share[date_field] = share[date_field].replace(tzinfo=timezone.utc)
+    
+    # Check if share is active
+    if not share.get("isActive", True):
+        raise HTTPException(status_code=403, detail="This share has been revoked")
+    
+    # Check if share has expired
+    if share.get("expiresAt"):
+        if datetime.now(timezone.utc) > share["expiresAt"]:
+            raise HTTPException(status_code=403, detail="This share has expired")
+    return share
+
 @api_router.get("/view/{token}")
 async def view_shared_process(token: str):
     """Access a shared process via token (public endpoint, no auth required)"""
     try:
-        # Get share by token
-        share = await db.shares.find_one({"token": token}, {"_id": 0})
-        if not share:
-            raise HTTPException(status_code=404, detail="Share not found or invalid token")
-        
-        # Convert datetime strings if needed and ensure timezone awareness
-        for date_field in ['createdAt', 'updatedAt', 'expiresAt', 'lastAccessedAt', 'revokedAt']:
-            if isinstance(share.get(date_field), str):
-                dt = datetime.fromisoformat(share[date_field])
-                # Make timezone-aware if naive
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                share[date_field] = dt
-            elif isinstance(share.get(date_field), datetime) and share[date_field].tzinfo is None:
-                # If already datetime but naive, make it aware
-                share[date_field] = share[date_field].replace(tzinfo=timezone.utc)
-        
-        # Check if share is active
-        if not share.get("isActive", True):
-            raise HTTPException(status_code=403, detail="This share has been revoked")
-        
-        # Check if share has expired
-        if share.get("expiresAt"):
-            if datetime.now(timezone.utc) > share["expiresAt"]:
-                raise HTTPException(status_code=403, detail="This share has expired")
+        share = await load_active_share(token)
         
         # Get the process
         process = await db.processes.find_one({"id": share["processId"]}, {"_id": 0})
@@ -3820,9 +5210,213 @@ async def view_shared_process(token: str):
         logger.error(f"Error accessing shared process: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to access shared process: {str(e)}")
 
+# ============ Real-time Collaboration ============
+
+COLLAB_PROJECTION = {"_id": 0, "id": 1, "userId": 1, "status": 1, "version": 1, "revision": 1, "updatedAt": 1, "nodes": 1, "edges": 1}
+COLLAB_ACCESS_PROJECTION = {"_id": 0, "id": 1, "userId": 1, "status": 1}
+COLLAB_AUTH_TIMEOUT_SECONDS = 10
+
+async def get_socket_user(websocket: WebSocket, token: Optional[str]) -> Optional[Dict]:
+    """Session cookie / Authorization header, or the token from the first message (browsers can't set headers on sockets)"""
+    user = await get_current_user(websocket)
+    if user or not isinstance(token, str) or not token:
+        return user
+    payload = decode_access_token(token)
+    if not payload or not payload.get("sub"):
+        return None
+    return await db.users.find_one({"id": payload["sub"]}, {"_id": 0, "password": 0})
+
+async def collaboration_access(process: Dict[str, Any], user: Optional[Dict], share_token: Any) -> Tuple[bool, bool]:
+    """(can view, can edit): the owner edits, a published process is public, a share grants its level"""
+    if user and user.get("id") == process.get("userId"):
+        return True, True
+    if isinstance(share_token, str) and share_token:
+        try:
+            share = await load_active_share(share_token)
+            if share["processId"] == process["id"]:
+                return True, share["accessLevel"] == "edit"
+        except HTTPException:
+            pass  # Revoked or expired: only what the process itself allows
+    return process.get("status") == "published", False
+
+@api_router.websocket("/process/{process_id}/ws")
+async def process_collaboration(websocket: WebSocket, process_id: str):
+    """
+    Live editing channel for one process. Owners and holders of an "edit" share
+    can edit; viewers of a published process or a view/comment share only receive.
+    Credentials travel in the first message, never in the URL (which ends up in
+    access logs and browser history). Refusals close with 4400 (no auth message),
+    4403 (no access) or 4404 (no such process); clients should not reconnect. Access
+    is checked again on every message (clients ping every 25 s), so a revoked share
+    or an unpublished process closes the socket with 4403.
+    
+    Client -> server:
+    - {"type": "auth", "token", "share", "clientId"} first; all optional. clientId is
+      the tab id echoed in broadcasts so a tab can skip its own edits
+    - {"type": "ops", "ops": [...], "revision": n, "requestId"} (same ops as POST /process/{id}/ops)
+    - {"type": "sync"} to get a fresh snapshot (e.g. after a revision gap)
+    - {"type": "ping"}
+    
+    Server -> client:
+    - {"type": "snapshot", "revision", "version", "nodes", "edges", "canEdit", "connectionId"}
+    - {"type": "ops" | "patch" | "reload", "revision", "clientId", ...} for every accepted write
+    - {"type": "presence", "event": "join" | "leave", "connectionId", "clientId", "name"}
+    - {"type": "ack", "requestId", "revision", "version", "addedNodeIds", "addedEdgeIds"}
+    - {"type": "conflict", "requestId", "revision", "nodes", "edges"} when the sent revision is stale
+    - {"type": "error", "requestId", "message", "index"}
+    """
+    # Close codes only reach the client after the handshake, so accept first
+    await websocket.accept()
+    try:
+        auth = await asyncio.wait_for(websocket.receive_json(), COLLAB_AUTH_TIMEOUT_SECONDS)
+    except WebSocketDisconnect:
+        return
+    except Exception:
+        auth = None
+    if not isinstance(auth, dict) or auth.get("type") != "auth":
+        await websocket.close(code=4400, reason="Expected an auth message")
+        return
+    
+    connection_id = str(uuid.uuid4())  # Room key: never client-supplied, so one socket can't evict another
+    client_id = auth.get("clientId") if isinstance(auth.get("clientId"), str) else None
+    process = await db.processes.find_one({"id": process_id}, COLLAB_PROJECTION)
+    if not process:
+        await websocket.close(code=4404, reason="Process not found")
+        return
+    user = await get_socket_user(websocket, auth.get("token"))
+    share_token = auth.get("share")
+    can_view, can_edit = await collaboration_access(process, user, share_token)
+    if not can_view:
+        await websocket.close(code=4403, reason="Access denied")
+        return
+    
+    name = (user or {}).get("name") or "Guest"
+    
+    connection = None
+    
+    def reply(message: Dict[str, Any]):
+        """Queue a frame behind any broadcasts; the connection's writer is the only sender"""
+        if not connection.send(json.dumps(message, default=str)):
+            raise WebSocketDisconnect(SLOW_CONSUMER_CLOSE_CODE)
+    
+    async def send_snapshot():
+        current = await db.processes.find_one({"id": process_id}, COLLAB_PROJECTION)
+        reply({
+            "type": "snapshot",
+            "connectionId": connection_id,
+            "canEdit": can_edit,
+            "revision": current.get("revision", 0),
+            "version": current.get("version", 1),
+            "nodes": current.get("nodes", []),
+            "edges": current.get("edges", [])
+        })
+    
+    try:
+        # Join before the snapshot so no accepted write falls between the two
+        connection = await collaboration_hub.join(process_id, connection_id, websocket)
+        await send_snapshot()
+        await collaboration_hub.publish(process_id, {
+            "type": "presence", "event": "join", "connectionId": connection_id, "clientId": client_id, "name": name
+        })
+        logger.info(f"🤝 {name} joined process {process_id} ({'edit' if can_edit else 'view'})")
+        
+        while True:
+            message = await websocket.receive_json()
+            kind = message.get("type")
+            request_id = message.get("requestId")
+            # Shares get revoked or expire and processes get unpublished while sockets stay open
+            current = await db.processes.find_one({"id": process_id}, {"_id": 0} if kind == "ops" else COLLAB_ACCESS_PROJECTION)
+            if not current:
+                reply({"type": "error", "requestId": request_id, "message": "Process not found"})
+                await connection.drain(4404)
+                return
+            can_view, can_edit = await collaboration_access(current, user, share_token)
+            if not can_view:
+                reply({"type": "error", "requestId": request_id, "message": "Access denied"})
+                await connection.drain(4403)
+                return
+            if kind == "ping":
+                reply({"type": "pong"})
+            elif kind == "sync":
+                await send_snapshot()
+            elif kind == "ops":
+                if not can_edit:
+                    reply({"type": "error", "requestId": request_id, "message": "Read-only access"})
+                    continue
+                ops = message.get("ops")
+                if not isinstance(ops, list) or not 0 < len(ops) <= MAX_OPS:
+                    reply({"type": "error", "requestId": request_id, "message": f"ops must hold 1 to {MAX_OPS} operations"})
+                    continue
+                expected = message.get("revision")
+                try:
+                    result = await commit_process_operations(
+                        current, ops, expected if isinstance(expected, int) else None, (user or {}).get("id"), client_id
+                    )
+                except HTTPException as e:
+                    if e.status_code == 409:
+                        reply({"type": "conflict", "requestId": request_id, **e.detail})
+                    elif isinstance(e.detail, dict):
+                        reply({"type": "error", "requestId": request_id, **e.detail})
+                    else:
+                        reply({"type": "error", "requestId": request_id, "message": e.detail})
+                    continue
+                reply({
+                    "type": "ack",
+                    "requestId": request_id,
+                    "revision": result["revision"],
+                    "version": result["version"],
+                    "addedNodeIds": result["addedNodeIds"],
+                    "addedEdgeIds": result["addedEdgeIds"]
+                })
+            else:
+                reply({"type": "error", "requestId": request_id, "message": f"Unknown message type {kind!r}"})
+    except WebSocketDisconnect:
+        logger.info(f"🔌 {name} left process {process_id}")
+    except Exception as e:
+        logger.error(f"Collaboration channel error: {e}")
+        if connection is not None:
+            connection.send(json.dumps({"type": "error", "message": str(e)}))
+            await connection.drain(1011)
+        else:
+            try:
+                await websocket.close(code=1011)
+            except Exception:
+                pass
+    finally:
+        collaboration_hub.leave(process_id, connection_id)
+        if connection is not None:
+            await connection.drain()
+        await collaboration_hub.publish(process_id, {
+            "type": "presence", "event": "leave", "connectionId": connection_id, "clientId": client_id, "name": name
+        })
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Declared-size limits checked before the multipart body is parsed
+UPLOAD_SIZE_LIMITS = {
+    "/api/upload": MAX_DOCUMENT_UPLOAD_BYTES,
+    "/api/upload/stream": MAX_DOCUMENT_UPLOAD_BYTES,
+    "/api/transcribe": MAX_AUDIO_UPLOAD_BYTES,
+    "/api/transcribe/stream": MAX_AUDIO_UPLOAD_BYTES,
+    "/api/process/import/bpmn": MAX_DOCUMENT_UPLOAD_BYTES,
+    "/api/process/import/bpmn/bulk": MAX_BULK_UPLOAD_BYTES,
+}
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # Boundaries and part headers
+
+@app.middleware("http")
+async def enforce_upload_size_limits(request: Request, call_next):
+    """Reject oversized uploads from Content-Length before any body is read"""
+    limit = UPLOAD_SIZE_LIMITS.get(request.url.path)
+    content_length = request.headers.get("content-length")
+    if limit and content_length and content_length.isdigit():
+        if int(content_length) > limit + MULTIPART_OVERHEAD_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": str(UploadTooLargeError(limit))}
+            )
+    return await call_next(request)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -3840,6 +5434,8 @@ async def startup_db_indexes():
         await db.processes.create_index("workspaceId")
         await db.processes.create_index([("userId", 1), ("isGuest", 1)])
         await db.processes.create_index([("userId", 1), ("status", 1)])
+        await db.processes.create_index([("userId", 1), ("updatedAt", -1), ("id", -1)])  # Summary keyset pages
+        await db.processes.create_index("id")  # Search reads its page of results by id
         
         # Workspace indexes
         await db.workspaces.create_index("userId")
@@ -3849,6 +5445,14 @@ async def startup_db_indexes():
         await db.users.create_index("email", unique=True)
         await db.users.create_index("id", unique=True)
         
+        # Learned per-workspace vocabulary
+        await db[VOCABULARY_COLLECTION].create_index(
+            [("workspaceId", 1), ("kind", 1), ("key", 1)], unique=True
+        )
+        
+        # Version history: one entry per (process, version)
+        await db[VERSION_COLLECTION].create_index([("processId", 1), ("version", -1)], unique=True)
+        
         # Shares indexes for performance
         await db.shares.create_index("token", unique=True)
         await db.shares.create_index("processId")
@@ -3858,6 +5462,18 @@ async def startup_db_indexes():
     except Exception as e:
         logger.warning(f"⚠️ Error creating indexes (may already exist): {e}")
 
+@app.on_event("startup")
+async def start_collaboration_hub():
+    """Connect the collaboration publisher/subscriber; a worker without sockets still publishes its writes"""
+    await collaboration_hub.start()
+
+@app.on_event("startup")
+async def load_token_encoding_in_background():
+    """tiktoken may download its encoding: never on the event loop, never blocking startup"""
+    asyncio.get_running_loop().run_in_executor(None, load_token_encoding)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
+    extraction_executor.shutdown()
+    await collaboration_hub.close()
@@ -0,0 +1,350 @@
+"""
+Monte Carlo Cycle-Time Simulation
+Features:
+- Triangular duration per step from timeEstimate ("5-10 min") or min/mode/max overrides
+- Decision branches sampled per trial (equal split unless probabilities are given)
+- Parallel forks and joins: a step starts when its slowest active predecessor finishes
+- Percentile cycle times, join wait times and per-step critical-path contributions
+All trials of a step are computed at once with NumPy, so the Python loop is over
+steps only: 100k trials of a 30-step process take a few hundred milliseconds.
+Retry loops (back edges) are left out, as in graph_analysis.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from graph_analysis import format_minutes, parse_duration_range
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRIALS = 100_000
+MAX_TRIALS = 1_000_000
+SAMPLE_DTYPE = np.float32  # Minute resolution is plenty; halves memory traffic
+CHUNK_CELLS = 4_000_000  # trials x steps sampled per batch (~16 MB per matrix)
+POINT_ESTIMATE_LOW = 0.75  # "10 min" becomes triangular(7.5, 10, 15): overruns are likelier than
+POINT_ESTIMATE_HIGH = 1.5  # finishing early
+PERCENTILES = (10, 50, 80, 90, 95, 99)
+HISTOGRAM_BINS = 20
+
+
+class SimulationError(Exception):
+    """Raised when a process cannot be simulated"""
+
+
+@dataclass
+class StepDistribution:
+    low: float
+    mode: float
+    high: float
+    source: str  # "override", "estimate" or "none"
+
+
+def _distribution(node: Dict[str, Any], override: Optional[Dict[str, Any]]) -> StepDistribution:
+    bounds = parse_duration_range(node.get("timeEstimate"))
+    if bounds is None:
+        low = mode = high = 0.0
+        source = "none"
+    elif bounds[0] < bounds[1]:
+        low, mode, high = bounds[0], (bounds[0] + bounds[1]) / 2, bounds[1]
+        source = "estimate"
+    else:
+        low, mode, high = bounds[0] * POINT_ESTIMATE_LOW, bounds[0], bounds[0] * POINT_ESTIMATE_HIGH
+        source = "estimate"
+
+    if override:
+        values = {key: float(override[key]) for key in ("min", "mode", "max") if override.get(key) is not None}
+        if any(value < 0 for value in values.values()):
+            raise SimulationError(f"Negative duration override for step {node.get('id')}")
+        if values:
+            mode = values.get("mode", mode if source != "none" else values.get("min", values.get("max")))
+            low = values.get("min", min(low, mode) if source != "none" else mode)
+            high = values.get("max", max(high, mode) if source != "none" else mode)
+            source = "override"
+    if not low <= mode <= high:
+        raise SimulationError(f"Step {node.get('id')} needs min <= mode <= max")
+    return StepDistribution(low, mode, high, source)
+
+
+class SimulationEngine:
+    def simulate(
+        self,
+        process: Dict[str, Any],
+        trials: int = DEFAULT_TRIALS,
+        seed: Optional[int] = None,
+        overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+        branch_probabilities: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        nodes = [n for n in process.get("nodes") or [] if isinstance(n, dict) and n.get("id") not in (None, "")]
+        if not nodes:
+            raise SimulationError("Process has no steps to simulate")
+        if not 1 <= trials <= MAX_TRIALS:
+            raise SimulationError(f"trials must be between 1 and {MAX_TRIALS}")
+
+        ids = [str(node["id"]) for node in nodes]
+        overrides = overrides or {}
+        distributions = [_distribution(node, overrides.get(node_id)) for node, node_id in zip(nodes, ids)]
+        flow, dependencies, ignored = self._graph(nodes, ids, process.get("edges") or [])
+        order = self._order(len(nodes), flow + dependencies)
+        branches = self._branches(nodes, flow, branch_probabilities or {})
+
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % (2 ** 32))
+        rng = np.random.default_rng(seed)
+        count = len(nodes)
+        chunk = max(1, min(trials, CHUNK_CELLS // count))
+
+        cycle_times = np.empty(trials)
+        active_sum = np.zeros(count)
+        duration_sum = np.zeros(count)
+        critical_sum = np.zeros(count)
+        contribution_sum = np.zeros(count)
+        wait_sum = np.zeros(count)
+        wait_count = np.zeros(count)
+        done = 0
+        while done < trials:
+            size = min(chunk, trials - done)
+            batch = self._run(rng, size, distributions, flow, dependencies, order, branches)
+            cycle_times[done:done + size] = batch["cycle"]
+            active_sum += batch["active"].sum(axis=1)
+            duration_sum += batch["durations"].sum(axis=1, dtype=np.float64)
+            critical_sum += batch["onPath"].sum(axis=1)
+            contribution_sum += np.where(batch["onPath"], batch["durations"], 0).sum(axis=1, dtype=np.float64)
+            wait_sum += batch["wait"].sum(axis=1, dtype=np.float64)
+            wait_count += (batch["wait"] > 0).sum(axis=1)
+            done += size
+
+        mean_cycle = float(cycle_times.mean(dtype=np.float64))
+        percentiles = np.percentile(cycle_times, PERCENTILES)
+        counts, bin_edges = np.histogram(cycle_times, bins=HISTOGRAM_BINS)
+        steps = []
+        for i, node in enumerate(nodes):
+            contribution = float(contribution_sum[i] / trials)
+            steps.append({
+                "id": ids[i],
+                "title": node.get("title", ""),
+                "distribution": {
+                    "min": distributions[i].low,
+                    "mode": distributions[i].mode,
+                    "max": distributions[i].high,
+                    "source": distributions[i].source,
+                },
+                "activationRate": float(active_sum[i] / trials),
+                "meanDuration": float(duration_sum[i] / active_sum[i]) if active_sum[i] else 0.0,
+                "criticality": float(critical_sum[i] / trials),  # Share of trials on the critical path
+                "meanContribution": contribution,
+                "contributionShare": contribution / mean_cycle if mean_cycle else 0.0,
+                "meanWait": float(wait_sum[i] / wait_count[i]) if wait_count[i] else 0.0,
+                "waitRate": float(wait_count[i] / trials),
+            })
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(
+            f"🎲 Simulated {trials} trials over {count} steps in {elapsed_ms}ms: "
+            f"P50 {format_minutes(float(percentiles[1]))}, P90 {format_minutes(float(percentiles[3]))}"
+        )
+        return {
+            "trials": trials,
+            "seed": seed,
+            "unit": "minutes",
+            "cycleTime": {
+                "mean": mean_cycle,
+                "std": float(cycle_times.std()),
+                "min": float(cycle_times.min()),
+                "max": float(cycle_times.max()),
+                **{f"p{pct}": float(value) for pct, value in zip(PERCENTILES, percentiles)},
+                "labels": {f"p{pct}": format_minutes(float(value)) for pct, value in zip(PERCENTILES, percentiles)},
+            },
+            "histogram": {"binEdges": bin_edges.tolist(), "counts": counts.tolist()},
+            "nodes": steps,
+            "criticalNodes": [step["id"] for step in sorted(steps, key=lambda s: -s["meanContribution"]) if step["meanContribution"] > 0],
+            "unestimatedNodes": [ids[i] for i, d in enumerate(distributions) if d.source == "none"],
+            "ignoredEdges": ignored,
+            "elapsedMs": elapsed_ms,
+        }
+
+    def _graph(self, nodes, ids, edges) -> Tuple[List[Tuple[int, int, Optional[str]]], List[Tuple[int, int, None]], int]:
+        """Flow edges (source, target, edge id) and dependency edges, minus retry loops"""
+        index = {node_id: i for i, node_id in enumerate(ids)}
+        flow = []
+        seen = set()
+        for edge in edges:
+            if not isinstance(edge, dict):
+                continue
+            source, target = index.get(str(edge.get("source"))), index.get(str(edge.get("target")))
+            if source is None or target is None or source == target or (source, target) in seen:
+                continue
+            seen.add((source, target))
+            flow.append((source, target, str(edge["id"]) if edge.get("id") is not None else None))
+        if not flow:
+            # No explicit edges: steps run in list order
+            flow = [(i, i + 1, None) for i in range(len(nodes) - 1)]
+        dependencies = []
+        for target, node in enumerate(nodes):
+            for dependency in node.get("dependencies") or []:
+                source = index.get(str(dependency))
+                if source is not None and source != target and (source, target) not in seen:
+                    seen.add((source, target))
+                    dependencies.append((source, target, None))
+
+        # Drop DFS back edges so every trial runs over a DAG
+        outgoing: List[List[Tuple[int, int]]] = [[] for _ in nodes]
+        for position, (source, target, _) in enumerate(flow + dependencies):
+            outgoing[source].append((target, position))
+        back = set()
+        state = [0] * len(nodes)
+        for root in range(len(nodes)):
+            if state[root]:
+                continue
+            state[root] = 1
+            stack = [(root, iter(outgoing[root]))]
+            while stack:
+                node, children = stack[-1]
+                for child, position in children:
+                    if state[child] == 1:
+                        back.add(position)
+                    elif state[child] == 0:
+                        state[child] = 1
+                        stack.append((child, iter(outgoing[child])))
+                        break
+                else:
+                    state[node] = 2
+                    stack.pop()
+        kept_flow = [edge for position, edge in enumerate(flow) if position not in back]
+        kept_dependencies = [edge for position, edge in enumerate(dependencies, len(flow)) if position not in back]
+        return kept_flow, kept_dependencies, len(back)
+
+    def _order(self, count: int, edges) -> List[int]:
+        indegree = [0] * count
+        outgoing: List[List[int]] = [[] for _ in range(count)]
+        for source, target, _ in edges:
+            outgoing[source].append(target)
+            indegree[target] += 1
+        order = [i for i in range(count) if indegree[i] == 0]
+        for node in order:
+            for child in outgoing[node]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    order.append(child)
+        return order
+
+    def _branches(self, nodes, flow, probabilities: Dict[str, float]) -> Dict[int, Tuple[Dict[Tuple[int, int], int], np.ndarray]]:
+        """Decision index -> (flow edge -> branch number, cumulative branch probabilities)"""
+        outgoing: Dict[int, List[Tuple[int, int, Optional[str]]]] = {}
+        for edge in flow:
+            outgoing.setdefault(edge[0], []).append(edge)
+        branches = {}
+        for decision, edges in outgoing.items():
+            if nodes[decision].get("type") != "decision" or len(edges) < 2:
+                continue  # Any other fork runs all of its branches in parallel
+            weights = []
+            for _, _, edge_id in edges:
+                weight = probabilities.get(edge_id) if edge_id is not None else None
+                if weight is not None and weight < 0:
+                    raise SimulationError(f"Negative branch probability for edge {edge_id}")
+                weights.append(weight)
+            given = sum(w for w in weights if w is not None)
+            missing = [i for i, w in enumerate(weights) if w is None]
+            if given > 1 + 1e-9 and missing:
+                raise SimulationError(f"Branch probabilities of decision {nodes[decision].get('id')} exceed 1")
+            # Branches without a probability share whatever is left
+            share = (1 - given) / len(missing) if missing else 0.0
+            weights = np.array([share if w is None else w for w in weights], dtype=float)
+            if weights.sum() <= 0:
+                raise SimulationError(f"Branch probabilities of decision {nodes[decision].get('id')} sum to 0")
+            cumulative = np.cumsum(weights / weights.sum())
+            cumulative[-1] = 1.0
+            branches[decision] = ({(source, target): i for i, (source, target, _) in enumerate(edges)}, cumulative)
+        return branches
+
+    def _run(self, rng, size: int, distributions: List[StepDistribution], flow, dependencies, order, branches) -> Dict[str, np.ndarray]:
+        """One batch of trials; every matrix is (steps, trials) so each step's trials are contiguous"""
+        count = len(distributions)
+        low = np.array([d.low for d in distributions], dtype=SAMPLE_DTYPE)[:, None]
+        mode = np.array([d.mode for d in distributions], dtype=SAMPLE_DTYPE)[:, None]
+        high = np.array([d.high for d in distributions], dtype=SAMPLE_DTYPE)[:, None]
+
+        # Inverse-CDF triangular sampling; zero-width distributions stay constant
+        width = high - low
+        split = np.divide(mode - low, width, out=np.full_like(width, 0.5), where=width > 0)
+        u = rng.random((count, size), dtype=SAMPLE_DTYPE)
+        rising = np.sqrt(u * (width * (mode - low)))
+        rising += low
+        falling = np.sqrt((1 - u) * (width * (high - mode)))
+        np.subtract(high, falling, out=falling)
+        durations = np.where(u < split, rising, falling)
+
+        choices = {decision: np.searchsorted(cumulative, rng.random(size), side="right") for decision, (_, cumulative) in branches.items()}
+        incoming: List[List[Tuple[int, bool]]] = [[] for _ in range(count)]
+        for source, target, _ in flow:
+            incoming[target].append((source, True))
+        for source, target, _ in dependencies:
+            incoming[target].append((source, False))
+
+        finish = np.zeros((count, size), dtype=SAMPLE_DTYPE)
+        active = np.zeros((count, size), dtype=bool)
+        wait = np.zeros((count, size), dtype=SAMPLE_DTYPE)
+        critical_parent = np.full((count, size), -1, dtype=np.int32)
+        for node in order:
+            reached = None
+            ready = np.full(size, -1.0, dtype=SAMPLE_DTYPE)  # Below any finish time, so the first arrival always becomes the parent
+            first = np.full(size, np.inf, dtype=SAMPLE_DTYPE)
+            arrivals = np.zeros(size, dtype=np.int32)
+            parent = critical_parent[node]
+            for source, is_flow in incoming[node]:
+                arrived = active[source]
+                if is_flow:
+                    if source in branches:
+                        arrived = arrived & (choices[source] == branches[source][0][(source, node)])
+                    reached = arrived if reached is None else reached | arrived
+                arrival = np.where(arrived, finish[source], SAMPLE_DTYPE(-1))
+                later = arrival > ready
+                parent[later] = source
+                np.maximum(ready, arrival, out=ready)
+                np.minimum(first, np.where(arrived, finish[source], SAMPLE_DTYPE(np.inf)), out=first)
+                arrivals += arrived
+            if reached is None:
+                reached = np.ones(size, dtype=bool)
+            np.maximum(ready, 0.0, out=ready)
+            active[node] = reached
+            finish[node] = np.where(reached, ready + durations[node], SAMPLE_DTYPE(0))
+            joined = reached & (arrivals > 1)
+            wait[node] = np.where(joined, ready - first, SAMPLE_DTYPE(0))
+            parent[~reached] = -1
+
+        cycle = finish.max(axis=0)
+        # Walk each trial's critical path back from the step that finished last
+        # (on ties, the one later in topological order)
+        on_path = np.zeros((count, size), dtype=bool)
+        columns = np.arange(size)
+        topological = np.array(order)
+        current = topological[len(order) - 1 - finish[topological[::-1]].argmax(axis=0)]
+        alive = np.ones(size, dtype=bool)
+        for _ in range(count):
+            on_path[current[alive], columns[alive]] = True
+            current = np.where(alive, critical_parent[current, columns], -1)
+            alive = current >= 0
+            if not alive.any():
+                break
+        return {
+            "cycle": cycle,
+            "active": active,
+            "durations": np.where(active, durations, SAMPLE_DTYPE(0)),
+            "onPath": on_path,
+            "wait": wait,
+        }
+
+
+# Global simulation engine instance
+simulation_engine = SimulationEngine()
+
+
+def simulate_process(process: Dict[str, Any], trials: int = DEFAULT_TRIALS, seed: Optional[int] = None,
+                     overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+                     branch_probabilities: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Module-level entry point for the extraction worker pool"""
+    return simulation_engine.simulate(process, trials, seed, overrides, branch_probabilities)
@@ -0,0 +1,490 @@
+"""
+Structured Input Parser
+Features:
+- Recognizes numbered SOP lists, markdown outlines and CSV (spreadsheet exports)
+- Builds ProcessNode/ProcessEdge-shaped graphs directly, no LLM call
+- "If …" / "Otherwise …" and yes/no question cues become decision nodes with YES/NO edges
+- Structure confidence score; callers fall back to the LLM when it is low
+"""
+
+import csv
+import io
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from local_extraction import extract_emails, extract_phone_numbers, extract_systems, extract_timelines
+
+logger = logging.getLogger(__name__)
+
+STRUCTURE_CONFIDENCE_THRESHOLD = 0.75
+MIN_STEPS = 3
+MIN_FAST_PATH_STEPS = 4  # Shorter lists go to the LLM even when well-formed
+MAX_TITLE_WORDS = 8
+
+NUMBERED_ITEM_RE = re.compile(r'^(\s*)(?:step\s+)?(\d{1,3}(?:\.\d{1,3})*)[.):]?\s+(\S.*)$', re.IGNORECASE)
+LETTERED_ITEM_RE = re.compile(r'^(\s*)([a-z])[.)]\s+(\S.*)$')
+BULLET_ITEM_RE = re.compile(r'^(\s*)([-*•▪◦+])\s+(\S.*)$')
+MARKDOWN_HEADING_RE = re.compile(r'^(#{1,6})\s+(\S.*?)\s*#*$')
+PAGE_MARKER_LINE_RE = re.compile(r'^==.*==$')
+
+# The clause ends at ", " (not a thousands separator like "$5,000"), "then", ":" or a dash.
+# "When …" describes a trigger, not a branch, so it is not a cue
+CONDITION_RE = re.compile(
+    r'^(?:if|in case|in the event that|should)\s+(.+?)'
+    r'(?:(?:(?<!\d),\s+|,\s+(?!\d))(?:then\s+)?|\s+then\s+|:\s+|\s+[-–]\s+)(.+)$',
+    re.IGNORECASE,
+)
+CONDITION_ONLY_RE = re.compile(r'^(?:if|in case)\s+(.+?)[:,]?$', re.IGNORECASE)
+ELSE_RE = re.compile(r'^(?:otherwise|else|if not|if no)\b[\s,:-]*(.*)$', re.IGNORECASE)
+BRANCH_RE = re.compile(r'^(?:if\s+)?(yes|no)\b[\s,:-]*(.*)$', re.IGNORECASE)
+QUESTION_RE = re.compile(r'\?\s*$')
+ARROW_RE = re.compile(r'\s(?:->|=>|→|⇒)\s')
+STEP_PREFIX_RE = re.compile(r'^(?:step\s+\d+\s*[:.)-]?\s*|then\s+|next,?\s+|first,?\s+|finally,?\s+)', re.IGNORECASE)
+STEP_VERBS = {
+    'accept', 'add', 'allocate', 'answer', 'apply', 'approve', 'archive', 'arrange', 'ask', 'assess',
+    'assign', 'attach', 'book', 'calculate', 'call', 'cancel', 'capture', 'check', 'choose', 'classify',
+    'close', 'collect', 'compare', 'complete', 'confirm', 'contact', 'copy', 'create', 'decide', 'delete',
+    'deliver', 'determine', 'dispatch', 'document', 'download', 'draft', 'email', 'enter', 'escalate',
+    'evaluate', 'file', 'fill', 'find', 'follow', 'forward', 'gather', 'generate', 'get', 'give', 'hand',
+    'identify', 'inform', 'input', 'inspect', 'investigate', 'issue', 'log', 'login', 'make', 'mark',
+    'match', 'merge', 'monitor', 'move', 'notify', 'obtain', 'open', 'order', 'pack', 'pay', 'perform',
+    'phone', 'pick', 'place', 'post', 'prepare', 'print', 'process', 'provide', 'publish', 'raise',
+    'reconcile', 'record', 'refer', 'register', 'reject', 'release', 'remove', 'repeat', 'reply',
+    'report', 'request', 'resolve', 'respond', 'return', 'review', 'route', 'run', 'save', 'scan',
+    'schedule', 'select', 'send', 'set', 'ship', 'sign', 'start', 'store', 'submit', 'take', 'test',
+    'track', 'transfer', 'update', 'upload', 'validate', 'verify', 'wait', 'write',
+}
+REQUIRED_DATA_RE = re.compile(r'\b(?:collect|capture|record|gather|obtain|ask for|request|note)\s+(?:the\s+|their\s+|caller\'?s?\s+)?([^.;:]+)', re.IGNORECASE)
+
+CSV_COLUMN_ROLES = {
+    'id': ('id', '#', 'no', 'no.', 'step #', 'step no', 'step number', 'number', 'seq', 'order'),
+    'title': ('task', 'activity', 'action', 'title', 'step name', 'name', 'step'),
+    'description': ('description', 'details', 'notes', 'instructions', 'comments'),
+    'actor': ('owner', 'actor', 'role', 'responsible', 'who', 'assignee', 'team', 'department'),
+    'system': ('system', 'systems', 'tool', 'tools', 'application', 'platform'),
+    'time': ('duration', 'time', 'sla', 'timeline', 'due', 'estimate', 'time estimate'),
+    'condition': ('condition', 'decision', 'if', 'criteria', 'question'),
+    'next': ('next', 'next step', 'then', 'yes', 'if yes', 'yes next'),
+    'no': ('no', 'if no', 'else', 'otherwise', 'no next'),
+}
+
+
+@dataclass
+class Step:
+    text: str
+    label: Optional[str] = None  # Numbering as written ("3", "2.1")
+    sub_steps: List[str] = field(default_factory=list)
+    actors: List[str] = field(default_factory=list)
+    systems: List[str] = field(default_factory=list)
+    timeline: Optional[str] = None
+    condition: Optional[str] = None
+    next_labels: List[str] = field(default_factory=list)
+    no_labels: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Outline:
+    format: str
+    name: str
+    steps: List[Step]
+    confidence: float
+    step_evidence: bool = True  # Reads as a procedure, not just any list (see _has_step_evidence)
+
+
+# ============ Format Readers ============
+
+def _content_lines(text: str) -> List[str]:
+    return [line.rstrip() for line in text.splitlines() if line.strip() and not PAGE_MARKER_LINE_RE.match(line.strip())]
+
+
+def _list_item(line: str) -> Optional[Tuple[int, str, str]]:
+    """(indent, marker, text) for numbered, lettered or bulleted lines"""
+    for pattern in (NUMBERED_ITEM_RE, LETTERED_ITEM_RE, BULLET_ITEM_RE):
+        match = pattern.match(line)
+        if match:
+            indent = len(match.group(1).expandtabs(4))
+            return indent, match.group(2), match.group(3).strip()
+    return None
+
+
+def _verb_led(text: str) -> bool:
+    words = STEP_PREFIX_RE.sub('', text.strip()).split()
+    return bool(words) and words[0].lower().strip('.,:;') in STEP_VERBS
+
+
+def _has_step_evidence(steps: List[Step], numbers: List[int]) -> bool:
+    """
+    A list is a procedure when it is numbered in sequence, mostly opens with action
+    verbs, or has arrows / conditions; agendas and notes ("Budget", "Hiring") are not
+    """
+    if len(numbers) >= MIN_STEPS:
+        in_sequence = sum(1 for a, b in zip(numbers, numbers[1:]) if b == a + 1)
+        if in_sequence * 2 >= len(numbers) - 1:
+            return True
+    if sum(1 for step in steps if _verb_led(step.text)) * 2 >= len(steps):
+        return True
+    return any(
+        ARROW_RE.search(step.text) or CONDITION_RE.match(step.text) or CONDITION_ONLY_RE.match(step.text)
+        or QUESTION_RE.search(step.text)
+        for step in steps
+    )
+
+
+def read_outline(text: str) -> Optional[Outline]:
+    """Numbered lists and markdown outlines: top-level items are steps, nested items sub-steps"""
+    lines = _content_lines(text)
+    if not lines:
+        return None
+
+    name = None
+    steps: List[Step] = []
+    structured = 0
+    top_indent = None
+    is_markdown = False
+    numbers: List[int] = []
+
+    for line in lines:
+        heading = MARKDOWN_HEADING_RE.match(line.strip())
+        if heading:
+            is_markdown = True
+            structured += 1
+            if name is None:
+                name = heading.group(2)
+            continue
+
+        item = _list_item(line)
+        if item is None:
+            if not steps and name is None:
+                name = line.strip().rstrip(':')  # Title line above the list
+                structured += 1
+            elif steps and line[:1].isspace():
+                steps[-1].sub_steps.append(line.strip())  # Wrapped / indented continuation
+                structured += 1
+            continue
+
+        indent, marker, body = item
+        is_nested_number = '.' in marker.rstrip('.') and marker[0].isdigit()
+        if top_indent is None:
+            top_indent = indent
+        if steps and (indent > top_indent or is_nested_number or (marker.isalpha() and len(marker) == 1)):
+            steps[-1].sub_steps.append(body)
+        else:
+            steps.append(Step(text=body, label=marker if marker[0].isalnum() else None))
+            if marker.isdigit():
+                numbers.append(int(marker))
+        structured += 1
+
+    if len(steps) < MIN_STEPS:
+        return None
+
+    confidence = structured / len(lines)
+    if numbers:
+        # Numbering that restarts or jumps suggests several lists or a garbled export
+        in_sequence = sum(1 for a, b in zip(numbers, numbers[1:]) if b == a + 1)
+        confidence *= 0.5 + 0.5 * (in_sequence / max(1, len(numbers) - 1))
+    return Outline(
+        format='markdown' if is_markdown else 'numbered' if numbers else 'bulleted',
+        name=name or "Imported Process",
+        steps=steps,
+        confidence=round(confidence, 3),
+        step_evidence=_has_step_evidence(steps, numbers),
+    )
+
+
+def _match_columns(header: List[str]) -> Dict[str, int]:
+    columns: Dict[str, int] = {}
+    normalized = [' '.join(h.lower().replace('_', ' ').split()) for h in header]
+    for role, names in CSV_COLUMN_ROLES.items():
+        for index, column in enumerate(normalized):
+            if column in names and index not in columns.values():
+                columns[role] = index
+                break
+    return columns
+
+
+def _split_refs(value: str) -> List[str]:
+    return [ref.strip() for ref in re.split(r'[,;/]| and ', value or '') if ref.strip()]
+
+
+def read_csv(text: str) -> Optional[Outline]:
+    """One row per step; optional next/no columns reference other rows by id"""
+    lines = _content_lines(text)
+    if len(lines) < MIN_STEPS + 1 or not any(sep in lines[0] for sep in (',', ';', '\t', '|')):
+        return None
+    sample = '\n'.join(lines[:20])
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+    except csv.Error:
+        return None
+
+    rows = [row for row in csv.reader(io.StringIO('\n'.join(lines)), dialect) if any(cell.strip() for cell in row)]
+    if len(rows) < MIN_STEPS + 1:
+        return None
+    header, body = rows[0], rows[1:]
+    columns = _match_columns(header)
+    if 'title' not in columns:
+        return None
+
+    # "Step" holding only numbers is an id column, not a title
+    if 'id' not in columns and all(row[columns['title']].strip().isdigit() for row in body if len(row) > columns['title']):
+        columns['id'] = columns.pop('title')
+        remaining = _match_columns([h if i != columns['id'] else '' for i, h in enumerate(header)])
+        if 'title' not in remaining:
+            if 'description' not in columns:
+                return None
+            columns['title'] = columns['description']
+        else:
+            columns['title'] = remaining['title']
+
+    def cell(row: List[str], role: str) -> str:
+        index = columns.get(role)
+        return row[index].strip() if index is not None and index < len(row) else ''
+
+    steps = []
+    consistent = 0
+    for number, row in enumerate(body, 1):
+        if len(row) == len(header):
+            consistent += 1
+        title = cell(row, 'title')
+        if not title:
+            continue
+        description = cell(row, 'description')
+        steps.append(Step(
+            text=title,
+            label=cell(row, 'id') or str(number),
+            sub_steps=[description] if description else [],
+            actors=_split_refs(cell(row, 'actor')),
+            systems=_split_refs(cell(row, 'system')),
+            timeline=cell(row, 'time') or None,
+            condition=cell(row, 'condition') or None,
+            next_labels=_split_refs(cell(row, 'next')),
+            no_labels=_split_refs(cell(row, 'no')),
+        ))
+
+    if len(steps) < MIN_STEPS:
+        return None
+    first = header[0].strip()
+    return Outline(
+        format='csv',
+        name=first if first.startswith('# ') else "Imported Process",
+        steps=steps,
+        confidence=round(consistent / len(body) * len(steps) / len(body), 3),
+    )
+
+
+# ============ Graph Builder ============
+
+def _title(text: str) -> str:
+    text = text.strip().rstrip('.')
+    if len(text.split()) > MAX_TITLE_WORDS:
+        clause = re.split(r'[,;:(]| - | – ', text)[0].strip()
+        words = clause.split()
+        text = ' '.join(words[:MAX_TITLE_WORDS]) + ('…' if len(words) > MAX_TITLE_WORDS else '')
+    return text[:1].upper() + text[1:]
+
+
+def _question(condition: str) -> str:
+    condition = condition.strip().rstrip('.,:;?')
+    return _title(condition) + '?'
+
+
+def _required_data(text: str) -> List[str]:
+    match = REQUIRED_DATA_RE.search(text)
+    if not match:
+        return []
+    items = re.split(r',\s*|\s+and\s+|\s+or\s+', match.group(1))
+    return [item.strip().strip('.').title() for item in items if 0 < len(item.split()) <= 4]
+
+
+class GraphBuilder:
+    def __init__(self, vocabulary: Iterable[str] = ()):
+        self.vocabulary = list(vocabulary)
+        self.nodes: List[Dict[str, Any]] = []
+        self.edges: List[Dict[str, Any]] = []
+        self.labels: Dict[str, str] = {}  # Step label -> node id (for CSV next references)
+
+    def node(self, kind: str, title: str, text: str, step: Optional[Step] = None) -> str:
+        node_id = f"node-{len(self.nodes) + 1}"
+        full_text = ' '.join([text, *(step.sub_steps if step else [])])
+        phones = extract_phone_numbers(full_text)
+        emails = extract_emails(full_text)
+        contacts = {}
+        for i, value in enumerate(phones):
+            contacts[f"Phone {i + 1}" if len(phones) > 1 else "Phone"] = value
+        for i, value in enumerate(emails):
+            contacts[f"Email {i + 1}" if len(emails) > 1 else "Email"] = value
+        timelines = extract_timelines(full_text)
+        systems = list(dict.fromkeys([*(step.systems if step else []), *extract_systems(full_text, self.vocabulary)]))
+
+        self.nodes.append({
+            "id": node_id,
+            "type": kind,
+            "status": "trigger" if kind == "trigger" else "current",
+            "title": title,
+            "description": text.strip(),
+            "actors": list(step.actors) if step else [],
+            "subSteps": list(step.sub_steps) if step else [],
+            "dependencies": [],
+            "parallelWith": [],
+            "failures": [],
+            "blocking": None,
+            "currentState": None,
+            "idealState": None,
+            "gap": None,
+            "impact": None,
+            "timeEstimate": (step.timeline if step else None) or (timelines[0] if timelines else None),
+            "operationalDetails": {
+                "requiredData": _required_data(full_text),
+                "specificActions": list(step.sub_steps) if step else [],
+                "contactInfo": contacts,
+                "timeline": (step.timeline if step else None) or (timelines[0] if timelines else None),
+                "systems": systems,
+                "decisionCriteria": text.strip() if kind == "decision" else None,
+                "sourcePage": None,
+            },
+        })
+        if step and step.label and step.label not in self.labels:
+            self.labels[step.label] = node_id
+        return node_id
+
+    def edge(self, source: str, target: str, label: Optional[str] = None):
+        edge = {"id": f"edge-{len(self.edges) + 1}", "source": source, "target": target, "label": label}
+        if label:
+            edge["condition"] = label.lower()
+        self.edges.append(edge)
+
+    def _kind(self) -> str:
+        return "trigger" if not self.nodes else "process"
+
+    def build_sequence(self, steps: List[Step]):
+        """Linear flow with If/Otherwise and yes/no question branching"""
+        tails: List[Tuple[str, Optional[str]]] = []  # Open ends waiting for the next node
+
+        def attach(node_id: str, only: Optional[str] = 'any'):
+            nonlocal tails
+            remaining = []
+            for source, label in tails:
+                if only == 'any' or label == only:
+                    self.edge(source, node_id, label)
+                else:
+                    remaining.append((source, label))
+            tails = remaining
+
+        for step in steps:
+            text = step.text.strip()
+            otherwise = ELSE_RE.match(text)
+            branch = BRANCH_RE.match(text)
+            condition = CONDITION_RE.match(text)
+            condition_only = CONDITION_ONLY_RE.match(text)
+
+            if otherwise and any(label == "NO" for _, label in tails):
+                action = otherwise.group(1) or text
+                node_id = self.node(self._kind(), _title(action), text, step)
+                attach(node_id, only="NO")
+                tails.append((node_id, None))
+            elif branch and any(label == branch.group(1).upper() for _, label in tails):
+                answer = branch.group(1).upper()
+                action = branch.group(2) or text
+                node_id = self.node(self._kind(), _title(action), text, step)
+                attach(node_id, only=answer)
+                tails.append((node_id, None))
+            elif step.condition or condition or condition_only or QUESTION_RE.search(text):
+                if step.condition:
+                    question, action = step.condition, text
+                elif condition:
+                    question, action = condition.group(1), condition.group(2)
+                elif condition_only:
+                    question, action = condition_only.group(1), None
+                else:
+                    question, action = text, None
+                decision_id = self.node("decision", _question(question), text, step if not action else None)
+                attach(decision_id)
+                if action:
+                    action_id = self.node("process", _title(action), action, step)
+                    self.edge(decision_id, action_id, "YES")
+                    tails = [(action_id, None), (decision_id, "NO")]
+                else:
+                    tails = [(decision_id, "YES"), (decision_id, "NO")]
+            else:
+                node_id = self.node(self._kind(), _title(text), text, step)
+                attach(node_id)
+                tails = [(node_id, None)]
+
+    def build_referenced(self, steps: List[Step]):
+        """CSV rows with explicit next/no columns: edges follow the references"""
+        ids = []
+        for step in steps:
+            kind = "decision" if step.condition or step.no_labels else self._kind()
+            title = _question(step.condition) if step.condition else _title(step.text)
+            ids.append(self.node(kind, title, step.text, step))
+
+        for index, step in enumerate(steps):
+            source = ids[index]
+            is_decision = self.nodes[index]["type"] == "decision"
+            targets = [self.labels[label] for label in step.next_labels if label in self.labels]
+            if not targets and not step.no_labels and index + 1 < len(ids):
+                targets = [ids[index + 1]]
+            for target in targets:
+                self.edge(source, target, "YES" if is_decision else None)
+            for label in step.no_labels:
+                if label in self.labels:
+                    self.edge(source, self.labels[label], "NO")
+
+
+def outline_to_process(outline: Outline, vocabulary: Iterable[str] = ()) -> Dict[str, Any]:
+    builder = GraphBuilder(vocabulary)
+    if any(step.next_labels or step.no_labels for step in outline.steps):
+        builder.build_referenced(outline.steps)
+    else:
+        builder.build_sequence(outline.steps)
+
+    actors = list(dict.fromkeys(actor for node in builder.nodes for actor in node["actors"]))
+    return {
+        "processName": outline.name.lstrip('# ').strip(),
+        "description": f"Imported from a {outline.format} outline with {len(outline.steps)} steps",
+        "actors": actors,
+        "nodes": builder.nodes,
+        "edges": builder.edges,
+        "criticalGaps": [],
+        "improvementOpportunities": [],
+    }
+
+
+class StructuredParser:
+    def detect(self, text: str) -> Optional[Outline]:
+        """Best structured reading of the text, or None if it is prose"""
+        candidates = [outline for outline in (read_csv(text), read_outline(text)) if outline]
+        return max(candidates, key=lambda outline: outline.confidence, default=None)
+
+    def parse(self, text: str, vocabulary: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+        """
+        Parse result in the same shape as AIService.parse_process, or None when the
+        structure confidence is below threshold and the LLM should be used.
+        """
+        outline = self.detect(text)
+        if outline is None:
+            return None
+        if (outline.confidence < STRUCTURE_CONFIDENCE_THRESHOLD or not outline.step_evidence
+                or len(outline.steps) < MIN_FAST_PATH_STEPS):
+            logger.info(
+                f"Structured parse skipped: {outline.format} confidence {outline.confidence}, "
+                f"{len(outline.steps)} steps, step evidence {outline.step_evidence}"
+            )
+            return None
+
+        process = outline_to_process(outline, vocabulary)
+        logger.info(
+            f"⚡ Structured parse ({outline.format}, confidence {outline.confidence}): "
+            f"{len(process['nodes'])} nodes, {len(process['edges'])} edges without LLM"
+        )
+        return {
+            "multipleProcesses": False,
+            "processes": [process],
+            "structured": {"format": outline.format, "confidence": outline.confidence},
+        }
+
+
+# Global structured parser instance
+structured_parser = StructuredParser()
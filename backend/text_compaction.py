@@ -0,0 +1,255 @@
+"""
+Prompt Input Compaction
+Features:
+- Removes page headers/footers repeated across pages and page-number lines
+- Drops "==End of OCR for page X==" markers (==Page N== markers are kept)
+- Dedupes repeated paragraphs (boilerplate, disclaimers pasted on every page)
+- Normalizes whitespace without touching phone numbers or email addresses
+- Keeps leading indentation: outline nesting (sub-steps, continuation lines) is structure
+- Token accounting (tiktoken when available) so savings can be reported
+Deterministic: the same input always compacts to the same output.
+"""
+
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+from document_service import PAGE_MARKER_RE
+
+logger = logging.getLogger(__name__)
+
+HEADER_FOOTER_LINES = 3  # Lines at each end of a page considered header/footer candidates
+REPEATED_LINE_PAGE_RATIO = 0.5  # Must appear on at least this share of pages
+MIN_DEDUPE_PARAGRAPH_CHARS = 40  # Short paragraphs ("Yes", "Call back") may legitimately repeat
+TOKEN_ENCODING = "cl100k_base"
+
+OCR_END_MARKER_RE = re.compile(r'^\s*=+\s*End of OCR for page \d+\s*=+\s*$', re.IGNORECASE)
+PAGE_NUMBER_LINE_RE = re.compile(r'^\s*(?:page\s*)?[-–—]?\s*\d+\s*(?:(?:of|/)\s*\d+)?\s*[-–—]?\s*$', re.IGNORECASE)
+EXPLICIT_PAGE_LINE_RE = re.compile(r'^\s*page\s+\d+(?:\s*(?:of|/)\s*\d+)?\s*$', re.IGNORECASE)
+PHONE_RE = re.compile(r'\+?\(?\d[\d\s().-]{5,}\d(?:\s*(?:ext\.?|x)\s*\d+)?')
+EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f\u200b\ufeff]')
+HORIZONTAL_SPACE_RE = re.compile(r'[ \t\u00a0\u2000-\u200a\u202f\u3000]+')
+
+_encoder = None
+
+
+def load_token_encoding() -> bool:
+    """
+    Load the tiktoken encoding (may download it, so call it off the event loop, e.g.
+    at startup in an executor). Until it has loaded, count_tokens estimates.
+    """
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:
+            logger.warning(f"⚠️ tiktoken unavailable, estimating tokens from length: {e}")
+            return False
+    return True
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken once load_token_encoding has run, else a ~4 chars/token estimate"""
+    if _encoder is not None:
+        try:
+            return len(_encoder.encode(text, disallowed_special=()))
+        except Exception as e:
+            logger.warning(f"⚠️ Token count failed, estimating from length: {e}")
+    return (len(text) + 3) // 4
+
+
+def _protected_spans(line: str) -> List[Tuple[int, int]]:
+    spans = [m.span() for m in EMAIL_RE.finditer(line)]
+    for match in PHONE_RE.finditer(line):
+        if sum(c.isdigit() for c in match.group()) >= 7:
+            spans.append(match.span())
+    return sorted(spans)
+
+
+def normalize_line(line: str) -> str:
+    """
+    Collapse runs of spaces and strip trailing space, leaving leading indentation,
+    phone numbers and emails byte-for-byte intact
+    """
+    line = CONTROL_CHARS_RE.sub('', line).rstrip()
+    body = line.lstrip()
+    if not body or PAGE_MARKER_RE.match(body):
+        return body
+    indent = line[:len(line) - len(body)]
+    spans = _protected_spans(body)
+    if not spans:
+        return indent + HORIZONTAL_SPACE_RE.sub(' ', body)
+
+    parts = [indent]
+    position = 0
+    for start, end in spans:
+        if start < position:
+            continue  # Overlapping match (email digits inside a phone match)
+        parts.append(HORIZONTAL_SPACE_RE.sub(' ', body[position:start]))
+        parts.append(body[start:end])
+        position = end
+    parts.append(HORIZONTAL_SPACE_RE.sub(' ', body[position:]))
+    return ''.join(parts)
+
+
+def _line_key(line: str) -> str:
+    """Header/footer identity: case, spacing and digits (page numbers, dates) ignored"""
+    key = ' '.join(line.lower().split())
+    if _protected_spans(line):
+        return key  # Lines with different phone numbers/emails are never the same footer
+    return re.sub(r'\d+', '#', key)
+
+
+def _split_pages(lines: List[str]) -> List[List[int]]:
+    """Line indexes per page, split on ==Page N== or end-of-OCR markers"""
+    pages: List[List[int]] = [[]]
+    for index, line in enumerate(lines):
+        if PAGE_MARKER_RE.match(line):
+            pages.append([])
+        elif OCR_END_MARKER_RE.match(line):
+            pages.append([])
+        else:
+            pages[-1].append(index)
+    return [page for page in pages if any(lines[i] for i in page)]
+
+
+def _edge_lines(lines: List[str], pages: List[List[int]]) -> Tuple[set, set]:
+    """
+    (indexes of the first/last line of each page, keys of header/footer lines that
+    repeat across many pages)
+    """
+    counts: Counter = Counter()
+    edge_indexes = set()
+    for page in pages:
+        content = [i for i in page if lines[i]]
+        edge_indexes.update((content[0], content[-1]))
+        # On short pages only the outer third can be header/footer
+        depth = min(HEADER_FOOTER_LINES, len(content) // 3)
+        edges = content[:depth] + content[len(content) - depth:]
+        counts.update({_line_key(lines[i]) for i in edges})
+    if len(pages) < 2:
+        return edge_indexes, set()
+    threshold = max(2, int(len(pages) * REPEATED_LINE_PAGE_RATIO + 0.5))
+    return edge_indexes, {key for key, count in counts.items() if count >= threshold and key}
+
+
+@dataclass
+class CompactionResult:
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    removed_lines: int
+    removed_paragraphs: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.compacted_tokens
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "originalTokens": self.original_tokens,
+            "compactedTokens": self.compacted_tokens,
+            "tokensSaved": self.tokens_saved,
+        }
+
+
+class TextCompactor:
+    def __init__(self):
+        self._counters = {"requests": 0, "original_tokens": 0, "compacted_tokens": 0}
+
+    def _compact_lines(self, text: str) -> Tuple[List[str], int]:
+        lines = [normalize_line(line) for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n')]
+        pages = _split_pages(lines)
+        edge_indexes, repeated = _edge_lines(lines, pages) if len(pages) > 1 else (set(), set())
+
+        kept = []
+        seen_repeated = set()
+        removed = 0
+        for index, line in enumerate(lines):
+            if OCR_END_MARKER_RE.match(line):
+                kept.append('')  # Keep the page break as a paragraph break
+                removed += 1
+                continue
+            if PAGE_MARKER_RE.match(line):
+                kept.append(line)
+                continue
+            # Bare numbers only count as page numbers on a page's first/last line (elsewhere they may be data)
+            if line and (EXPLICIT_PAGE_LINE_RE.match(line) or (index in edge_indexes and PAGE_NUMBER_LINE_RE.match(line))):
+                removed += 1
+                continue
+            key = _line_key(line) if line else ''
+            if key in repeated:
+                # First occurrence stays: headers often carry the document title or a contact
+                if key in seen_repeated:
+                    removed += 1
+                    continue
+                seen_repeated.add(key)
+            kept.append(line)
+        return kept, removed
+
+    def _dedupe_paragraphs(self, lines: List[str]) -> Tuple[List[str], int]:
+        paragraphs: List[List[str]] = [[]]
+        for line in lines:
+            if PAGE_MARKER_RE.match(line):
+                # Markers stand alone so page-leading boilerplate still dedupes
+                paragraphs.extend([[line], []])
+            elif line:
+                paragraphs[-1].append(line)
+            elif paragraphs[-1]:
+                paragraphs.append([])
+
+        kept = []
+        seen = set()
+        removed = 0
+        for paragraph in paragraphs:
+            if not paragraph:
+                continue
+            key = ' '.join(' '.join(paragraph).lower().split())
+            is_marker = len(paragraph) == 1 and PAGE_MARKER_RE.match(paragraph[0])
+            if not is_marker and len(key) >= MIN_DEDUPE_PARAGRAPH_CHARS:
+                if key in seen:
+                    removed += 1
+                    continue
+                seen.add(key)
+            kept.append('\n'.join(paragraph))
+        return kept, removed
+
+    def compact(self, text: str) -> CompactionResult:
+        """Compact prompt input and record the token savings"""
+        lines, removed_lines = self._compact_lines(text or '')
+        paragraphs, removed_paragraphs = self._dedupe_paragraphs(lines)
+        compacted = '\n\n'.join(paragraphs)
+
+        result = CompactionResult(
+            text=compacted,
+            original_tokens=count_tokens(text or ''),
+            compacted_tokens=count_tokens(compacted),
+            removed_lines=removed_lines,
+            removed_paragraphs=removed_paragraphs,
+        )
+        self._counters["requests"] += 1
+        self._counters["original_tokens"] += result.original_tokens
+        self._counters["compacted_tokens"] += result.compacted_tokens
+        if result.tokens_saved > 0:
+            logger.info(
+                f"🗜️ Compacted prompt input: {result.original_tokens} → {result.compacted_tokens} tokens "
+                f"(-{result.tokens_saved}, {removed_lines} lines, {removed_paragraphs} paragraphs)"
+            )
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        original = self._counters["original_tokens"]
+        saved = original - self._counters["compacted_tokens"]
+        return {
+            **self._counters,
+            "tokens_saved": saved,
+            "saved_ratio": round(saved / original, 3) if original else 0.0,
+        }
+
+
+# Global compactor instance
+text_compactor = TextCompactor()
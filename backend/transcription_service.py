@@ -0,0 +1,329 @@
+"""
+Async Audio Transcription Service
+Features:
+- One shared AsyncOpenAI client, so Whisper calls never block the event loop
+- Long recordings are decoded to PCM (ffmpeg) and split on silence
+- Segments are transcribed concurrently with bounded parallelism and stitched in order
+- Per-segment progress events for streaming endpoints
+- Single-request fallback for short audio or when ffmpeg is unavailable
+- Live sessions that cut rolling windows from audio arriving while the user records
+"""
+
+import asyncio
+import io
+import logging
+import os
+import shutil
+import wave
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from openai import AsyncOpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+WHISPER_MODEL = "whisper-1"
+SAMPLE_RATE = 16000  # Whisper resamples to 16kHz mono anyway
+SAMPLE_WIDTH = 2  # s16le
+TRANSCRIPTION_CONCURRENCY = int(os.environ.get('TRANSCRIPTION_CONCURRENCY', '4'))
+SEGMENT_TARGET_SECONDS = float(os.environ.get('TRANSCRIPTION_SEGMENT_SECONDS', '60'))
+SEGMENT_MAX_SECONDS = SEGMENT_TARGET_SECONDS * 2  # Hard cut if no pause is found
+SINGLE_REQUEST_MAX_SECONDS = SEGMENT_TARGET_SECONDS * 1.5
+SILENCE_FRAME_SECONDS = 0.03
+SEGMENT_RETRIES = 2
+FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+
+# Live (WebSocket) transcription
+LIVE_WINDOW_MIN_SECONDS = float(os.environ.get('LIVE_TRANSCRIPTION_WINDOW_MIN_SECONDS', '6'))
+LIVE_WINDOW_MAX_SECONDS = float(os.environ.get('LIVE_TRANSCRIPTION_WINDOW_MAX_SECONDS', '12'))
+LIVE_MAX_SECONDS = float(os.environ.get('LIVE_TRANSCRIPTION_MAX_MINUTES', '30')) * 60
+LIVE_PROMPT_CHARS = 200  # Tail of the transcript passed to Whisper for continuity
+LIVE_FORMATS = ('pcm16', 'webm', 'ogg', 'mp4', 'wav')
+
+
+@dataclass
+class AudioSegment:
+    index: int
+    start: float
+    end: float
+    audio: bytes  # WAV container
+
+
+def _frame_rms(samples: np.ndarray, frame: int) -> np.ndarray:
+    usable = len(samples) - len(samples) % frame
+    if usable == 0:
+        return np.zeros(1, dtype=np.float32)
+    frames = samples[:usable].astype(np.float32).reshape(-1, frame)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def find_split_points(samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                      target_seconds: float = SEGMENT_TARGET_SECONDS,
+                      max_seconds: float = SEGMENT_MAX_SECONDS) -> List[int]:
+    """
+    Sample offsets where the audio should be cut: the quietest frame between
+    target_seconds and max_seconds after the previous cut, so words are not split.
+    """
+    frame = max(1, int(sample_rate * SILENCE_FRAME_SECONDS))
+    rms = _frame_rms(samples, frame)
+    frames_per_second = sample_rate / frame
+    target = max(1, int(target_seconds * frames_per_second))
+    limit = max(target + 1, int(max_seconds * frames_per_second))
+
+    cuts = []
+    start = 0
+    while len(rms) - start > limit:
+        window = rms[start + target:start + limit]
+        # Prefer the earliest of the quietest frames to keep segments near the target length
+        quietest = start + target + int(np.argmin(window))
+        cuts.append(quietest * frame)
+        start = quietest
+    return cuts
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+def split_on_silence(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[AudioSegment]:
+    bounds = [0, *find_split_points(samples, sample_rate), len(samples)]
+    return [
+        AudioSegment(
+            index=i,
+            start=round(start / sample_rate, 2),
+            end=round(end / sample_rate, 2),
+            audio=encode_wav(samples[start:end], sample_rate),
+        )
+        for i, (start, end) in enumerate(zip(bounds, bounds[1:]))
+    ]
+
+
+def stitch_transcripts(texts: List[str]) -> str:
+    return " ".join(text.strip() for text in texts if text and text.strip())
+
+
+class TranscriptionService:
+    def __init__(self):
+        self._client = None
+        self.ffmpeg_path = shutil.which(FFMPEG_BINARY)
+        if not self.ffmpeg_path:
+            logger.warning("⚠️ ffmpeg not found - long recordings will be transcribed in a single request")
+
+    @property
+    def available(self) -> bool:
+        return OPENAI_AVAILABLE
+
+    @property
+    def client(self):
+        """Shared async client, created on first use so the key can be loaded after import"""
+        if self._client is None:
+            api_key = os.environ.get('EMERGENT_LLM_KEY')
+            if not api_key:
+                raise RuntimeError("EMERGENT_LLM_KEY not configured")
+            self._client = AsyncOpenAI(api_key=api_key, max_retries=SEGMENT_RETRIES)
+        return self._client
+
+    async def decode_pcm(self, source, partial: bool = False) -> Optional[np.ndarray]:
+        """
+        Decode any container ffmpeg understands (path or bytes) to 16kHz mono int16 samples.
+        partial=True accepts a truncated stream (a recording still in progress).
+        """
+        if not self.ffmpeg_path:
+            return None
+        from_memory = isinstance(source, (bytes, bytearray))
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg_path, '-nostdin', '-v', 'error', '-i', 'pipe:0' if from_memory else source,
+            '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), '-',
+            stdin=asyncio.subprocess.PIPE if from_memory else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        pcm, errors = await process.communicate(bytes(source) if from_memory else None)
+        if process.returncode != 0 and not (partial and pcm):
+            logger.warning(f"⚠️ ffmpeg could not decode audio: {errors.decode(errors='ignore').strip()[:200]}")
+            return None
+        return np.frombuffer(pcm[:len(pcm) - len(pcm) % SAMPLE_WIDTH], dtype='<i2')
+
+    async def transcribe_file(self, filename: str, stream, prompt: Optional[str] = None) -> str:
+        """One Whisper request for the whole file"""
+        options = {"prompt": prompt} if prompt else {}
+        transcript = await self.client.audio.transcriptions.create(
+            model=WHISPER_MODEL,
+            file=(filename, stream),
+            **options,
+        )
+        return transcript.text
+
+    async def _transcribe_segment(self, segment: AudioSegment, slots: asyncio.Semaphore) -> Tuple[AudioSegment, str]:
+        async with slots:
+            text = await self.transcribe_file(f"segment-{segment.index}.wav", segment.audio)
+        return segment, text
+
+    async def plan_segments(self, path: str) -> Optional[List[AudioSegment]]:
+        """Silence-split segments, or None when the audio should go up in one request"""
+        samples = await self.decode_pcm(path)
+        if samples is None or len(samples) <= SINGLE_REQUEST_MAX_SECONDS * SAMPLE_RATE:
+            return None
+        return await asyncio.to_thread(split_on_silence, samples)
+
+    async def iter_transcription(self, upload, filename: str) -> AsyncIterator[Dict]:
+        """
+        Yield progress events while transcribing a SpooledUpload:
+        {"event": "segments", ...}, one {"event": "segment", ...} per finished
+        segment (in completion order), then {"event": "complete", ...}.
+        """
+        segments = await self.plan_segments(upload.materialize())
+
+        if segments is None:
+            yield {"event": "segments", "total": 1, "durationSeconds": None}
+            text = await self.transcribe_file(filename, upload.open_stream())
+            yield {"event": "segment", "index": 0, "completed": 1, "total": 1, "text": text}
+            yield {"event": "complete", "text": text, "segments": 1, "durationSeconds": None}
+            return
+
+        total = len(segments)
+        duration = segments[-1].end
+        logger.info(f"🎙️ Transcribing {duration:.0f}s of audio in {total} segments")
+        yield {"event": "segments", "total": total, "durationSeconds": duration}
+
+        slots = asyncio.Semaphore(TRANSCRIPTION_CONCURRENCY)
+        tasks = [asyncio.create_task(self._transcribe_segment(segment, slots)) for segment in segments]
+        texts: List[Optional[str]] = [None] * total
+        try:
+            for completed, next_done in enumerate(asyncio.as_completed(tasks), 1):
+                segment, text = await next_done
+                texts[segment.index] = text
+                yield {
+                    "event": "segment",
+                    "index": segment.index,
+                    "start": segment.start,
+                    "end": segment.end,
+                    "completed": completed,
+                    "total": total,
+                    "text": text,
+                }
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        yield {"event": "complete", "text": stitch_transcripts(texts), "segments": total, "durationSeconds": duration}
+
+    async def transcribe(self, upload, filename: str) -> Dict:
+        """Transcribe a SpooledUpload and return the final result"""
+        result: Dict = {}
+        async for event in self.iter_transcription(upload, filename):
+            if event["event"] == "complete":
+                result = event
+        return {"text": result.get("text", ""), "segments": result.get("segments", 0),
+                "durationSeconds": result.get("durationSeconds")}
+
+
+class LiveTranscriptionSession:
+    """
+    Buffers audio that arrives while the user is still recording and cuts it into
+    rolling windows at pauses. Each window is transcribed with the tail of the
+    transcript so far as the Whisper prompt, so words and casing carry across windows.
+
+    pcm16: little-endian mono 16-bit samples at sample_rate, appended as-is.
+    Container formats (webm/ogg/...): chunks are not decodable on their own, so the
+    whole recording so far is re-decoded and only the new samples are taken.
+    """
+
+    def __init__(self, transcriber, audio_format: str = 'pcm16', sample_rate: int = SAMPLE_RATE,
+                 max_container_bytes: Optional[int] = None):
+        if audio_format not in LIVE_FORMATS:
+            raise ValueError(f"Unsupported audio format '{audio_format}', expected one of {', '.join(LIVE_FORMATS)}")
+        if audio_format != 'pcm16':
+            if not getattr(transcriber, 'ffmpeg_path', None):
+                raise ValueError(f"'{audio_format}' audio needs ffmpeg on the server; send pcm16 instead")
+            sample_rate = SAMPLE_RATE  # ffmpeg output rate
+        if not 8000 <= sample_rate <= 192000:
+            raise ValueError(f"Unsupported sample rate {sample_rate}")
+
+        self.transcriber = transcriber
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self.max_container_bytes = max_container_bytes
+        self.windows_cut = 0
+        self.texts: List[str] = []
+
+        self._pending = np.zeros(0, dtype='<i2')
+        self._odd_byte = b''
+        self._container = bytearray()
+        self._decoded_samples = 0  # Container samples already moved into windows or pending
+        self._total_samples = 0
+
+    @property
+    def transcript(self) -> str:
+        return stitch_transcripts(self.texts)
+
+    @property
+    def duration_seconds(self) -> float:
+        return round(self._total_samples / self.sample_rate, 2)
+
+    async def _new_samples(self, chunk: bytes) -> np.ndarray:
+        if self.audio_format == 'pcm16':
+            data = self._odd_byte + chunk
+            usable = len(data) - len(data) % SAMPLE_WIDTH
+            self._odd_byte = data[usable:]
+            return np.frombuffer(data[:usable], dtype='<i2')
+
+        self._container.extend(chunk)
+        if self.max_container_bytes and len(self._container) > self.max_container_bytes:
+            raise ValueError("Recording exceeds the maximum upload size")
+        decoded = await self.transcriber.decode_pcm(self._container, partial=True)
+        if decoded is None or len(decoded) <= self._decoded_samples:
+            return np.zeros(0, dtype='<i2')
+        fresh = decoded[self._decoded_samples:]
+        self._decoded_samples = len(decoded)
+        return fresh
+
+    def _cut_windows(self, final: bool) -> List[np.ndarray]:
+        cuts = find_split_points(self._pending, self.sample_rate, LIVE_WINDOW_MIN_SECONDS, LIVE_WINDOW_MAX_SECONDS)
+        bounds = [0, *cuts]
+        windows = [self._pending[start:end] for start, end in zip(bounds, bounds[1:])]
+        self._pending = self._pending[bounds[-1]:]
+        if final and len(self._pending):
+            windows.append(self._pending)
+            self._pending = self._pending[:0]
+        self.windows_cut += len(windows)
+        return windows
+
+    async def add_audio(self, chunk: bytes) -> List[np.ndarray]:
+        """Append a chunk; returns the windows that are now complete"""
+        samples = await self._new_samples(chunk)
+        self._total_samples += len(samples)
+        if self._total_samples > LIVE_MAX_SECONDS * self.sample_rate:
+            raise ValueError(f"Live transcription is limited to {LIVE_MAX_SECONDS / 60:g} minutes")
+        if len(samples):
+            self._pending = np.concatenate([self._pending, samples])
+        return self._cut_windows(final=False)
+
+    def finish(self) -> List[np.ndarray]:
+        """Remaining audio once the recording has stopped"""
+        return self._cut_windows(final=True)
+
+    async def transcribe_window(self, window: np.ndarray) -> str:
+        """Transcribe the next window in order and append it to the transcript"""
+        prompt = self.transcript[-LIVE_PROMPT_CHARS:] or None
+        text = await self.transcriber.transcribe_file(
+            f"window-{len(self.texts)}.wav", encode_wav(window, self.sample_rate), prompt=prompt
+        )
+        self.texts.append(text.strip())
+        return text.strip()
+
+
+# Global transcription service instance
+transcription_service = TranscriptionService()
@@ -0,0 +1,316 @@
+"""
+Process Version History
+Features:
+- One entry per process version in its own collection (processId + version)
+- Periodic full snapshots, compact JSON deltas in between
+- Bounded delta chains: a snapshot is forced after MAX_CHAIN_LENGTH deltas, or when
+  a delta would be nearly as large as the document itself
+- Any version rebuilt from its nearest snapshot in O(chain length)
+- Writers that already know their change (targeted patches) record it as a delta
+  directly, without the document
+Deltas are keyed on node/edge ids, so editing one node of a 200-node process stores
+that node's changed fields only.
+"""
+
+import bisect
+import copy
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+VERSION_COLLECTION = "process_versions"
+MAX_CHAIN_LENGTH = 16  # Deltas between two snapshots
+SNAPSHOT_SIZE_RATIO = 0.5  # A delta at least half the document's size is stored as a snapshot instead
+UNVERSIONED_FIELDS = {"_id", "views", "revision", "intelligence", "intelligenceGeneratedAt", "lastChange"}
+ENTRY_PROJECTION = {"_id": 0, "snapshot": 0, "delta": 0}
+
+# Delta encoding: {"v": value} replaces, {"d": {"s": set, "u": unset, "c": child deltas}}
+# patches a dict, {"l": {"r": removed ids, "p": placements, "s": new items, "c": child deltas}}
+# patches an id-keyed list
+
+
+class VersionConflictError(Exception):
+    """A version number was recorded twice with different content"""
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+def _keyed(items: Any) -> Optional[Dict[str, Any]]:
+    """id -> item when `items` is a list of dicts with unique ids (nodes, edges)"""
+    if not isinstance(items, list) or not items:
+        return None
+    index = {}
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("id"), str) or item["id"] in index:
+            return None
+        index[item["id"]] = item
+    return index
+
+
+def _placements(old_ids: List[str], new_ids: List[str]) -> List[List[Optional[str]]]:
+    """
+    [id, predecessor in the new order] for every added or moved id. Ids on the
+    longest run kept in the old relative order are not listed, so swapping two
+    steps costs one entry instead of the whole order.
+    """
+    old_position = {item_id: i for i, item_id in enumerate(old_ids)}
+    kept = [item_id for item_id in new_ids if item_id in old_position]
+    tails: List[int] = []
+    tail_at: List[int] = []
+    parent = [-1] * len(kept)
+    for i, item_id in enumerate(kept):
+        k = bisect.bisect_left(tails, old_position[item_id])
+        if k == len(tails):
+            tails.append(old_position[item_id])
+            tail_at.append(i)
+        else:
+            tails[k] = old_position[item_id]
+            tail_at[k] = i
+        parent[i] = tail_at[k - 1] if k else -1
+    stable = set()
+    i = tail_at[-1] if tail_at else -1
+    while i >= 0:
+        stable.add(kept[i])
+        i = parent[i]
+    return [
+        [item_id, new_ids[position - 1] if position else None]
+        for position, item_id in enumerate(new_ids) if item_id not in stable
+    ]
+
+
+def make_delta(old: Any, new: Any) -> Optional[Dict[str, Any]]:
+    """Delta turning `old` into `new`; None when they are equal"""
+    if old == new:
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch: Dict[str, Any] = {}
+        assigned = {key: value for key, value in new.items() if key not in old}
+        removed = [key for key in old if key not in new]
+        children = {}
+        for key, value in new.items():
+            if key in old and old[key] != value:
+                child = make_delta(old[key], value)
+                if "v" in child:
+                    assigned[key] = value
+                else:
+                    children[key] = child
+        if assigned:
+            patch["s"] = assigned
+        if removed:
+            patch["u"] = removed
+        if children:
+            patch["c"] = children
+        return {"d": patch}
+
+    old_index, new_index = _keyed(old), _keyed(new)
+    if old_index is not None and new_index is not None:
+        patch = {}
+        removed = [item_id for item_id in old_index if item_id not in new_index]
+        placed = _placements(list(old_index), list(new_index))
+        added = {item_id: item for item_id, item in new_index.items() if item_id not in old_index}
+        children = {}
+        for item_id, item in new_index.items():
+            if item_id in old_index and old_index[item_id] != item:
+                children[item_id] = make_delta(old_index[item_id], item)
+        if removed:
+            patch["r"] = removed
+        if placed:
+            patch["p"] = placed
+        if added:
+            patch["s"] = added
+        if children:
+            patch["c"] = children
+        return {"l": patch}
+    return {"v": new}
+
+
+def apply_delta(old: Any, delta: Dict[str, Any]) -> Any:
+    if "v" in delta:
+        return copy.deepcopy(delta["v"])
+    if "d" in delta:
+        patch = delta["d"]
+        result = dict(old)
+        for key in patch.get("u", []):
+            result.pop(key, None)
+        for key, child in patch.get("c", {}).items():
+            result[key] = apply_delta(old[key], child)
+        result.update(copy.deepcopy(patch.get("s", {})))
+        return result
+    patch = delta["l"]
+    index = {item["id"]: item for item in old}
+    added = patch.get("s", {})
+    children = patch.get("c", {})
+    placed = patch.get("p", [])
+    skipped = set(patch.get("r", [])) | {item_id for item_id, _ in placed}
+    followers: Dict[Optional[str], List[str]] = {}
+    for item_id, predecessor in placed:
+        followers.setdefault(predecessor, []).append(item_id)
+
+    order: List[str] = []
+
+    def emit(item_id: Optional[str]):
+        pending = list(reversed(followers.get(item_id, [])))
+        while pending:
+            current = pending.pop()
+            order.append(current)
+            pending.extend(reversed(followers.get(current, [])))
+    emit(None)
+    for item_id in index:
+        if item_id not in skipped:
+            order.append(item_id)
+            emit(item_id)
+
+    result = []
+    for item_id in order:
+        if item_id in added:
+            result.append(copy.deepcopy(added[item_id]))
+        elif item_id in children:
+            result.append(apply_delta(index[item_id], children[item_id]))
+        else:
+            result.append(index[item_id])
+    return result
+
+
+def versioned_content(process: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of a process document that version history tracks"""
+    return json.loads(_dumps({key: value for key, value in process.items() if key not in UNVERSIONED_FIELDS}))
+
+
+class VersionStore:
+    def plan(self, previous: Optional[Tuple[int, Dict[str, Any], int]], content: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Storage entry for `content` given the previous recorded version as
+        (version, content, deltas since its snapshot), or None for the first version
+        """
+        full = _dumps(content)
+        if previous is not None and previous[2] < MAX_CHAIN_LENGTH:
+            delta = _dumps(make_delta(previous[1], content) or {"d": {}})
+            if len(delta) < len(full) * SNAPSHOT_SIZE_RATIO:
+                return {"kind": "delta", "base": previous[0], "chain": previous[2] + 1, "delta": delta, "size": len(delta)}
+        return {"kind": "snapshot", "base": None, "chain": 0, "snapshot": content, "size": len(full)}
+
+    async def _latest_chain(self, collection, process_id: str, version: int, inclusive: bool) -> List[Dict[str, Any]]:
+        """Entries from the newest version (<= or < `version`) back to its snapshot, oldest first"""
+        bound = "$lte" if inclusive else "$lt"
+        entries = await collection.find(
+            {"processId": process_id, "version": {bound: version}}, {"_id": 0}
+        ).sort("version", -1).limit(MAX_CHAIN_LENGTH + 1).to_list(MAX_CHAIN_LENGTH + 1)
+        chain = []
+        for entry in entries:
+            if chain and chain[-1].get("base") != entry["version"]:
+                return []  # Gap in the history: the chain can't be rebuilt
+            chain.append(entry)
+            if entry["kind"] == "snapshot":
+                return chain[::-1]
+        return []
+
+    def _rebuild(self, chain: List[Dict[str, Any]]) -> Dict[str, Any]:
+        content = chain[0]["snapshot"]
+        for entry in chain[1:]:
+            content = apply_delta(content, json.loads(entry["delta"]))
+        return content
+
+    async def record(self, collection, process: Dict[str, Any], author_id: Optional[str] = None,
+                     summary: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Store the process's current version. Recording the same content again is a
+        no-op; the same version with different content raises VersionConflictError.
+        """
+        process_id, version = process["id"], int(process.get("version", 1))
+        content = versioned_content(process)
+        chain = await self._latest_chain(collection, process_id, version, inclusive=False)
+        previous = (chain[-1]["version"], self._rebuild(chain), chain[-1]["chain"]) if chain else None
+
+        entry = {
+            "processId": process_id,
+            "version": version,
+            **self.plan(previous, content),
+            "authorId": author_id,
+            "summary": summary,
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            result = await collection.update_one(
+                {"processId": process_id, "version": version},
+                {"$setOnInsert": entry},
+                upsert=True
+            )
+            inserted = result.upserted_id is not None
+        except DuplicateKeyError:
+            inserted = False  # A concurrent writer inserted it first
+        if not inserted:
+            existing = await self.load(collection, process_id, version)
+            if existing is None:
+                logger.warning(f"⚠️ Version {version} of process {process_id} exists but its history can't be rebuilt")
+            elif existing != content:
+                raise VersionConflictError(f"Version {version} of process {process_id} is already recorded with different content")
+            return await collection.find_one({"processId": process_id, "version": version}, ENTRY_PROJECTION)
+        logger.info(f"🗂️ Recorded version {version} of process {process_id} as {entry['kind']} ({entry['size']} bytes)")
+        return entry
+
+    async def record_delta(self, collection, process_id: str, version: int, delta: Dict[str, Any],
+                           author_id: Optional[str] = None, summary: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Store a version given as its delta from the previous version. Returns None when
+        it has to be stored some other way (previous version not recorded, chain full):
+        the caller records the document instead.
+        """
+        base = await collection.find_one({"processId": process_id, "version": version - 1}, ENTRY_PROJECTION)
+        if base is None or base.get("chain", 0) >= MAX_CHAIN_LENGTH:
+            return None
+        encoded = _dumps(delta)
+        entry = {
+            "processId": process_id,
+            "version": version,
+            "kind": "delta",
+            "base": version - 1,
+            "chain": base.get("chain", 0) + 1,
+            "delta": encoded,
+            "size": len(encoded),
+            "authorId": author_id,
+            "summary": summary,
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            result = await collection.update_one(
+                {"processId": process_id, "version": version},
+                {"$setOnInsert": entry},
+                upsert=True
+            )
+            inserted = result.upserted_id is not None
+        except DuplicateKeyError:
+            inserted = False
+        if not inserted:
+            existing = await collection.find_one({"processId": process_id, "version": version}, {"_id": 0})
+            if existing.get("delta") != encoded:
+                previous = await self.load(collection, process_id, version - 1)
+                current = await self.load(collection, process_id, version)
+                if previous is not None and current is not None and apply_delta(previous, json.loads(encoded)) != current:
+                    raise VersionConflictError(f"Version {version} of process {process_id} is already recorded with different content")
+            return {key: value for key, value in existing.items() if key not in ENTRY_PROJECTION}
+        logger.info(f"🗂️ Recorded version {version} of process {process_id} as delta ({entry['size']} bytes)")
+        return entry
+
+    async def load(self, collection, process_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Content of one version, or None if it was never recorded"""
+        chain = await self._latest_chain(collection, process_id, version, inclusive=True)
+        if not chain or chain[-1]["version"] != version:
+            return None
+        return self._rebuild(chain)
+
+    async def list(self, collection, process_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Version entries newest first, without their payloads"""
+        return await collection.find(
+            {"processId": process_id}, ENTRY_PROJECTION
+        ).sort("version", -1).limit(limit).to_list(limit)
+
+
+# Global version store instance
+version_store = VersionStore()
@@ -3,17 +3,40 @@ import { Mic, MessageSquare, ArrowRight, X, Sparkles, CheckCircle } from 'lucide
 import { Button } from '@/components/ui/button';
 import { Card } from '@/components/ui/card';
 import { toast } from 'sonner';
-import { api } from '@/utils/api';
+import { streamTranscription } from '@/utils/sseClient';
+import { startLiveTranscription } from '@/utils/liveTranscription';
 
 const ContextAdder = ({ documentText, onContextAdded, onSkip }) => {
   const [mode, setMode] = useState(null); // 'voice' or 'chat'
   const [chatContext, setChatContext] = useState('');
   const [isRecording, setIsRecording] = useState(false);
   const [isTranscribing, setIsTranscribing] = useState(false);
+  const [transcriptionProgress, setTranscriptionProgress] = useState(null); // { completed, total }
+  const [liveSession, setLiveSession] = useState(null);
+  const [liveTranscript, setLiveTranscript] = useState('');
   const [mediaRecorder, setMediaRecorder] = useState(null);
   const [audioChunks, setAudioChunks] = useState([]);
 
+  const startLiveRecording = async () => {
+    const session = await startLiveTranscription({
+      onPartial: ({ transcript }) => setLiveTranscript(transcript),
+      onError: (error) => console.error(error),
+    });
+    setLiveTranscript('');
+    setLiveSession(session);
+    setIsRecording(true);
+    toast.success('Recording started - speak now');
+  };
+
   const startRecording = async () => {
+    try {
+      await startLiveRecording();
+      return;
+    } catch (error) {
+      // Live streaming unavailable: record the whole clip and upload it afterwards
+      console.warn('Live transcription unavailable, recording full clip:', error);
+    }
+
     try {
       const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
       const recorder = new MediaRecorder(stream);
@@ -42,7 +65,22 @@ const ContextAdder = ({ documentText, onContextAdded, onSkip }) => {
     }
   };
 
-  const stopRecording = () => {
+  const stopRecording = async () => {
+    if (liveSession && isRecording) {
+      setIsRecording(false);
+      setIsTranscribing(true);
+      try {
+        const result = await liveSession.stop();
+        setChatContext(result.text);
+        toast.success('Voice transcribed successfully!');
+      } catch (error) {
+        toast.error('Failed to transcribe audio. Please try again.');
+        console.error(error);
+      }
+      setLiveSession(null);
+      setIsTranscribing(false);
+      return;
+    }
     if (mediaRecorder && isRecording) {
       mediaRecorder.stop();
       setIsRecording(false);
@@ -51,16 +89,23 @@ const ContextAdder = ({ documentText, onContextAdded, onSkip }) => {
   };
 
   const transcribeAudio = async (audioBlob) => {
-    try {
-      const result = await api.transcribeAudio(audioBlob);
-      setChatContext(result.text);
-      setIsTranscribing(false);
-      toast.success('Voice transcribed successfully!');
-    } catch (error) {
-      setIsTranscribing(false);
-      toast.error('Failed to transcribe audio. Please try again.');
-      console.error(error);
-    }
+    let failed = false;
+    setTranscriptionProgress(null);
+    await streamTranscription(audioBlob, {
+      onSegments: ({ total }) => setTranscriptionProgress({ completed: 0, total }),
+      onSegment: ({ completed, total }) => setTranscriptionProgress({ completed, total }),
+      onComplete: ({ text }) => {
+        setChatContext(text);
+        toast.success('Voice transcribed successfully!');
+      },
+      onError: (error) => {
+        failed = true;
+        toast.error('Failed to transcribe audio. Please try again.');
+        console.error(error);
+      },
+    });
+    if (failed) setTranscriptionProgress(null);
+    setIsTranscribing(false);
   };
 
   const handleAddContext = () => {
@@ -195,6 +240,11 @@ const ContextAdder = ({ documentText, onContextAdded, onSkip }) => {
                     </div>
                     <p className="text-lg font-semibold text-slate-800 mb-2">Recording...</p>
                     <p className="text-sm text-slate-600 mb-4">Speak clearly about additional details</p>
+                    {liveTranscript && (
+                      <p className="text-sm text-slate-700 bg-slate-50 rounded-lg p-3 mb-4 text-left max-h-32 overflow-y-auto">
+                        {liveTranscript}
+                      </p>
+                    )}
                     <Button
                       onClick={stopRecording}
                       variant="outline"
@@ -209,7 +259,11 @@ const ContextAdder = ({ documentText, onContextAdded, onSkip }) => {
                   <div className="text-center py-8">
                     <div className="w-16 h-16 border-4 border-blue-600 border-t-transparent rounded-full animate-spin mx-auto mb-4"></div>
                     <p className="text-lg font-semibold text-slate-800">Transcribing...</p>
-                    <p className="text-sm text-slate-600">Converting your voice to text with AI</p>
+                    <p className="text-sm text-slate-600">
+                      {transcriptionProgress && transcriptionProgress.total > 1
+                        ? `Transcribed ${transcriptionProgress.completed} of ${transcriptionProgress.total} segments`
+                        : 'Converting your voice to text with AI'}
+                    </p>
                   </div>
                 )}
               </div>
@@ -90,7 +90,7 @@ const Dashboard = ({ currentWorkspace, workspaces, onWorkspacesUpdate }) => {
   const loadProcesses = async () => {
     setLoading(true);
     try {
-      const data = await api.getProcesses();
+      const data = await api.getAllProcessSummaries({ fields: ['description', 'publishedAt'] });
       
       // Store ALL processes for empty state check
       setAllProcesses(data);
@@ -125,10 +125,11 @@ const Dashboard = ({ currentWorkspace, workspaces, onWorkspacesUpdate }) => {
       const data = await api.searchProcesses(
         searchQuery.trim(), 
         null, // Don't filter by workspace for search
-        filterStatus === 'all' ? null : filterStatus
+        filterStatus === 'all' ? null : filterStatus,
+        { limit: 200, fields: ['description', 'publishedAt'] }
       );
       console.log('🔍 Search results:', data);
-      setProcesses(data);
+      setProcesses(data.items);
     } catch (error) {
       console.error('❌ Search error:', error);
       toast.error('Failed to search processes');
@@ -583,7 +584,7 @@ const Dashboard = ({ currentWorkspace, workspaces, onWorkspacesUpdate }) => {
                           {process.views || 0}
                         </span>
                         <span>
-                          {process.nodes?.length || 0} steps
+                          {(process.nodeCount ?? process.nodes?.length) || 0} steps
                         </span>
                         <span>
                           v{process.version}
@@ -61,7 +61,7 @@ const DocumentUploader = ({ onComplete, onCancel }) => {
           <Upload className="w-16 h-16 text-slate-400 mx-auto mb-4" />
           <h3 className="text-lg font-semibold text-slate-800 mb-2">Drop files here or click to browse</h3>
           <p className="text-sm text-slate-600">Supports PDF, Word, Excel, images (JPG, PNG), and text files</p>
-          <input id="fileInput" type="file" multiple accept=".pdf,.doc,.docx,.txt,.jpg,.png,.xlsx,.xls" onChange={handleFileSelect} className="hidden" />
+          <input id="fileInput" type="file" multiple accept=".pdf,.doc,.docx,.txt,.csv,.jpg,.png,.xlsx,.xls" onChange={handleFileSelect} className="hidden" />
         </div>
       )}
 
@@ -123,7 +123,7 @@ const DocumentUploader = ({ onComplete, onCancel }) => {
           <div>• Word documents (.doc, .docx)</div>
           <div>• Excel spreadsheets (.xlsx, .xls)</div>
           <div>• Images (.jpg, .png) with OCR</div>
-          <div>• Plain text files (.txt)</div>
+          <div>• Plain text and CSV files (.txt, .csv)</div>
           <div>• Email exports (.eml, .msg)</div>
         </div>
       </div>
@@ -73,7 +73,7 @@ const StudioDashboard = () => {
   const loadProcesses = async () => {
     setLoading(true);
     try {
-      const data = await api.getProcesses();
+      const data = await api.getAllProcessSummaries({ fields: ['description', 'publishedAt'] });
       setAllProcesses(data);
       
       // Filter by current studio
@@ -92,9 +92,13 @@ const StudioDashboard = () => {
 
   const performSearch = async () => {
     try {
-      const data = await api.searchProcesses(searchQuery);
-      const filtered = filterStatus === 'all' ? data : data.filter(p => p.status === filterStatus);
-      setProcesses(filtered);
+      const data = await api.searchProcesses(
+        searchQuery,
+        null,
+        filterStatus === 'all' ? null : filterStatus,
+        { limit: 200, fields: ['description', 'publishedAt'] }
+      );
+      setProcesses(data.items);
     } catch (error) {
       toast.error('Search failed');
     }
@@ -304,7 +308,7 @@ const StudioDashboard = () => {
                     </span>
                     <span className="flex items-center gap-1">
                       <Zap className="w-4 h-4" />
-                      {process.nodes?.length || 0} stages
+                      {(process.nodeCount ?? process.nodes?.length) || 0} stages
                     </span>
                   </div>
 
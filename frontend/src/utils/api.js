@@ -3,8 +3,14 @@ import axios from 'axios';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL || window.location.origin;
 const API = `${BACKEND_URL}/api`;
 
+// Identifies this tab in collaboration broadcasts, so it can skip its own edits
+export const CLIENT_ID = (window.crypto && window.crypto.randomUUID)
+  ? window.crypto.randomUUID()
+  : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
 // Configure axios to always send credentials (cookies)
 axios.defaults.withCredentials = true;
+axios.defaults.headers.common['X-Client-Id'] = CLIENT_ID;
 
 // Add request interceptor to include token from localStorage if available
 axios.interceptors.request.use(
@@ -20,6 +26,10 @@ axios.interceptors.request.use(
   }
 );
 
+// Conditional write: the server rejects it with 409 if the process revision moved on
+const ifMatch = (revision) =>
+  revision === undefined || revision === null ? {} : { headers: { 'If-Match': `"${revision}"` } };
+
 export const api = {
   // Process endpoints
   analyzeDocument: async (text, inputType) => {
@@ -51,11 +61,39 @@ export const api = {
     return res.data;
   },
 
-  searchProcesses: async (query, workspaceId = null, status = null) => {
+  // Dashboard listing: one page of summaries ({ items, nextCursor }), newest first
+  getProcessSummaries: async ({ workspaceId = null, status = null, limit = null, cursor = null, fields = null } = {}) => {
+    const params = {};
+    if (workspaceId) params.workspace_id = workspaceId;
+    if (status) params.status = status;
+    if (limit) params.limit = limit;
+    if (cursor) params.cursor = cursor;
+    if (fields) params.fields = fields.join(',');
+    const res = await axios.get(`${API}/process/summary`, { params });
+    return res.data;
+  },
+
+  // Every summary page, followed through the cursors
+  getAllProcessSummaries: async (options = {}) => {
+    const items = [];
+    let cursor = null;
+    do {
+      const page = await api.getProcessSummaries({ limit: 200, ...options, cursor });
+      items.push(...page.items);
+      cursor = page.nextCursor;
+    } while (cursor);
+    return items;
+  },
+
+  // Ranked search: { items (summaries with score and snippets), total, nextOffset }
+  searchProcesses: async (query, workspaceId = null, status = null, { limit = null, offset = null, fields = null } = {}) => {
     const params = new URLSearchParams();
     if (query) params.append('q', query);
     if (workspaceId) params.append('workspace_id', workspaceId);
     if (status) params.append('status', status);
+    if (limit) params.append('limit', limit);
+    if (offset) params.append('offset', offset);
+    if (fields) params.append('fields', fields.join(','));
     
     const queryString = params.toString();
     const url = `${API}/process/search${queryString ? '?' + queryString : ''}`;
@@ -71,8 +109,19 @@ export const api = {
     return res.data;
   },
 
-  updateProcess: async (id, process) => {
-    const res = await axios.put(`${API}/process/${id}`, process);
+  updateProcess: async (id, process, revision) => {
+    const res = await axios.put(`${API}/process/${id}`, process, ifMatch(revision));
+    return res.data;
+  },
+
+  // Partial update: an array is sent as a JSON Patch, an object as a merge patch
+  patchProcess: async (id, patch, revision) => {
+    const contentType = Array.isArray(patch) ? 'application/json-patch+json' : 'application/merge-patch+json';
+    const config = ifMatch(revision);
+    const res = await axios.patch(`${API}/process/${id}`, patch, {
+      ...config,
+      headers: { ...config.headers, 'Content-Type': contentType },
+    });
     return res.data;
   },
 
@@ -102,6 +151,38 @@ export const api = {
     return res.data;
   },
 
+  // Critical path, slack and parallel candidates (computed server-side, no AI call)
+  getProcessAnalysis: async (id) => {
+    const res = await axios.get(`${API}/process/${id}/analysis`);
+    return res.data;
+  },
+
+  simulateProcess: async (id, options = {}) => {
+    const res = await axios.post(`${API}/process/${id}/simulate`, options);
+    return res.data;
+  },
+
+  diffProcess: async (id, otherVersion) => {
+    const res = await axios.post(`${API}/process/${id}/diff`, otherVersion);
+    return res.data;
+  },
+
+  // Version history
+  getProcessVersions: async (id) => {
+    const res = await axios.get(`${API}/process/${id}/versions`);
+    return res.data;
+  },
+
+  getProcessVersion: async (id, version) => {
+    const res = await axios.get(`${API}/process/${id}/versions/${version}`);
+    return res.data;
+  },
+
+  restoreProcessVersion: async (id, version) => {
+    const res = await axios.post(`${API}/process/${id}/versions/${version}/restore`);
+    return res.data;
+  },
+
 
   // Workspace APIs
   getWorkspaces: async () => {
@@ -159,6 +240,33 @@ export const api = {
     return res.data;
   },
 
+  // Server-computed flowchart layout (positions keyed by node id)
+  getProcessLayout: async (processId) => {
+    const res = await axios.get(`${API}/process/${processId}/layout`);
+    return res.data;
+  },
+
+  // BPMN import/export endpoints
+  importBpmn: async (file) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    const res = await axios.post(`${API}/process/import/bpmn`, formData);
+    return res.data;
+  },
+
+  importBpmnBulk: async (files, workspaceId = null) => {
+    const formData = new FormData();
+    files.forEach((file) => formData.append('files', file));
+    if (workspaceId) formData.append('workspaceId', workspaceId);
+    const res = await axios.post(`${API}/process/import/bpmn/bulk`, formData);
+    return res.data;
+  },
+
+  exportBpmn: async (processId) => {
+    const res = await axios.get(`${API}/process/${processId}/export/bpmn`, { responseType: 'blob' });
+    return res.data;
+  },
+
   // Transcribe audio endpoint
   transcribeAudio: async (audioBlob) => {
     const formData = new FormData();
@@ -225,24 +333,31 @@ export const api = {
     return res.data;
   },
 
-  // Node editing
-  updateNode: async (processId, nodeId, nodeData) => {
-    const res = await axios.patch(`${API}/process/${processId}/node/${nodeId}`, nodeData);
+  // Node editing. Pass the process revision to get a 409 (with the current
+  // nodes/edges) instead of overwriting someone else's edit
+  updateNode: async (processId, nodeId, nodeData, revision) => {
+    const res = await axios.patch(`${API}/process/${processId}/node/${nodeId}`, nodeData, ifMatch(revision));
+    return res.data;
+  },
+
+  reorderNodes: async (processId, nodeIds, revision) => {
+    const res = await axios.patch(`${API}/process/${processId}/reorder`, { nodeIds }, ifMatch(revision));
     return res.data;
   },
 
-  reorderNodes: async (processId, nodeIds) => {
-    const res = await axios.patch(`${API}/process/${processId}/reorder`, { nodeIds });
+  addNode: async (processId, nodeData, revision) => {
+    const res = await axios.post(`${API}/process/${processId}/node`, nodeData, ifMatch(revision));
     return res.data;
   },
 
-  addNode: async (processId, nodeData) => {
-    const res = await axios.post(`${API}/process/${processId}/node`, nodeData);
+  deleteNode: async (processId, nodeId, revision) => {
+    const res = await axios.delete(`${API}/process/${processId}/node/${nodeId}`, ifMatch(revision));
     return res.data;
   },
 
-  deleteNode: async (processId, nodeId) => {
-    const res = await axios.delete(`${API}/process/${processId}/node/${nodeId}`);
+  // Several editor changes in one request: applied atomically, one version bump
+  applyProcessOps: async (processId, ops, revision) => {
+    const res = await axios.post(`${API}/process/${processId}/ops`, { ops }, ifMatch(revision));
     return res.data;
   },
 
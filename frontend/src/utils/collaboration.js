@@ -0,0 +1,180 @@
+/**
+ * Real-time process collaboration over WebSocket
+ * Joins /api/process/{id}/ws, keeps the local nodes/edges in step with every
+ * accepted edit (applied in revision order) and sends local edits as op batches.
+ * A gap in revisions triggers a resync instead of polling.
+ * Credentials go in the first message, never in the URL.
+ */
+
+import { CLIENT_ID } from './api';
+
+const RECONNECT_DELAY_MS = 1000;
+const PING_INTERVAL_MS = 25000;
+
+// Refusals from the server: reconnecting would be refused again
+const FINAL_CLOSE_CODES = {
+  4400: 'Collaboration handshake failed',
+  4403: 'Access denied',
+  4404: 'Process not found',
+};
+
+const toWebSocketUrl = (path) => {
+  const backendUrl = process.env.REACT_APP_BACKEND_URL || window.location.origin;
+  return backendUrl.replace(/^http/, 'ws') + path;
+};
+
+/**
+ * Apply ops in the POST /process/{id}/ops vocabulary to { nodes, edges };
+ * returns new arrays, the inputs are not modified.
+ */
+export const applyOps = ({ nodes, edges }, ops) => {
+  let nextNodes = [...nodes];
+  let nextEdges = [...edges];
+  ops.forEach((op) => {
+    switch (op.op) {
+      case 'update':
+        nextNodes = nextNodes.map((n) => (n.id === op.nodeId ? { ...n, ...op.fields } : n));
+        break;
+      case 'add': {
+        const index = op.index ?? nextNodes.length;
+        nextNodes = [...nextNodes.slice(0, index), op.node, ...nextNodes.slice(index)];
+        break;
+      }
+      case 'delete':
+        nextNodes = nextNodes.filter((n) => n.id !== op.nodeId);
+        nextEdges = nextEdges.filter((e) => e.source !== op.nodeId && e.target !== op.nodeId);
+        break;
+      case 'reorder': {
+        const byId = new Map(nextNodes.map((n) => [n.id, n]));
+        nextNodes = op.nodeIds.map((id) => byId.get(id)).filter(Boolean);
+        break;
+      }
+      case 'addEdge':
+        nextEdges = [...nextEdges, op.edge];
+        break;
+      case 'updateEdge':
+        nextEdges = nextEdges.map((e) => (e.id === op.edgeId ? { ...e, ...op.fields } : e));
+        break;
+      case 'deleteEdge':
+        nextEdges = nextEdges.filter((e) => e.id !== op.edgeId);
+        break;
+      default:
+        break;
+    }
+  });
+  return { nodes: nextNodes, edges: nextEdges };
+};
+
+/**
+ * Connect to a process's channel. Callbacks:
+ * - onState({ nodes, edges, revision, canEdit }) whenever the graph changes
+ * - onPresence({ event, connectionId, clientId, name })
+ * - onReload() when the process was replaced wholesale (refetch it)
+ * - onError(message); after a refusal (no access, no such process) it does not reconnect
+ * Returns { sendOps(ops) -> Promise<ack>, close() }. sendOps rejects with
+ * { conflict: true, ...currentState } when someone else's edit landed first.
+ */
+export const connectProcessChannel = (processId, callbacks = {}, options = {}) => {
+  const { onState, onPresence, onReload, onError } = callbacks;
+
+  let socket = null;
+  let closed = false;
+  let pingTimer = null;
+  let state = null;
+  let nextRequestId = 1;
+  const pending = new Map();
+
+  const setState = (next) => {
+    state = next;
+    if (onState) onState(state);
+  };
+
+  const handleEvent = (message) => {
+    if (!state || message.revision == null) {
+      if (message.type === 'reload' && onReload) onReload();
+      return;
+    }
+    if (message.revision <= state.revision) return; // Already part of the snapshot
+    if (message.revision !== state.revision + 1 || message.type !== 'ops') {
+      // Missed an event, or a change we can't replay locally: start from a fresh snapshot
+      socket.send(JSON.stringify({ type: 'sync' }));
+      if (message.type === 'reload' && onReload) onReload();
+      return;
+    }
+    setState({ ...state, ...applyOps(state, message.ops), revision: message.revision });
+  };
+
+  const connect = () => {
+    socket = new WebSocket(toWebSocketUrl(`/api/process/${processId}/ws`));
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      switch (message.type) {
+        case 'snapshot':
+          setState({ nodes: message.nodes, edges: message.edges, revision: message.revision, canEdit: message.canEdit });
+          break;
+        case 'ops':
+        case 'patch':
+        case 'reload':
+          handleEvent(message);
+          break;
+        case 'presence':
+          if (onPresence && message.clientId !== CLIENT_ID) onPresence(message);
+          break;
+        case 'ack':
+        case 'conflict':
+        case 'error': {
+          const request = pending.get(message.requestId);
+          if (request) {
+            pending.delete(message.requestId);
+            if (message.type === 'ack') request.resolve(message);
+            else request.reject(message.type === 'conflict' ? { conflict: true, ...message } : message);
+          }
+          if (message.type === 'conflict') {
+            setState({ ...state, nodes: message.nodes, edges: message.edges, revision: message.revision });
+          } else if (message.type === 'error' && !request && onError) {
+            onError(message.message);
+          }
+          break;
+        }
+        default:
+          break;
+      }
+    };
+    socket.onopen = () => {
+      socket.send(JSON.stringify({
+        type: 'auth',
+        clientId: CLIENT_ID,
+        token: localStorage.getItem('auth_token') || undefined,
+        share: options.shareToken || undefined,
+      }));
+      pingTimer = setInterval(() => socket.send(JSON.stringify({ type: 'ping' })), PING_INTERVAL_MS);
+    };
+    socket.onclose = (event) => {
+      clearInterval(pingTimer);
+      pending.forEach((request) => request.reject({ message: 'Connection closed' }));
+      pending.clear();
+      if (closed) return;
+      if (FINAL_CLOSE_CODES[event.code]) {
+        closed = true;
+        if (onError) onError(FINAL_CLOSE_CODES[event.code]);
+        return;
+      }
+      setTimeout(connect, RECONNECT_DELAY_MS); // The snapshot on reconnect catches up on missed edits
+    };
+  };
+
+  connect();
+
+  return {
+    sendOps: (ops) =>
+      new Promise((resolve, reject) => {
+        const requestId = String(nextRequestId++);
+        pending.set(requestId, { resolve, reject });
+        socket.send(JSON.stringify({ type: 'ops', ops, revision: state ? state.revision : undefined, requestId }));
+      }),
+    close: () => {
+      closed = true;
+      socket.close();
+    },
+  };
+};
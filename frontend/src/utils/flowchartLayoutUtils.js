@@ -8,7 +8,8 @@ const NODE_WIDTH = 280;
 const NODE_HEIGHT = 110;
 const DECISION_SIZE = 280;
 
-export const convertToReactFlowFormat = (process) => {
+// Pass the result of api.getProcessLayout() as serverLayout to skip Dagre
+export const convertToReactFlowFormat = (process, serverLayout = null) => {
   if (!process || !process.nodes) return { nodes: [], edges: [] };
 
   const nodes = [];
@@ -77,6 +78,15 @@ export const convertToReactFlowFormat = (process) => {
     }
   }
 
+  // Server-side layered layout (cached per process version) when it covers every node
+  const positions = serverLayout?.positions;
+  if (positions && nodes.every((node) => positions[node.id])) {
+    return {
+      nodes: nodes.map((node) => ({ ...node, position: positions[node.id] })),
+      edges,
+    };
+  }
+
   // Apply Dagre layout
   return getLayoutedElements(nodes, edges);
 };
@@ -0,0 +1,112 @@
+/**
+ * Live transcription over WebSocket
+ * Captures microphone audio as 16-bit PCM and streams it to /api/transcribe/ws
+ * while the user is still speaking; partial transcripts arrive as windows finish.
+ */
+
+const CHUNK_FRAMES = 4096;
+
+const toWebSocketUrl = (path) => {
+  const backendUrl = process.env.REACT_APP_BACKEND_URL || window.location.origin;
+  return backendUrl.replace(/^http/, 'ws') + path;
+};
+
+const floatToPcm16 = (samples) => {
+  const pcm = new Int16Array(samples.length);
+  for (let i = 0; i < samples.length; i++) {
+    const s = Math.max(-1, Math.min(1, samples[i]));
+    pcm[i] = s < 0 ? s * 0x8000 : s * 0x7fff;
+  }
+  return pcm.buffer;
+};
+
+/**
+ * Start recording and streaming. Resolves once the server is ready, with
+ * { stop } - stop() ends the recording and resolves with the final result.
+ * Rejects if the microphone or the connection is unavailable, so callers can
+ * fall back to recording the whole clip.
+ */
+export const startLiveTranscription = async (callbacks = {}) => {
+  const { onPartial, onProcesses, onError } = callbacks;
+
+  const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+  const AudioContextClass = window.AudioContext || window.webkitAudioContext;
+  // 16kHz is all Whisper uses; browsers that ignore the hint report their own rate
+  const audioContext = new AudioContextClass({ sampleRate: 16000 });
+  const source = audioContext.createMediaStreamSource(stream);
+  const processor = audioContext.createScriptProcessor(CHUNK_FRAMES, 1, 1);
+  const socket = new WebSocket(toWebSocketUrl('/api/transcribe/ws'));
+  socket.binaryType = 'arraybuffer';
+
+  let resolveFinal;
+  let rejectFinal;
+  const finalResult = new Promise((resolve, reject) => {
+    resolveFinal = resolve;
+    rejectFinal = reject;
+  });
+  finalResult.catch(() => {}); // Errors before stop() are reported through onError
+
+  const releaseAudio = () => {
+    processor.disconnect();
+    source.disconnect();
+    stream.getTracks().forEach((track) => track.stop());
+    audioContext.close().catch(() => {});
+  };
+
+  await new Promise((resolve, reject) => {
+    socket.onopen = () => {
+      socket.send(JSON.stringify({ type: 'start', format: 'pcm16', sampleRate: audioContext.sampleRate }));
+    };
+    socket.onerror = () => {
+      releaseAudio();
+      reject(new Error('Live transcription connection failed'));
+    };
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      switch (message.type) {
+        case 'ready':
+          resolve();
+          break;
+        case 'partial':
+          if (onPartial) onPartial(message);
+          break;
+        case 'processes':
+          if (onProcesses) onProcesses(message);
+          break;
+        case 'final':
+          resolveFinal(message);
+          socket.close();
+          break;
+        case 'error': {
+          const error = new Error(message.error || 'Live transcription failed');
+          releaseAudio();
+          reject(error);
+          rejectFinal(error);
+          if (onError) onError(error);
+          break;
+        }
+        default:
+          break;
+      }
+    };
+    socket.onclose = () => rejectFinal(new Error('Live transcription connection closed'));
+  });
+
+  processor.onaudioprocess = (event) => {
+    if (socket.readyState === WebSocket.OPEN) {
+      socket.send(floatToPcm16(event.inputBuffer.getChannelData(0)));
+    }
+  };
+  source.connect(processor);
+  processor.connect(audioContext.destination);
+
+  return {
+    stop: () => {
+      releaseAudio();
+      if (socket.readyState === WebSocket.OPEN) {
+        socket.send(JSON.stringify({ type: 'stop' }));
+      }
+      return finalResult;
+    },
+  };
+};
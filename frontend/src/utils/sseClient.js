@@ -86,3 +86,93 @@ export const streamDocumentAnalysis = async (text, callbacks = {}) => {
   consumer.connect();
   return consumer;
 };
+
+/**
+ * POST a form and dispatch the Server-Sent Events in the response to handlers
+ * EventSource only supports GET, so the body is sent with fetch and the
+ * SSE frames are parsed from the response stream.
+ */
+const postEventStream = async (path, formData, handlers, onError) => {
+  const backendUrl = process.env.REACT_APP_BACKEND_URL || window.location.origin;
+
+  const dispatch = (frame) => {
+    let event = 'message';
+    const dataLines = [];
+    frame.split('\n').forEach((line) => {
+      if (line.startsWith('event:')) event = line.slice(6).trim();
+      else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+    });
+    if (!dataLines.length || !handlers[event]) return;
+    try {
+      handlers[event](JSON.parse(dataLines.join('\n')));
+    } catch (e) {
+      console.error(`Failed to parse ${event} event:`, e);
+    }
+  };
+
+  try {
+    const response = await fetch(`${backendUrl}${path}`, {
+      method: 'POST',
+      body: formData,
+      credentials: 'include',
+    });
+    if (!response.ok) {
+      const detail = await response.json().catch(() => ({}));
+      throw new Error(detail.detail || `Upload failed (${response.status})`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, '\n');
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        dispatch(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+      }
+    }
+  } catch (error) {
+    console.error(`Streaming request to ${path} failed:`, error);
+    if (onError) onError(error);
+  }
+};
+
+/**
+ * Stream a document upload with per-page results
+ */
+export const streamDocumentUpload = async (file, callbacks = {}) => {
+  const { onProgress, onPage, onProcesses, onComplete, onError } = callbacks;
+
+  const formData = new FormData();
+  formData.append('file', file);
+
+  await postEventStream('/api/upload/stream', formData, {
+    progress: onProgress,
+    page: onPage,
+    processes: onProcesses,
+    complete: onComplete,
+    error: (data) => onError && onError(new Error(data.error || 'Extraction failed')),
+  }, onError);
+};
+
+/**
+ * Stream an audio transcription with per-segment progress
+ * Segment events can arrive out of order; use `index` to place them.
+ */
+export const streamTranscription = async (audioBlob, callbacks = {}) => {
+  const { onSegments, onSegment, onComplete, onError } = callbacks;
+
+  const formData = new FormData();
+  formData.append('file', audioBlob, 'recording.webm');
+
+  await postEventStream('/api/transcribe/stream', formData, {
+    segments: onSegments,
+    segment: onSegment,
+    complete: onComplete,
+    error: (data) => onError && onError(new Error(data.error || 'Transcription failed')),
+  }, onError);
+};
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# Backend modules import each other as top-level modules (uvicorn runs from backend/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """(server module, in-memory db, TestClient); skipped where the server's dependencies are missing"""
+    pytest.importorskip("emergentintegrations")
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "flowpro_test")
+    import server
+    from fastapi.testclient import TestClient
+    from tests.fake_mongo import FakeDatabase
+
+    db = FakeDatabase()
+    monkeypatch.setattr(server, "db", db)
+    return server, db, TestClient(server.app)
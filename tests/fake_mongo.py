@@ -0,0 +1,140 @@
+"""
+In-memory stand-in for the few motor collection calls the process endpoints make.
+Supports equality, $in, $lt, $lte and $gte filters on top-level fields, $set/$inc/$unset/$push/$pull
+updates and "list.$[name].field" paths with one equality array filter.
+"""
+
+import copy
+from types import SimpleNamespace
+
+from pymongo import ReturnDocument
+
+OPERATORS = {
+    "$in": lambda value, expected: value in expected,
+    "$lt": lambda value, expected: value is not None and value < expected,
+    "$lte": lambda value, expected: value is not None and value <= expected,
+    "$gte": lambda value, expected: value is not None and value >= expected,
+}
+
+
+def _matches(document, query):
+    for key, expected in query.items():
+        value = document.get(key)
+        if isinstance(expected, dict) and set(expected) <= set(OPERATORS):
+            if not all(OPERATORS[op](value, operand) for op, operand in expected.items()):
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def _project(document, projection):
+    if document is None:
+        return None
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+    included = [key for key, flag in projection.items() if flag and key != "_id"]
+    if included:
+        return {key: document[key] for key in included if key in document}
+    return {key: value for key, value in document.items() if projection.get(key, 1)}
+
+
+def _pull_matches(item, condition):
+    if isinstance(condition, dict) and "$or" in condition:
+        return any(_pull_matches(item, branch) for branch in condition["$or"])
+    if isinstance(condition, dict):
+        return isinstance(item, dict) and all(item.get(key) == value for key, value in condition.items())
+    return item == condition
+
+
+def _set(document, path, value, array_filters):
+    if ".$[" not in path:
+        document[path] = copy.deepcopy(value)
+        return
+    field, rest = path.split(".$[", 1)
+    name, key = rest.split("].", 1)
+    [(filter_path, expected)] = [(k, v) for f in array_filters for k, v in f.items() if k.startswith(name + ".")]
+    for item in document.get(field, []):
+        if item.get(filter_path.split(".", 1)[1]) == expected:
+            item[key] = copy.deepcopy(value)
+
+
+def _apply(document, update, array_filters=()):
+    for key, value in update.get("$set", {}).items():
+        _set(document, key, value, array_filters)
+    for key, value in update.get("$inc", {}).items():
+        document[key] = (document.get(key) or 0) + value
+    for key in update.get("$unset", {}):
+        document.pop(key, None)
+    for key, value in update.get("$push", {}).items():
+        items = document.setdefault(key, [])
+        if isinstance(value, dict) and "$each" in value:
+            position = value.get("$position", len(items))
+            items[position:position] = copy.deepcopy(value["$each"])
+        else:
+            items.append(copy.deepcopy(value))
+    for key, condition in update.get("$pull", {}).items():
+        document[key] = [item for item in document.get(key, []) if not _pull_matches(item, condition)]
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction=1):
+        self.documents.sort(key=lambda document: document.get(key) or 0, reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count] if count else self.documents
+        return self
+
+    async def to_list(self, length=None):
+        return self.documents[:length] if length else self.documents
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([_project(d, projection) for d in self.documents if _matches(d, query or {})])
+
+    async def find_one(self, query, projection=None):
+        return _project(next((d for d in self.documents if _matches(d, query)), None), projection)
+
+    async def insert_one(self, document):
+        self.documents.append(copy.deepcopy(document))
+
+    async def update_one(self, query, update, upsert=False, array_filters=()):
+        document = next((d for d in self.documents if _matches(d, query)), None)
+        if document is not None:
+            _apply(document, update, array_filters)
+            return SimpleNamespace(matched_count=1, upserted_id=None)
+        if not upsert:
+            return SimpleNamespace(matched_count=0, upserted_id=None)
+        document = {key: value for key, value in query.items() if not isinstance(value, dict)}
+        document.update(copy.deepcopy(update.get("$setOnInsert", {})))
+        _apply(document, update)
+        self.documents.append(document)
+        return SimpleNamespace(matched_count=0, upserted_id=len(self.documents))
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=ReturnDocument.BEFORE, **kwargs):
+        document = next((d for d in self.documents if _matches(d, query)), None)
+        if document is None:
+            return None
+        before = copy.deepcopy(document)
+        _apply(document, update)
+        return _project(document if return_document == ReturnDocument.AFTER else before, projection)
+
+    async def create_index(self, *args, **kwargs):
+        pass
+
+
+class FakeDatabase(dict):
+    def __getattr__(self, name):
+        return self.setdefault(name, FakeCollection())
+
+    def __getitem__(self, name):
+        return self.setdefault(name, FakeCollection())
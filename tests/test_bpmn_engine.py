@@ -0,0 +1,81 @@
+import io
+import zipfile
+
+import pytest
+
+pytest.importorskip("lxml")
+
+import bpmn_engine
+from bpmn_engine import BpmnImportError, import_bpmn, import_bpmn_archive
+
+MODEL = b"""<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="http://www.omg.org/spec/BPMN/20100524/MODEL" id="defs">
+  <process id="p1" name="Supplier onboarding">
+    <startEvent id="start" name="Request received"/>
+    <subProcess id="checks" name="Run checks">
+      <documentation>Finance verifies bank details and tax status</documentation>
+      <task id="bank" name="Verify bank details"/>
+      <sequenceFlow id="f_inner" sourceRef="bank" targetRef="tax"/>
+      <task id="tax" name="Check tax status"/>
+    </subProcess>
+    <task id="record" name="Create supplier record"/>
+    <sequenceFlow id="f1" sourceRef="start" targetRef="checks"/>
+    <sequenceFlow id="f2" sourceRef="checks" targetRef="record"/>
+  </process>
+</definitions>
+"""
+
+
+def archive(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_subprocess_documentation_survives_streaming_release():
+    [process] = import_bpmn(MODEL, "onboarding.bpmn")
+    checks = next(node for node in process["nodes"] if node["id"] == "checks")
+    assert checks["description"] == "Finance verifies bank details and tax status"
+    assert checks["subSteps"] == ["Verify bank details", "Check tax status"]
+
+
+def test_archive_imports_models_and_skips_other_entries():
+    results = import_bpmn_archive(archive({
+        "models/a.bpmn": MODEL, "models/.hidden.bpmn": MODEL, "README.txt": b"notes",
+    }))
+    assert [result["file"] for result in results] == ["models/a.bpmn"]
+    assert results[0]["processes"][0]["processName"] == "Supplier onboarding"
+
+
+def test_archive_entry_count_is_capped(monkeypatch):
+    monkeypatch.setattr(bpmn_engine, "MAX_ARCHIVE_ENTRIES", 3)
+    data = archive({f"notes-{i}.txt": b"x" for i in range(4)})
+    with pytest.raises(BpmnImportError, match="4 entries"):
+        import_bpmn_archive(data)
+
+
+def test_oversized_model_is_reported_without_being_read(monkeypatch):
+    monkeypatch.setattr(bpmn_engine, "MAX_MODEL_BYTES", len(MODEL))
+    results = import_bpmn_archive(archive({"big.bpmn": MODEL + b" " * 10_000, "ok.bpmn": MODEL}))
+    assert "larger than" in results[0]["error"]
+    assert "processes" in results[1]
+
+
+def test_understated_member_size_is_never_expanded():
+    data = bytearray(archive({"bomb.bpmn": b" " * 50_000}))
+    # Forge the declared uncompressed size in the central directory (offset 24 of the record)
+    central = data.rfind(b"PK\x01\x02")
+    data[central + 24:central + 28] = (10).to_bytes(4, "little")
+    with zipfile.ZipFile(io.BytesIO(bytes(data))) as zf:
+        assert zf.infolist()[0].file_size == 10
+    # Reads stop at the declared size and the CRC check rejects the archive
+    with pytest.raises(zipfile.BadZipFile):
+        import_bpmn_archive(bytes(data))
+
+
+def test_total_expanded_size_is_capped(monkeypatch):
+    monkeypatch.setattr(bpmn_engine, "MAX_ARCHIVE_BYTES", len(MODEL) * 2)
+    with pytest.raises(BpmnImportError, match="expands to"):
+        import_bpmn_archive(archive({f"m{i}.bpmn": MODEL for i in range(3)}))
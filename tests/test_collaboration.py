@@ -0,0 +1,189 @@
+import asyncio
+
+import anyio
+import pytest
+
+pytest.importorskip("redis")
+
+import collaboration
+from collaboration import CollaborationHub
+
+PROCESS = {
+    "id": "p1", "name": "Onboarding", "userId": "u1", "status": "draft", "version": 2, "revision": 5,
+    "nodes": [{"id": "n1", "type": "trigger", "title": "Request received"}], "edges": [],
+}
+
+
+class FakeRedis:
+    def __init__(self):
+        self.published = []
+
+    async def ping(self):
+        return True
+
+    async def publish(self, channel, payload):
+        self.published.append((channel, payload))
+
+    async def aclose(self):
+        pass
+
+
+class FakeSocket:
+    def __init__(self, delay=0.0):
+        self.sent = []
+        self.closed = None
+        self.delay = delay
+        self.sending = False
+
+    async def send_text(self, payload):
+        assert not self.sending, "concurrent sends on one socket"
+        self.sending = True
+        await asyncio.sleep(self.delay)
+        self.sending = False
+        self.sent.append(payload)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+def test_worker_without_sockets_still_publishes(monkeypatch):
+    redis = FakeRedis()
+    hub = CollaborationHub()
+
+    async def connect():
+        return redis
+
+    async def no_listener():
+        pass
+
+    monkeypatch.setattr(hub, "_connect", connect)
+    monkeypatch.setattr(hub, "_ensure_listener", no_listener)  # Subscriber down: publisher is independent of it
+    asyncio.run(hub.start())
+    asyncio.run(hub.publish("p1", {"type": "ops", "revision": 6}))
+    assert [channel for channel, _ in redis.published] == ["collab:process:p1"]
+
+
+def test_local_delivery_while_redis_is_down(monkeypatch):
+    hub = CollaborationHub()
+    attempts = []
+
+    async def unavailable():
+        attempts.append(1)
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(hub, "_connect", unavailable)
+    socket = FakeSocket()
+
+    async def run():
+        connection = await hub.join("p1", "c1", socket)
+        await hub.publish("p1", {"type": "ops", "revision": 6})
+        await hub.publish("p1", {"type": "ops", "revision": 7})
+        hub.leave("p1", "c1")
+        await connection.drain()
+
+    asyncio.run(run())
+    assert len(socket.sent) == 2
+    assert len(attempts) == 2  # Listener on join, publisher once: reconnects wait RECONNECT_INTERVAL_SECONDS
+
+
+def test_one_writer_per_socket_and_slow_sockets_are_dropped(monkeypatch):
+    monkeypatch.setattr(collaboration, "SEND_QUEUE_SIZE", 3)
+    hub = CollaborationHub()
+
+    async def unavailable():
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(hub, "_connect", unavailable)
+    fast, slow = FakeSocket(), FakeSocket(delay=0.05)
+
+    async def run():
+        quick = await hub.join("p1", "fast", fast)
+        await hub.join("p1", "slow", slow)
+        assert quick.send("reply")  # A handler reply queues behind broadcasts instead of racing them
+        for revision in range(5):
+            await hub.publish("p1", {"type": "ops", "revision": revision})
+            await asyncio.sleep(0.001)  # The fast socket keeps up, the slow one (50 ms a frame) can't
+        hub.leave("p1", "fast")
+        await quick.drain()
+        await asyncio.sleep(0.3)
+
+    asyncio.run(run())
+    assert len(fast.sent) == 6 and fast.closed is None
+    assert list(hub.rooms) == [] and slow.closed == collaboration.SLOW_CONSUMER_CLOSE_CODE
+    assert len(slow.sent) < 5
+
+
+@pytest.fixture
+def channel(api, monkeypatch):
+    server, db, client = api
+    db.users.documents.append({"id": "u1", "email": "owner@example.com", "name": "Owner"})
+    db.processes.documents.append(dict(PROCESS))
+
+    async def unavailable():
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(server.collaboration_hub, "_connect", unavailable)
+    monkeypatch.setattr(collaboration, "RECONNECT_INTERVAL_SECONDS", 3600)
+    # One event loop for every socket of the test, as in a server worker
+    with anyio.from_thread.start_blocking_portal(**client.async_backend) as portal:
+        client.portal = portal
+        yield server, db, client
+        client.portal = None
+
+
+def close_code(client, path, auth):
+    with client.websocket_connect(path) as socket:
+        if auth is not None:
+            socket.send_json(auth)
+        message = socket.receive()
+    assert message["type"] == "websocket.close"
+    return message["code"]
+
+
+def test_refusals_close_after_the_handshake_with_app_codes(channel):
+    _, _, client = channel
+    assert close_code(client, "/api/process/missing/ws", {"type": "auth"}) == 4404
+    assert close_code(client, "/api/process/p1/ws", {"type": "auth"}) == 4403
+    assert close_code(client, "/api/process/p1/ws", {"type": "ops"}) == 4400
+
+
+def test_token_in_first_message_and_server_connection_ids(channel):
+    server, _, client = channel
+    auth = {"type": "auth", "token": server.create_access_token({"sub": "u1"}), "clientId": "tab-1"}
+    with client.websocket_connect("/api/process/p1/ws") as first, client.websocket_connect("/api/process/p1/ws") as second:
+        first.send_json(auth)
+        one = first.receive_json()
+        second.send_json(auth)  # Same tab id must not evict the first socket
+        two = second.receive_json()
+        assert one["type"] == two["type"] == "snapshot" and one["canEdit"]
+        assert one["connectionId"] != two["connectionId"] and "tab-1" not in (one["connectionId"], two["connectionId"])
+        assert set(server.collaboration_hub.rooms["p1"]) == {one["connectionId"], two["connectionId"]}
+
+
+def reply(socket):
+    """Next message that isn't a presence broadcast"""
+    while True:
+        message = socket.receive_json()
+        if message["type"] != "presence":
+            return message
+
+
+def test_access_is_checked_again_on_every_message(channel):
+    _, db, client = channel
+    db.shares.documents.append({"token": "s1", "processId": "p1", "accessLevel": "edit", "isActive": True})
+    db.processes.documents[0]["status"] = "published"
+    with client.websocket_connect("/api/process/p1/ws") as editor, client.websocket_connect("/api/process/p1/ws") as viewer:
+        editor.send_json({"type": "auth", "share": "s1"})
+        assert editor.receive_json()["canEdit"]
+        viewer.send_json({"type": "auth"})
+        assert viewer.receive_json()["canEdit"] is False
+
+        db.shares.documents[0]["isActive"] = False  # Revoked while the socket is open
+        editor.send_json({"type": "ops", "ops": [{"op": "update", "nodeId": "n1", "fields": {"title": "Sneaky"}}], "requestId": "1"})
+        assert reply(editor) == {"type": "error", "requestId": "1", "message": "Read-only access"}
+        assert db.processes.documents[0]["nodes"][0]["title"] == "Request received"
+
+        db.processes.documents[0]["status"] = "draft"  # Unpublished: viewers lose access on their next message
+        viewer.send_json({"type": "ping"})
+        assert reply(viewer)["message"] == "Access denied"
+        assert viewer.receive()["code"] == 4403
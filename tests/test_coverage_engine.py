@@ -0,0 +1,43 @@
+from coverage_engine import RESIDUAL_MAX_CHARS, coverage_engine, NodeIndex
+
+NODES = [
+    {"id": "n1", "title": "Receive invoice", "description": "Accounts payable receives the supplier invoice",
+     "operationalDetails": {"contactInfo": {"phone": "0894152888"}, "systems": ["Xero"]}},
+]
+
+
+def uncovered(topic: str, words: int) -> str:
+    return " ".join(f"{topic}{i}" for i in range(words))
+
+
+def test_id_like_numbers_are_not_coverage_gaps():
+    text = (
+        "Invoice #10042311 must quote PO 4500012345 and order no. 55512345.\n"
+        "Escalations: call (08) 9415 2888."
+    )
+    check = coverage_engine.check(text, {"nodes": NODES})
+    phones = [m["value"] for m in check["missing"] if m["kind"] == "phone"]
+    assert phones == []
+    assert check["sourceElements"]["contacts"] == 1
+    assert check["capturedElements"]["contacts"] == 1  # Stored without separators on the node
+
+
+def test_residual_keeps_scanning_past_a_paragraph_that_does_not_fit():
+    first = uncovered("alpha", 200)
+    oversized = uncovered("bravo", RESIDUAL_MAX_CHARS // 6)
+    last = uncovered("charlie", 50)
+    residual = coverage_engine.residual_text(f"{first}\n\n{oversized}\n\n{last}", NodeIndex(NODES))
+    assert residual == f"{first}\n\n{last}"
+    assert len(residual) <= RESIDUAL_MAX_CHARS
+
+
+def test_residual_truncates_a_single_oversized_paragraph():
+    oversized = uncovered("delta", RESIDUAL_MAX_CHARS // 5)
+    residual = coverage_engine.residual_text(oversized, NodeIndex(NODES))
+    assert 0 < len(residual) <= RESIDUAL_MAX_CHARS
+    assert oversized.startswith(residual)
+
+
+def test_residual_skips_paragraphs_the_nodes_cover():
+    text = "Accounts payable receives the supplier invoice\n\n" + uncovered("echo", 10)
+    assert coverage_engine.residual_text(text, NodeIndex(NODES)) == uncovered("echo", 10)
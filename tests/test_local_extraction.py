@@ -0,0 +1,40 @@
+import pytest
+
+from local_extraction import extract_phone_numbers
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Call +61 8 9415 2888 for urgent issues", ["+61 8 9415 2888"]),
+    ("Reception: (08) 9415 2888", ["(08) 9415 2888"]),
+    ("Contact Jane on 0412 345 678.", ["0412 345 678"]),
+    ("Helpdesk 1300 555 123 ext 22", ["1300 555 123 ext 22"]),
+    ("Dial 555.123.4567", ["555.123.4567"]),
+    ("Phone: 0894152888", ["0894152888"]),
+    ("call the helpdesk on 94152888", ["94152888"]),
+])
+def test_phone_shapes_are_extracted(text, expected):
+    assert extract_phone_numbers(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Invoice #10042311 is due on receipt",
+    "Quote INV-2024-001234 on the remittance",
+    "Raise PO 4500012345 before ordering",
+    "Match against PO12345678",
+    "Check order no. 55512345 in the portal",
+    "Order 123 456 789 shipped",
+    "Reference: #1234 5678",
+    "Total payable 45000123",
+    "Approve amounts over 1.250.000",
+    "Posted on 2024-01-15",
+])
+def test_ids_amounts_and_dates_are_not_phones(text):
+    assert extract_phone_numbers(text) == []
+
+
+def test_numbers_do_not_run_across_lines():
+    assert extract_phone_numbers("Phone 9415 2888\n2. Log the call") == ["9415 2888"]
+
+
+def test_duplicates_are_reported_once():
+    assert extract_phone_numbers("Call 9415 2888. If busy, call 9415 2888 again.") == ["9415 2888"]
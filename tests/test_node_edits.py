@@ -0,0 +1,89 @@
+import pytest
+
+PROCESS = {
+    "id": "p1", "name": "Onboarding", "userId": "u1", "version": 2, "revision": 5,
+    "updatedAt": "2026-01-01T00:00:00+00:00", "intelligence": {"score": 80},
+    "nodes": [
+        {"id": "n1", "type": "trigger", "title": "Request received"},
+        {"id": "n2", "type": "decision", "title": "Complete?"},
+        {"id": "n3", "type": "process", "title": "Create record"},
+    ],
+    "edges": [
+        {"id": "e1", "source": "n1", "target": "n2"},
+        {"id": "e2", "source": "n2", "target": "n3", "label": "Yes"},
+        {"id": "e3", "source": "n2", "target": "n1", "label": "No"},
+    ],
+}
+
+
+@pytest.fixture
+def editor(api):
+    server, db, client = api
+    db.users.documents.append({"id": "u1", "email": "owner@example.com"})
+    db.users.documents.append({"id": "u2", "email": "viewer@example.com"})
+    db.processes.documents.append({**PROCESS, "nodes": [dict(n) for n in PROCESS["nodes"]], "edges": [dict(e) for e in PROCESS["edges"]]})
+    client.headers["Authorization"] = f"Bearer {server.create_access_token({'sub': 'u1'})}"
+    return server, db, client
+
+
+def stored(db):
+    return db.processes.documents[0]
+
+
+def test_delete_node_pulls_its_edges_in_the_same_write(editor):
+    _, db, client = editor
+    response = client.delete("/api/process/p1/node/n2", headers={"If-Match": "5"})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"6"'
+    process = stored(db)
+    assert [n["id"] for n in process["nodes"]] == ["n1", "n3"]
+    assert process["edges"] == []
+    assert process["version"] == 3
+    assert process["lastChange"]["summary"]["removedNodes"] == 1
+    assert process["lastChange"]["summary"]["removedEdges"] == 3
+    assert "intelligence" not in process
+
+
+def test_node_edits_are_versioned(editor):
+    _, db, client = editor
+    assert client.patch("/api/process/p1/node/n3", json={"title": "Create supplier record"}).status_code == 200
+    assert client.post("/api/process/p1/node", json={"title": "Notify requester", "insertIndex": 3}).status_code == 200
+    process = stored(db)
+    assert process["nodes"][2]["title"] == "Create supplier record"
+    assert process["nodes"][3]["title"] == "Notify requester"
+    assert process["version"] == 4 and process["revision"] == 7
+    assert process["lastChange"] == {
+        "version": 4,
+        "summary": {**process["lastChange"]["summary"], "addedNodes": 1},
+        "impacts": {"intelligence": True, "layout": True, "coverage": True},
+    }
+    history = sorted(db.process_versions.documents, key=lambda entry: entry["version"])
+    assert [(entry["version"], entry["summary"]["event"]) for entry in history] == [(3, "updateNode"), (4, "addNode")]
+
+
+def test_title_edit_keeps_layout_but_invalidates_coverage(editor):
+    _, db, client = editor
+    client.patch("/api/process/p1/node/n3", json={"title": "Create supplier record"})
+    assert stored(db)["lastChange"]["impacts"] == {"intelligence": True, "layout": False, "coverage": True}
+    assert stored(db)["lastChange"]["summary"]["changedFields"] == ["title"]
+
+
+def test_stale_delete_is_a_conflict(editor):
+    _, db, client = editor
+    response = client.delete("/api/process/p1/node/n2", headers={"If-Match": "4"})
+    assert response.status_code == 409
+    assert len(stored(db)["nodes"]) == 3
+    assert db.process_versions.documents == []
+
+
+def test_last_node_cannot_be_deleted(editor):
+    _, db, client = editor
+    stored(db)["nodes"] = stored(db)["nodes"][:1]
+    assert client.delete("/api/process/p1/node/n1").status_code == 400
+
+
+def test_unknown_node_and_foreign_process(editor):
+    server, _, client = editor
+    assert client.delete("/api/process/p1/node/missing").status_code == 404
+    client.headers["Authorization"] = f"Bearer {server.create_access_token({'sub': 'u2'})}"
+    assert client.patch("/api/process/p1/node/n1", json={"title": "Mine now"}).status_code == 403
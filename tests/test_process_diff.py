@@ -0,0 +1,66 @@
+from process_diff import process_differ
+
+
+def node(node_id, title, **fields):
+    return {"id": node_id, "title": title, "type": "process", **fields}
+
+
+def chain(*nodes):
+    return [{"source": a["id"], "target": b["id"]} for a, b in zip(nodes, nodes[1:])]
+
+
+def test_position_only_change_is_not_structural():
+    old = {"nodes": [node("a", "Receive", position={"x": 0, "y": 0})], "edges": []}
+    new = {"nodes": [node("a", "Receive", position={"x": 300, "y": 40})], "edges": []}
+    diff = process_differ.diff(old, new)
+    assert not diff.structural
+    assert diff.impacts() == {"intelligence": False, "layout": False, "coverage": False}
+
+
+def test_missing_field_equals_its_empty_default():
+    diff = process_differ.diff({"nodes": [node("a", "Receive")]}, {"nodes": [node("a", "Receive", actors=[], description="")]})
+    assert diff.modified_nodes == []
+
+
+def test_regenerated_ids_match_by_title_and_edges_follow():
+    a, b = node("a", "Receive invoice"), node("b", "Approve invoice")
+    a2, b2 = node("x1", "Receive invoices"), node("x2", "Approve invoice")
+    diff = process_differ.diff({"nodes": [a, b], "edges": chain(a, b)}, {"nodes": [a2, b2], "edges": chain(a2, b2)})
+    assert diff.added_nodes == diff.removed_nodes == []
+    assert {n["previousId"] for n in diff.modified_nodes} == {"a", "b"}
+    assert all(n["matchedBy"] == "title" for n in diff.modified_nodes)
+    assert not diff.edges_changed
+    assert diff.impacts()["layout"]  # Ids changed: cached positions are keyed by the old ids
+
+
+def test_description_edit_invalidates_coverage_but_not_layout():
+    old = {"nodes": [node("a", "Receive", description="by email")]}
+    new = {"nodes": [node("a", "Receive", description="by portal")]}
+    diff = process_differ.diff(old, new)
+    assert diff.changed_fields == ["description"]
+    assert diff.impacts() == {"intelligence": True, "layout": False, "coverage": True}
+
+
+def test_single_reorder_reports_one_move():
+    nodes = [node(str(i), f"Step {i}") for i in range(6)]
+    reordered = nodes[:1] + nodes[2:5] + nodes[1:2] + nodes[5:]
+    diff = process_differ.diff({"nodes": nodes}, {"nodes": reordered})
+    assert [(n["id"], n["fromIndex"], n["toIndex"]) for n in diff.moved_nodes] == [("1", 1, 4)]
+    assert not diff.node_set_changed
+
+
+def test_edge_label_change_and_removed_node_edges():
+    a, b, c = node("a", "Check"), node("b", "Pay"), node("c", "Reject")
+    old_edges = [{"source": "a", "target": "b", "label": "Yes"}, {"source": "a", "target": "c", "label": "No"}]
+    new_edges = [{"source": "a", "target": "b", "label": "Approved"}]
+    diff = process_differ.diff({"nodes": [a, b, c], "edges": old_edges}, {"nodes": [a, b], "edges": new_edges})
+    assert [n["id"] for n in diff.removed_nodes] == ["c"]
+    assert diff.modified_edges[0]["changes"] == [{"field": "label", "before": "Yes", "after": "Approved"}]
+    assert [(e["source"], e["target"]) for e in diff.removed_edges] == [("a", "c")]
+
+
+def test_process_fields_only_compared_when_sent():
+    old = {"name": "Onboarding", "description": "Old", "nodes": []}
+    assert process_differ.diff(old, {"nodes": []}).process_changes == []
+    changes = process_differ.diff(old, {"name": "Supplier onboarding", "nodes": []}).process_changes
+    assert changes == [{"field": "name", "before": "Onboarding", "after": "Supplier onboarding"}]
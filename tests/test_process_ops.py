@@ -0,0 +1,154 @@
+import copy
+import random
+import time
+
+import pytest
+
+from graph_validation import new_node_id
+from process_ops import OperationError, apply_operations
+
+
+def graph(count=5):
+    nodes = [{"id": f"n{i}", "title": f"Step {i}"} for i in range(count)]
+    edges = [{"id": f"e{i}", "source": f"n{i}", "target": f"n{i + 1}"} for i in range(count - 1)]
+    return nodes, edges
+
+
+def ids(items):
+    return [item["id"] for item in items]
+
+
+def test_batch_is_all_or_nothing():
+    nodes, edges = graph()
+    before = copy.deepcopy((nodes, edges))
+    with pytest.raises(OperationError) as error:
+        apply_operations(nodes, edges, [
+            {"op": "update", "nodeId": "n1", "fields": {"title": "Checked"}},
+            {"op": "delete", "nodeId": "n2"},
+            {"op": "update", "nodeId": "n2", "fields": {"title": "Gone"}},
+        ])
+    assert error.value.index == 2
+    assert "not found" in error.value.message
+    assert (nodes, edges) == before
+
+
+def test_delete_drops_the_node_edges_for_later_ops():
+    nodes, edges = graph()
+    with pytest.raises(OperationError) as error:
+        apply_operations(nodes, edges, [
+            {"op": "delete", "nodeId": "n2"},
+            {"op": "updateEdge", "edgeId": "e1", "fields": {"label": "Yes"}},
+        ])
+    assert error.value.index == 1
+
+    batch = apply_operations(nodes, edges, [
+        {"op": "delete", "nodeId": "n2"},
+        {"op": "addEdge", "edge": {"source": "n1", "target": "n3"}},
+        {"op": "updateEdge", "edgeId": "e3", "fields": {"label": "Done"}},
+    ])
+    assert ids(batch.nodes) == ["n0", "n1", "n3", "n4"]
+    assert [(e["source"], e["target"]) for e in batch.edges] == [("n0", "n1"), ("n3", "n4"), ("n1", "n3")]
+    assert batch.edges[1]["label"] == "Done"
+
+
+def test_add_index_counts_nodes_left_after_deletes():
+    nodes, edges = graph()
+    batch = apply_operations(nodes, edges, [
+        {"op": "delete", "nodeId": "n0"},
+        {"op": "delete", "nodeId": "n1"},
+        {"op": "add", "node": {"title": "Inserted"}, "index": 1},
+        {"op": "add", "node": {"title": "Appended"}},
+        {"op": "add", "node": {"title": "Out of range"}, "index": 99},
+    ])
+    assert [n["title"] for n in batch.nodes] == ["Step 2", "Inserted", "Step 3", "Step 4", "Appended", "Out of range"]
+    assert [op["index"] for op in batch.applied[2:]] == [1, 4, 5]
+    assert len(batch.added_nodes) == 3 and batch.added_nodes[0] not in {"n0", "n1"}
+
+
+def test_reorder_and_last_node_see_only_live_nodes():
+    nodes, edges = graph(3)
+    batch = apply_operations(nodes, edges, [
+        {"op": "delete", "nodeId": "n1"},
+        {"op": "reorder", "nodeIds": ["n2", "n0"]},
+    ])
+    assert ids(batch.nodes) == ["n2", "n0"]
+    with pytest.raises(OperationError, match="last node"):
+        apply_operations(nodes, edges, [{"op": "delete", "nodeId": "n0"}, {"op": "delete", "nodeId": "n1"},
+                                        {"op": "delete", "nodeId": "n2"}])
+    with pytest.raises(OperationError, match="every node"):
+        apply_operations(nodes, edges, [{"op": "delete", "nodeId": "n1"}, {"op": "reorder", "nodeIds": ["n0", "n1", "n2"]}])
+
+
+def test_edges_without_ids_are_dropped_with_their_node():
+    nodes, _ = graph(3)
+    batch = apply_operations(nodes, [{"source": "n0", "target": "n1"}, {"source": "n1", "target": "n2"}],
+                             [{"op": "delete", "nodeId": "n1"}])
+    assert batch.edges == []
+
+
+def test_deleted_ids_are_not_reused():
+    nodes, edges = graph(3)
+    with pytest.raises(OperationError, match="already used"):
+        apply_operations(nodes, edges, [{"op": "delete", "nodeId": "n1"}, {"op": "add", "node": {"id": "n1"}}])
+
+
+def reference(nodes, edges, op):
+    """Plain list semantics the batch must match, one op at a time"""
+    if op["op"] == "delete":
+        nodes = [n for n in nodes if n["id"] != op["nodeId"]]
+        edges = [e for e in edges if op["nodeId"] not in (e["source"], e["target"])]
+    elif op["op"] == "add":
+        nodes = nodes[:op["index"]] + [dict(op["node"])] + nodes[op["index"]:]
+    elif op["op"] == "update":
+        nodes = [{**n, **op["fields"]} if n["id"] == op["nodeId"] else n for n in nodes]
+    elif op["op"] == "addEdge":
+        edges = edges + [{"label": None, "condition": None, **op["edge"]}]
+    elif op["op"] == "deleteEdge":
+        edges = [e for e in edges if e["id"] != op["edgeId"]]
+    return nodes, edges
+
+
+def test_random_batches_match_plain_list_semantics():
+    rng = random.Random(46)
+    for _ in range(50):
+        nodes, edges = graph(30)
+        expected_nodes, expected_edges, ops = nodes, edges, []
+        for step in range(40):
+            live = ids(expected_nodes)
+            kind = rng.choice(["delete", "add", "update", "addEdge", "deleteEdge"])
+            if kind == "delete" and len(live) > 1:
+                op = {"op": "delete", "nodeId": rng.choice(live)}
+            elif kind == "add":
+                op = {"op": "add", "node": {"id": f"x{step}", "title": f"Added {step}"}, "index": rng.randrange(len(live) + 1)}
+            elif kind == "addEdge":
+                op = {"op": "addEdge", "edge": {"id": f"y{step}", "source": rng.choice(live), "target": rng.choice(live)}}
+            elif kind == "deleteEdge" and expected_edges:
+                op = {"op": "deleteEdge", "edgeId": rng.choice(ids(expected_edges))}
+            else:
+                op = {"op": "update", "nodeId": rng.choice(live), "fields": {"title": f"Edit {step}"}}
+            ops.append(op)
+            expected_nodes, expected_edges = reference(expected_nodes, expected_edges, op)
+        batch = apply_operations(nodes, edges, ops)
+        assert [(n["id"], n["title"]) for n in batch.nodes] == [(n["id"], n["title"]) for n in expected_nodes]
+        assert batch.edges == expected_edges
+
+
+def test_many_deletes_stay_linear():
+    nodes, edges = graph(20_000)
+    ops = [{"op": "delete", "nodeId": f"n{i}"} for i in range(0, 20_000, 4)]
+    started = time.perf_counter()
+    batch = apply_operations(nodes, edges, ops)
+    assert time.perf_counter() - started < 2.0  # Re-indexing on every delete took over a minute
+    assert len(batch.nodes) == 15_000
+
+
+def test_deleted_ids_are_not_reissued_by_later_batches():
+    nodes = [{"id": f"node-{i}", "title": f"Step {i}"} for i in (1, 2, 3)]
+    edges = [{"id": "edge-1", "source": "node-1", "target": "node-2"}, {"id": "edge-2", "source": "node-2", "target": "node-3"}]
+    deleted = apply_operations(nodes, edges, [{"op": "delete", "nodeId": "node-3"}])
+    later = apply_operations(deleted.nodes, deleted.edges, [
+        {"op": "add", "node": {"title": "Unrelated step"}},
+        {"op": "addEdge", "edge": {"source": "node-1", "target": "node-2"}},
+    ])
+    assert later.added_nodes[0] != "node-3" and later.added_edges[0] != "edge-2"
+    assert new_node_id([{"id": "node-1"}, {"id": "node-2"}, {"id": "node-4"}]) not in {"node-1", "node-2", "node-3", "node-4"}
@@ -0,0 +1,157 @@
+import copy
+
+import pytest
+
+from process_patch import (
+    PatchError, apply_patch, history_delta, merge_patch_ops, normalize_ops, touched_projection, translate,
+)
+from version_store import apply_delta, versioned_content
+
+PROCESS = {
+    "id": "p1", "name": "Invoice approval", "description": "AP flow", "version": 4, "revision": 9,
+    "updatedAt": "2026-01-01T00:00:00+00:00", "actors": ["AP", "Finance"],
+    "nodes": [{"id": f"n{i}", "title": f"Step {i}", "description": "", "actors": ["AP"]} for i in range(4)],
+    "edges": [{"id": f"e{i}", "source": f"n{i}", "target": f"n{i + 1}"} for i in range(3)],
+}
+
+
+def ops(*raw):
+    return normalize_ops(list(raw))
+
+
+def test_targeted_paths_carry_their_preconditions():
+    query, update = translate(ops(
+        {"op": "test", "path": "/name", "value": "Invoice approval"},
+        {"op": "replace", "path": "/nodes/2/title", "value": "Approve"},
+        {"op": "add", "path": "/nodes/1/timeEstimate", "value": "5 min"},
+        {"op": "remove", "path": "/description"},
+    ))
+    assert query == {
+        "name": {"$exists": True, "$eq": "Invoice approval", "$not": {"$type": "array"}},
+        "nodes.2.title": {"$exists": True},
+        "nodes.1": {"$type": "object", "$not": {"$type": "array"}},
+        "description": {"$exists": True},
+    }
+    assert update == {"$set": {"nodes.2.title": "Approve", "nodes.1.timeEstimate": "5 min"}, "$unset": {"description": ""}}
+
+
+def test_add_under_a_list_of_objects_is_guarded():
+    # {"$type": "object"} alone matches an array that holds objects, so /nodes/x would write into every node
+    query, _ = translate(ops({"op": "add", "path": "/nodes/x", "value": 1}))
+    assert query["nodes"]["$not"] == {"$type": "array"}
+
+
+def test_appends_to_one_list_keep_their_order():
+    _, update = translate(ops(
+        {"op": "add", "path": "/actors/-", "value": "Legal"},
+        {"op": "add", "path": "/actors/-", "value": "Tax"},
+    ))
+    assert update == {"$push": {"actors": {"$each": ["Legal", "Tax"]}}}
+
+
+@pytest.mark.parametrize("patch", [
+    [{"op": "add", "path": "/nodes/1", "value": {"id": "x"}}],  # Insert by index shifts the list
+    [{"op": "remove", "path": "/nodes/1"}],
+    [{"op": "move", "from": "/nodes/1", "path": "/nodes/0"}],
+    [{"op": "copy", "from": "/name", "path": "/description"}],
+    [{"op": "replace", "path": "/nodes/1/title", "value": "A"}, {"op": "remove", "path": "/nodes/1"}],
+    [{"op": "replace", "path": "/name", "value": "A"}, {"op": "test", "path": "/name", "value": "A"}],
+    [{"op": "test", "path": "/nodes", "value": []}],
+    [{"op": "replace", "path": "/nodes/1/$where", "value": "x"}],
+    [{"op": "replace", "path": "/nodes/1/a.b", "value": "x"}],
+    [{"op": "add", "path": "/nodes/1/operationalDetails", "value": {}}, {"op": "add", "path": "/nodes/1/operationalDetails", "value": {}}],
+])
+def test_patches_needing_the_document_are_not_translated(patch):
+    assert translate(ops(*patch)) is None
+
+
+def test_merge_patch_becomes_add_and_optional_remove():
+    assert merge_patch_ops({"name": "New", "description": None, "theme": {"dark": True}}) == [
+        {"op": "add", "path": "/name", "value": "New"},
+        {"op": "remove", "path": "/description", "optional": True},
+        {"op": "add", "path": "/theme", "value": {}, "ifMissing": True},
+        {"op": "add", "path": "/theme/dark", "value": True},
+    ]
+    query, update = translate(normalize_ops(merge_patch_ops({"description": None})))
+    assert query == {} and update == {"$unset": {"description": ""}}
+
+
+def test_failed_test_is_a_conflict_and_bad_index_unprocessable():
+    with pytest.raises(PatchError) as error:
+        apply_patch(PROCESS, ops({"op": "test", "path": "/name", "value": "Other"}))
+    assert error.value.status == 409
+    with pytest.raises(PatchError) as error:
+        apply_patch(PROCESS, ops({"op": "replace", "path": "/nodes/9/title", "value": "x"}))
+    assert error.value.status == 422 and error.value.index == 0
+
+
+def test_apply_copies_only_the_patched_path():
+    patched = apply_patch(PROCESS, ops({"op": "replace", "path": "/nodes/1/title", "value": "Approve"}))
+    assert PROCESS["nodes"][1]["title"] == "Step 1"
+    assert patched["nodes"][1]["title"] == "Approve"
+    assert patched["nodes"][0] is PROCESS["nodes"][0]
+    assert patched["edges"] is PROCESS["edges"]
+
+
+def projected(process, projection):
+    """What Mongo returns for touched_projection()"""
+    result = {}
+    for path in projection:
+        if path.endswith(".id"):
+            field = path[:-3]
+            result[field] = [{"id": item["id"]} for item in process[field]]
+        else:
+            result[path] = copy.deepcopy(process[path])
+    return result
+
+
+@pytest.mark.parametrize("patch", [
+    [{"op": "replace", "path": "/nodes/2/title", "value": "Approve"}],
+    [{"op": "remove", "path": "/nodes/1/description"}, {"op": "add", "path": "/nodes/1/timeEstimate", "value": "5 min"}],
+    [{"op": "add", "path": "/nodes/-", "value": {"id": "n9", "title": "Archive"}},
+     {"op": "add", "path": "/nodes/-", "value": {"id": "n10", "title": "Notify"}}],
+    [{"op": "replace", "path": "/nodes/0", "value": {"id": "n0", "title": "Start"}}],
+    [{"op": "replace", "path": "/nodes/1", "value": {"id": "m1", "title": "Swapped"}},
+     {"op": "replace", "path": "/nodes/2", "value": {"id": "m2", "title": "Swapped too"}}],
+    [{"op": "add", "path": "/edges/0/label", "value": "Yes"}, {"op": "add", "path": "/actors/-", "value": "Legal"}],
+    [{"op": "replace", "path": "/actors/1", "value": "Treasury"}, {"op": "remove", "path": "/description"}],
+    [{"op": "replace", "path": "/nodes", "value": [{"id": "only", "title": "One"}]}],
+    [{"op": "test", "path": "/name", "value": "Invoice approval"}, {"op": "replace", "path": "/name", "value": "AP"}],
+])
+def test_history_delta_rebuilds_the_patched_document(patch):
+    patch = ops(*patch)
+    assert translate(patch) is not None
+    stamp = {"updatedAt": "2026-02-01T00:00:00+00:00", "version": 5}
+    delta = history_delta(patch, projected(PROCESS, touched_projection(patch)), stamp)
+    expected = versioned_content({**apply_patch(PROCESS, patch), **stamp})
+    assert apply_delta(versioned_content(PROCESS), delta) == expected
+
+
+def test_projection_is_ids_for_node_and_edge_lists():
+    patch = ops({"op": "replace", "path": "/nodes/2/title", "value": "A"}, {"op": "add", "path": "/actors/-", "value": "B"},
+                {"op": "replace", "path": "/name", "value": "C"})
+    assert touched_projection(patch) == {"nodes.id": 1, "actors": 1}
+
+
+def test_history_delta_gives_up_on_lists_not_keyed_by_id():
+    patch = ops({"op": "replace", "path": "/nodes/1/title", "value": "A"})
+    duplicated = {"nodes": [{"id": "n0"}, {"id": "n0"}]}
+    assert history_delta(patch, duplicated, {}) is None
+    pushed = ops({"op": "add", "path": "/nodes/-", "value": {"id": "n1", "title": "Again"}})
+    assert history_delta(pushed, projected(PROCESS, {"nodes.id": 1}), {}) is None
+
+
+@pytest.mark.parametrize("code, status", [(112, 409), (28, 422)])
+def test_database_write_errors_map_to_client_errors(api, monkeypatch, code, status):
+    from pymongo.errors import WriteError
+    server, db, client = api
+    db.users.documents.append({"id": "u1", "email": "owner@example.com"})
+    db.processes.documents.append({**PROCESS, "userId": "u1"})
+
+    async def failing_update(*args, **kwargs):
+        raise WriteError("Cannot create field 'x'", code, {"errmsg": "Cannot create field 'x'"})
+
+    monkeypatch.setattr(db.processes, "find_one_and_update", failing_update)
+    client.headers["Authorization"] = f"Bearer {server.create_access_token({'sub': 'u1'})}"
+    response = client.patch("/api/process/p1", json=[{"op": "replace", "path": "/nodes/1/title", "value": "A"}])
+    assert response.status_code == status
@@ -0,0 +1,167 @@
+import pytest
+
+STORED = {
+    "id": "p1", "name": "Onboarding", "description": "", "userId": "u1", "version": 3, "revision": 7,
+    "updatedAt": "2026-01-01T00:00:00+00:00", "createdAt": "2026-01-01T00:00:00+00:00", "actors": [],
+    "nodes": [{"id": "n1", "type": "trigger", "title": "Start", "description": "", "status": "trigger"}],
+    "edges": [],
+}
+
+
+def body(**changes):
+    return {key: value for key, value in {**STORED, **changes}.items() if key not in ("createdAt", "updatedAt")}
+
+
+@pytest.fixture
+def stored(api):
+    server, db, client = api
+    db.processes.documents.append(dict(STORED))
+    return server, db, client
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None), ("*", None), ("7", 7), ('"7"', 7), ('W/"7"', 7), (' "0" ', 0),
+])
+def test_if_match_parsing(api, header, expected):
+    server, _, _ = api
+    from starlette.requests import Request
+    headers = [(b"if-match", header.encode())] if header is not None else []
+    assert server.parse_if_match(Request({"type": "http", "headers": headers})) == expected
+
+
+def test_if_match_must_be_a_revision(stored):
+    _, _, client = stored
+    response = client.put("/api/process/p1", json=body(), headers={"If-Match": "abc"})
+    assert response.status_code == 400
+
+
+def test_revision_zero_matches_processes_without_revisions(api):
+    server, _, _ = api
+    assert server.revision_filter(None) == {}
+    assert server.revision_filter(0) == {"revision": {"$in": [0, None]}}
+    assert server.revision_filter(4) == {"revision": 4}
+
+
+def test_stale_revision_is_rejected_with_the_current_graph(stored):
+    _, db, client = stored
+    response = client.put("/api/process/p1", json=body(name="Renamed"), headers={"If-Match": '"6"'})
+    assert response.status_code == 409
+    detail = response.json()["detail"]
+    assert detail["revision"] == 7
+    assert detail["nodes"][0]["id"] == "n1"
+    assert response.headers["ETag"] == '"7"'
+    assert db.processes.documents[0]["name"] == "Onboarding"
+
+
+def test_write_lost_to_a_concurrent_edit_is_a_conflict(stored, monkeypatch):
+    _, db, client = stored
+    collection = db.processes
+    original = collection.find_one_and_update
+
+    async def racing_update(query, update, **kwargs):
+        collection.documents[0]["revision"] = 8  # Another writer lands between the read and the guarded write
+        return await original(query, update, **kwargs)
+
+    monkeypatch.setattr(collection, "find_one_and_update", racing_update)
+    response = client.put("/api/process/p1", json=body(name="Renamed"), headers={"If-Match": "7"})
+    assert response.status_code == 409
+    assert response.json()["detail"]["revision"] == 8
+
+
+def test_matching_revision_is_applied_and_bumped(stored):
+    _, db, client = stored
+    response = client.put("/api/process/p1", json=body(name="Renamed"), headers={"If-Match": "7"})
+    assert response.status_code == 200
+    assert response.json()["revision"] == 8
+    assert db.processes.documents[0]["name"] == "Renamed"
+    assert db.processes.documents[0]["revision"] == 8
+
+
+def test_version_follows_the_stored_document_not_the_body(stored):
+    _, db, client = stored
+    response = client.put("/api/process/p1", json=body(name="Renamed", version=99))
+    assert response.json()["version"] == 4
+    assert db.processes.documents[0]["version"] == 4
+    assert db.processes.documents[0]["lastChange"]["version"] == 4
+    assert [entry["version"] for entry in db.process_versions.documents] == [4]
+
+
+def test_unguarded_write_retries_after_losing_a_race(stored, monkeypatch):
+    _, db, client = stored
+    collection = db.processes
+    original = collection.find_one_and_update
+    raced = []
+
+    async def racing_update(query, update, **kwargs):
+        if not raced:
+            raced.append(True)
+            collection.documents[0].update(revision=8, version=4)
+        return await original(query, update, **kwargs)
+
+    monkeypatch.setattr(collection, "find_one_and_update", racing_update)
+    response = client.put("/api/process/p1", json=body(name="Renamed"))
+    assert response.status_code == 200
+    assert response.json()["version"] == 5
+    assert collection.documents[0]["revision"] == 9
+
+
+def test_missing_process_is_not_created(api):
+    _, db, client = api
+    assert client.put("/api/process/p1", json=body()).status_code == 404
+    assert db.process_versions.documents == []
+
+
+def race_first_write(collection, monkeypatch, **concurrent):
+    """Another writer lands between the first read and its guarded write"""
+    original = collection.find_one_and_update
+    raced = []
+
+    async def racing_update(query, update, **kwargs):
+        if not raced:
+            raced.append(True)
+            collection.documents[0].update(concurrent)
+        return await original(query, update, **kwargs)
+
+    monkeypatch.setattr(collection, "find_one_and_update", racing_update)
+
+
+def test_publish_bumps_revision_and_retries_after_a_race(stored, monkeypatch):
+    _, db, client = stored
+    race_first_write(db.processes, monkeypatch, revision=8, version=4, name="Concurrent edit")
+    response = client.patch("/api/process/p1/publish")
+    assert response.status_code == 200
+    process = db.processes.documents[0]
+    assert (process["status"], process["version"], process["revision"], process["name"]) == ("published", 5, 9, "Concurrent edit")
+    assert [entry["version"] for entry in db.process_versions.documents] == [5]
+
+
+def test_publish_gives_up_with_a_conflict(stored, monkeypatch):
+    server, db, client = stored
+    collection = db.processes
+
+    async def always_raced(query, update, **kwargs):
+        collection.documents[0]["revision"] += 1
+        return None
+
+    monkeypatch.setattr(collection, "find_one_and_update", always_raced)
+    assert client.patch("/api/process/p1/publish").status_code == 409
+    assert db.processes.documents[0]["version"] == 3 and db.process_versions.documents == []
+
+
+def restorable(server, db, client):
+    import asyncio
+    db.users.documents.append({"id": "u1", "email": "owner@example.com"})
+    asyncio.run(server.version_store.record(db[server.VERSION_COLLECTION], {**STORED, "version": 2, "name": "Old name"}))
+    client.headers["Authorization"] = f"Bearer {server.create_access_token({'sub': 'u1'})}"
+
+
+def test_restore_is_conditional_on_the_revision_it_read(stored, monkeypatch):
+    server, db, client = stored
+    restorable(server, db, client)
+    assert client.post("/api/process/p1/versions/2/restore", headers={"If-Match": "6"}).status_code == 409
+    race_first_write(db.processes, monkeypatch, revision=8, version=4)
+    response = client.post("/api/process/p1/versions/2/restore")
+    assert response.status_code == 200
+    process = db.processes.documents[0]
+    assert (process["name"], process["version"], process["revision"]) == ("Old name", 5, 9)
+    assert sorted(entry["version"] for entry in db.process_versions.documents) == [2, 5]
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from search_index import ProcessSearch
+from tests.fake_mongo import FakeCollection
+
+
+def process(process_id, name, updated_at):
+    return {"id": process_id, "userId": "u1", "status": "draft", "name": name, "description": "", "updatedAt": updated_at}
+
+
+def test_searches_without_writes_leave_the_index_alone():
+    collection = FakeCollection()
+    collection.documents += [
+        process("p1", "Invoice approval", "2026-03-01T10:00:00+00:00"),
+        process("p2", "Supplier onboarding", "2026-03-01T10:00:03+00:00"),  # Both inside the refresh overlap
+    ]
+    search = ProcessSearch()
+
+    async def run():
+        first = await search.search(collection, "u1", "invoice")
+        index = search.indexes["u1"]
+        state = (index.changes, len(index.ids))
+        second = await search.search(collection, "u1", "invoice")
+        third = await search.search(collection, "u1", "supplier")
+        return first, second, third, state, (index.changes, len(index.ids))
+
+    first, second, third, before, after = asyncio.run(run())
+    assert first == second and first["page"][0][0] == "p1" and third["page"][0][0] == "p2"
+    assert after == before
+
+
+def test_refresh_picks_up_a_write():
+    collection = FakeCollection()
+    collection.documents.append(process("p1", "Invoice approval", "2026-03-01T10:00:00+00:00"))
+    search = ProcessSearch()
+
+    async def run():
+        await search.search(collection, "u1", "invoice")
+        collection.documents[0].update(name="Expense approval", updatedAt="2026-03-01T10:00:01+00:00")
+        return await search.search(collection, "u1", "invoice"), await search.search(collection, "u1", "expense")
+
+    stale, fresh = asyncio.run(run())
+    assert stale["total"] == 0 and fresh["page"][0][0] == "p1"
@@ -0,0 +1,107 @@
+from structured_parser import CONDITION_RE, read_outline, structured_parser
+
+SOP = """Invoice Approval
+1. Receive the invoice from the supplier
+2. Check the PO number in Xero
+3. If the amount is over $5,000, send to the CFO for approval
+4. Otherwise approve and schedule payment
+5. File the invoice
+"""
+
+
+def parse(text):
+    result = structured_parser.parse(text)
+    return result["processes"][0] if result else None
+
+
+def test_thousands_separator_does_not_end_the_condition():
+    match = CONDITION_RE.match("If the amount is over $5,000, send to the CFO for approval")
+    assert match.groups() == ("the amount is over $5,000", "send to the CFO for approval")
+
+
+def test_comma_needs_following_whitespace():
+    assert CONDITION_RE.match("If amounts differ by 1,5 percent,escalate") is None
+
+
+def test_condition_with_thousands_becomes_one_decision():
+    process = parse(SOP)
+    titles = {node["title"]: node for node in process["nodes"]}
+    decision = titles["The amount is over $5,000?"]
+    assert decision["type"] == "decision"
+    assert "Send to the CFO for approval" in titles
+    assert not any(title.startswith("000") for title in titles)
+    labels = {(e["source"], e["label"]) for e in process["edges"] if e["source"] == decision["id"]}
+    assert labels == {(decision["id"], "YES"), (decision["id"], "NO")}
+
+
+def test_when_sentences_are_steps_not_decisions():
+    text = """1. When an invoice arrives, log it in Xero
+2. Check the supplier details
+3. Approve the invoice
+4. Schedule the payment
+"""
+    process = parse(text)
+    assert [node["type"] for node in process["nodes"]] == ["trigger", "process", "process", "process"]
+    assert process["nodes"][0]["title"] == "When an invoice arrives, log it in Xero"
+
+
+def test_meeting_notes_are_not_a_process():
+    notes = "Agenda\n- Budget\n- Hiring\n- Roadmap\n- Office move\n"
+    outline = read_outline(notes)
+    assert outline is not None and outline.confidence >= 0.75
+    assert outline.step_evidence is False
+    assert parse(notes) is None
+
+
+def test_short_lists_go_to_the_llm():
+    assert parse("1. Receive the request\n2. Review it\n3. Send the reply\n") is None
+
+
+def test_verb_led_bullets_are_steps():
+    text = "- Receive the request\n- Review the request\n- Approve or reject it\n- Notify the requester\n"
+    process = parse(text)
+    assert len(process["nodes"]) == 4
+
+
+def test_numbered_sequence_counts_as_evidence():
+    text = "1. Budget review\n2. Hiring plan\n3. Roadmap sign-off\n4. Office move\n"
+    assert read_outline(text).step_evidence is True
+
+
+def test_csv_with_next_references():
+    text = """Step,Task,Owner,Next,If No
+1,Receive request,Service desk,2,
+2,Is the request complete?,Service desk,3,4
+3,Fulfil request,Operations,,
+4,Return to requester,Service desk,,
+"""
+    process = parse(text)
+    assert [node["type"] for node in process["nodes"]][:2] == ["trigger", "decision"]
+    no_edges = [e for e in process["edges"] if e["label"] == "NO"]
+    assert len(no_edges) == 1 and no_edges[0]["target"] == process["nodes"][3]["id"]
+
+
+NESTED_OUTLINE = """Supplier Onboarding
+1. Receive the supplier request form
+   - Check the form is signed
+   - Confirm the bank details
+2. Verify the supplier in the vendor portal
+   continuing with the tax number check
+3. Create the supplier record in Xero
+4. Email the supplier a welcome pack
+"""
+
+
+def test_compaction_keeps_outline_nesting():
+    from text_compaction import text_compactor
+    assert parse(text_compactor.compact(NESTED_OUTLINE).text) == parse(NESTED_OUTLINE)
+
+
+def test_parse_endpoint_keeps_sub_steps(api):
+    _, _, client = api
+    response = client.post("/api/process/parse", json={"text": NESTED_OUTLINE, "inputType": "text"})
+    assert response.status_code == 200
+    nodes = response.json()["processes"][0]["nodes"]
+    assert len(nodes) == 4
+    assert nodes[0]["subSteps"] == ["Check the form is signed", "Confirm the bank details"]
+    assert nodes[1]["subSteps"] == ["continuing with the tax number check"]
@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/api/upload", "/api/process/import/bpmn", "/api/process/import/bpmn/bulk"])
+def test_declared_oversize_upload_is_rejected_before_reading(api, path):
+    server, _, client = api
+    limit = server.UPLOAD_SIZE_LIMITS[path]
+    size = str(limit + server.MULTIPART_OVERHEAD_BYTES + 1)
+    response = client.post(path, content=b"", headers={"Content-Length": size, "Content-Type": "multipart/form-data; boundary=x"})
+    assert response.status_code == 413
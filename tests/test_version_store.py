@@ -0,0 +1,168 @@
+import asyncio
+import copy
+import json
+import random
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+import version_store as store
+from tests.fake_mongo import FakeCollection
+from version_store import VersionConflictError, apply_delta, make_delta, version_store
+
+
+def process(nodes=8, **fields):
+    return {
+        "id": "p1", "name": "Invoice approval", "version": 1, "revision": 3, "views": 12,
+        "nodes": [{"id": f"n{i}", "title": f"Step {i}", "actors": ["AP"], "operationalDetails": {"systems": []}}
+                  for i in range(nodes)],
+        "edges": [{"id": f"e{i}", "source": f"n{i}", "target": f"n{i + 1}"} for i in range(nodes - 1)],
+        **fields,
+    }
+
+
+def round_trip(old, new):
+    delta = make_delta(old, new)
+    if delta is None:
+        assert old == new
+        return None
+    assert apply_delta(old, json.loads(json.dumps(delta))) == new
+    return delta
+
+
+def test_equal_documents_have_no_delta():
+    assert make_delta(process(), process()) is None
+
+
+def test_one_field_edit_stores_only_that_field():
+    old = process()
+    new = copy.deepcopy(old)
+    new["nodes"][5]["title"] = "Approve invoice"
+    delta = round_trip(old, new)
+    assert delta == {"d": {"c": {"nodes": {"l": {"c": {"n5": {"d": {"s": {"title": "Approve invoice"}}}}}}}}}
+
+
+def test_swap_is_one_placement():
+    old = process()
+    new = copy.deepcopy(old)
+    new["nodes"][2], new["nodes"][3] = new["nodes"][3], new["nodes"][2]
+    assert len(round_trip(old, new)["d"]["c"]["nodes"]["l"]["p"]) == 1
+
+
+def test_add_remove_and_unset_round_trip():
+    old = process(description="Draft")
+    new = copy.deepcopy(old)
+    del new["description"]
+    new["nodes"].insert(0, {"id": "start", "title": "Start"})
+    new["nodes"] = [n for n in new["nodes"] if n["id"] != "n4"]
+    new["nodes"].append({"id": "end", "title": "Done"})
+    round_trip(old, new)
+
+
+def test_lists_without_ids_are_replaced():
+    old = {"actors": ["AP", "Finance"]}
+    assert round_trip(old, {"actors": ["Finance"]}) == {"d": {"s": {"actors": ["Finance"]}}}
+
+
+def test_random_edit_sequences_round_trip():
+    rng = random.Random(44)
+    current = process(nodes=20)
+    for step in range(200):
+        new = copy.deepcopy(current)
+        nodes = new["nodes"]
+        action = rng.choice(["edit", "move", "add", "remove"])
+        if action == "edit" and nodes:
+            rng.choice(nodes)["title"] = f"Edited {step}"
+        elif action == "move" and len(nodes) > 1:
+            nodes.insert(rng.randrange(len(nodes)), nodes.pop(rng.randrange(len(nodes))))
+        elif action == "add":
+            nodes.insert(rng.randrange(len(nodes) + 1), {"id": f"x{step}", "title": "New"})
+        elif nodes:
+            nodes.pop(rng.randrange(len(nodes)))
+        round_trip(current, new)
+        current = new
+
+
+def test_history_rebuilds_every_version_across_snapshots(monkeypatch):
+    monkeypatch.setattr(store, "MAX_CHAIN_LENGTH", 3)
+    collection = FakeCollection()
+    versions = {}
+    current = process()
+
+    async def run():
+        for version in range(1, 10):
+            current["version"] = version
+            current["nodes"][version % 8]["title"] = f"Edited in {version}"
+            versions[version] = store.versioned_content(current)
+            await version_store.record(collection, current)
+        return [await version_store.load(collection, "p1", version) for version in range(1, 10)]
+
+    assert asyncio.run(run()) == [versions[v] for v in range(1, 10)]
+    kinds = [entry["kind"] for entry in sorted(collection.documents, key=lambda e: e["version"])]
+    assert kinds == ["snapshot", "delta", "delta", "delta", "snapshot", "delta", "delta", "delta", "snapshot"]
+    assert "views" not in versions[1] and "revision" not in versions[1]
+
+
+def test_recording_the_same_version_twice_is_idempotent():
+    collection = FakeCollection()
+
+    async def run():
+        first = await version_store.record(collection, process(version=2), summary={"event": "update"})
+        again = await version_store.record(collection, process(version=2, views=99, revision=4))
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert len(collection.documents) == 1
+    assert again["summary"] == first["summary"]
+
+
+def test_same_version_with_different_content_fails_loudly():
+    collection = FakeCollection()
+    changed = process(version=2)
+    changed["nodes"][0]["title"] = "Someone else's edit"
+
+    async def run():
+        await version_store.record(collection, process(version=2))
+        await version_store.record(collection, changed)
+
+    with pytest.raises(VersionConflictError, match="Version 2 of process p1"):
+        asyncio.run(run())
+    assert len(collection.documents) == 1
+
+
+def test_delta_recorded_without_the_document_rebuilds_like_a_full_record(monkeypatch):
+    monkeypatch.setattr(store, "MAX_CHAIN_LENGTH", 2)
+    collection = FakeCollection()
+    current = process()
+
+    async def run():
+        await version_store.record(collection, current)
+        recorded = []
+        for version in (2, 3, 4):
+            delta = {"d": {"s": {"version": version}, "c": {"nodes": {"l": {"c": {"n1": {"d": {"s": {"title": f"v{version}"}}}}}}}}}
+            recorded.append(await version_store.record_delta(collection, "p1", version, delta))
+        return recorded, await version_store.load(collection, "p1", 3)
+
+    recorded, loaded = asyncio.run(run())
+    assert [entry and entry["chain"] for entry in recorded] == [1, 2, None]  # Chain full: caller stores the document
+    assert loaded["version"] == 3 and loaded["nodes"][1]["title"] == "v3"
+
+
+def test_delta_needs_the_previous_version():
+    collection = FakeCollection()
+    assert asyncio.run(version_store.record_delta(collection, "p1", 5, {"d": {"s": {"version": 5}}})) is None
+    assert collection.documents == []
+
+
+def test_conflicting_delta_for_a_recorded_version_fails_loudly():
+    collection = FakeCollection()
+
+    async def run():
+        await version_store.record(collection, process())
+        await version_store.record_delta(collection, "p1", 2, {"d": {"s": {"version": 2, "name": "A"}}})
+        await version_store.record_delta(collection, "p1", 2, {"d": {"s": {"version": 2, "name": "A"}}})  # Retry: fine
+        await version_store.record_delta(collection, "p1", 2, {"d": {"s": {"version": 2, "name": "B"}}})
+
+    with pytest.raises(VersionConflictError):
+        asyncio.run(run())